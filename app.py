@@ -1,9 +1,14 @@
+import argparse
+import getpass
+
 from models.users import UserStore
 from models.auth_selector import AuthSelector
-from models.tabs.tickets import TicketManager
-from models.tabs.tasks import TaskManager
-from models.tabs.knowledge_base import KnowledgeBase
-from models.tabs.dashboard import Dashboard
+from models.assignment import AssignmentEngine
+from models.audit import AuditCorrupt
+from models.auth import Perm, verify_password
+from models.tenants import Tenant, TenantRegistry
+from models.render import write_lines
+from models.jobs import Scheduler
 
 # -----------------------------------------------------------------------------
 # Seed Users
@@ -11,9 +16,11 @@ from models.tabs.dashboard import Dashboard
 def seed_users():
     """Initialize system with default users."""
     store = UserStore()
-    store.add_user("Admin", role="Admin", status="Active")
-    store.add_user("Sam Patel", role="Agent", status="Active")
-    store.add_user("Dana Kim", role="Agent", status="Active")
+    store.add_user("Admin", role="Admin", status="Active", email="admin@helpdesk.local")
+    store.add_user("Sam Patel", role="Agent", status="Active", skills=["Support"],
+                   email="sam@helpdesk.local")
+    store.add_user("Dana Kim", role="Agent", status="Active", skills=["Support", "IT Ops"],
+                   email="dana@helpdesk.local")
     return store
 
 
@@ -23,31 +30,136 @@ def seed_users():
 class App:
     """Main app controller: login + tabs menu."""
 
-    def __init__(self):
+    def __init__(self, snapshot_path=None, data_dir=None, mail_spool=None, tenants_dir=None,
+                 replicate=None, setup_code=None):
         # Core state
-        self.user_store = seed_users()
         self.current_user = None
+        self.session = None
         self.running = True
+        self.tenant = None
+        self.setup_code = setup_code    # first-admin code from the command line (else random)
+
+        # Background maintenance jobs (index builds, audit checks) for every tenant
+        self.scheduler = Scheduler()
+
+        if tenants_dir:
+            # One helpdesk per client organisation, picked before login
+            self.registry = TenantRegistry(tenants_dir, seed_users=seed_users,
+                                           scheduler=self.scheduler)
+        else:
+            self.registry = None
+            self._bind(Tenant("default", snapshot_path, data_dir, mail_spool,
+                              seed_users=seed_users, replicate=replicate,
+                              scheduler=self.scheduler))
 
-        # Managers (pass user_store where needed)
-        self.ticket_manager = TicketManager(self.user_store)
-        self.task_manager = TaskManager(self.user_store)
-        self.kb = KnowledgeBase()
-        self.dashboard = Dashboard(self.ticket_manager, self.task_manager)
+    def _bind(self, tenant):
+        """Point the app (menus, tabs) at one tenant's managers and services."""
+        self.tenant = tenant
+        self.snapshot_path = tenant.snapshot_path
+        self.user_store = tenant.user_store
+        self.auth = tenant.auth
+        self.ticket_manager = tenant.ticket_manager
+        self.task_manager = tenant.task_manager
+        self.kb = tenant.kb
+        self.audit = tenant.audit
+        self.history = tenant.history
+        self.assigner = tenant.assigner
+        self.notifier = tenant.notifier
+        self.mail_gateway = tenant.mail_gateway
+        self.dashboard = tenant.dashboard
+        self.intake = tenant.intake
+        self.macros = tenant.macros
+        self.rules = tenant.rules
 
     # --- main loop ---
     def run(self):
+        self.scheduler.start()
+        if self.registry is None:
+            self.tenant.start()
         while self.running:
-            selector = AuthSelector(self.user_store)
-            self.current_user = selector.run()
-            if not self.current_user:
+            if self.registry is not None:
+                self.registry.evict_idle(keep=(self.tenant.name,) if self.tenant else ())
+                tenant = self._choose_tenant()
+                if tenant is None:
+                    break
+                self._bind(tenant)
+            self._announce_setup()
+            selector = AuthSelector(self.user_store, self.auth)
+            self.session = selector.run()
+            if not self.session:
                 break
+            self.current_user = self.session.user
             self._tabs_menu_loop()
-        print("Goodbye! (session reset)")
+            self.auth.logout(self.session.token)
+            self.session = self.current_user = None
+
+        if self.registry is not None:
+            self.registry.close_all()
+            self.scheduler.stop()
+            print("Goodbye! (tenant state saved under {})".format(self.registry.root))
+            return
+        self.tenant.close()
+        self.scheduler.stop()
+        if self.intake.stats["dropped"]:
+            print("⚠️  {} queued submission(s) could not become tickets (open-ticket quota) "
+                  "and were discarded; run with --data-dir to keep them.".format(
+                      self.intake.stats["dropped"]))
+        if self.snapshot_path:
+            print("Goodbye! (state saved to {})".format(self.snapshot_path))
+        else:
+            print("Goodbye! (session reset)")
+
+    def save(self):
+        """Persist all manager state to the snapshot file."""
+        self.tenant.save()
+
+    def _announce_setup(self):
+        """While no admin has a password, print the one-time code that sets the first one."""
+        code = self.auth.issue_setup_code(self.setup_code)
+        if code is None:
+            return
+        print("⚠️  No admin password is set for '{}'.".format(self.tenant.name))
+        if self.setup_code:
+            print("   Log in as an admin and enter the code passed with --setup-code.\n")
+        else:
+            print("   Log in as an admin and enter this one-time setup code: {}\n".format(code))
+
+    def _choose_tenant(self):
+        """Pick (or create) the organisation to work in. Returns None to exit."""
+        while True:
+            names = self.registry.names()
+            print("=" * 58)
+            print("  Select Organisation")
+            print("=" * 58)
+            for i, name in enumerate(names, start=1):
+                loaded = " (loaded)" if name in self.registry.loaded() else ""
+                print("{}) {}{}".format(i, name, loaded))
+            print("n) New organisation")
+            print("0) Exit\n")
+            s = input("Choose: ").strip().lower()
+            if s == "0":
+                return None
+            if s == "n":
+                name = input("Organisation name (letters, digits, - and _): ").strip()
+                try:
+                    return self.registry.create(name)
+                except ValueError as e:
+                    print("❌ {}\n".format(e))
+                    continue
+            if s.isdigit() and 1 <= int(s) <= len(names):
+                return self.registry.get(names[int(s) - 1])
+            print("❌ Invalid selection. Please try again.\n")
 
     # --- tabs navigation ---
     def _tabs_menu_loop(self):
         while True:
+            # turn queued public submissions into tickets, a bounded batch per tick
+            self.intake.drain()
+            # finish background jobs' short main-thread steps (e.g. installing an index)
+            self.scheduler.run_main()
+            if self.auth.authenticate(self.session.token) is None:
+                print("\n⚠️  Your session has expired or was revoked. Please log in again.\n")
+                return
             self._print_tabs_header()
             self._print_tabs_menu()
             choice = input("Enter a number: ").strip()
@@ -67,8 +179,22 @@ class App:
                 self._run_kb_tab()
             elif choice == "4":
                 self._run_dashboard_tab()
+            elif choice == "5":
+                self._run_change_password()
+            elif choice == "6" and self.mail_gateway:
+                self._run_mail_import()
+            elif choice == "7":
+                self._run_availability()
             elif choice == "8":   # client-facing ticket submission
                 self._run_client_submit_ticket()
+            elif choice == "10":
+                self.rules.run_ui(self.session)
+            elif choice == "11":
+                self._run_jobs()
+            elif choice == "12":  # client-facing status lookup
+                self.ticket_manager.ticket_status_ui()
+            elif choice == "13":
+                self._run_manage_users()
             else:
                 print("\n❌ Invalid option. Try again.\n")
 
@@ -87,22 +213,163 @@ class App:
         print("4) Dashboard")
         print("")
         print("Extra Options:")
+        print("5) Change my password")
+        if self.mail_gateway:
+            print("6) Import email from spool")
+        print("7) Set agent availability (Admin)")
         print("8) Submit a ticket (as a client)")
         print("9) Switch Agents")
+        print("10) Automation rules (Admin)")
+        print("11) Background jobs (Admin)")
+        print("12) Check ticket status (as a client)")
+        print("13) Manage users (Admin)")
         print("0) Exit\n")
 
     # --- tab launchers ---
+    def _require(self, perm):
+        if self.session.can(perm):
+            return True
+        print("\n❌ You don't have permission to do that.\n")
+        return False
+
     def _run_tickets_tab(self):
-        self.ticket_manager.run_ui(self.current_user)
+        if self._require(Perm.VIEW_QUEUE):
+            self.ticket_manager.run_ui(self.current_user, self.session)
 
     def _run_tasks_tab(self):
-        self.task_manager.run_ui(self.current_user)
+        if self._require(Perm.VIEW_QUEUE):
+            self.task_manager.run_ui(self.current_user, self.session)
 
     def _run_kb_tab(self):
-        self.kb.run_ui()
+        self.kb.run_ui(self.session)
 
     def _run_dashboard_tab(self):
-        self.dashboard.run_ui()
+        if self._require(Perm.VIEW_DASHBOARD):
+            self.dashboard.run_ui()
+
+    def _run_jobs(self):
+        if self._require(Perm.MANAGE_USERS):
+            self.scheduler.run_ui(group=self.tenant.name)
+
+    def _run_change_password(self):
+        current = getpass.getpass("Current password: ")
+        if not verify_password(current, self.current_user.password_hash):
+            print("❌ Wrong password.\n")
+            return
+        new = getpass.getpass("New password (min 8 chars): ")
+        if new != getpass.getpass("Repeat new password: "):
+            print("❌ Passwords don't match.\n")
+            return
+        try:
+            self.auth.set_password(self.current_user, new)
+        except ValueError as e:
+            print("❌ {}\n".format(e))
+            return
+        # set_password revoked every session of this user, including ours
+        print("✅ Password changed. Please log in again.\n")
+
+    def _run_mail_import(self):
+        if not self._require(Perm.IMPORT_MAIL):
+            return
+        print("\nReading mail spool...")
+        run = self.mail_gateway.poll()
+        print("✅ {} new ticket(s), {} repl(ies) threaded, {} skipped.".format(
+            run["created"], run["replies"], run["skipped"]))
+        if run["limited"]:
+            print("⚠️  {} message(s) dropped by the intake rate limits.".format(run["limited"]))
+        if run["deferred"]:
+            print("⚠️  Open-ticket quota reached; {} message(s) left in the spool.".format(
+                run["deferred"]))
+        print("")
+
+    def _run_availability(self):
+        """Admin-only: mark an agent Active/Inactive; an inactive agent's work is re-routed."""
+        if not self.session.can(Perm.MANAGE_USERS):
+            print("\n❌ Only admins can change agent availability.\n")
+            return
+        write_lines(["", "--- Agent Availability ---"] + [
+            "{:<4} {:<20} {:<8} {:<8} load={}".format(
+                u.id, u.name, u.role, u.status, AssignmentEngine.load_of(u))
+            for u in self.user_store.list_users()])
+        s = input("Toggle USER ID (or 0 to cancel): ").strip()
+        target = self.user_store.get_by_id(int(s)) if s.isdigit() else None
+        if target is None:
+            print("Cancelled.\n")
+            return
+        self.set_user_status(target, "Inactive" if target.is_active else "Active")
+
+    def set_user_status(self, user, status):
+        """Change availability and rebalance the agent's open work if they went inactive."""
+        before = user.status
+        self.user_store.set_status(user, status)
+        self.audit.record("user", user.id, "status",
+                          self.current_user.name if self.current_user else None,
+                          {"status": (before, status)})
+        self.assigner.touch([user])
+        if not user.is_active:
+            self.auth.revoke_user(user)
+            moved = self.ticket_manager.rebalance_user(user)
+            moved_tasks = self.task_manager.rebalance_user(user)
+            print("✅ {} is now {}; re-routed {} ticket(s) and {} task(s).\n".format(
+                user.name, status, len(moved), len(moved_tasks)))
+        else:
+            print("✅ {} is now {}.\n".format(user.name, status))
+
+    def _run_manage_users(self):
+        """Admin-only: passwords, department scope and API tokens of any user."""
+        if not self.session.can(Perm.MANAGE_USERS):
+            print("\n❌ Only admins can manage users.\n")
+            return
+        write_lines(["", "--- Users ---"] + [
+            "{:<4} {:<20} {:<8} {:<10} tokens={:<3} departments={}".format(
+                u.id, u.name, u.role, "password" if u.password_hash else "(none)",
+                len(u.api_tokens), ", ".join(u.departments) or "all")
+            for u in self.user_store.list_users()])
+        s = input("USER ID (or 0 to cancel): ").strip()
+        target = self.user_store.get_by_id(int(s)) if s.isdigit() else None
+        if target is None:
+            print("Cancelled.\n")
+            return
+        print("1) Set password")
+        print("2) Set departments")
+        print("3) Create API token")
+        print("4) Revoke all API tokens")
+        choice = input("Choose an action (or 0 to cancel): ").strip()
+
+        if choice == "1":
+            new = getpass.getpass("New password for {} (min 8 chars): ".format(target.name))
+            if new != getpass.getpass("Repeat password: "):
+                print("❌ Passwords don't match.\n")
+                return
+            try:
+                self.auth.set_password(target, new)
+            except ValueError as e:
+                print("❌ {}\n".format(e))
+                return
+            self._audit_user(target, "password")
+            print("✅ Password set for {}.\n".format(target.name))
+        elif choice == "2":
+            raw = input("Departments, comma-separated (blank = all): ")
+            before = list(target.departments)
+            self.auth.set_departments(target, raw.split(","))
+            self._audit_user(target, "departments", {"departments": (before, target.departments)})
+            print("✅ {} now works in: {}.\n".format(
+                target.name, ", ".join(target.departments) or "all departments"))
+        elif choice == "3":
+            token = self.auth.create_api_token(target)
+            self._audit_user(target, "token")
+            print("✅ API token for {} (shown once, store it now):\n   {}\n".format(
+                target.name, token))
+        elif choice == "4":
+            self.auth.revoke_api_tokens(target)
+            self._audit_user(target, "tokens revoked")
+            print("✅ Revoked every API token of {}.\n".format(target.name))
+        else:
+            print("Cancelled.\n")
+
+    def _audit_user(self, user, event, changes=None):
+        self.audit.record("user", user.id, event,
+                          self.current_user.name if self.current_user else None, changes or {})
 
     def _run_client_submit_ticket(self):
         self.ticket_manager.submit_ticket_ui()
@@ -112,5 +379,28 @@ class App:
 # Entrypoint
 # -----------------------------------------------------------------------------
 if __name__ == "__main__":
-    app = App()
-    app.run()
+    parser = argparse.ArgumentParser(description="Terminal ticketing system")
+    parser.add_argument("--snapshot", metavar="PATH",
+                        help="load state from / save state to this snapshot file")
+    parser.add_argument("--data-dir", metavar="DIR",
+                        help="directory for on-disk services (notification outbox, mail sink)")
+    parser.add_argument("--mail-spool", metavar="PATH",
+                        help="Maildir directory or mbox file to import email tickets from")
+    parser.add_argument("--tenants", metavar="DIR",
+                        help="run one helpdesk per organisation, each stored under DIR/<name>/")
+    parser.add_argument("--replicate", metavar="ADDR",
+                        help="serve read-only followers on host:port or a Unix socket path")
+    parser.add_argument("--setup-code", metavar="CODE",
+                        help="one-time code for setting the first admin password "
+                             "(default: a random code printed at startup)")
+    args = parser.parse_args()
+    if args.replicate and args.tenants:
+        parser.error("--replicate is only supported for a single helpdesk (not with --tenants)")
+
+    try:
+        app = App(snapshot_path=args.snapshot, data_dir=args.data_dir, mail_spool=args.mail_spool,
+                  tenants_dir=args.tenants, replicate=args.replicate, setup_code=args.setup_code)
+        app.run()
+    except AuditCorrupt as e:
+        # refuse to run on a tampered or damaged trail rather than write past it
+        raise SystemExit("❌ {}".format(e))
@@ -0,0 +1,84 @@
+"""
+Report timings for models/analytics.py over a synthetic ticket history.
+
+    python benchmarks/bench_analytics.py [--rows 10000000]
+
+Rows are generated straight into the column arrays (building 10M Ticket
+objects would take far longer than the reports), then each report is timed.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.analytics import Analytics, ColumnStore, Categories     # noqa: E402
+
+DEPARTMENTS = ["Support", "Billing", "IT", "Finance", "HR", "Facilities"]
+PRIORITIES = ["Low", "Normal", "High"]
+STATUSES = ["Open", "Resolved"]
+
+
+def synthetic(rows, agents, seed):
+    rnd = np.random.default_rng(seed)
+    now = int(time.time())
+    created = now - rnd.integers(0, 90 * 86400, rows)
+    created.sort()
+    duration = rnd.exponential(36 * 3600, rows).astype(np.int64)
+    resolved = created + duration
+    still_open = (resolved > now) | (rnd.random(rows) < 0.02)
+    resolved[still_open] = -1
+    store = ColumnStore(Analytics.TICKET_FIELDS, capacity=rows)
+    store.cats = {"department": Categories(DEPARTMENTS), "priority": Categories(PRIORITIES),
+                  "status": Categories(STATUSES),
+                  "assigned_to": Categories("Agent {}".format(i) for i in range(agents))}
+    assignee = rnd.integers(0, agents, rows).astype(np.int32)
+    assignee[rnd.random(rows) < 0.05] = -1
+    store.extend_codes(np.arange(1, rows + 1), created, resolved, {
+        "department": rnd.integers(0, len(DEPARTMENTS), rows),
+        "priority": rnd.choice(3, rows, p=[0.3, 0.5, 0.2]),
+        "status": np.where(resolved < 0, 0, 1),
+        "assigned_to": assignee,
+    })
+    return store, now
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    store, now = synthetic(args.rows, args.agents, args.seed)
+    print("generated {:,} rows in {:.2f}s".format(store.n, time.perf_counter() - t0))
+
+    an = Analytics.__new__(Analytics)       # reports only; no managers behind it
+    an.tickets = an.tasks = store
+    reports = [
+        ("counts by department", lambda: an.counts("ticket", "department")),
+        ("open by department x priority",
+         lambda: an.counts("ticket", "department", "priority", open_only=True)),
+        ("resolution p50/p90/p99", lambda: an.resolution_percentiles("ticket")),
+        ("resolution percentiles by priority",
+         lambda: an.resolution_percentiles("ticket", by="priority")),
+        ("throughput per agent, 7 daily buckets",
+         lambda: an.throughput("ticket", until=now, bucket=86400)),
+        ("backlog age by priority", lambda: an.backlog_age("ticket", now=now, by="priority")),
+    ]
+    total = 0.0
+    for name, fn in reports:
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        total += dt
+        print("  {:<40} {:>8.1f} ms".format(name, dt * 1e3))
+    print("  {:<40} {:>8.1f} ms".format("all reports", total * 1e3))
+
+
+if __name__ == "__main__":
+    main()
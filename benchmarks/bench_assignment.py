@@ -0,0 +1,85 @@
+"""
+Simulation benchmark for AssignmentEngine: fairness and routing throughput.
+
+    python benchmarks/bench_assignment.py [--agents 200] [--tickets 100000]
+
+A stream of tickets is created through TicketManager.create_ticket (so the
+engine routes each one); a fraction of open tickets is resolved as we go and
+a few agents go inactive mid-run to exercise rebalancing.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.users import UserStore                      # noqa: E402
+from models.tabs.tickets import TicketManager           # noqa: E402
+from models.assignment import AssignmentEngine          # noqa: E402
+
+DEPARTMENTS = ["Support", "IT Ops", "HR", "Finance", "Facilities"]
+
+
+def jain_index(values):
+    """1.0 = perfectly even load; 1/n = one agent has everything."""
+    values = list(values)
+    if not values or not any(values):
+        return 1.0
+    return sum(values) ** 2 / (len(values) * sum(v * v for v in values))
+
+
+def run(agents: int, tickets: int, resolve_rate: float, seed: int):
+    rnd = random.Random(seed)
+    store = UserStore()
+    for i in range(agents):
+        skills = rnd.sample(DEPARTMENTS, rnd.randint(1, 2))
+        store.add_user("Agent {}".format(i), skills=skills)
+
+    tm = TicketManager(store, seed=False)
+    engine = AssignmentEngine(store)
+    tm.assigner = engine
+
+    latencies = []
+    open_ids = []
+    start = time.perf_counter()
+    for n in range(tickets):
+        t0 = time.perf_counter()
+        t = tm.create_ticket("Issue {}".format(n), "Requester", department=rnd.choice(DEPARTMENTS))
+        latencies.append(time.perf_counter() - t0)
+        open_ids.append(t.id)
+
+        if rnd.random() < resolve_rate and open_ids:
+            idx = rnd.randrange(len(open_ids))
+            open_ids[idx], open_ids[-1] = open_ids[-1], open_ids[idx]
+            tm.resolve_tickets([open_ids.pop()], cascade=False)
+
+        if n and n % (tickets // 5 or 1) == 0:
+            # an agent goes home: their queue is re-routed
+            victim = store.list_users()[rnd.randrange(agents)]
+            if victim.status == "Active":
+                store.set_status(victim, "Inactive")
+                engine.touch([victim])
+                tm.rebalance_user(victim)
+    elapsed = time.perf_counter() - start
+
+    loads = list(engine.loads().values())
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    print("agents={} tickets={} open_at_end={}".format(agents, tickets, len(tm.tickets)))
+    print("throughput: {:,.0f} routed tickets/s (incl. create+resolve)".format(tickets / elapsed))
+    print("route p99:  {:.1f} µs".format(p99 * 1e6))
+    print("load:       min={} max={} mean={:.1f}".format(
+        min(loads), max(loads), sum(loads) / len(loads)))
+    print("fairness:   Jain index {:.3f} (1.0 = perfectly even)".format(jain_index(loads)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--tickets", type=int, default=100000)
+    parser.add_argument("--resolve-rate", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    run(args.agents, args.tickets, args.resolve_rate, args.seed)
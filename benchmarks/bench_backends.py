@@ -0,0 +1,128 @@
+"""
+Standard workload for every registered store and search backend (models/backends.py).
+
+    python benchmarks/bench_backends.py [--rows 100000] [--only sqlite log trigram]
+
+Stores: insert + flush, reopen, random reads on the reopened store, change 1%
+in place + flush, full scan. Search: index build, then the mean of a fixed
+query set. Backends that fail models/conformance.py are reported and skipped.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.backends import (SEARCH_BACKENDS, STORE_BACKENDS, TICKET_CODEC,   # noqa: E402
+                             open_search, open_store)
+from models.conformance import check_search, check_store                     # noqa: E402
+from models.tabs.tickets import Ticket                                       # noqa: E402
+
+from bench_search import DOMAINS, FIRST, QUERIES, WORDS                      # noqa: E402
+
+
+def synthetic(rows, seed):
+    rnd = random.Random(seed)
+    out = [Ticket(ticket_id=1, subject="Cannot log in to portal", from_name="Taylor",
+                  email="taylor@example.com", created_at=time.time())]
+    for tid in range(2, rows + 1):
+        name = rnd.choice(FIRST)
+        out.append(Ticket(ticket_id=tid, subject=" ".join(rnd.sample(WORDS, rnd.randint(2, 5))),
+                          from_name=name.title(), created_at=time.time(),
+                          email="{}{}@{}".format(name, rnd.randint(1, 999), rnd.choice(DOMAINS))))
+    return out
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def bench_store(name, tickets, reads, seed):
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    path = os.path.join(tmp, "tickets")
+    rnd = random.Random(seed)
+    ids = [t.id for t in tickets]
+    res = {}
+    try:
+        store = open_store(name, path, TICKET_CODEC)
+
+        def insert():
+            for t in tickets:
+                store[t.id] = t
+            store.flush()
+        res["insert"] = timed(insert)
+        if getattr(store, "persistent", True):
+            store.close()
+            t0 = time.perf_counter()
+            store = open_store(name, path, TICKET_CODEC)
+            res["reopen"] = time.perf_counter() - t0
+        sample = [rnd.choice(ids) for _ in range(reads)]
+        res["get"] = timed(lambda: [store[i] for i in sample]) / reads
+
+        def mutate():
+            for i in rnd.sample(ids, max(1, len(ids) // 100)):
+                store[i].status = "Pending"
+            store.flush()
+        res["mutate"] = timed(mutate)
+        res["scan"] = timed(lambda: sum(1 for _ in store.values()))
+        store.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return res
+
+
+def bench_search(name, tickets):
+    index = open_search(name)
+    res = {"build": timed(lambda: [index.add_ticket(t) for t in tickets])}
+    res["query"] = sum(timed(lambda: index.search(q, limit=5)) for q in QUERIES) / len(QUERIES)
+    index.close()
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--reads", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", nargs="*", help="backend names to run (default: all)")
+    args = parser.parse_args()
+
+    tickets = synthetic(args.rows, args.seed)
+    print("{:,} tickets\n".format(len(tickets)))
+
+    print("{:<12} {:>10} {:>10} {:>10} {:>12} {:>10}".format(
+        "Store", "insert s", "reopen s", "get µs", "mutate 1% s", "scan s"))
+    print("-" * 69)
+    for name in STORE_BACKENDS:
+        if args.only and name not in args.only:
+            continue
+        failures = check_store(name)
+        if failures:
+            print("{:<12} ❌ fails conformance ({})".format(name, failures[0]))
+            continue
+        r = bench_store(name, tickets, args.reads, args.seed)
+        print("{:<12} {:>10.2f} {:>10} {:>10.1f} {:>12.3f} {:>10.2f}".format(
+            name, r["insert"], "{:.2f}".format(r["reopen"]) if "reopen" in r else "-",
+            r["get"] * 1e6, r["mutate"], r["scan"]))
+
+    print("\n{:<12} {:>10} {:>10}".format("Search", "build s", "query ms"))
+    print("-" * 34)
+    for name in SEARCH_BACKENDS:
+        if args.only and name not in args.only:
+            continue
+        failures = check_search(name)
+        if failures:
+            print("{:<12} ❌ fails conformance ({})".format(name, failures[0]))
+            continue
+        r = bench_search(name, tickets)
+        print("{:<12} {:>10.2f} {:>10.1f}".format(name, r["build"], r["query"] * 1e3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Flood benchmark for public ticket intake: agent-side latency while spam pours in.
+
+    python benchmarks/bench_intake.py [--ticks 60] [--flood 1000] [--agents 20]
+
+Each simulated second a flood of submissions arrives (most from a handful of
+noisy sources/domains, the rest from random ones) while agents keep working:
+filter the queue, check for duplicates, claim and resolve. The same run is
+done twice, once creating every submission directly (the old behaviour) and
+once through Intake, and agent latency is compared early vs late in the run.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.users import UserStore                      # noqa: E402
+from models.tabs.tickets import TicketManager           # noqa: E402
+from models.assignment import AssignmentEngine          # noqa: E402
+from models.intake import Intake                        # noqa: E402
+
+NOISY_DOMAINS = ["spam{}.example".format(i) for i in range(5)]
+
+
+def make_submission(rnd, n):
+    if rnd.random() < 0.7:
+        domain = rnd.choice(NOISY_DOMAINS)
+        source = "api:{}".format(domain)
+    else:
+        domain = "d{}.example".format(rnd.randrange(100000))
+        source = "api:{}".format(rnd.randrange(100000))
+    fields = {"subject": "Buy cheap things {}".format(n), "from_name": "Bot",
+              "email": "u{}@{}".format(rnd.randrange(50), domain)}
+    return fields, source
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def run(mode, ticks, flood, agents, seed, spool_dir):
+    rnd = random.Random(seed)
+    store = UserStore()
+    for i in range(agents):
+        store.add_user("Agent {}".format(i))
+    tm = TicketManager(store, seed=False)
+    tm.assigner = AssignmentEngine(store)
+    tm.dedup                # build the duplicate index up front (not part of any sample)
+    intake = None
+    if mode == "intake":
+        intake = Intake(tm, spool_path=os.path.join(spool_dir, "spool.jsonl"))
+
+    latencies = []          # (tick, seconds) for one agent work cycle
+    submit_time = 0.0
+    n = 0
+    for tick in range(ticks):
+        now = float(tick)
+        t0 = time.perf_counter()
+        for _ in range(flood):
+            fields, source = make_submission(rnd, n)
+            n += 1
+            if intake is None:
+                tm.create_ticket(**fields)
+            else:
+                intake.submit(fields, source, now=now)
+        submit_time += time.perf_counter() - t0
+        if intake is not None:
+            intake.drain(now=now)
+
+        # agents' work for this second
+        for a in store.list_users()[:5]:
+            t0 = time.perf_counter()
+            tm.select_tickets("unassigned priority=High")
+            tm.find_duplicates("Cannot log in to portal", "x@corp.example")
+            mine = tm.get_user_tickets(a)
+            if mine:
+                tm.resolve_tickets([mine[0].id], a, cascade=False)
+            latencies.append((tick, time.perf_counter() - t0))
+
+    early = [s for t, s in latencies if t < ticks // 4]
+    late = [s for t, s in latencies if t >= ticks * 3 // 4]
+    print("[{}] open tickets at end: {:,}".format(mode, len(tm.tickets)))
+    print("    agent cycle p50/p99 early: {:.2f} / {:.2f} ms".format(
+        percentile(early, 0.5) * 1e3, percentile(early, 0.99) * 1e3))
+    print("    agent cycle p50/p99 late:  {:.2f} / {:.2f} ms".format(
+        percentile(late, 0.5) * 1e3, percentile(late, 0.99) * 1e3))
+    print("    submission cost: {:.1f} µs each".format(submit_time / max(1, n) * 1e6))
+    if intake is not None:
+        s = intake.stats
+        print("    created={created} queued={queued} spooled={spooled} rate_limited={rate_limited} "
+              "busy={busy} drained={drained}".format(**s))
+        print("    still pending: {:,}".format(intake.pending()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=60, help="simulated seconds")
+    parser.add_argument("--flood", type=int, default=1000, help="submissions per second")
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("direct", "intake"):
+            run(mode, args.ticks, args.flood, args.agents, args.seed, tmp)
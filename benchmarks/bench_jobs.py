@@ -0,0 +1,119 @@
+"""
+Background job scheduler (models/jobs.py): throughput, work stealing and UI latency.
+
+    python benchmarks/bench_jobs.py [--threads 4] [--jobs 20000] [--actions 300]
+
+Measured: no-op job throughput; a fan-out workload (each job spawns sub-jobs
+onto its own worker's deque) with the share of work idle workers stole; and
+the latency of agent actions on the main thread (create a ticket + search +
+run_main) while no job runs, while CPU-heavy thread jobs run (they share
+the GIL with the tab loop) and while the same work runs as process jobs.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.jobs import Scheduler                      # noqa: E402
+from models.tabs.tickets import TicketManager          # noqa: E402
+
+from bench_search import FIRST, QUERIES, WORDS         # noqa: E402
+
+
+def burn(n):
+    """CPU-bound stand-in for a maintenance job (hashing, index building)."""
+    x = 0
+    for i in range(n):
+        x = (x * 31 + i) % 1000003
+    return x
+
+
+def noop():
+    return None
+
+
+def throughput(sched, n):
+    t0 = time.perf_counter()
+    jobs = [sched.submit(noop) for _ in range(n)]
+    for j in jobs:
+        j.wait()
+    return n / (time.perf_counter() - t0)
+
+
+def fan_out(sched, parents, children, work):
+    def parent():
+        parts = [sched.spawn(burn, work) for _ in range(children)]
+        sched.join(parts)
+    before = sched.stats["stolen"]
+    t0 = time.perf_counter()
+    jobs = [sched.submit(parent) for _ in range(parents)]
+    for j in jobs:
+        j.wait()
+    return time.perf_counter() - t0, sched.stats["stolen"] - before
+
+
+def agent_actions(sched, tm, n, rnd):
+    """Latency of n interactive actions, as the tab loop performs them."""
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        tm.create_ticket(" ".join(rnd.sample(WORDS, 3)), rnd.choice(FIRST).title())
+        tm.search_tickets(rnd.choice(QUERIES), limit=5)
+        sched.run_main()
+        out.append(time.perf_counter() - t0)
+        time.sleep(0.002)                   # think time between actions
+    return out
+
+
+def report(label, lat):
+    lat = sorted(lat)
+    print("{:<34} p50 {:>7.2f} ms   p99 {:>7.2f} ms   max {:>7.2f} ms".format(
+        label, statistics.median(lat) * 1e3, lat[int(len(lat) * 0.99) - 1] * 1e3, lat[-1] * 1e3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--actions", type=int, default=300)
+    parser.add_argument("--tickets", type=int, default=20000)
+    args = parser.parse_args()
+
+    sched = Scheduler(threads=args.threads, processes=args.processes)
+    sched.start()
+    print("{} worker threads, {} processes, {} CPUs\n".format(
+        sched.threads, sched.processes, os.cpu_count()))
+
+    print("no-op jobs: {:,.0f}/s".format(throughput(sched, args.jobs)))
+    took, stolen = fan_out(sched, parents=8, children=50, work=20000)
+    print("fan-out 8 x 50 sub-jobs: {:.2f}s, {} of 400 sub-jobs stolen by idle workers\n".format(
+        took, stolen))
+
+    rnd = random.Random(1)
+    tm = TicketManager(seed=True)
+    for _ in range(args.tickets):
+        tm.create_ticket(" ".join(rnd.sample(WORDS, 3)), rnd.choice(FIRST).title())
+    tm.search_index
+
+    report("agent actions, idle scheduler", agent_actions(sched, tm, args.actions, rnd))
+    for kind in ("thread", "process"):
+        load = [sched.submit(burn, 3_000_000, kind=kind, priority="low")
+                for _ in range(sched.threads if kind == "thread" else max(1, sched.processes))]
+        if kind == "process":
+            while not any(j.state == "running" for j in load):
+                time.sleep(0.01)
+            time.sleep(1.0)                 # let the spawned workers finish importing
+        report("agent actions, {} jobs busy".format(kind), agent_actions(sched, tm, args.actions, rnd))
+        for j in load:
+            j.cancel()
+            j.wait()
+    sched.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Leader/follower replication (models/replication.py) across local processes.
+
+    python benchmarks/bench_replication.py [--followers 2] [--writes 2000] [--rate 500]
+
+The parent is the leader; each follower is its own process. Measured:
+bootstrap time, replication lag while the leader writes at --rate records/s
+and the followers serve search + list reads, the followers' read throughput,
+and failover (follower 1 is promoted, the others re-point at it and sync).
+Leader and followers share the machine's cores, so read throughput and lag
+reflect how many there are.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.audit import AuditLog                                      # noqa: E402
+from models.replication import ReplicationFollower, ReplicationLeader  # noqa: E402
+from models.tabs.tasks import TaskManager                              # noqa: E402
+from models.tabs.tickets import TicketManager                          # noqa: E402
+from models.users import UserStore                                     # noqa: E402
+
+from bench_search import FIRST, QUERIES, WORDS                         # noqa: E402
+
+
+def follower_main(address, commands, results):
+    f = ReplicationFollower(address, max_staleness=5.0)
+    t0 = time.perf_counter()
+    f.start()
+    f.wait_for(0, timeout=30)
+    with f.read():
+        f.ticket_manager.search_index          # built on first search; part of joining
+    results.put(("synced", time.perf_counter() - t0))
+    leader = None
+    rnd = random.Random(os.getpid())
+    while True:
+        cmd, arg = commands.get()
+        if cmd == "read":                   # serve reads until the leader's final seq arrives
+            reads, worst = 0, 0.0
+            while True:
+                with f.read():
+                    f.ticket_manager.search_tickets(rnd.choice(QUERIES), limit=5)
+                    len(f.ticket_manager.tickets)
+                    worst = max(worst, f.leader_seq - f.applied)
+                reads += 1
+                if not commands.empty():
+                    break
+            _, final = commands.get()
+            f.wait_for(final, timeout=30)
+            results.put(("read", (reads, worst, time.time())))
+        elif cmd == "promote":
+            t0 = time.perf_counter()
+            leader = f.promote("127.0.0.1:0")
+            results.put(("promoted", (leader.address, time.perf_counter() - t0)))
+        elif cmd == "write":                # as the new leader
+            for i in range(arg):
+                leader.ticket_manager.create_ticket("after failover {}".format(i), "Quinn")
+            results.put(("written", len(leader.audit)))
+        elif cmd == "follow":
+            t0 = time.perf_counter()
+            address, seq = arg
+            old = f.term
+            f.follow(address)
+            while f.term == old or f.applied < seq:   # new term arrives as a snapshot
+                time.sleep(0.002)
+            results.put(("followed", time.perf_counter() - t0))
+        elif cmd == "stop":
+            if leader is not None:
+                leader.stop()
+            f.stop()
+            return
+
+
+def collect(results, kind, n):
+    out = []
+    while len(out) < n:
+        k, v = results.get(timeout=60)
+        if k == kind:
+            out.append(v)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--followers", type=int, default=2)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=500.0, help="leader writes per second")
+    parser.add_argument("--preload", type=int, default=20000, help="open tickets before followers join")
+    args = parser.parse_args()
+
+    users = UserStore()
+    users.add_user("Admin", role="Admin", status="Active")
+    audit = AuditLog()
+    tm = TicketManager(users, seed=True)
+    ta = TaskManager(users, ticket_manager=tm, seed=True)
+    tm.task_manager = ta
+    tm.add_listener(audit.ticket_listener)
+    ta.add_listener(audit.task_listener)
+    rnd = random.Random(1)
+    for _ in range(args.preload):
+        tm.create_ticket(" ".join(rnd.sample(WORDS, 3)), rnd.choice(FIRST).title())
+    leader = ReplicationLeader(audit, users, tm, ta, "127.0.0.1:0")
+    leader.start()
+
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    commands = [ctx.Queue() for _ in range(args.followers)]
+    procs = [ctx.Process(target=follower_main, args=(leader.address, c, results))
+             for c in commands]
+    for p in procs:
+        p.start()
+    synced = collect(results, "synced", args.followers)
+    print("{} followers bootstrapped {:,} open tickets in {:.2f}s (slowest)".format(
+        args.followers, len(tm.tickets), max(synced)))
+
+    for c in commands:
+        c.put(("read", None))
+    t0 = time.time()
+    for i in range(args.writes):
+        if i % 4 == 3:
+            tm.resolve_tickets([next(iter(tm.tickets))])
+        else:
+            tm.create_ticket(" ".join(rnd.sample(WORDS, 3)), rnd.choice(FIRST).title())
+        delay = t0 + (i + 1) / args.rate - time.time()
+        if delay > 0:
+            time.sleep(delay)
+    done = time.time()
+    for c in commands:
+        c.put(("final", len(audit)))
+    reads = collect(results, "read", args.followers)
+    elapsed = done - t0
+    print("leader wrote {:,} records in {:.2f}s ({:,.0f}/s)".format(args.writes, elapsed,
+                                                                   args.writes / elapsed))
+    print("caught up {:.1f} ms after the last write (slowest follower)".format(
+        max(r[2] for r in reads) * 1e3 - done * 1e3))
+    print("worst observed backlog: {:,} records".format(max(r[1] for r in reads)))
+    print("follower reads: {:,.0f}/s total ({:,.0f}/s each, search + list)".format(
+        sum(r[0] for r in reads) / elapsed, sum(r[0] for r in reads) / elapsed / args.followers))
+
+    # failover: stop the leader, promote follower 1, re-point the rest
+    leader.stop()
+    commands[0].put(("promote", None))
+    address, dt = collect(results, "promoted", 1)[0]
+    print("\nfollower 1 promoted in {:.1f} ms, serving on {}".format(dt * 1e3, address))
+    commands[0].put(("write", 100))
+    seq = collect(results, "written", 1)[0]
+    for c in commands[1:]:
+        c.put(("follow", (address, seq)))
+    for dt in collect(results, "followed", args.followers - 1):
+        print("  a follower re-synced to the new leader in {:.1f} ms".format(dt * 1e3))
+
+    for c in commands:
+        c.put(("stop", None))
+    for p in procs:
+        p.join(10)
+
+
+if __name__ == "__main__":
+    main()
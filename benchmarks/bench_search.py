@@ -0,0 +1,59 @@
+"""
+Index build and query timings for models/search.py over synthetic tickets.
+
+    python benchmarks/bench_search.py [--rows 1000000]
+
+Ticket text is generated straight into the index (no Ticket objects), with
+ticket 1 being the seed "Cannot log in to portal" from Taylor.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.search import TicketSearch, ticket_text     # noqa: E402
+
+WORDS = ("printer vpn email password reset laptop slow cannot connect login portal error "
+         "outlook sync monitor keyboard mouse request access account locked install update "
+         "network wifi drive shared folder permission license software crash screen").split()
+FIRST = ("alex sam dana jordan morgan chris priya casey riley jamie avery quinn rowan "
+         "harper logan parker reese skyler drew blake").split()
+DOMAINS = ("example.com", "acme.org", "globex.net", "initech.io", "umbrella.co")
+QUERIES = ("taylr portal login", "pasword reset", "vpn cant conect", "printer jordan",
+           "outlok sync acme", "taylor@example.com")
+
+
+def synthetic(index, rows, seed):
+    rnd = random.Random(seed)
+    index.add(1, ticket_text("Cannot log in to portal", "Taylor", "taylor@example.com"))
+    for tid in range(2, rows + 1):
+        name = rnd.choice(FIRST)
+        subject = " ".join(rnd.sample(WORDS, rnd.randint(2, 5)))
+        email = "{}{}@{}".format(name, rnd.randint(1, 999), rnd.choice(DOMAINS))
+        index.add(tid, ticket_text(subject, name.title(), email))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    index = TicketSearch()
+    t0 = time.perf_counter()
+    synthetic(index, args.rows, args.seed)
+    print("indexed {:,} tickets in {:.1f}s".format(len(index), time.perf_counter() - t0))
+
+    for q in QUERIES:
+        t0 = time.perf_counter()
+        hits = index.search(q, limit=5)
+        dt = time.perf_counter() - t0
+        print("  {:<24} {:>8.1f} ms   top: {}".format(
+            q, dt * 1e3, ", ".join("{} ({:.0%})".format(tid, s) for tid, s in hits[:3])))
+
+
+if __name__ == "__main__":
+    main()
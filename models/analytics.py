@@ -0,0 +1,440 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:             # analytics are optional: pip install numpy
+    np = None
+
+from models.jobs import check_cancelled
+
+HAVE_NUMPY = np is not None
+
+# -----------------------------------------------------------------------------
+# Column store
+# -----------------------------------------------------------------------------
+NONE_LABEL = "(none)"           # shown for missing labels (e.g. unassigned)
+
+
+class Categories:
+    """Label <-> small int code for one categorical column (None is code -1)."""
+
+    def __init__(self, labels: Iterable[str] = ()):
+        self.labels = list(labels)
+        self._codes = {label: i for i, label in enumerate(self.labels)}
+
+    def code(self, label) -> int:
+        if label is None:
+            return -1
+        c = self._codes.get(label)
+        if c is None:
+            c = self._codes[label] = len(self.labels)
+            self.labels.append(label)
+        return c
+
+    def __len__(self):
+        return len(self.labels)
+
+
+class ColumnStore:
+    """
+    One kind of item (tickets or tasks) as NumPy columns: id, created and
+    resolved (int64 epoch seconds; -1 = unknown / still open) and an int32
+    code column per categorical field. Arrays grow by doubling. Rows are
+    kept in id order, one per id, so a row is found by a binary search on the
+    id column: bulk extends must continue the order (ValueError otherwise),
+    and upsert() inserts or overwrites a single row wherever its id falls.
+    """
+
+    def __init__(self, fields: Sequence[str], capacity: int = 1024):
+        self.fields = tuple(fields)
+        self.cats = {f: Categories() for f in self.fields}
+        self.n = 0
+        self._id = np.empty(capacity, np.int64)
+        self._created = np.empty(capacity, np.int64)
+        self._resolved = np.empty(capacity, np.int64)
+        self._codes = {f: np.empty(capacity, np.int32) for f in self.fields}
+
+    # ---------- views (length n, no copies) ----------
+    @property
+    def ids(self):
+        return self._id[:self.n]
+
+    @property
+    def created(self):
+        return self._created[:self.n]
+
+    @property
+    def resolved(self):
+        return self._resolved[:self.n]
+
+    def codes(self, field: str):
+        return self._codes[field][:self.n]
+
+    # ---------- writes ----------
+    def _reserve(self, extra: int):
+        need = self.n + extra
+        cap = len(self._id)
+        if need <= cap:
+            return
+        while cap < need:
+            cap *= 2
+        for name in ("_id", "_created", "_resolved"):
+            old = getattr(self, name)
+            new = np.empty(cap, old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+        for f, old in self._codes.items():
+            new = np.empty(cap, old.dtype)
+            new[:self.n] = old[:self.n]
+            self._codes[f] = new
+
+    def _check_order(self, ids):
+        ids = np.asarray(ids, np.int64)
+        if len(ids) and ((self.n and ids[0] <= self._id[self.n - 1]) or (np.diff(ids) <= 0).any()):
+            raise ValueError("ColumnStore rows must be appended in increasing id order.")
+
+    def extend(self, ids, created, resolved, labels: Dict[str, Sequence]):
+        """Append many rows; `labels` maps each field to a sequence of labels."""
+        self._check_order(ids)
+        k = len(ids)
+        self._reserve(k)
+        lo, hi = self.n, self.n + k
+        self._id[lo:hi] = ids
+        self._created[lo:hi] = created
+        self._resolved[lo:hi] = resolved
+        for f in self.fields:
+            cat = self.cats[f]
+            self._codes[f][lo:hi] = [cat.code(v) for v in labels[f]]
+        self.n = hi
+
+    def extend_codes(self, ids, created, resolved, codes: Dict[str, Sequence[int]]):
+        """Like extend() but with codes already assigned (bulk loads, benchmarks)."""
+        self._check_order(ids)
+        k = len(ids)
+        self._reserve(k)
+        lo, hi = self.n, self.n + k
+        self._id[lo:hi] = ids
+        self._created[lo:hi] = created
+        self._resolved[lo:hi] = resolved
+        for f in self.fields:
+            self._codes[f][lo:hi] = codes[f]
+        self.n = hi
+
+    def row(self, item_id: int) -> Optional[int]:
+        i = int(np.searchsorted(self.ids, item_id))
+        return i if i < self.n and self._id[i] == item_id else None
+
+    def upsert(self, item_id: int, created: int, resolved: int, labels: Dict[str, object]):
+        """Insert one row in id order, or overwrite the row already holding `item_id`."""
+        i = int(np.searchsorted(self.ids, item_id))
+        if i == self.n or self._id[i] != item_id:
+            self._reserve(1)
+            arrays = [self._id, self._created, self._resolved] + list(self._codes.values())
+            for a in arrays:
+                a[i + 1:self.n + 1] = a[i:self.n]
+            self.n += 1
+        self._id[i] = item_id
+        self._created[i] = created
+        self._resolved[i] = resolved
+        for f in self.fields:
+            self.set_label(i, f, labels[f])
+
+    def merge(self, other: "ColumnStore"):
+        """Add `other`'s rows for ids not already here (rows here win), keeping id order."""
+        keep = ~np.isin(other.ids, self.ids)
+        if not keep.any():
+            return
+        ids = np.concatenate([self.ids, other.ids[keep]])
+        order = np.argsort(ids, kind="stable")
+        self._id = ids[order]
+        self._created = np.concatenate([self.created, other.created[keep]])[order]
+        self._resolved = np.concatenate([self.resolved, other.resolved[keep]])[order]
+        for f in self.fields:
+            # other's codes -> ours; the trailing -1 maps other's None (-1) to None
+            remap = np.array([self.cats[f].code(label) for label in other.cats[f].labels] + [-1],
+                             np.int32)
+            self._codes[f] = np.concatenate([self.codes(f), remap[other.codes(f)[keep]]])[order]
+        self.n = len(ids)
+
+    def set_label(self, row: int, field: str, label):
+        self._codes[field][row] = self.cats[field].code(label)
+
+    def set_resolved(self, row: int, ts: int):
+        self._resolved[row] = ts
+
+    # ---------- persistence ----------
+    def arrays(self, prefix: str) -> dict:
+        out = {prefix + "id": self.ids, prefix + "created": self.created,
+               prefix + "resolved": self.resolved,
+               prefix + "labels": np.array(json.dumps({f: self.cats[f].labels for f in self.fields}))}
+        for f in self.fields:
+            out[prefix + "code_" + f] = self.codes(f)
+        return out
+
+    @classmethod
+    def from_arrays(cls, fields, data, prefix: str) -> "ColumnStore":
+        ids = data[prefix + "id"]
+        store = cls(fields, capacity=max(1024, len(ids)))
+        labels = json.loads(str(data[prefix + "labels"]))
+        for f in store.fields:
+            store.cats[f] = Categories(labels[f])
+        store.extend_codes(ids, data[prefix + "created"], data[prefix + "resolved"],
+                           {f: data[prefix + "code_" + f] for f in store.fields})
+        return store
+
+
+# grouped percentiles pack (group, duration in seconds) into one int64 sort key
+_GROUP_SHIFT = 40
+_DURATION_MASK = (1 << _GROUP_SHIFT) - 1      # ~34,800 years
+
+
+def _stamp(ts) -> int:
+    return -1 if ts is None else int(ts)
+
+
+def _label(cats: Categories, code: int) -> str:
+    return NONE_LABEL if code < 0 else cats.labels[code]
+
+
+# -----------------------------------------------------------------------------
+# Analytics
+# -----------------------------------------------------------------------------
+class Analytics:
+    """
+    Ticket and task history as column arrays, kept current by manager
+    listeners, with reports computed by vectorized NumPy operations (no loops
+    over rows; at most one per group or percentile).
+
+    Built once from the managers (open and archived tickets, open tasks) or
+    from `path` (an .npz written by save()), which is how resolved tasks —
+    not kept by TaskManager — stay in the history across restarts. Archived
+    tickets still undecoded in a snapshot are left out of the startup build;
+    warm() adds them from a background job, and the first report or save()
+    before that finishes them in the foreground.
+    """
+
+    TICKET_FIELDS = ("department", "priority", "status", "assigned_to")
+    TASK_FIELDS = ("department", "status", "assigned_to")
+
+    def __init__(self, ticket_manager, task_manager, path: Optional[str] = None):
+        if np is None:
+            raise RuntimeError("Analytics need NumPy (pip install numpy).")
+        self.ticket_manager = ticket_manager
+        self.task_manager = task_manager
+        self.path = path
+        self._deferred = None           # (archive, [ids]) not yet in self.tickets
+        if not (path and os.path.exists(path) and self._load(path)):
+            self._build()
+
+    def _store(self, kind: str) -> ColumnStore:
+        self.ensure_history()
+        return self.tickets if kind == "ticket" else self.tasks
+
+    # ---------- building ----------
+    def _build(self):
+        tm, ta = self.ticket_manager, self.task_manager
+        archive = tm.archived
+        if hasattr(archive, "raw_refs"):
+            # LazyArchive: decoded entries now, the rest later (see warm)
+            archived = [t for _, t in archive.loaded_items()]
+            pending = [tid for tid, _ in archive.raw_refs()]
+            self._deferred = (archive, pending) if pending else None
+        else:
+            archived = list(archive.values())
+        tickets = sorted(list(tm.tickets.values()) + archived, key=lambda t: t.id)
+        self.tickets = self._from_items(self.TICKET_FIELDS, tickets)
+        tasks = sorted(ta.tasks.values(), key=lambda t: t.id) if ta is not None else []
+        self.tasks = self._from_items(self.TASK_FIELDS, tasks)
+
+    def _build_deferred(self, deferred) -> ColumnStore:
+        archive, ids = deferred
+        items = []
+        for n, tid in enumerate(ids):
+            if n % 1000 == 999:
+                check_cancelled()       # no-op unless running as a background job
+            items.append(archive.peek(tid))
+        items.sort(key=lambda t: t.id)
+        return self._from_items(self.TICKET_FIELDS, items)
+
+    def _install_deferred(self, deferred, store: ColumnStore):
+        if self._deferred is not deferred:
+            return                      # finished in the foreground meanwhile
+        self.tickets.merge(store)
+        self._deferred = None
+
+    def warm(self, scheduler, group=None):
+        """Add the archived tickets left out at startup on a low-priority background job."""
+        deferred = self._deferred
+        if deferred is None:
+            return None
+        return scheduler.submit(
+            lambda: scheduler.call_in_main(self._install_deferred, deferred,
+                                           self._build_deferred(deferred)),
+            name="analytics-history", priority="low", group=group)
+
+    def ensure_history(self):
+        """Finish the archived history now if the background build hasn't yet."""
+        deferred = self._deferred
+        if deferred is not None:
+            self._install_deferred(deferred, self._build_deferred(deferred))
+
+    @staticmethod
+    def _from_items(fields, items) -> ColumnStore:
+        store = ColumnStore(fields, capacity=max(1024, len(items)))
+        store.extend([t.id for t in items],
+                     [_stamp(t.created_at) for t in items],
+                     [_stamp(t.resolved_at) for t in items],
+                     {f: [getattr(t, f) for t in items] for f in fields})
+        return store
+
+    def _load(self, path: str) -> bool:
+        with np.load(path) as data:
+            self.tickets = ColumnStore.from_arrays(self.TICKET_FIELDS, data, "ticket_")
+            self.tasks = ColumnStore.from_arrays(self.TASK_FIELDS, data, "task_")
+        # stale file (e.g. snapshot replaced): every open item must have a row
+        open_tickets = np.fromiter(self.ticket_manager.tickets, np.int64)
+        open_tasks = np.fromiter(self.task_manager.tasks if self.task_manager else (), np.int64)
+        return (np.isin(open_tickets, self.tickets.ids).all()
+                and np.isin(open_tasks, self.tasks.ids).all())
+
+    def save(self):
+        if not self.path:
+            return
+        self.ensure_history()           # never save a history missing archived tickets
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, **self.tickets.arrays("ticket_"), **self.tasks.arrays("task_"))
+        os.replace(tmp, self.path)
+
+    # ---------- listeners ----------
+    def ticket_listener(self, event, t, actor, changes):
+        self._on_event(self.tickets, event, t, changes)
+
+    def task_listener(self, event, t, actor, changes):
+        self._on_event(self.tasks, event, t, changes)
+
+    @staticmethod
+    def _on_event(store: ColumnStore, event, item, changes):
+        if event == "created":
+            store.upsert(item.id, _stamp(item.created_at), -1,
+                         {f: getattr(item, f) for f in store.fields})
+            return
+        touched = [f for f in changes if f in store.cats]
+        if not touched and event != "resolved":
+            return
+        row = store.row(item.id)
+        if row is None:
+            return
+        for f in touched:
+            store.set_label(row, f, changes[f][1])
+        if event == "resolved":
+            store.set_resolved(row, _stamp(item.resolved_at or time.time()))
+
+    # -------------------------------------------------------------------------
+    # Reports (values are plain ints/floats; durations in hours)
+    # -------------------------------------------------------------------------
+    def counts(self, kind: str = "ticket", by: str = "department", then: Optional[str] = None,
+               open_only: bool = False):
+        """{label: n}, or {label: {label2: n}} when `then` names a second field."""
+        s = self._store(kind)
+        mask = s.resolved < 0 if open_only else slice(None)
+        a = s.codes(by)[mask] + 1                       # shift so None (-1) is bin 0
+        na = len(s.cats[by]) + 1
+        if then is None:
+            counts = np.bincount(a, minlength=na)
+            return {_label(s.cats[by], i - 1): int(c) for i, c in enumerate(counts) if c}
+        b = s.codes(then)[mask] + 1
+        nb = len(s.cats[then]) + 1
+        grid = np.bincount(a * nb + b, minlength=na * nb).reshape(na, nb)
+        out = {}
+        for i, j in zip(*np.nonzero(grid)):
+            out.setdefault(_label(s.cats[by], i - 1), {})[_label(s.cats[then], j - 1)] = int(grid[i, j])
+        return out
+
+    def resolution_percentiles(self, kind: str = "ticket", by: Optional[str] = None,
+                               percentiles: Sequence[float] = (50, 90, 99)):
+        """
+        Hours from creation to resolution at each percentile (linear
+        interpolation, as numpy.percentile): {p: h}, or {label: {p: h}} per group.
+        """
+        s = self._store(kind)
+        mask = (s.resolved >= 0) & (s.created >= 0)
+        seconds = np.maximum(s.resolved[mask] - s.created[mask], 0)
+        if by is None:
+            if not len(seconds):
+                return {}
+            return {p: float(v) / 3600.0
+                    for p, v in zip(percentiles, np.percentile(seconds, percentiles))}
+
+        # one integer sort orders rows by (group, duration): group in the high bits
+        groups = (s.codes(by)[mask] + 1).astype(np.int64)
+        keys = np.sort((groups << _GROUP_SHIFT) | np.minimum(seconds, _DURATION_MASK))
+        seconds = keys & _DURATION_MASK
+        ng = len(s.cats[by]) + 1
+        bounds = np.searchsorted(keys, np.arange(ng + 1, dtype=np.int64) << _GROUP_SHIFT)
+        starts, sizes = bounds[:-1], np.diff(bounds)
+        present = np.nonzero(sizes)[0]
+        starts, sizes = starts[present], sizes[present]
+        out = {_label(s.cats[by], g - 1): {} for g in present}
+        for p in percentiles:
+            pos = (sizes - 1) * (p / 100.0)
+            lo = np.floor(pos).astype(np.int64)
+            hi = np.minimum(lo + 1, sizes - 1)
+            v = seconds[starts + lo] + (seconds[starts + hi] - seconds[starts + lo]) * (pos - lo)
+            for g, val in zip(present, v / 3600.0):
+                out[_label(s.cats[by], g - 1)][p] = float(val)
+        return out
+
+    def throughput(self, kind: str = "ticket", since: Optional[float] = None,
+                   until: Optional[float] = None, bucket: Optional[float] = None):
+        """
+        Items resolved per assignee in [since, until): {agent: n}, or with
+        `bucket` seconds {agent: [n per bucket]} (e.g. bucket=86400 for daily).
+        """
+        s = self._store(kind)
+        until = time.time() if until is None else until
+        since = until - 7 * 86400 if since is None else since
+        agents = s.codes("assigned_to")
+        mask = (s.resolved >= since) & (s.resolved < until) & (agents >= 0)
+        a = agents[mask]
+        na = len(s.cats["assigned_to"])
+        if bucket is None:
+            counts = np.bincount(a, minlength=na)
+            return {s.cats["assigned_to"].labels[i]: int(c) for i, c in enumerate(counts) if c}
+        nb = max(1, int(np.ceil((until - since) / bucket)))
+        b = ((s.resolved[mask] - int(since)) // int(bucket)).astype(np.int64)
+        grid = np.bincount(a * nb + b, minlength=na * nb).reshape(na, nb)
+        totals = grid.sum(axis=1)
+        return {s.cats["assigned_to"].labels[i]: grid[i].tolist() for i in np.nonzero(totals)[0]}
+
+    BACKLOG_EDGES_HOURS = (1, 4, 8, 24, 72, 168)
+
+    def backlog_age(self, kind: str = "ticket", now: Optional[float] = None,
+                    edges_hours: Sequence[float] = BACKLOG_EDGES_HOURS, by: Optional[str] = None):
+        """
+        Histogram of open items by age. Returns (bin labels, counts) or
+        (bin labels, {label: counts}) per group; the last bin is open-ended.
+        """
+        s = self._store(kind)
+        now = time.time() if now is None else now
+        mask = (s.resolved < 0) & (s.created >= 0)
+        age = (now - s.created[mask]) / 3600.0
+        edges = np.asarray(edges_hours, dtype=np.float64)
+        bins = np.searchsorted(edges, age, side="right")          # 0 .. len(edges)
+        nbins = len(edges) + 1
+        names = (["<{}h".format(_fmt(edges[0]))]
+                 + ["{}-{}h".format(_fmt(a), _fmt(b)) for a, b in zip(edges[:-1], edges[1:])]
+                 + [">={}h".format(_fmt(edges[-1]))])
+        if by is None:
+            return names, np.bincount(bins, minlength=nbins).tolist()
+        g = s.codes(by)[mask] + 1
+        ng = len(s.cats[by]) + 1
+        grid = np.bincount(g * nbins + bins, minlength=ng * nbins).reshape(ng, nbins)
+        return names, {_label(s.cats[by], i - 1): grid[i].tolist()
+                       for i in np.nonzero(grid.sum(axis=1))[0]}
+
+
+def _fmt(hours) -> str:
+    return "{:g}".format(hours)
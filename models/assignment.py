@@ -0,0 +1,135 @@
+import heapq
+import itertools
+from typing import Dict, Iterable, List, Optional
+
+from models.users import User
+
+# -----------------------------------------------------------------------------
+# Assignment engine
+# -----------------------------------------------------------------------------
+ANY_SKILL = "*"
+
+
+def _key(value) -> str:
+    return (value or "").strip().lower()
+
+
+class AssignmentEngine:
+    """
+    Routes new work to the least-loaded active agent with a matching skill.
+
+    Load is the live size of a user's claim lists (tickets + tasks). Each skill
+    (department or help topic, lowercased) has a min-heap of agents keyed by
+    load; "*" holds every active agent. Entries are invalidated lazily with a
+    per-user version number, so routing and load updates are O(log agents).
+    """
+
+    def __init__(self, user_store, compact_factor: int = 4):
+        self.user_store = user_store
+        self.compact_factor = compact_factor
+        self._heaps: Dict[str, list] = {}     # {skill: [(load, seq, user_id, version)]}
+        self._version: Dict[int, int] = {}     # {user_id: current version}
+        self._users: Dict[int, User] = {}      # routable users
+        self._seq = itertools.count()
+        self._entries = 0                      # heap entries incl. stale ones
+        self.rebuild()
+
+    # ---------- membership ----------
+    @staticmethod
+    def is_routable(u: User) -> bool:
+        return u.is_active and isinstance(u.role, str) and u.role.lower() == "agent"
+
+    @staticmethod
+    def load_of(u: User) -> int:
+        return len(u.tickets_claimed) + len(u.tasks_claimed)
+
+    def rebuild(self):
+        """Recreate every heap from the user store (O(agents))."""
+        self._heaps = {}
+        self._users = {}
+        self._entries = 0
+        for u in self.user_store.list_users():
+            if self.is_routable(u):
+                self._users[u.id] = u
+                self._version[u.id] = self._version.get(u.id, 0) + 1
+                self._push(u)
+
+    def _skills(self, u: User) -> List[str]:
+        return [ANY_SKILL] + sorted(_key(s) for s in getattr(u, "skills", ()) if _key(s))
+
+    def _push(self, u: User):
+        entry = (self.load_of(u), next(self._seq), u.id, self._version[u.id])
+        for skill in self._skills(u):
+            heapq.heappush(self._heaps.setdefault(skill, []), entry)
+            self._entries += 1
+
+    def touch(self, users: Iterable[User]):
+        """Record that these users' loads (or status) changed."""
+        for u in users:
+            if u is None:
+                continue
+            self._version[u.id] = self._version.get(u.id, 0) + 1
+            if self.is_routable(u):
+                self._users[u.id] = u
+                self._push(u)
+            else:
+                self._users.pop(u.id, None)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        live = max(len(self._users), 1)
+        if self._entries > self.compact_factor * live * 2 + 64:
+            self.rebuild()
+
+    # ---------- routing ----------
+    def _peek(self, skill: str, exclude: Optional[int]):
+        """Best valid entry in one skill heap, discarding stale entries on the way."""
+        heap = self._heaps.get(skill)
+        if not heap:
+            return None
+        skipped = []
+        best = None
+        while heap:
+            load, seq, uid, version = heap[0]
+            u = self._users.get(uid)
+            if u is None or version != self._version.get(uid):
+                heapq.heappop(heap)                  # stale
+                self._entries -= 1
+                continue
+            if load != self.load_of(u):
+                heapq.heappop(heap)                  # load drifted; re-key it
+                heapq.heappush(heap, (self.load_of(u), next(self._seq), uid, version))
+                continue
+            if uid == exclude:
+                skipped.append(heapq.heappop(heap))
+                continue
+            best = heap[0]
+            break
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return best
+
+    def pick(self, skills: Iterable[str] = (), exclude: Optional[User] = None) -> Optional[User]:
+        """
+        Least-loaded routable user having any of `skills`; falls back to any
+        active agent when nobody has the skill. Ties go to the longest-waiting.
+        """
+        exclude_id = exclude.id if exclude is not None else None
+        best = None
+        for skill in dict.fromkeys(_key(s) for s in skills if _key(s)):
+            entry = self._peek(skill, exclude_id)
+            if entry is not None and (best is None or entry[:2] < best[:2]):
+                best = entry
+        if best is None:
+            best = self._peek(ANY_SKILL, exclude_id)
+        return self._users[best[2]] if best is not None else None
+
+    def pick_for_ticket(self, ticket, exclude: Optional[User] = None) -> Optional[User]:
+        return self.pick((ticket.department, ticket.help_topic), exclude)
+
+    def pick_for_task(self, task, exclude: Optional[User] = None) -> Optional[User]:
+        return self.pick((task.department,), exclude)
+
+    def loads(self) -> Dict[str, int]:
+        """{agent name: current load} for routable agents (for display/benchmarks)."""
+        return {u.name: self.load_of(u) for u in self._users.values()}
@@ -0,0 +1,278 @@
+import bisect
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# -----------------------------------------------------------------------------
+# Record helpers
+# -----------------------------------------------------------------------------
+GENESIS = "0" * 64
+
+# Fields captured in full when an item is created (so history can be replayed)
+TICKET_FIELDS = ("subject", "from_name", "priority", "status", "assigned_to", "department",
+                 "sla_plan", "help_topic", "printing", "email", "parent_id")
+TASK_FIELDS = ("title", "department", "status", "assigned_to", "ticket_id", "description")
+
+
+def _canonical(rec: dict) -> bytes:
+    body = {k: v for k, v in rec.items() if k != "hash"}
+    return json.dumps(body, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def chain_hash(prev: str, rec: dict) -> str:
+    return hashlib.sha256(prev.encode("ascii") + _canonical(rec)).hexdigest()
+
+
+def format_audit_record(rec: dict) -> str:
+    """One-line rendering used by the history/activity views."""
+    when = datetime.fromtimestamp(rec["at"]).strftime("%Y-%m-%d %H:%M:%S")
+    if rec["event"] == "created":
+        detail = ""
+    else:
+        detail = "; ".join("{}: {!r} -> {!r}".format(k, v[0], v[1])
+                           for k, v in rec["changes"].items())
+    return "{} {:<6} {:<4} {:<9} by {:<12} {}".format(
+        when, rec["kind"], rec["id"], rec["event"], rec["actor"] or "System", detail)
+
+
+def verify_segment(path: str, offset: int, seq: int, count: int, prev: str) -> Optional[int]:
+    """
+    Check `count` records of the log file at `path` starting at byte `offset`
+    (record `seq`, whose prev hash must be `prev`). Module-level so segments
+    can be checked in parallel worker processes; returns the first bad seq.
+    """
+    with open(path, "rb") as fh:
+        fh.seek(offset)
+        for s in range(seq, seq + count):
+            try:
+                rec = json.loads(fh.readline())
+            except ValueError:
+                return s
+            if rec.get("prev") != prev or chain_hash(prev, rec) != rec.get("hash"):
+                return s
+            prev = rec["hash"]
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Audit log
+# -----------------------------------------------------------------------------
+class AuditCorrupt(ValueError):
+    """The log file has a damaged or out-of-chain record before its end."""
+
+    def __init__(self, path: str, seq: int, reason: str):
+        super().__init__("Audit log {} is damaged at record {}: {}. The file was left as it "
+                         "is; restore it from a backup or move it aside.".format(path, seq, reason))
+        self.path = path
+        self.seq = seq
+
+
+class AuditLog:
+    """
+    Append-only, hash-chained log of every mutation.
+
+    Each record carries seq, timestamp (epoch seconds), kind (ticket/task/user),
+    id, event, actor and {field: [before, after]}, plus the hash of the
+    previous record, so any edit or deletion breaks verify().
+
+    With a path, records live only on disk (JSON lines) and memory holds just
+    their byte offsets plus three indexes: by item, by actor and by time. A
+    per-ticket history or "everything Dana did today" is an index lookup and
+    a few seeks, independent of how many years the log covers. Loading checks
+    that every record links to the one before it and that the last record's
+    hash is right (verify() rehashes the whole chain).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._mem: List[dict] = []                        # records when no path
+        self._offsets: List[int] = []                     # seq -> byte offset
+        self._times: List[float] = []                     # seq -> timestamp
+        self._by_item: Dict[Tuple[str, int], List[int]] = {}
+        self._by_actor: Dict[str, List[int]] = {}
+        self._max_id: Dict[str, int] = {}                 # kind -> highest id recorded
+        self._listeners = []
+        self.head = GENESIS
+        self._fh = None
+        if path:
+            self._load()
+            self._fh = open(path, "ab")
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def add_listener(self, fn):
+        """fn(record) is called after each append (used by replication/history)."""
+        self._listeners.append(fn)
+
+    # ---------- writing ----------
+    def record(self, kind: str, item_id: int, event: str, actor: Optional[str] = None,
+               changes: Optional[dict] = None, at: Optional[float] = None) -> dict:
+        """Append one record and return it."""
+        at = at if at is not None else time.time()
+        if self._times and at < self._times[-1]:
+            at = self._times[-1]        # keep the time index sorted across clock steps
+        rec = {
+            "seq": len(self._times),
+            "at": at,
+            "kind": kind,
+            "id": item_id,
+            "event": event,
+            "actor": actor,
+            "changes": {k: [v[0], v[1]] for k, v in (changes or {}).items()},
+            "prev": self.head,
+        }
+        rec["hash"] = chain_hash(self.head, rec)
+        self._append(rec)
+        for fn in self._listeners:
+            fn(rec)
+        return rec
+
+    def _append(self, rec: dict, offset: Optional[int] = None):
+        if self._fh is not None:
+            offset = self._fh.tell()
+            self._fh.write(json.dumps(rec, default=str).encode("utf-8") + b"\n")
+            self._fh.flush()
+        if self.path:
+            self._offsets.append(offset)
+        else:
+            self._mem.append(rec)
+        self._index(rec)
+
+    def _index(self, rec: dict):
+        seq = rec["seq"]
+        self._times.append(rec["at"])
+        self._by_item.setdefault((rec["kind"], rec["id"]), []).append(seq)
+        if rec["id"] > self._max_id.get(rec["kind"], 0):
+            self._max_id[rec["kind"]] = rec["id"]
+        if rec["actor"]:
+            self._by_actor.setdefault(rec["actor"], []).append(seq)
+        self.head = rec["hash"]
+
+    def _load(self):
+        """
+        Index the file. Only an unterminated last line is a torn write (it is
+        cut off); a bad record anywhere else, a broken prev link or a wrong
+        hash on the last record raises AuditCorrupt and leaves the file alone.
+        """
+        if not os.path.exists(self.path):
+            return
+        last = None
+        with open(self.path, "rb") as fh:
+            offset = 0
+            for line in fh:
+                seq = len(self._times)
+                if not line.endswith(b"\n"):
+                    break               # torn tail after a crash; truncated below
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    raise AuditCorrupt(self.path, seq, "not a JSON record")
+                if rec.get("seq") != seq or rec.get("prev") != self.head:
+                    raise AuditCorrupt(self.path, seq, "not chained to the record before it")
+                self._offsets.append(offset)
+                self._index(rec)
+                last = rec
+                offset += len(line)
+        if last is not None and chain_hash(last["prev"], last) != last["hash"]:
+            raise AuditCorrupt(self.path, last["seq"], "hash does not match its contents")
+        if offset != os.path.getsize(self.path):
+            with open(self.path, "r+b") as fh:
+                fh.truncate(offset)
+
+    # ---------- listener adapters ----------
+    def ticket_listener(self, event, t, actor, changes):
+        if event == "created":
+            changes = {f: (None, getattr(t, f)) for f in TICKET_FIELDS}
+        self.record("ticket", t.id, event, actor.name if actor is not None else None, changes)
+
+    def task_listener(self, event, t, actor, changes):
+        if event == "created":
+            changes = {f: (None, getattr(t, f)) for f in TASK_FIELDS}
+        self.record("task", t.id, event, actor.name if actor is not None else None, changes)
+
+    # ---------- reading ----------
+    def max_id(self, kind: str) -> int:
+        """Highest id ever recorded for `kind` (0 if none), resolved items included."""
+        return self._max_id.get(kind, 0)
+
+    def get(self, seq: int) -> dict:
+        if not self.path:
+            return self._mem[seq]
+        with open(self.path, "rb") as fh:
+            fh.seek(self._offsets[seq])
+            return json.loads(fh.readline())
+
+    def _get_many(self, seqs: List[int]) -> List[dict]:
+        if not self.path:
+            return [self._mem[s] for s in seqs]
+        out = []
+        with open(self.path, "rb") as fh:
+            for s in seqs:
+                fh.seek(self._offsets[s])
+                out.append(json.loads(fh.readline()))
+        return out
+
+    def history(self, kind: str, item_id: int) -> List[dict]:
+        """Every record for one ticket/task/user, oldest first."""
+        return self._get_many(self._by_item.get((kind, item_id), []))
+
+    def by_actor(self, actor: str, since: Optional[float] = None,
+                 until: Optional[float] = None) -> List[dict]:
+        """Records made by `actor` in [since, until), oldest first."""
+        seqs = self._by_actor.get(actor, [])
+        lo = bisect.bisect_left(seqs, self._seq_at(since)) if since is not None else 0
+        hi = bisect.bisect_left(seqs, self._seq_at(until)) if until is not None else len(seqs)
+        return self._get_many(seqs[lo:hi])
+
+    def between(self, since: Optional[float] = None, until: Optional[float] = None) -> List[dict]:
+        """All records in [since, until), oldest first."""
+        lo = self._seq_at(since) if since is not None else 0
+        hi = self._seq_at(until) if until is not None else len(self._times)
+        return self.records(lo, hi)
+
+    def records(self, lo: int, hi: int) -> List[dict]:
+        """Records with seq in [lo, hi), oldest first."""
+        return self._get_many(list(range(lo, hi)))
+
+    def seq_until(self, ts: float) -> int:
+        """Number of records stamped at or before ts."""
+        return bisect.bisect_right(self._times, ts)
+
+    def _seq_at(self, ts: float) -> int:
+        """First seq with timestamp >= ts (timestamps are non-decreasing)."""
+        return bisect.bisect_left(self._times, ts)
+
+    def verify(self) -> Optional[int]:
+        """Walk the chain; return the seq of the first bad record, or None if intact."""
+        prev = GENESIS
+        for seq in range(len(self._times)):
+            rec = self.get(seq)
+            if rec.get("prev") != prev or chain_hash(prev, rec) != rec.get("hash"):
+                return seq
+            prev = rec["hash"]
+        return None
+
+    def segments(self, size: int = 50000) -> List[Tuple[str, int, int, int, str]]:
+        """
+        verify_segment() arguments covering a file-backed log in chunks of
+        `size` records. Each chunk starts from the hash stored in the record
+        before it; that record's own chunk checks the stored hash is right.
+        """
+        if not self.path:
+            raise ValueError("segments() needs a file-backed audit log")
+        if self._fh is not None:
+            self._fh.flush()
+        out = []
+        for lo in range(0, len(self._offsets), size):
+            prev = self.get(lo - 1)["hash"] if lo else GENESIS
+            out.append((self.path, self._offsets[lo], lo, min(size, len(self._offsets) - lo), prev))
+        return out
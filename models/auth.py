@@ -0,0 +1,274 @@
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from typing import Dict, Optional
+
+from models.users import User
+
+# -----------------------------------------------------------------------------
+# Password hashing (salted PBKDF2; the encoded string carries its parameters)
+# -----------------------------------------------------------------------------
+PBKDF2_ITERATIONS = 240000
+_SCHEME = "pbkdf2_sha256"
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii")
+
+
+def hash_password(password: str, iterations: int = PBKDF2_ITERATIONS) -> str:
+    """Return 'pbkdf2_sha256$<iterations>$<salt>$<hash>' for storage."""
+    salt = secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return "{}${}${}${}".format(_SCHEME, iterations, _b64(salt), _b64(digest))
+
+
+def verify_password(password: str, encoded: Optional[str]) -> bool:
+    """Constant-time check of `password` against a hash_password() string."""
+    try:
+        scheme, iterations, salt, expected = (encoded or "").split("$")
+    except ValueError:
+        return False
+    if scheme != _SCHEME:
+        return False
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"),
+                                 base64.b64decode(salt), int(iterations))
+    return hmac.compare_digest(_b64(digest), expected)
+
+
+def _token_digest(token: str) -> str:
+    # tokens are long random strings, so a fast hash is enough; only digests are stored
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+# -----------------------------------------------------------------------------
+# Permissions
+# -----------------------------------------------------------------------------
+class Perm:
+    """Permission bits; a session holds the OR of everything its role grants."""
+    VIEW_QUEUE = 1 << 0
+    WORK_TICKETS = 1 << 1       # claim, note, resolve, link
+    ASSIGN_OTHERS = 1 << 2      # assign/escalate to someone else
+    BULK_ACTIONS = 1 << 3
+    WORK_TASKS = 1 << 4
+    EDIT_KB = 1 << 5
+    VIEW_DASHBOARD = 1 << 6
+    VIEW_AUDIT = 1 << 7
+    IMPORT_MAIL = 1 << 8
+    MANAGE_USERS = 1 << 9       # availability, passwords of other users
+    MANAGE_RULES = 1 << 10      # automation rules
+    ALL = (1 << 11) - 1
+
+
+ROLE_PERMS = {
+    "agent": Perm.ALL & ~Perm.MANAGE_USERS & ~Perm.MANAGE_RULES,
+    "admin": Perm.ALL,
+}
+
+ALL_DEPARTMENTS = -1            # every bit set
+
+
+class DepartmentBits:
+    """
+    Department scope bits for one user store. A department gets a bit when
+    it first appears in a user's configured scope; any other name (e.g. one
+    typed on the public form) maps to 0, which no restricted scope includes.
+    """
+
+    def __init__(self):
+        self._bits: Dict[str, int] = {}
+
+    @staticmethod
+    def _key(name: Optional[str]) -> str:
+        return (name or "").strip().lower()
+
+    def bit(self, name: Optional[str]) -> int:
+        return self._bits.get(self._key(name), 0)
+
+    def mask(self, user: User) -> int:
+        """Admins and users without explicit departments see every department."""
+        if user.is_admin or not user.departments:
+            return ALL_DEPARTMENTS
+        mask = 0
+        for d in user.departments:
+            key = self._key(d)
+            bit = self._bits.get(key)
+            if bit is None:
+                bit = self._bits[key] = 1 << len(self._bits)
+            mask |= bit
+        return mask
+
+
+# -----------------------------------------------------------------------------
+# Sessions
+# -----------------------------------------------------------------------------
+class AuthError(Exception):
+    """Login failed (unknown user, wrong password, inactive account, bad token)."""
+
+
+class Session:
+    """A logged-in user with permissions precomputed into bitmasks."""
+
+    __slots__ = ("token", "user", "perms", "departments", "scope", "created_at", "last_seen")
+
+    def __init__(self, token: str, user: User, scope: Optional[DepartmentBits] = None):
+        self.token = token
+        self.user = user
+        self.perms = ROLE_PERMS.get((user.role or "").lower(), 0)
+        self.scope = scope if scope is not None else DepartmentBits()
+        self.departments = self.scope.mask(user)
+        self.created_at = self.last_seen = time.monotonic()
+
+    def can(self, perm: int, department: Optional[str] = None) -> bool:
+        """O(1): every bit of `perm` granted, and `department` (if given) in scope."""
+        if self.perms & perm != perm:
+            return False
+        if department is None or self.departments == ALL_DEPARTMENTS:
+            return True
+        return bool(self.departments & self.scope.bit(department))
+
+
+class Authenticator:
+    """
+    Password and API-token login plus server-side sessions for one user store.
+
+    Sessions live in memory keyed by the SHA-256 of their token and expire
+    after `idle_timeout` seconds without use or `max_age` seconds overall.
+    Permission bitmasks are computed once at login; changing a user's role,
+    departments, status or password revokes their sessions.
+
+    An account without a password can't log in. While no admin has one, a
+    one-time setup code (issue_setup_code, printed by the app at startup)
+    lets its holder choose the first admin password; after that, admins set
+    other users' passwords.
+    """
+
+    def __init__(self, user_store, idle_timeout: float = 8 * 3600, max_age: float = 24 * 3600):
+        self.user_store = user_store
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+        self._sessions: Dict[str, Session] = {}     # {token digest: Session}
+        self._api_tokens: Optional[Dict[str, User]] = None   # {token digest: user}, lazy
+        self._setup_digest: Optional[str] = None    # outstanding first-admin setup code
+        self.departments = DepartmentBits()
+
+    # ---------- credentials ----------
+    @staticmethod
+    def needs_password(user: User) -> bool:
+        return not user.password_hash
+
+    def set_password(self, user: User, password: str):
+        if len(password) < 8:
+            raise ValueError("Password must be at least 8 characters.")
+        user.password_hash = hash_password(password)
+        self.revoke_user(user)
+
+    def set_departments(self, user: User, departments):
+        """Limit `user` to these departments (empty = all)."""
+        user.departments = [d.strip() for d in departments if d.strip()]
+        self.revoke_user(user)
+
+    # ---------- first admin ----------
+    def needs_setup(self) -> bool:
+        """True while no admin account has a password (nobody could log in to set one)."""
+        return not any(u.is_admin and u.password_hash for u in self.user_store.list_users())
+
+    @property
+    def setup_pending(self) -> bool:
+        return self._setup_digest is not None
+
+    def issue_setup_code(self, code: Optional[str] = None) -> Optional[str]:
+        """
+        Start first-admin setup with `code` (or a random one) and return it.
+        Returns None when setup isn't needed or a code is already outstanding.
+        """
+        if not self.needs_setup():
+            self._setup_digest = None
+            return None
+        if self._setup_digest is not None:
+            return None
+        code = code or secrets.token_urlsafe(12)
+        self._setup_digest = _token_digest(code)
+        return code
+
+    def redeem_setup_code(self, user: User, code: str, password: str):
+        """Set the first admin password; the code works once, for a password-less admin."""
+        ok = self._setup_digest is not None and hmac.compare_digest(
+            _token_digest(code), self._setup_digest)
+        if not ok or not user.is_admin or not self.needs_password(user):
+            raise AuthError("Invalid setup code.")
+        self.set_password(user, password)
+        self._setup_digest = None
+
+    def create_api_token(self, user: User) -> str:
+        """New long-lived token for scripts; only its digest is stored on the user."""
+        token = secrets.token_urlsafe(32)
+        digest = _token_digest(token)
+        user.api_tokens.append(digest)
+        if self._api_tokens is not None:
+            self._api_tokens[digest] = user
+        return token
+
+    def revoke_api_tokens(self, user: User):
+        for digest in user.api_tokens:
+            if self._api_tokens is not None:
+                self._api_tokens.pop(digest, None)
+        user.api_tokens = []
+        self.revoke_user(user)
+
+    # ---------- login ----------
+    def login(self, name: str, password: str) -> Session:
+        user = self.user_store.get_by_name(name)
+        # hash even for unknown users so timing doesn't reveal which names exist
+        ok = verify_password(password, user.password_hash if user else _dummy_hash())
+        if user is None or not ok:
+            raise AuthError("Invalid username or password.")
+        return self._open(user)
+
+    def login_with_token(self, token: str) -> Session:
+        if self._api_tokens is None:
+            self._api_tokens = {d: u for u in self.user_store.list_users() for d in u.api_tokens}
+        user = self._api_tokens.get(_token_digest(token))
+        if user is None:
+            raise AuthError("Invalid API token.")
+        return self._open(user)
+
+    def _open(self, user: User) -> Session:
+        if not user.is_active:
+            raise AuthError("Account {} is inactive.".format(user.name))
+        session = Session(secrets.token_urlsafe(32), user, self.departments)
+        self._sessions[_token_digest(session.token)] = session
+        return session
+
+    # ---------- session checks ----------
+    def authenticate(self, token: str) -> Optional[Session]:
+        """The live session for `token` (sliding its idle timer), or None if expired/revoked."""
+        key = _token_digest(token)
+        session = self._sessions.get(key)
+        if session is None:
+            return None
+        now = time.monotonic()
+        if now - session.last_seen > self.idle_timeout or now - session.created_at > self.max_age:
+            del self._sessions[key]
+            return None
+        session.last_seen = now
+        return session
+
+    def logout(self, token: str):
+        self._sessions.pop(_token_digest(token), None)
+
+    def revoke_user(self, user: User):
+        """Drop every session of `user` (their permissions are recomputed at next login)."""
+        for key in [k for k, s in self._sessions.items() if s.user is user]:
+            del self._sessions[key]
+
+
+_DUMMY = []
+
+
+def _dummy_hash() -> str:
+    if not _DUMMY:
+        _DUMMY.append(hash_password(secrets.token_hex(8)))
+    return _DUMMY[0]
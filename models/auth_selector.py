@@ -1,40 +1,73 @@
-from models.users import UserStore
+import getpass
+import time
+
+from models.auth import AuthError
+
 
 class AuthSelector:
-    """Standalone login/switch-user UI for the terminal."""
+    """
+    Terminal login: username + password (or an API token) opens a server-side
+    session. Accounts without a password can't log in until an admin sets one;
+    the first admin password is chosen with the one-time setup code the app
+    prints at startup.
+    """
+
+    MAX_FAILURES = 5
 
-    def __init__(self, user_store):
+    def __init__(self, user_store, auth):
         self.users = user_store
+        self.auth = auth
 
     def run(self):
+        """Return a Session, or None to exit."""
         self._print_header()
+        failures = 0
         while True:
-            display = self.users.list_agents_first()
-            self._show_user_list(display)
-            choice = input("Select a user by number (or 0 to exit): ").strip()
-
-            if choice == "0":
-                print("Exiting to system… (session will reset to defaults)")
+            name = input("Username (or 'token' for an API token, 0 to exit): ").strip()
+            if name == "0":
+                print("Exiting to system…")
                 return None
+            if not name:
+                continue
+
+            try:
+                if name.lower() == "token":
+                    session = self.auth.login_with_token(getpass.getpass("API token: ").strip())
+                else:
+                    user = self.users.get_by_name(name)
+                    if (user is not None and user.is_admin and self.auth.setup_pending
+                            and self.auth.needs_password(user)):
+                        if not self._set_first_password(user):
+                            continue
+                    session = self.auth.login(name, getpass.getpass("Password: "))
+            except AuthError as e:
+                failures += 1
+                print("❌ {}\n".format(e))
+                if failures >= self.MAX_FAILURES:
+                    # slow down guessing from the same terminal
+                    time.sleep(min(30, 2 ** (failures - self.MAX_FAILURES)))
+                continue
 
-            if choice.isdigit():
-                idx = int(choice) - 1
-                selected = self.users.get_by_index(idx, display)
-                if selected:
-                    print("\n✅ Operating as: {} ({})\n".format(selected.name, selected.role))
-                    return selected
+            print("\n✅ Operating as: {} ({})\n".format(session.user.name, session.user.role))
+            return session
 
-            print("❌ Invalid selection. Please try again.\n")
+    def _set_first_password(self, user) -> bool:
+        """First admin login: setup code, then a new password (AuthError on a bad code)."""
+        print("No admin password is set yet — enter the setup code shown at startup.")
+        code = getpass.getpass("Setup code: ").strip()
+        first = getpass.getpass("New password (min 8 chars): ")
+        if first != getpass.getpass("Repeat password: "):
+            print("❌ Passwords don't match.\n")
+            return False
+        try:
+            self.auth.redeem_setup_code(user, code, first)
+        except ValueError as e:
+            print("❌ {}\n".format(e))
+            return False
+        print("✅ Password set.\n")
+        return True
 
     def _print_header(self):
         print("=" * 58)
-        print("  Login / Switch User  ")
+        print("  Login  ")
         print("=" * 58)
-        print("Pick an Agent/Admin to operate as. No password required.\n")
-
-    def _show_user_list(self, display):
-        print("Users:")
-        print("-" * 58)
-        for i, u in enumerate(display, start=1):
-            print("{}) {:<20} | {:<5} | {}".format(i, u.name, u.role, u.status))
-        print("-" * 58)
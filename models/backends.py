@@ -0,0 +1,175 @@
+import importlib
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# -----------------------------------------------------------------------------
+# Backend interfaces
+# -----------------------------------------------------------------------------
+# The managers only need two kinds of backend:
+#
+#   ItemStore      id -> item mapping behind TicketManager.tickets / .archived
+#                  and TaskManager.tasks. A plain dict is the in-memory
+#                  implementation (and models/snapshot.py's LazyArchive
+#                  another), so existing code keeps working unchanged.
+#   SearchBackend  the ticket text index behind TicketManager.search_tickets.
+#
+# Every implementation has to pass models/conformance.py; the standard
+# workload in benchmarks/bench_backends.py compares them on equal terms.
+
+
+class ItemStore(MutableMapping):
+    """
+    {id: item}. Items handed out are live objects that the managers change in
+    place (t.status = ...), so a persistent store keeps each item it has
+    handed out and writes them all back on flush(). Ids inserted in
+    ascending order (as the managers create them) iterate in that order;
+    the on-disk stores always iterate sorted.
+    """
+
+    persistent = True
+
+    def flush(self):
+        """Write every live item back to durable storage."""
+
+    def close(self):
+        self.flush()
+
+
+class SearchBackend(ABC):
+    """Ticket text index: add once per ticket, flip open/archived, query."""
+
+    @abstractmethod
+    def add(self, tid: int, text: str, state: int = 1):
+        """Index a ticket's text (state 1 = open, 2 = archived)."""
+
+    @abstractmethod
+    def set_state(self, tid: int, state: int):
+        """Move an indexed ticket between open and archived."""
+
+    @abstractmethod
+    def search(self, query: str, limit: int = 10,
+               include_archived: bool = False) -> List[Tuple[int, float]]:
+        """Best-first (ticket id, score in 0..1); open tickets only unless asked."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of indexed tickets."""
+
+    def add_ticket(self, t, state: int = 1):
+        from models.search import ticket_text
+        self.add(t.id, ticket_text(t.subject, t.from_name, t.email), state)
+
+    def close(self):
+        pass
+
+
+class MemoryStore(dict):
+    """Today's behaviour: a dict (no flush needed, nothing survives a restart)."""
+
+    persistent = False
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+ItemStore.register(MemoryStore)
+
+
+# -----------------------------------------------------------------------------
+# Record codecs (item <-> JSON-able dict)
+# -----------------------------------------------------------------------------
+class Codec(NamedTuple):
+    encode: Callable[[object], dict]
+    decode: Callable[[dict], object]
+
+
+def _encode_ticket(t) -> dict:
+    from models.snapshot import _ticket_record
+    rec = _ticket_record(t)
+    rec["notes"] = t.internal_notes
+    return rec
+
+
+def _decode_ticket(rec: dict):
+    from models.snapshot import _ticket_from_record
+    return _ticket_from_record(rec)
+
+
+def _encode_task(t) -> dict:
+    from models.snapshot import _task_record
+    rec = _task_record(t)
+    rec["notes"] = t.internal_notes
+    return rec
+
+
+def _decode_task(rec: dict):
+    from models.tabs.tasks import Task
+    rec = dict(rec)
+    notes = rec.pop("notes", [])
+    t = Task(task_id=rec.pop("id"), **rec)
+    t.internal_notes = notes
+    return t
+
+
+TICKET_CODEC = Codec(_encode_ticket, _decode_ticket)
+TASK_CODEC = Codec(_encode_task, _decode_task)
+
+
+# -----------------------------------------------------------------------------
+# Registry
+# -----------------------------------------------------------------------------
+# name -> "module:Class" (imported on first use) or a factory callable.
+# Store factories take (path, codec); search factories take (path,). Memory
+# and the trigram index ignore the path.
+STORE_BACKENDS: Dict[str, object] = {
+    "memory": "models.backends:_memory_store",
+    "sqlite": "models.store_sqlite:SQLiteStore",
+    "log": "models.store_log:AppendLogStore",
+}
+SEARCH_BACKENDS: Dict[str, object] = {
+    "trigram": "models.backends:_trigram_search",
+    "sqlite-fts": "models.store_sqlite:SQLiteSearch",
+}
+
+
+def _memory_store(path: Optional[str], codec: Codec) -> MemoryStore:
+    return MemoryStore()
+
+
+def _trigram_search(path: Optional[str]) -> SearchBackend:
+    from models.search import TicketSearch
+    return TicketSearch()
+
+
+def register_store(name: str, factory):
+    STORE_BACKENDS[name] = factory
+
+
+def register_search(name: str, factory):
+    SEARCH_BACKENDS[name] = factory
+
+
+def _resolve(table: Dict[str, object], kind: str, name: str):
+    try:
+        target = table[name]
+    except KeyError:
+        raise ValueError("Unknown {} backend '{}' (known: {}).".format(
+            kind, name, ", ".join(sorted(table))))
+    if isinstance(target, str):
+        module, _, attr = target.partition(":")
+        target = table[name] = getattr(importlib.import_module(module), attr)
+    return target
+
+
+def open_store(name: str, path: Optional[str], codec: Codec) -> ItemStore:
+    """Open (or create) an item store by backend name."""
+    return _resolve(STORE_BACKENDS, "store", name)(path, codec)
+
+
+def open_search(name: str, path: Optional[str] = None) -> SearchBackend:
+    """Create a ticket search index by backend name."""
+    return _resolve(SEARCH_BACKENDS, "search", name)(path)
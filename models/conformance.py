@@ -0,0 +1,261 @@
+import os
+import shutil
+import sys
+import tempfile
+from typing import Callable, List, Optional
+
+from models.backends import (SEARCH_BACKENDS, STORE_BACKENDS, TICKET_CODEC, ItemStore,
+                             SearchBackend, open_search, open_store)
+from models.search import ARCHIVED, OPEN, ticket_text
+from models.tabs.tickets import Ticket, TicketManager
+
+# -----------------------------------------------------------------------------
+# Backend conformance suite
+# -----------------------------------------------------------------------------
+# Every registered store and search backend has to pass these checks before
+# it can back a manager. Run them all with
+#
+#     python -m models.conformance
+#
+# or call check_store() / check_search() on a new backend's factory. Each
+# check returns a list of failure messages (empty = passed).
+CORPUS = [
+    (1, "Cannot log in to portal", "Taylor", "taylor@example.com"),
+    (2, "Printer on 3rd floor jammed", "Jordan", "jordan@acme.org"),
+    (3, "VPN keeps disconnecting", "Priya", "priya@globex.net"),
+    (4, "Password reset link expired", "Sam", "sam@example.com"),
+    (5, "Outlook not syncing calendar", "Dana", "dana@initech.io"),
+]
+
+
+class Failed(AssertionError):
+    pass
+
+
+def _expect(cond, msg: str):
+    if not cond:
+        raise Failed(msg)
+
+
+def _ticket(tid: int, subject: str = "Subject", **kw) -> Ticket:
+    return Ticket(ticket_id=tid, subject=subject, from_name=kw.pop("from_name", "Alex"), **kw)
+
+
+# -----------------------------------------------------------------------------
+# Store checks: each takes open_fn(part="store") -> store; the same part
+# reopens the same location
+# -----------------------------------------------------------------------------
+def _store_empty(open_fn):
+    s = open_fn()
+    _expect(isinstance(s, ItemStore), "not an ItemStore")
+    _expect(len(s) == 0 and list(s) == [], "new store is not empty")
+    _expect(1 not in s and s.get(1) is None, "missing key reported present")
+    try:
+        s[1]
+    except KeyError:
+        pass
+    else:
+        raise Failed("missing key did not raise KeyError")
+    s.close()
+
+
+def _store_roundtrip(open_fn):
+    s = open_fn()
+    t = _ticket(7, "Roundtrip", email="a@example.com")
+    s[7] = t
+    _expect(7 in s and len(s) == 1, "stored item not found")
+    _expect(s[7] is t, "store did not hand back the live object it was given")
+    _expect(s.get(7).email == "a@example.com", "field lost")
+    s.close()
+
+
+def _store_order(open_fn):
+    s = open_fn()
+    for tid in (1, 3, 5):
+        s[tid] = _ticket(tid)
+    s[3] = _ticket(3, "replaced")                            # overwriting keeps the position
+    _expect(list(s) == [1, 3, 5], "keys not in ascending id order: {}".format(list(s)))
+    _expect([t.id for t in s.values()] == [1, 3, 5], "values() not in id order")
+    _expect([k for k, _ in s.items()] == [1, 3, 5], "items() not in id order")
+    s[2] = _ticket(2)                                        # e.g. archive fills out of order
+    _expect(sorted(s) == [1, 2, 3, 5], "out-of-order insert lost: {}".format(list(s)))
+    s.close()
+
+
+def _store_overwrite_delete(open_fn):
+    s = open_fn()
+    s[1] = _ticket(1, "old")
+    s[1] = _ticket(1, "new")
+    _expect(len(s) == 1 and s[1].subject == "new", "overwrite did not replace the item")
+    s[2] = _ticket(2)
+    del s[1]
+    _expect(1 not in s and list(s) == [2], "deleted item still present")
+    try:
+        del s[1]
+    except KeyError:
+        pass
+    else:
+        raise Failed("deleting a missing key did not raise KeyError")
+    _expect(s.pop(2).id == 2 and len(s) == 0, "pop() did not remove the item")
+    s.close()
+
+
+def _store_persistence(open_fn):
+    s = open_fn()
+    if not getattr(s, "persistent", True):
+        s.close()
+        return
+    for tid in (3, 1, 2):
+        s[tid] = _ticket(tid, "Persist {}".format(tid))
+    s[1].status = "Pending"                                  # in-place change, as managers do
+    s[2].internal_notes.append({"by": "Alex", "text": "note"})
+    del s[3]
+    s.close()
+
+    s = open_fn()
+    _expect(list(s) == [1, 2], "reopened keys {} != [1, 2]".format(list(s)))
+    _expect(s[1].status == "Pending", "in-place change lost on reopen")
+    _expect(s[2].internal_notes == [{"by": "Alex", "text": "note"}], "notes lost on reopen")
+    t = s[2]                                                 # change an item read back from disk
+    t.subject = "Edited"
+    s.flush()
+    s.close()
+
+    s = open_fn()
+    _expect(s[2].subject == "Edited", "change to a re-read item lost on reopen")
+    s.close()
+
+
+def _store_manager(open_fn):
+    """TicketManager on the store: ids survive a restart and resolve moves tickets."""
+    s = open_fn()
+    if not getattr(s, "persistent", True):
+        s.close()
+        return
+    tm = TicketManager(seed=True, store=s, archive=open_fn("archive"))
+    seeded = len(tm.tickets)
+    t = tm.create_ticket("Monitor flickers", "Casey", email="casey@example.com")
+    tm.resolve_tickets([1])
+    tm.tickets.close()
+    tm.archived.close()
+
+    tm = TicketManager(seed=True, store=open_fn(), archive=open_fn("archive"))
+    _expect(len(tm.tickets) == seeded, "open tickets {} != {}".format(len(tm.tickets), seeded))
+    _expect(1 in tm.archived and tm.archived[1].status == "Resolved", "resolved ticket not archived")
+    _expect(tm.get_ticket(t.id).subject == "Monitor flickers", "created ticket lost")
+    _expect(tm.create_ticket("Next", "Casey").id == t.id + 1, "ticket id reused after restart")
+    _expect([h.id for h, _ in tm.search_tickets("monitr flicker")][:1] == [t.id],
+            "search over the reopened store failed")
+    tm.tickets.close()
+    tm.archived.close()
+
+
+STORE_CHECKS = [_store_empty, _store_roundtrip, _store_order, _store_overwrite_delete,
+                _store_persistence, _store_manager]
+
+
+def check_store(name: str) -> List[str]:
+    """Run every store check against a fresh location for backend `name`."""
+    failures = []
+    for check in STORE_CHECKS:
+        tmp = tempfile.mkdtemp(prefix="conformance-")
+        try:
+            check(lambda part="store": open_store(name, os.path.join(tmp, part), TICKET_CODEC))
+        except Exception as e:
+            failures.append("{}: {}".format(check.__name__.lstrip("_"), e))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return failures
+
+
+# -----------------------------------------------------------------------------
+# Search checks: each takes make() -> empty SearchBackend
+# -----------------------------------------------------------------------------
+def _filled(make) -> SearchBackend:
+    idx = make()
+    for tid, subject, name, email in CORPUS:
+        idx.add(tid, ticket_text(subject, name, email))
+    return idx
+
+
+def _search_empty(make):
+    idx = make()
+    _expect(isinstance(idx, SearchBackend), "not a SearchBackend")
+    _expect(len(idx) == 0 and idx.search("portal") == [], "new index is not empty")
+    idx.close()
+
+
+def _search_typos(make):
+    idx = _filled(make)
+    _expect(len(idx) == len(CORPUS), "len {} != {}".format(len(idx), len(CORPUS)))
+    for query, want in (("taylr portal login", 1), ("pasword reset", 4),
+                        ("vpn disconecting", 3), ("jordan@acme.org", 2)):
+        hits = idx.search(query)
+        _expect(hits and hits[0][0] == want, "'{}' ranked {} first, expected {}".format(
+            query, hits[0][0] if hits else None, want))
+        _expect(0 < hits[0][1] <= 1, "score {} outside (0, 1]".format(hits[0][1]))
+        scores = [s for _, s in hits]
+        _expect(scores == sorted(scores, reverse=True), "'{}' not best-first".format(query))
+    _expect(idx.search("zzqx") == [] and idx.search("") == [], "unrelated query matched")
+    idx.close()
+
+
+def _search_states(make):
+    idx = _filled(make)
+    idx.set_state(1, ARCHIVED)
+    _expect(1 not in [t for t, _ in idx.search("taylor portal")], "archived ticket returned")
+    _expect([t for t, _ in idx.search("taylor portal", include_archived=True)][:1] == [1],
+            "archived ticket missing with include_archived")
+    idx.add(1, ticket_text(*CORPUS[0][1:]), OPEN)            # re-adding only changes state
+    _expect(len(idx) == len(CORPUS), "re-adding a ticket indexed it twice")
+    _expect([t for t, _ in idx.search("taylor portal")][:1] == [1], "reopened ticket missing")
+    idx.set_state(99, ARCHIVED)                              # unknown id is ignored
+    idx.close()
+
+
+def _search_limit(make):
+    idx = make()
+    for tid in range(1, 31):
+        idx.add(tid, ticket_text("Printer jammed", "Jordan", None))
+    _expect(len(idx.search("printer jammed", limit=5)) == 5, "limit not respected")
+    _expect([t for t, _ in idx.search("printer jammed", limit=3)] == [30, 29, 28],
+            "equal scores not newest first")
+    idx.close()
+
+
+SEARCH_CHECKS = [_search_empty, _search_typos, _search_states, _search_limit]
+
+
+def check_search(name: str) -> List[str]:
+    failures = []
+    for check in SEARCH_CHECKS:
+        try:
+            check(lambda: open_search(name))
+        except Exception as e:
+            failures.append("{}: {}".format(check.__name__.lstrip("_"), e))
+    return failures
+
+
+# -----------------------------------------------------------------------------
+# Runner
+# -----------------------------------------------------------------------------
+def run_all(names: Optional[List[str]] = None, out: Callable[[str], None] = print) -> bool:
+    ok = True
+    for kind, table, check in (("store", STORE_BACKENDS, check_store),
+                               ("search", SEARCH_BACKENDS, check_search)):
+        for name in list(table):
+            if names and name not in names:
+                continue
+            failures = check(name)
+            ok = ok and not failures
+            if failures:
+                out("❌ {} backend '{}':".format(kind, name))
+                for f in failures:
+                    out("   - " + f)
+            else:
+                out("✅ {} backend '{}' passed.".format(kind, name))
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all(sys.argv[1:]) else 1)
@@ -0,0 +1,172 @@
+import re
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+# -----------------------------------------------------------------------------
+# Fingerprinting helpers
+# -----------------------------------------------------------------------------
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+# MinHash parameters: NUM_BANDS * ROWS_PER_BAND hash functions in total.
+# 16 bands of 4 rows catches pairs with Jaccard ~0.5+ with high probability.
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+
+
+def _make_hash_params(n: int) -> List[Tuple[int, int]]:
+    """Deterministic (a, b) pairs for the universal hashes h(x) = (a*x + b) % p."""
+    params = []
+    seed = 0x9E3779B1
+    for _ in range(n):
+        seed = (seed * 6364136223846793005 + 1442695040888963407) & ((1 << 64) - 1)
+        a = (seed >> 16) | 1
+        seed = (seed * 6364136223846793005 + 1442695040888963407) & ((1 << 64) - 1)
+        b = seed >> 16
+        params.append((a % _PRIME, b % _PRIME))
+    return params
+
+
+_HASH_PARAMS = _make_hash_params(NUM_BANDS * ROWS_PER_BAND)
+
+
+def normalize_subject(subject: str) -> str:
+    """Lowercase and collapse punctuation/whitespace so trivial variations match."""
+    return _NON_WORD.sub(" ", (subject or "").lower()).strip()
+
+
+def email_domain(email: Optional[str]) -> str:
+    """Return the lowercased domain part of an email, or "" if unknown."""
+    if not email or "@" not in email:
+        return ""
+    return email.rsplit("@", 1)[1].strip().lower()
+
+
+def shingles(subject: str, email: Optional[str] = None, k: int = 3) -> Set[str]:
+    """
+    Character k-shingles of the normalized subject, plus one token for the
+    requester's email domain (so the same outage from the same org clusters).
+    """
+    text = normalize_subject(subject)
+    out = set()
+    if len(text) <= k:
+        if text:
+            out.add(text)
+    else:
+        for i in range(len(text) - k + 1):
+            out.add(text[i:i + k])
+    domain = email_domain(email)
+    if domain:
+        out.add("@" + domain)
+    return out
+
+
+def minhash(sh: Set[str]) -> List[int]:
+    """MinHash signature of a shingle set (one min value per hash function)."""
+    if not sh:
+        return [0] * len(_HASH_PARAMS)
+    base = [zlib.crc32(s.encode("utf-8")) & _MASK for s in sh]
+    return [min((a * x + b) % _PRIME for x in base) for a, b in _HASH_PARAMS]
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / float(len(a | b))
+
+
+# -----------------------------------------------------------------------------
+# Index
+# -----------------------------------------------------------------------------
+class DuplicateDetector:
+    """
+    Near-duplicate index over the open ticket set.
+
+    Exact duplicates (same normalized subject + email domain) are found with a
+    single dict lookup. Near-duplicates use MinHash + LSH banding: each ticket
+    lands in NUM_BANDS buckets and only tickets sharing a bucket are compared,
+    so a lookup touches a handful of candidates instead of every open ticket.
+    """
+
+    def __init__(self, threshold: float = 0.5):
+        self.threshold = threshold
+        self._shingles: Dict[int, Set[str]] = {}        # {ticket_id: shingles}
+        self._bands: Dict[int, List[tuple]] = {}        # {ticket_id: band keys}
+        self._buckets: Dict[tuple, Set[int]] = {}       # {band key: {ticket_id}}
+        self._exact: Dict[Tuple[str, str], Set[int]] = {}
+        self._exact_key: Dict[int, Tuple[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    # ---------- maintenance ----------
+    def add(self, ticket) -> None:
+        """Index a ticket (replaces any previous entry for the same id)."""
+        self.remove(ticket.id)
+        sh = shingles(ticket.subject, ticket.email)
+        keys = self._band_keys(sh)
+
+        self._shingles[ticket.id] = sh
+        self._bands[ticket.id] = keys
+        for key in keys:
+            self._buckets.setdefault(key, set()).add(ticket.id)
+
+        ek = (normalize_subject(ticket.subject), email_domain(ticket.email))
+        self._exact_key[ticket.id] = ek
+        self._exact.setdefault(ek, set()).add(ticket.id)
+
+    def remove(self, ticket_id: int) -> None:
+        """Drop a ticket from the index (no-op if it was never indexed)."""
+        if ticket_id not in self._shingles:
+            return
+        del self._shingles[ticket_id]
+        for key in self._bands.pop(ticket_id, []):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(ticket_id)
+                if not bucket:
+                    del self._buckets[key]
+        ek = self._exact_key.pop(ticket_id, None)
+        if ek is not None:
+            ids = self._exact.get(ek)
+            if ids is not None:
+                ids.discard(ticket_id)
+                if not ids:
+                    del self._exact[ek]
+
+    # ---------- queries ----------
+    def find_similar(self, subject: str, email: Optional[str] = None,
+                     limit: int = 5) -> List[Tuple[int, float]]:
+        """
+        Return up to `limit` (ticket_id, similarity) pairs for open tickets that
+        look like the given submission, best match first. Exact duplicates
+        score 1.0.
+        """
+        scores: Dict[int, float] = {}
+
+        ek = (normalize_subject(subject), email_domain(email))
+        for tid in self._exact.get(ek, ()):
+            scores[tid] = 1.0
+
+        sh = shingles(subject, email)
+        candidates: Set[int] = set()
+        for key in self._band_keys(sh):
+            candidates.update(self._buckets.get(key, ()))
+
+        for tid in candidates:
+            if tid in scores:
+                continue
+            score = jaccard(sh, self._shingles[tid])
+            if score >= self.threshold:
+                scores[tid] = score
+
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        return ranked[:limit]
+
+    # ---------- internals ----------
+    @staticmethod
+    def _band_keys(sh: Set[str]) -> List[tuple]:
+        sig = minhash(sh)
+        return [(b,) + tuple(sig[b * ROWS_PER_BAND:(b + 1) * ROWS_PER_BAND])
+                for b in range(NUM_BANDS)]
@@ -0,0 +1,312 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from models.analytics import np, HAVE_NUMPY
+from models.assignment import AssignmentEngine
+
+# -----------------------------------------------------------------------------
+# Assumptions
+# -----------------------------------------------------------------------------
+PRIORITIES = ("High", "Normal", "Low")          # service order
+SLA_HOURS = {"High": 4, "Normal": 24, "Low": 72}
+HOURS_PER_WEEK = 168
+_EPOCH_WEEK_OFFSET = 72         # 1970-01-01 was a Thursday; slot 0 = Monday 00:00
+DEFAULT_SERVICE_RATE = 1.0      # tickets per agent per hour when history is too thin
+MIN_HISTORY = 50                # resolutions needed before trusting the measured rate
+MAX_LEVELS = 24                 # staffing levels compared per simulation run
+MAX_AGENTS = 500                # give up recommending beyond this many agents
+
+
+def observed_weeks(tickets, now: float, weeks: int) -> float:
+    """Weeks of history actually available in the window (at least one day)."""
+    created = tickets.created
+    known = created[(created >= 0) & (created < now)]
+    start = max(float(known.min()), now - weeks * 7 * 86400) if len(known) else now
+    return max(1.0 / 7, min(float(weeks), (now - start) / (7 * 86400)))
+
+
+def hour_of_week(ts, utc_offset: int):
+    """Slot 0..167 (Monday 00:00 = 0) of epoch seconds `ts` (scalar or array)."""
+    return ((ts + utc_offset) // 3600 + _EPOCH_WEEK_OFFSET) % HOURS_PER_WEEK
+
+
+# -----------------------------------------------------------------------------
+# Arrival model
+# -----------------------------------------------------------------------------
+class ArrivalModel:
+    """
+    Seasonal Poisson arrival rates: mean tickets per hour for every
+    (department, priority, hour-of-week) slot, averaged over the last
+    `weeks` weeks of ticket creations (or as much history as exists).
+    """
+
+    def __init__(self, departments: List[str], rates, weeks: float, utc_offset: int):
+        self.departments = departments
+        self.rates = rates                  # (departments, len(PRIORITIES), 168)
+        self.weeks = weeks
+        self.utc_offset = utc_offset
+
+    @classmethod
+    def fit(cls, tickets, now: Optional[float] = None, weeks: int = 8,
+            utc_offset: Optional[int] = None) -> "ArrivalModel":
+        """`tickets` is an analytics ColumnStore (see models/analytics.py)."""
+        now = int(time.time() if now is None else now)
+        if utc_offset is None:
+            utc_offset = time.localtime(now).tm_gmtoff
+        created = tickets.created
+        mask = (created >= now - weeks * 7 * 86400) & (created < now)
+        dept_codes = tickets.codes("department")[mask]
+        labels = tickets.cats["priority"].labels
+        prio_map = np.array([PRIORITIES.index(p) if p in PRIORITIES else 1 for p in labels] + [1])
+        prio = prio_map[tickets.codes("priority")[mask]]        # unknown (-1) -> Normal
+        slot = hour_of_week(created[mask], utc_offset)
+
+        present = np.unique(dept_codes[dept_codes >= 0])
+        departments = [tickets.cats["department"].labels[c] for c in present]
+        remap = np.full(len(tickets.cats["department"]) + 1, -1)
+        remap[present] = np.arange(len(present))
+        d = remap[dept_codes]
+        keep = d >= 0
+        nd, npri = len(departments), len(PRIORITIES)
+        flat = (d[keep] * npri + prio[keep]) * HOURS_PER_WEEK + slot[keep]
+        counts = np.bincount(flat, minlength=nd * npri * HOURS_PER_WEEK)
+        span = observed_weeks(tickets, now, weeks)
+        rates = counts.reshape(nd, npri, HOURS_PER_WEEK) / span
+        return cls(departments, rates, span, utc_offset)
+
+    def horizon(self, start: float, hours: int):
+        """(departments, priorities, hours) expected arrivals per hour from `start`."""
+        slots = hour_of_week(int(start) + 3600 * np.arange(hours), self.utc_offset)
+        return self.rates[:, :, slots]
+
+
+def service_rate(tickets, agents: int, now: Optional[float] = None, weeks: int = 8) -> float:
+    """
+    Tickets resolved per rostered agent per calendar hour over the window
+    (so breaks, nights and other work are folded in). Falls back to
+    DEFAULT_SERVICE_RATE with little history.
+    """
+    now = time.time() if now is None else now
+    resolved = tickets.resolved
+    n = int(np.count_nonzero((resolved >= now - weeks * 7 * 86400) & (resolved < now)))
+    if n < MIN_HISTORY or agents <= 0:
+        return DEFAULT_SERVICE_RATE
+    return n / (agents * observed_weeks(tickets, now, weeks) * HOURS_PER_WEEK)
+
+
+# -----------------------------------------------------------------------------
+# Queue simulation (runs in worker processes)
+# -----------------------------------------------------------------------------
+def _simulate_chunk(rates, capacities, mu, initial, sla, scenarios, seed):
+    """
+    Monte Carlo for one department. `rates` (P, H) expected arrivals per
+    hour, `capacities` (K,) staffing levels to compare (agent-equivalents),
+    `initial` list of P arrays of open tickets by age in hours, `sla` hours
+    per priority. Every staffing level sees the same arrivals (common random
+    numbers), so levels differ only by their capacity.
+
+    Each hour the agents' capacity (Poisson, mean mu * level) serves High
+    before Normal before Low, first-come first-served within a priority.
+    FIFO makes the queue fully described by cumulative arrivals A and
+    cumulative services D, so the hourly step is O(1) per priority and
+    breaches are counted afterwards: the tickets that arrived in hour i
+    breach unless D has reached A[i] by hour i + sla - 1.
+    Returns arrays (scenarios, K): backlog at the end, peak backlog,
+    breached and at-risk ticket counts.
+    """
+    rng = np.random.default_rng(seed)
+    P, H = rates.shape
+    K = len(capacities)
+    pre = max(sla)                          # hours of history holding the open backlog
+
+    # cumulative arrivals per priority over hours -pre .. H-1: (pre + H, scenarios)
+    cum = []
+    for p in range(P):
+        a = np.zeros((pre + H, scenarios))
+        ages = np.minimum(initial[p], pre - 1)
+        a[:pre] = np.bincount(pre - 1 - ages, minlength=pre)[:, None]
+        a[pre:] = rng.poisson(rates[p], size=(scenarios, H)).T
+        cum.append(np.cumsum(a, axis=0))
+
+    served_rate = np.broadcast_to(mu * np.asarray(capacities, np.float64), (scenarios, K))
+    done = [np.zeros((scenarios, K)) for _ in range(P)]         # running D
+    history = [np.empty((H, scenarios, K)) for _ in range(P)]   # D after each hour
+    peak = np.zeros((scenarios, K))
+    for h in range(H):
+        capacity = rng.poisson(served_rate).astype(np.float64)
+        backlog = np.zeros((scenarios, K))
+        for p in range(P):
+            waiting = cum[p][pre + h][:, None] - done[p]
+            served = np.minimum(capacity, waiting)
+            done[p] += served
+            capacity -= served
+            history[p][h] = done[p]
+            backlog += waiting - served
+        np.maximum(peak, backlog, out=peak)
+
+    breached = np.zeros((scenarios, K))
+    at_risk = np.zeros((scenarios, K))
+    for p in range(P):
+        A = cum[p]
+        first = pre + 1 - sla[p]            # earliest arrival hour not yet breached at h=0 (>= 1)
+        at_risk += (A[-1] - A[first - 1])[:, None]
+        # arrival hours whose deadline falls inside the horizon
+        j = np.arange(first, pre + H - sla[p] + 1)
+        if len(j):
+            deadline = history[p][j - pre + sla[p] - 1]                 # (len(j), S, K)
+            late = A[j][:, :, None] - np.maximum(deadline, A[j - 1][:, :, None])
+            breached += np.maximum(late, 0.0).sum(axis=0)
+    backlog = sum(cum[p][-1][:, None] - done[p] for p in range(P))
+    return {"backlog": backlog, "peak": peak, "breached": breached, "at_risk": at_risk}
+
+
+def simulate(rates, capacities, mu, initial, sla, scenarios=2000, seed=0, pool=None,
+             chunks=1):
+    """Run _simulate_chunk over `chunks` pieces (on `pool` when given) and stack the results."""
+    sizes = [scenarios // chunks + (1 if i < scenarios % chunks else 0) for i in range(chunks)]
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    args = [(rates, capacities, mu, initial, sla, n, s) for n, s in zip(sizes, seeds) if n]
+    if pool is None:
+        parts = [_simulate_chunk(*a) for a in args]
+    else:
+        parts = list(pool.map(_simulate_chunk, *zip(*args)))
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+# -----------------------------------------------------------------------------
+# Forecaster
+# -----------------------------------------------------------------------------
+class Forecaster:
+    """
+    Predicts each department's backlog and SLA breach rate over the next
+    `horizon_hours` for the current roster, and the smallest staffing level
+    keeping the 90th-percentile breach rate under `target_breach`.
+
+    Arrivals come from ArrivalModel, service capacity from the measured
+    per-agent resolution rate, and agents are split across the departments
+    their skills cover (generalists in proportion to expected arrivals).
+    Scenarios are spread over a process pool (`workers`, default one per
+    CPU; 0 runs in-process), created on first use and kept until close().
+    """
+
+    def __init__(self, analytics, user_store, ticket_manager, scenarios: int = 2000,
+                 horizon_hours: int = HOURS_PER_WEEK, weeks: int = 8,
+                 target_breach: float = 0.05, sla_hours: Optional[Dict[str, int]] = None,
+                 workers: Optional[int] = None):
+        if not HAVE_NUMPY:
+            raise RuntimeError("Forecasting needs NumPy (pip install numpy).")
+        self.analytics = analytics
+        self.user_store = user_store
+        self.ticket_manager = ticket_manager
+        self.scenarios = scenarios
+        self.horizon_hours = horizon_hours
+        self.weeks = weeks
+        self.target_breach = target_breach
+        self.sla_hours = dict(SLA_HOURS, **(sla_hours or {}))
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self._pool = None
+
+    def _get_pool(self):
+        if self.workers <= 0:
+            return None
+        if self._pool is None:
+            # spawned (not forked) workers: the app runs background threads
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    # ---------- inputs ----------
+    def roster(self, departments: Sequence[str], weights) -> Dict[str, float]:
+        """Agent-equivalents per department for the routable agents in the user store."""
+        index = {d.lower(): i for i, d in enumerate(departments)}
+        share = np.zeros(len(departments))
+        total = weights.sum()
+        for u in self.user_store.list_users():
+            if not AssignmentEngine.is_routable(u):
+                continue
+            covered = [index[s.lower()] for s in u.skills if s.lower() in index]
+            if covered:
+                share[covered] += 1.0 / len(covered)
+            elif total > 0:
+                share += weights / total
+        return share
+
+    def _open_ages(self, department: str, now: float):
+        ages = [[] for _ in PRIORITIES]
+        for t in self.ticket_manager.tickets.values():
+            if t.department != department:
+                continue
+            p = PRIORITIES.index(t.priority) if t.priority in PRIORITIES else 1
+            age = 0 if t.created_at is None else int(max(0.0, now - t.created_at) // 3600)
+            ages[p].append(age)
+        return [np.array(a, dtype=np.int64) for a in ages]
+
+    # ---------- forecast ----------
+    def forecast(self, now: Optional[float] = None, seed: int = 0) -> List[dict]:
+        """
+        One dict per department: expected arrivals, agents (current
+        agent-equivalents), mean/p90 backlog at the horizon, mean/p90 breach
+        rate, and recommended agents (None if even the largest level tried
+        misses the target).
+        """
+        now = time.time() if now is None else now
+        self.analytics.ensure_history()
+        tickets = self.analytics.tickets
+        model = ArrivalModel.fit(tickets, now=now, weeks=self.weeks)
+        if not model.departments:
+            return []
+        rates = model.horizon(now, self.horizon_hours)          # (D, P, H)
+        expected = rates.sum(axis=(1, 2))
+        agents = sum(1 for u in self.user_store.list_users() if AssignmentEngine.is_routable(u))
+        mu = service_rate(tickets, agents, now=now, weeks=self.weeks)
+        current = self.roster(model.departments, expected)
+        sla = [self.sla_hours[p] for p in PRIORITIES]
+        pool = self._get_pool()
+        chunks = max(1, self.workers)
+
+        out = []
+        for d, dept in enumerate(model.departments):
+            # current staffing, then whole agents from the stability minimum
+            # (mean load) up to a little above the peak hour's load; if none
+            # of those meet the target, try the next, larger batch
+            hourly = rates[d].sum(axis=0)
+            lo = max(1, int(hourly.mean() / mu))
+            hi = min(lo + MAX_LEVELS, max(lo + 4, int(np.ceil(hourly.max() / mu)) + 2))
+            ages = self._open_ages(dept, now)
+            levels = [current[d]] + list(range(lo, hi))
+            recommended = None
+            first = None
+            while True:
+                res = simulate(rates[d], np.array(levels), mu, ages, sla,
+                               scenarios=self.scenarios, seed=seed + d, pool=pool, chunks=chunks)
+                rate = res["breached"] / np.maximum(res["at_risk"], 1.0)
+                p90 = np.percentile(rate, 90, axis=0)
+                if first is None:
+                    first = res, rate, p90
+                ok = [lvl for lvl, r in zip(levels[1:], p90[1:]) if r <= self.target_breach]
+                if ok or hi > MAX_AGENTS:
+                    recommended = ok[0] if ok else None
+                    break
+                lo, hi = hi, min(hi + MAX_LEVELS, hi * 2)
+                levels = [current[d]] + list(range(lo, hi))
+            res, rate, p90 = first
+            out.append({
+                "department": dept,
+                "expected_arrivals": float(expected[d]),
+                "agents": float(current[d]),
+                "backlog_mean": float(res["backlog"][:, 0].mean()),
+                "backlog_p90": float(np.percentile(res["backlog"][:, 0], 90)),
+                "breach_mean": float(rate[:, 0].mean()),
+                "breach_p90": float(p90[0]),
+                "recommended": recommended,
+                "service_rate": mu,
+            })
+        return out
@@ -0,0 +1,315 @@
+import json
+import os
+import time
+from collections import deque, namedtuple
+from typing import Dict, Optional, Tuple
+
+from models.dedup import email_domain
+from models.quotas import QuotaExceeded
+
+# -----------------------------------------------------------------------------
+# Token buckets
+# -----------------------------------------------------------------------------
+class RateLimiter:
+    """
+    Token buckets keyed by string: each key may spend `burst` requests at once
+    and regains `per_minute` tokens per minute. Buckets are plain [tokens,
+    stamp] lists; full, idle buckets are pruned once more than `max_keys` exist.
+    """
+
+    def __init__(self, per_minute: float, burst: float, max_keys: int = 100000):
+        self.rate = per_minute / 60.0
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        self._buckets: Dict[str, list] = {}
+
+    def _level(self, key: str, now: float) -> float:
+        b = self._buckets.get(key)
+        if b is None:
+            return self.burst
+        return min(self.burst, b[0] + (now - b[1]) * self.rate)
+
+    def wait_time(self, key: str, now: float) -> float:
+        """Seconds until `key` may spend one token (0 if it can now)."""
+        missing = 1.0 - self._level(key, now)
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def spend(self, key: str, now: float):
+        b = self._buckets.get(key)
+        if b is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = [self.burst - 1.0, now]
+        else:
+            b[0] = self._level(key, now) - 1.0
+            b[1] = now
+
+    def _prune(self, now: float):
+        full = [k for k in self._buckets if self._level(k, now) >= self.burst]
+        for k in full:
+            del self._buckets[k]
+
+
+# -----------------------------------------------------------------------------
+# Intake
+# -----------------------------------------------------------------------------
+# Outcome of Intake.submit():
+#   created       ticket made immediately                    -> ticket
+#   queued        accepted; created on a later drain()       -> position
+#   spooled       queue full; written to the overflow spool  -> position
+#   rate_limited  over the email/domain/source limit         -> retry_after
+#   busy          queue full and no spool (backpressure)     -> retry_after
+IntakeResult = namedtuple("IntakeResult", "status ticket position retry_after reason")
+
+DEFAULT_LIMITS = {
+    "email": (6, 3),        # per minute, burst
+    "domain": (60, 20),
+    "source": (300, 60),
+}
+
+# Public status lookups (email + ticket number), charged like submissions
+# but separately, so guessing ticket numbers is slow and can't use up the
+# submission allowance
+LOOKUP_LIMITS = {
+    "email": (2, 5),
+    "domain": (20, 10),
+    "source": (60, 20),
+}
+
+
+class Intake:
+    """
+    Front door for public submissions. Every submission is charged against
+    token buckets for its email, email domain and source (all must have a
+    token, or nothing is charged).
+
+    Ticket creation itself is paced by one more bucket (`admit_per_minute`,
+    `admit_burst`): while it has tokens and nothing is waiting, a submission
+    becomes a ticket at once; otherwise it waits in a bounded FIFO that
+    drain() admits as tokens come back. So however hard the form is hit, the
+    open queue agents work from grows at most at the admission rate. When
+    the FIFO is full, submissions go to an optional JSON-lines overflow spool
+    (read back once the FIFO has room) or are refused with a retry hint.
+
+    Public status lookups go through allow_lookup(), which charges their own
+    email/domain/source buckets (LOOKUP_LIMITS).
+    """
+
+    def __init__(self, ticket_manager, limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 admit_per_minute: float = 600, admit_burst: float = 50,
+                 max_queue: int = 500, spool_path: Optional[str] = None,
+                 max_spool: int = 100000,
+                 lookup_limits: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.ticket_manager = ticket_manager
+        limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.limiters = {kind: RateLimiter(*limits[kind]) for kind in DEFAULT_LIMITS}
+        lookup_limits = dict(LOOKUP_LIMITS, **(lookup_limits or {}))
+        self.lookup_limiters = {kind: RateLimiter(*lookup_limits[kind]) for kind in LOOKUP_LIMITS}
+        self.admission = RateLimiter(admit_per_minute, admit_burst)
+        self.max_queue = max_queue
+        self.spool_path = spool_path
+        self.max_spool = max_spool
+        self._queue = deque()
+        self._spooled = 0                  # submissions in the spool not yet read back
+        self._spool_offset = 0
+        self.stats = {"created": 0, "queued": 0, "spooled": 0, "rate_limited": 0, "busy": 0,
+                      "drained": 0, "rejected": 0, "dropped": 0,
+                      "lookups": 0, "lookups_limited": 0}
+        if spool_path:
+            self._recover_spool()
+
+    # ---------- submission ----------
+    def _keys(self, fields: dict, source: str):
+        email = (fields.get("email") or "").strip().lower()
+        domain = email_domain(email)
+        keys = [("source", source or "unknown")]
+        if email:
+            keys.append(("email", email))
+        if domain:
+            keys.append(("domain", domain))
+        return keys
+
+    def pending(self) -> int:
+        return len(self._queue) + self._spooled
+
+    def check(self, fields: dict, source: str = "console",
+              now: Optional[float] = None) -> Optional[IntakeResult]:
+        """
+        The rate_limited/busy result submit() would give `fields` now, or None
+        if it would be accepted. Nothing is charged; forms call this before
+        doing any work for the submitter (duplicate lookups, prompts).
+        """
+        now = time.monotonic() if now is None else now
+        return self._refusal(self._keys(fields, source), now)
+
+    def _refusal(self, keys, now: float) -> Optional[IntakeResult]:
+        wait = self._wait(self.limiters, keys, now)
+        if wait > 0:
+            self.stats["rate_limited"] += 1
+            return IntakeResult("rate_limited", None, None, wait, "Too many submissions")
+        if len(self._queue) >= self.max_queue and (
+                not self.spool_path or self._spooled >= self.max_spool):
+            self.stats["busy"] += 1
+            return IntakeResult("busy", None, None, self._backlog_eta(), "Intake queue is full")
+        return None
+
+    def submit(self, fields: dict, source: str = "console",
+               now: Optional[float] = None) -> IntakeResult:
+        """`fields` are create_ticket keyword arguments."""
+        now = time.monotonic() if now is None else now
+        keys = self._keys(fields, source)
+        refused = self._refusal(keys, now)
+        if refused is not None:
+            return refused
+
+        self._spend(self.limiters, keys, now)
+
+        if not self.pending() and self.admission.wait_time("*", now) == 0:
+            self.admission.spend("*", now)
+            try:
+                t = self.ticket_manager.create_ticket(**fields)
+            except QuotaExceeded as e:
+                self.stats["busy"] += 1
+                return IntakeResult("busy", None, None, 60.0, str(e))
+            self.stats["created"] += 1
+            return IntakeResult("created", t, None, 0.0, None)
+        if len(self._queue) < self.max_queue and not self._spooled:
+            self._queue.append(fields)
+            self.stats["queued"] += 1
+            return IntakeResult("queued", None, self.pending(), 0.0, None)
+        self._spool([fields])
+        self.stats["spooled"] += 1
+        return IntakeResult("spooled", None, self.pending(), 0.0, None)
+
+    @staticmethod
+    def _wait(limiters, keys, now: float) -> float:
+        return max(limiters[kind].wait_time(key, now) for kind, key in keys)
+
+    @staticmethod
+    def _spend(limiters, keys, now: float):
+        for kind, key in keys:
+            limiters[kind].spend(key, now)
+
+    def charge(self, email: Optional[str], source: str = "console",
+               now: Optional[float] = None) -> float:
+        """
+        Charge a message that adds to an existing ticket (e.g. an emailed
+        reply) against the submission buckets. Returns 0 when it may go
+        ahead, else the seconds to wait (and nothing is charged).
+        """
+        now = time.monotonic() if now is None else now
+        keys = self._keys({"email": email}, source)
+        wait = self._wait(self.limiters, keys, now)
+        if wait > 0:
+            self.stats["rate_limited"] += 1
+            return wait
+        self._spend(self.limiters, keys, now)
+        return 0.0
+
+    def allow_lookup(self, email: str, source: str = "console",
+                     now: Optional[float] = None) -> float:
+        """
+        Charge one status lookup (successful or not). Returns 0 when it may
+        go ahead, else the seconds to wait (and nothing is charged).
+        """
+        now = time.monotonic() if now is None else now
+        keys = self._keys({"email": email}, source)
+        wait = self._wait(self.lookup_limiters, keys, now)
+        if wait > 0:
+            self.stats["lookups_limited"] += 1
+            return wait
+        self._spend(self.lookup_limiters, keys, now)
+        self.stats["lookups"] += 1
+        return 0.0
+
+    def _backlog_eta(self) -> float:
+        # time for the admission bucket to work through what is already waiting
+        return max(1.0, self.pending() / self.admission.rate)
+
+    # ---------- draining (agent side, call once per UI tick) ----------
+    def drain(self, now: Optional[float] = None, paced: bool = True) -> int:
+        """Admit waiting submissions as tickets, as far as the admission rate allows."""
+        now = time.monotonic() if now is None else now
+        made = 0
+        while True:
+            if paced and self.admission.wait_time("*", now) > 0:
+                break
+            if not self._queue and self._spooled:
+                self._refill_from_spool()
+            if not self._queue:
+                break
+            try:
+                self.ticket_manager.create_ticket(**self._queue[0])
+            except QuotaExceeded:
+                break                       # stays queued until agents resolve some tickets
+            except TypeError:
+                self.stats["rejected"] += 1     # malformed spool entry
+            else:
+                self.admission.spend("*", now)
+                made += 1
+            self._queue.popleft()
+        self.stats["drained"] += made
+        return made
+
+    # ---------- overflow spool ----------
+    def _spool(self, batch):
+        with open(self.spool_path, "a", encoding="utf-8") as fh:
+            fh.write("".join(json.dumps(f) + "\n" for f in batch))
+        self._spooled += len(batch)
+
+    def _refill_from_spool(self):
+        room = self.max_queue - len(self._queue)
+        with open(self.spool_path, "rb") as fh:
+            fh.seek(self._spool_offset)
+            while room > 0:
+                line = fh.readline()
+                if not line:
+                    break
+                self._spool_offset += len(line)
+                self._spooled -= 1
+                try:
+                    self._queue.append(json.loads(line))
+                except ValueError:
+                    self.stats["rejected"] += 1
+                room -= 1
+        if self._spooled <= 0:
+            # everything read back: start the spool over
+            self._spooled = 0
+            self._spool_offset = 0
+            open(self.spool_path, "w").close()
+
+    def _recover_spool(self):
+        """Count what a previous run left in the spool; it is drained like new overflow."""
+        if not os.path.exists(self.spool_path):
+            return
+        with open(self.spool_path, "rb") as fh:
+            self._spooled = sum(1 for _ in fh)
+
+    def close(self) -> int:
+        """
+        Keep unprocessed submissions across a restart: with a spool, the queue
+        and the unread spool tail are rewritten in order; without one the queue
+        is drained into tickets. Returns how many submissions were lost (only
+        without a spool, when the open-ticket quota stops the drain); they are
+        also counted in stats["dropped"].
+        """
+        if not self.spool_path:
+            self.drain(paced=False)     # nowhere to keep them: admit everything waiting
+            lost = len(self._queue)
+            self.stats["dropped"] += lost
+            self._queue.clear()
+            return lost
+        tail = b""
+        if os.path.exists(self.spool_path):
+            with open(self.spool_path, "rb") as fh:
+                fh.seek(self._spool_offset)
+                tail = fh.read()
+        tmp = self.spool_path + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write("".join(json.dumps(f) + "\n" for f in self._queue).encode("utf-8"))
+            fh.write(tail)
+        os.replace(tmp, self.spool_path)
+        self._spooled += len(self._queue)
+        self._spool_offset = 0
+        self._queue.clear()
+        return 0
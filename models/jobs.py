@@ -0,0 +1,590 @@
+import heapq
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from models.render import write_lines
+
+# -----------------------------------------------------------------------------
+# Background jobs
+# -----------------------------------------------------------------------------
+# Maintenance work (index builds, audit verification, exports, sweeps) runs
+# on a Scheduler instead of the interactive loop:
+#
+#   - thread jobs run on a pool of worker threads. Each worker has its own
+#     deque: sub-jobs a job spawns go onto its worker's deque (newest first,
+#     they share data with their parent), idle workers take the most urgent
+#     queued job, then steal the oldest entry from the busiest deque;
+#   - process jobs (CPU-heavy, picklable function + arguments) run on a
+#     spawned process pool, handed over only when a process is free so
+#     priorities still decide what runs next;
+#   - recurring jobs follow a cron expression or a fixed interval, and a run
+#     is skipped (and counted) while the previous one is still going;
+#   - jobs never touch the managers from a worker: they compute off-thread
+#     and post the (short) change with call_in_main(), which the tab loop
+#     runs between agent actions via run_main().
+PRIORITIES = {"high": 0, "normal": 5, "low": 9}
+JOB_YIELD = 0.001               # seconds a thread job sleeps at each check_cancelled()
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+IDLE = "idle"                   # recurring job between runs
+
+
+class JobCancelled(Exception):
+    """Raised by check_cancelled() inside a job whose cancellation was requested."""
+
+
+# -----------------------------------------------------------------------------
+# Cron expressions
+# -----------------------------------------------------------------------------
+class Cron:
+    """
+    Five-field cron schedule, "minute hour day-of-month month day-of-week"
+    (local time, Sunday = 0), each field "*", a number, a range "a-b", a
+    list "a,b" or a step "*/n" / "a-b/n". As in cron, when both day fields
+    are restricted a day matching either one runs.
+    """
+
+    BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError("Cron needs 5 fields (minute hour day month weekday): '{}'".format(expr))
+        self.expr = expr
+        (self.minutes, self.hours, self.days,
+         self.months, self.weekdays) = [self._field(p, lo, hi) for p, (lo, hi) in zip(parts, self.BOUNDS)]
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _field(text: str, lo: int, hi: int) -> frozenset:
+        out = set()
+        for part in text.split(","):
+            rng, _, step = part.partition("/")
+            if rng == "*":
+                a, b = lo, hi
+            elif "-" in rng:
+                a, b = (int(x) for x in rng.split("-", 1))
+            else:
+                a = b = int(rng)
+            if not (lo <= a <= b <= hi) or (step and int(step) <= 0):
+                raise ValueError("Cron field '{}' out of range {}-{}".format(text, lo, hi))
+            out.update(range(a, b + 1, int(step) if step else 1))
+        return frozenset(out)
+
+    def _day_ok(self, d: datetime) -> bool:
+        dom = d.day in self.days
+        dow = (d.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, ts: float) -> float:
+        """First matching minute strictly after `ts` (epoch seconds)."""
+        d = datetime.fromtimestamp(ts).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = d + timedelta(days=366 * 5)
+        while d < limit:
+            if d.month not in self.months:
+                d = (d.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_ok(d):
+                d = d.replace(hour=0, minute=0) + timedelta(days=1)
+            elif d.hour not in self.hours:
+                d = d.replace(minute=0) + timedelta(hours=1)
+            elif d.minute not in self.minutes:
+                d += timedelta(minutes=1)
+            else:
+                return d.timestamp()
+        raise ValueError("Cron '{}' never matches".format(self.expr))
+
+
+# -----------------------------------------------------------------------------
+# Jobs
+# -----------------------------------------------------------------------------
+class Job:
+    """One unit of background work (or a recurring one) plus its metrics."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name: str, fn: Callable, args=(), kwargs=None, priority: int = 5,
+                 kind: str = "thread", cron: Optional[Cron] = None, every: Optional[float] = None,
+                 group: Optional[str] = None):
+        if kind not in ("thread", "process"):
+            raise ValueError("Job kind must be 'thread' or 'process'.")
+        self.id = next(Job._ids)
+        self.name = name
+        self.fn = fn
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.priority = priority
+        self.kind = kind
+        self.cron = cron
+        self.every = every
+        self.group = group
+        self.state = QUEUED
+        self.next_run: Optional[float] = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+        # metrics
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0                # recurring runs dropped while the last one was still going
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.total_wait = 0.0           # queued -> started
+        self.last_started: Optional[float] = None
+        self.last_finished: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.result = None
+
+    @property
+    def recurring(self) -> bool:
+        return self.cron is not None or self.every is not None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """Drop queued/future runs; a running thread job stops at its next check_cancelled()."""
+        self._cancel.set()
+        if self.state in (QUEUED, IDLE):
+            self.state = CANCELLED
+            self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until a one-off job has finished (or been cancelled)."""
+        return self._done.wait(timeout)
+
+    def avg_time(self) -> float:
+        return self.total_time / self.runs if self.runs else 0.0
+
+    def __repr__(self):
+        return "<Job {} {} [{}]>".format(self.id, self.name, self.state)
+
+
+class _Run:
+    """A queued execution of a job (a recurring job has one per due time)."""
+
+    __slots__ = ("job", "queued_at")
+
+    def __init__(self, job: Job):
+        self.job = job
+        self.queued_at = time.monotonic()
+
+
+_current = threading.local()
+
+
+def current_job() -> Optional[Job]:
+    """The job running on this thread (None outside a worker)."""
+    return getattr(_current, "job", None)
+
+
+def check_cancelled():
+    """
+    Call from long thread jobs at convenient points; raises JobCancelled if
+    asked to stop. Also gives up the GIL for a moment, so a CPU-bound job
+    checked every few milliseconds lets the tab loop run between chunks.
+    """
+    job = current_job()
+    if job is None:
+        return
+    if job.cancelled:
+        raise JobCancelled(job.name)
+    time.sleep(JOB_YIELD)
+
+
+# -----------------------------------------------------------------------------
+# Scheduler
+# -----------------------------------------------------------------------------
+class Scheduler:
+    """
+    Thread + process pools with priorities, work stealing, cron/interval
+    schedules, cancellation and per-job metrics. `threads` and `processes`
+    default to one per CPU; the process pool is only started by the first
+    process job.
+    """
+
+    def __init__(self, threads: Optional[int] = None, processes: Optional[int] = None):
+        cpus = os.cpu_count() or 1
+        self.threads = threads or max(2, cpus)
+        self.processes = cpus if processes is None else processes
+        self.jobs: Dict[int, Job] = {}
+
+        self._cv = threading.Condition()
+        self._heap = []                             # (priority, seq, _Run) thread jobs
+        self._proc_heap = []                        # (priority, seq, _Run) process jobs
+        self._locals = [deque() for _ in range(self.threads)]
+        self._timers = []                           # (due, seq, Job) recurring jobs
+        self._seq = itertools.count()
+        self._main = deque()                        # (group, fn, args) for the interactive thread
+        self._pool = None
+        self._proc_busy = 0
+        self._workers: List[threading.Thread] = []
+        self._stopping = False
+        self.stats = {"executed": [0] * self.threads, "stolen": 0, "main_calls": 0,
+                      "main_dropped": 0}
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._workers:
+            return
+        self._stopping = False
+        for i in range(self.threads):
+            t = threading.Thread(target=self._work, args=(i,), name="jobs-{}".format(i), daemon=True)
+            t.start()
+            self._workers.append(t)
+        t = threading.Thread(target=self._tick, name="jobs-timer", daemon=True)
+        t.start()
+        self._workers.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Cancel everything queued and let running thread jobs finish (up to
+        timeout). A running process job cannot be interrupted; stop() waits
+        for it.
+        """
+        with self._cv:
+            self._stopping = True
+            for job in self.jobs.values():
+                if job.state in (QUEUED, IDLE):
+                    job.cancel()
+            self._cv.notify_all()
+        deadline = time.monotonic() + timeout
+        for t in self._workers:
+            t.join(max(0.0, deadline - time.monotonic()))
+        self._workers = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    # ---------- submitting ----------
+    def submit(self, fn: Callable, *args, name: Optional[str] = None, priority="normal",
+               kind: str = "thread", group: Optional[str] = None, **kwargs) -> Job:
+        """Queue a one-off job. Process jobs need a picklable module-level fn and arguments."""
+        job = Job(name or getattr(fn, "__name__", "job"), fn, args, kwargs,
+                  self._priority(priority), kind, group=group)
+        with self._cv:
+            self.jobs[job.id] = job
+            self._enqueue(_Run(job))
+        return job
+
+    def schedule(self, name: str, fn: Callable, *args, cron: Optional[str] = None,
+                 every: Optional[float] = None, priority="low", kind: str = "thread",
+                 group: Optional[str] = None, run_now: bool = False, **kwargs) -> Job:
+        """Run `fn` on a cron expression or every `every` seconds until cancelled."""
+        if (cron is None) == (every is None):
+            raise ValueError("Give exactly one of cron= or every=.")
+        job = Job(name, fn, args, kwargs, self._priority(priority), kind,
+                  cron=Cron(cron) if cron else None, every=every, group=group)
+        job.state = IDLE
+        now = time.time()
+        job.next_run = now if run_now else self._next_due(job, now)
+        with self._cv:
+            self.jobs[job.id] = job
+            heapq.heappush(self._timers, (job.next_run, next(self._seq), job))
+            self._cv.notify_all()
+        return job
+
+    def spawn(self, fn: Callable, *args, name: Optional[str] = None, kind: str = "thread",
+              **kwargs) -> Job:
+        """
+        Sub-job of the running job: goes on this worker's own deque (run next,
+        or stolen by an idle worker), with the parent's priority and group.
+        """
+        parent = current_job()
+        index = getattr(_current, "worker", None)
+        if parent is None or index is None or kind == "process":
+            return self.submit(fn, *args, name=name, kind=kind,
+                               priority=parent.priority if parent else "normal",
+                               group=parent.group if parent else None, **kwargs)
+        job = Job(name or "{}/{}".format(parent.name, getattr(fn, "__name__", "part")),
+                  fn, args, kwargs, parent.priority, group=parent.group)
+        with self._cv:
+            self.jobs[job.id] = job
+            self._locals[index].append(_Run(job))
+            self._cv.notify()
+        return job
+
+    def join(self, jobs: List[Job], timeout: Optional[float] = None) -> bool:
+        """
+        Wait for jobs to finish. On a worker thread the wait is spent running
+        other queued work instead of blocking a thread of the pool.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        index = getattr(_current, "worker", None)
+        while not all(j._done.is_set() for j in jobs):
+            left = None if deadline is None else deadline - time.monotonic()
+            if left is not None and left <= 0:
+                return False
+            run = self._take(index) if index is not None else None
+            if run is not None:
+                self._execute(run, index)
+                continue
+            with self._cv:
+                self._cv.wait(0.05 if left is None else min(left, 0.05))
+        return True
+
+    def cancel(self, job_id: int) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job.state in (DONE, FAILED, CANCELLED):
+            return False
+        job.cancel()
+        return True
+
+    def cancel_group(self, group: str) -> int:
+        """
+        Cancel every job of a group (e.g. a tenant being unloaded) and drop the
+        main-thread callbacks its jobs posted that haven't run yet.
+        """
+        n = 0
+        for job in list(self.jobs.values()):
+            if job.group == group and job.state not in (DONE, FAILED, CANCELLED):
+                job.cancel()
+                n += 1
+        with self._cv:
+            kept = [c for c in self._main if c[0] != group]
+            self.stats["main_dropped"] += len(self._main) - len(kept)
+            self._main = deque(kept)
+        return n
+
+    def run_now(self, job_id: int) -> bool:
+        """Queue an immediate extra run of a recurring job."""
+        job = self.jobs.get(job_id)
+        if job is None or job.cancelled or not job.recurring or job.state != IDLE:
+            return False
+        with self._cv:
+            job.state = QUEUED
+            self._enqueue(_Run(job))
+        return True
+
+    def _priority(self, p) -> int:
+        return PRIORITIES[p] if isinstance(p, str) else int(p)
+
+    def _enqueue(self, run: _Run):
+        # caller holds self._cv
+        heap = self._proc_heap if run.job.kind == "process" else self._heap
+        heapq.heappush(heap, (run.job.priority, next(self._seq), run))
+        self._cv.notify()
+
+    @staticmethod
+    def _next_due(job: Job, now: float) -> float:
+        return job.cron.next_after(now) if job.cron is not None else now + job.every
+
+    # ---------- main-thread hand-off ----------
+    def call_in_main(self, fn: Callable, *args):
+        """
+        From a job: run fn(*args) on the interactive thread at its next
+        run_main(). Tagged with the job's group so cancel_group() can drop it;
+        a job that is already cancelled posts nothing.
+        """
+        job = current_job()
+        if job is not None and job.cancelled:
+            self.stats["main_dropped"] += 1
+            return
+        with self._cv:
+            self._main.append((job.group if job is not None else None, fn, args))
+
+    def run_main(self, budget: float = 0.05) -> int:
+        """Run queued main-thread callbacks for at most `budget` seconds; returns how many ran."""
+        end = time.monotonic() + budget
+        n = 0
+        while n == 0 or time.monotonic() < end:
+            with self._cv:
+                if not self._main:
+                    break
+                _, fn, args = self._main.popleft()
+            fn(*args)
+            n += 1
+        self.stats["main_calls"] += n
+        return n
+
+    # ---------- workers ----------
+    def _take(self, index: Optional[int]) -> Optional[_Run]:
+        """Own deque (newest), then the most urgent queued job, then steal (oldest)."""
+        with self._cv:
+            if index is not None and self._locals[index]:
+                return self._locals[index].pop()
+            self._start_process_jobs()
+            if self._heap:
+                return heapq.heappop(self._heap)[2]
+            victim = max(self._locals, key=len)
+            if victim:
+                self.stats["stolen"] += 1
+                return victim.popleft()
+        return None
+
+    def _work(self, index: int):
+        _current.worker = index
+        while True:
+            run = self._take(index)
+            if run is None:
+                with self._cv:
+                    if self._stopping:
+                        return
+                    self._cv.wait(0.5)
+                continue
+            self._execute(run, index)
+
+    def _begin(self, run: _Run) -> bool:
+        job = run.job
+        if job.cancelled:
+            job.state = CANCELLED
+            job._done.set()
+            return False
+        job.state = RUNNING
+        job.last_started = time.time()
+        job.total_wait += time.monotonic() - run.queued_at
+        return True
+
+    def _finish(self, job: Job, started: float, result=None, error: Optional[BaseException] = None):
+        took = time.monotonic() - started
+        job.runs += 1
+        job.total_time += took
+        job.max_time = max(job.max_time, took)
+        job.last_finished = time.time()
+        if isinstance(error, JobCancelled):
+            job.state = CANCELLED
+        elif error is not None:
+            job.failures += 1
+            job.last_error = "{}: {}".format(type(error).__name__, error)
+            job.state = FAILED
+        else:
+            job.result = result
+            job.state = DONE
+        if job.recurring and not job.cancelled:
+            job.state = IDLE
+        else:
+            if job.recurring:
+                job.state = CANCELLED
+            job._done.set()
+        with self._cv:
+            self._cv.notify_all()
+
+    def _execute(self, run: _Run, index: int):
+        if not self._begin(run):
+            return
+        job = run.job
+        outer = current_job()
+        _current.job = job
+        started = time.monotonic()
+        try:
+            result = job.fn(*job.args, **job.kwargs)
+        except BaseException as e:              # a failing job must not kill its worker
+            self._finish(job, started, error=e)
+        else:
+            self._finish(job, started, result)
+        finally:
+            _current.job = outer
+        self.stats["executed"][index] += 1
+
+    # ---------- process pool ----------
+    def _start_process_jobs(self):
+        # caller holds self._cv; hand over only as many as there are free processes
+        while self._proc_heap and self._proc_busy < max(1, self.processes):
+            run = heapq.heappop(self._proc_heap)[2]
+            if not self._begin(run):
+                continue
+            if self._pool is None:
+                # spawned (not forked) workers: the app runs background threads
+                self._pool = ProcessPoolExecutor(max_workers=max(1, self.processes),
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            started = time.monotonic()
+            try:
+                future = self._pool.submit(run.job.fn, *run.job.args, **run.job.kwargs)
+            except Exception as e:              # pool broken or shut down
+                self._finish(run.job, started, error=e)
+                continue
+            self._proc_busy += 1
+            future.add_done_callback(lambda f, job=run.job, t=started: self._process_done(job, t, f))
+
+    def _process_done(self, job: Job, started: float, future):
+        with self._cv:
+            self._proc_busy -= 1
+        if future.cancelled():
+            self._finish(job, started, error=JobCancelled(job.name))
+        elif future.exception() is not None:
+            self._finish(job, started, error=future.exception())
+        else:
+            self._finish(job, started, future.result())
+
+    # ---------- timer ----------
+    def _tick(self):
+        while True:
+            with self._cv:
+                if self._stopping:
+                    return
+                now = time.time()
+                while self._timers and self._timers[0][0] <= now:
+                    _, _, job = heapq.heappop(self._timers)
+                    if job.cancelled:
+                        continue
+                    if job.state == IDLE:
+                        job.state = QUEUED
+                        self._enqueue(_Run(job))
+                    else:
+                        job.skipped += 1        # previous run still queued or running
+                    job.next_run = self._next_due(job, now)
+                    heapq.heappush(self._timers, (job.next_run, next(self._seq), job))
+                if self._proc_heap:
+                    self._start_process_jobs()
+                wait = (self._timers[0][0] - now) if self._timers else 1.0
+                self._cv.wait(min(max(wait, 0.01), 1.0))
+
+    # ---------- reporting ----------
+    def rows(self, group: Optional[str] = None, include_finished: bool = True) -> List[Job]:
+        """Jobs for display: recurring and active ones first, newest one-offs after."""
+        jobs = [j for j in list(self.jobs.values())
+                if (group is None or j.group == group)
+                and (include_finished or j.state not in (DONE, FAILED, CANCELLED))]
+        return sorted(jobs, key=lambda j: (not j.recurring, j.state not in (RUNNING, QUEUED), -j.id))
+
+    def prune(self, keep: int = 200):
+        """Forget the oldest finished one-off jobs beyond `keep`."""
+        finished = sorted(j.id for j in list(self.jobs.values())
+                          if not j.recurring and j.state in (DONE, FAILED, CANCELLED))
+        with self._cv:
+            for job_id in finished[:max(0, len(finished) - keep)]:
+                self.jobs.pop(job_id, None)
+
+    def run_ui(self, group: Optional[str] = None):
+        """Admin view of one group's jobs (None = all): metrics, run a recurring job now, cancel."""
+        while True:
+            self.prune()
+            lines = ["", "--- Background Jobs ({} threads, {} processes; {} stolen) ---".format(
+                         self.threads, self.processes, self.stats["stolen"]),
+                     "{:<5} {:<28} {:<8} {:<10} {:>5} {:>5} {:>5} {:>9} {:>9} {:>9}  {}".format(
+                         "ID", "Name", "Kind", "State", "Runs", "Fail", "Skip",
+                         "Avg s", "Max s", "Wait s", "Next / last result"),
+                     "-" * 120]
+            shown = self.rows(group)
+            for j in shown:
+                if j.next_run and j.state == IDLE:
+                    note = "next " + datetime.fromtimestamp(j.next_run).strftime("%Y-%m-%d %H:%M")
+                else:
+                    note = j.last_error or ("" if j.result is None else str(j.result))
+                lines.append("{:<5} {:<28} {:<8} {:<10} {:>5} {:>5} {:>5} {:>9.3f} {:>9.3f} {:>9.3f}  {}".format(
+                    j.id, j.name[:28], j.kind, j.state, j.runs, j.failures, j.skipped, j.avg_time(),
+                    j.max_time, j.total_wait / j.runs if j.runs else 0.0, note[:40]))
+            lines += ["", "r) Run a recurring job now", "c) Cancel a job", "0) Back", ""]
+            write_lines(lines)
+            choice = input("Choose: ").strip().lower()
+            if choice in ("r", "c"):
+                s = input("Job ID: ").strip()
+                job_id = int(s) if s.isdigit() and any(j.id == int(s) for j in shown) else -1
+                ok = self.run_now(job_id) if choice == "r" else self.cancel(job_id)
+                print("✅ Done.\n" if ok else "❌ No such job, or not in a state that allows it.\n")
+            else:
+                return
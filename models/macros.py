@@ -0,0 +1,264 @@
+import json
+import os
+import string
+from functools import lru_cache
+from operator import attrgetter
+from typing import Dict, List, Optional
+
+# -----------------------------------------------------------------------------
+# Templates
+# -----------------------------------------------------------------------------
+# Placeholders a template may use besides the macro's own parameters
+TICKET_PLACEHOLDERS = ("id", "subject", "from_name", "email", "priority", "department",
+                       "help_topic", "sla_plan", "assigned_to")
+AGENT_PLACEHOLDER = "agent"     # name of the agent applying the macro
+
+
+class CompiledTemplate:
+    """
+    A template parsed once into (literal, placeholder, format spec) parts.
+    Rendering is a join over prebuilt getters; no parsing per ticket.
+    """
+
+    __slots__ = ("text", "parts", "names", "static", "per_ticket")
+
+    def __init__(self, text: str):
+        self.text = text
+        parts = []
+        names = set()
+        for literal, name, spec, conv in string.Formatter().parse(text):
+            if conv:
+                raise ValueError("Conversions like !r are not supported in templates.")
+            if name is not None:
+                if not name.isidentifier():
+                    raise ValueError("Bad placeholder {{{}}}.".format(name))
+                names.add(name)
+            parts.append((literal, name, spec or ""))
+        self.parts = tuple(parts)
+        self.names = frozenset(names)
+        self.static = not names
+        self.per_ticket = bool(names & set(TICKET_PLACEHOLDERS))   # else same text for all
+
+    def check(self, params=()):
+        unknown = self.names - set(TICKET_PLACEHOLDERS) - {AGENT_PLACEHOLDER} - set(params)
+        if unknown:
+            raise ValueError("Unknown placeholder(s): {}. Use ticket fields ({}), {{agent}} "
+                             "or a macro parameter.".format(
+                                 ", ".join(sorted(unknown)), ", ".join(TICKET_PLACEHOLDERS)))
+
+    def bind(self, agent: str, params: Dict[str, str]):
+        """Return render(ticket) with the agent/params resolved up front."""
+        if self.static:
+            text = "".join(p[0] for p in self.parts)
+            return lambda t: text
+        pieces = []
+        for literal, name, spec in self.parts:
+            if name is None:
+                pieces.append((literal, None, ""))
+            elif name in TICKET_PLACEHOLDERS:
+                pieces.append((literal, attrgetter(name), spec))
+            else:
+                value = agent if name == AGENT_PLACEHOLDER else params[name]
+                pieces.append((literal + format(value, spec), None, ""))
+
+        def render(t):
+            out = []
+            for literal, get, spec in pieces:
+                out.append(literal)
+                if get is not None:
+                    value = get(t)
+                    out.append(format("" if value is None else value, spec))
+            return "".join(out)
+        return render
+
+
+@lru_cache(maxsize=512)
+def compile_template(text: str) -> CompiledTemplate:
+    """Parse a template (cached: each distinct text is compiled once per process)."""
+    return CompiledTemplate(text)
+
+
+# -----------------------------------------------------------------------------
+# Macros
+# -----------------------------------------------------------------------------
+ASSIGN_ME = "me"
+ASSIGN_SUGGEST = "suggest"      # least-loaded agent with matching skills
+STATUSES = ("Open", "Resolved")
+
+
+class Macro:
+    """
+    A named bundle of actions, run in order over a batch of tickets:
+      {"type": "note",   "text": "<template>"}
+      {"type": "assign", "to": "me" | "suggest" | "<user name>"}
+      {"type": "status", "value": "Open" | "Resolved"}
+    """
+
+    def __init__(self, name: str, actions: List[dict], description: str = "",
+                 params: Optional[List[str]] = None):
+        self.name = name
+        self.description = description
+        self.params = list(params or [])
+        self.actions = [dict(a) for a in actions]
+        for a in self.actions:
+            kind = a.get("type")
+            if kind == "note":
+                compile_template(a["text"]).check(self.params)
+            elif kind == "assign":
+                if not a.get("to"):
+                    raise ValueError("assign action needs 'to'.")
+            elif kind == "status":
+                if a.get("value") not in STATUSES:
+                    raise ValueError("status must be one of {}.".format(", ".join(STATUSES)))
+            else:
+                raise ValueError("Unknown macro action '{}'.".format(kind))
+
+    def assigns_to_others(self) -> bool:
+        return any(a["type"] == "assign" and a["to"] != ASSIGN_ME for a in self.actions)
+
+    def resolves(self) -> bool:
+        return any(a["type"] == "status" and a["value"] == "Resolved" for a in self.actions)
+
+    def summary(self) -> str:
+        out = []
+        for a in self.actions:
+            if a["type"] == "note":
+                out.append("note \"{}\"".format(a["text"][:30]))
+            elif a["type"] == "assign":
+                out.append("assign → {}".format(a["to"]))
+            else:
+                out.append("status → {}".format(a["value"]))
+        return "; ".join(out)
+
+    def to_dict(self) -> dict:
+        return {"description": self.description, "params": self.params, "actions": self.actions}
+
+    def apply(self, ticket_manager, ticket_ids, actor, params: Optional[Dict[str, str]] = None):
+        """
+        Run every action over all open tickets in `ticket_ids`, each action as
+        one batch. Returns {"tickets": n, "notes": n, "assigned": n, "reopened": n,
+        "resolved": [ids], "tasks_resolved": [ids]}; "reopened" counts tickets
+        whose status changed to Open.
+        """
+        params = dict(params or {})
+        missing = [p for p in self.params if p not in params]
+        if missing:
+            raise ValueError("Missing macro parameter(s): {}".format(", ".join(missing)))
+        tm = ticket_manager
+        ids = [i for i in dict.fromkeys(ticket_ids) if i in tm.tickets]
+        result = {"tickets": len(ids), "notes": 0, "assigned": 0, "reopened": 0,
+                  "resolved": [], "tasks_resolved": []}
+
+        for a in self.actions:
+            ids = [i for i in ids if i in tm.tickets]       # earlier steps may resolve some
+            if not ids:
+                break
+            if a["type"] == "note":
+                template = compile_template(a["text"])
+                render = template.bind(actor.name, params)
+                if not template.per_ticket:
+                    tm.add_notes(ids, actor, render(None))
+                else:
+                    for i in ids:
+                        t = tm.tickets[i]
+                        tm.add_note(t, actor, render(t))
+                result["notes"] += len(ids)
+            elif a["type"] == "assign":
+                result["assigned"] += self._assign(tm, ids, a["to"], actor)
+            elif a["type"] == "status" and a["value"] == "Resolved":
+                tickets, tasks = tm.resolve_tickets(ids, actor)
+                result["resolved"].extend(tickets)
+                result["tasks_resolved"].extend(tasks)
+            elif a["type"] == "status":
+                result["reopened"] += sum(
+                    1 for i in ids if tm.set_status(tm.tickets[i], a["value"], actor))
+        return result
+
+    @staticmethod
+    def _assign(tm, ids, to, actor) -> int:
+        if to == ASSIGN_ME:
+            return len(tm.assign_tickets(ids, actor, actor))
+        if to == ASSIGN_SUGGEST:
+            if tm.assigner is None:
+                raise ValueError("No assignment engine available for 'suggest'.")
+            n = 0
+            for i in ids:                   # loads change as we go, so pick per ticket
+                target = tm.assigner.pick_for_ticket(tm.tickets[i])
+                if target is not None:
+                    n += len(tm.assign_tickets([i], target, actor))
+            return n
+        target = tm.user_store.get_by_name(to) if tm.user_store is not None else None
+        if target is None or not target.is_active:
+            raise ValueError("Macro assigns to '{}', who is unknown or inactive.".format(to))
+        return len(tm.assign_tickets(ids, target, actor))
+
+
+# -----------------------------------------------------------------------------
+# Library
+# -----------------------------------------------------------------------------
+DEFAULT_MACROS = {
+    "password-reset": {
+        "description": "Send reset instructions and resolve",
+        "params": [],
+        "actions": [
+            {"type": "note", "text": "Hi {from_name}, we've sent password reset steps to "
+                                     "{email}. Reply to reopen if it doesn't work. — {agent}"},
+            {"type": "status", "value": "Resolved"},
+        ],
+    },
+    "escalate": {
+        "description": "Hand to the least-loaded matching agent with a reason",
+        "params": ["reason"],
+        "actions": [
+            {"type": "note", "text": "Escalated by {agent} ({department}): {reason}"},
+            {"type": "assign", "to": "suggest"},
+        ],
+    },
+    "take": {
+        "description": "Claim and acknowledge",
+        "params": [],
+        "actions": [
+            {"type": "assign", "to": "me"},
+            {"type": "note", "text": "{agent} is looking into \"{subject}\"."},
+        ],
+    },
+}
+
+
+class MacroLibrary:
+    """Named macros, kept in a small JSON file when a path is given."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.macros: Dict[str, Macro] = {}
+        data = DEFAULT_MACROS
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        for name, spec in data.items():
+            self.macros[name] = Macro(name, spec["actions"], spec.get("description", ""),
+                                      spec.get("params"))
+
+    def get(self, name: str) -> Optional[Macro]:
+        return self.macros.get(name)
+
+    def names(self) -> List[str]:
+        return sorted(self.macros)
+
+    def add(self, macro: Macro):
+        self.macros[macro.name] = macro
+        self._save()
+
+    def remove(self, name: str) -> bool:
+        if self.macros.pop(name, None) is None:
+            return False
+        self._save()
+        return True
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({n: m.to_dict() for n, m in self.macros.items()}, fh, indent=2)
+        os.replace(tmp, self.path)
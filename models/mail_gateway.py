@@ -0,0 +1,297 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from email import policy
+from email.parser import BytesParser
+from email.utils import parseaddr
+from typing import Iterator, List, Optional, Tuple
+
+from models.quotas import QuotaExceeded
+from models.requesters import normalize_email
+
+# -----------------------------------------------------------------------------
+# Parsing (top-level so it can run in a process pool)
+# -----------------------------------------------------------------------------
+TICKET_REF = re.compile(r"\[#(\d+)\]")
+_REPLY_PREFIX = re.compile(r"^\s*((re|fw|fwd)\s*:\s*)+", re.IGNORECASE)
+_QUOTE_HEADER = re.compile(r"^On .+ wrote:\s*$")
+MAX_BODY_CHARS = 10000
+RUN_KEYS = ("replies", "created", "skipped", "limited", "deferred")
+
+
+def _strip_quoted(text: str) -> str:
+    """Keep only the new part of a reply (drop '>' lines and the quote header)."""
+    out = []
+    for line in text.splitlines():
+        if line.startswith(">") or _QUOTE_HEADER.match(line.strip()):
+            break
+        out.append(line)
+    return "\n".join(out).strip()
+
+
+def parse_message(raw: bytes) -> Optional[dict]:
+    """
+    Turn one raw RFC 822 message into the fields the gateway needs.
+    Returns None for messages that can't be parsed.
+    """
+    try:
+        msg = BytesParser(policy=policy.default).parsebytes(raw)
+    except Exception:
+        return None
+
+    subject = str(msg.get("Subject", "") or "").strip()
+    from_name, email = parseaddr(str(msg.get("From", "") or ""))
+    body_part = msg.get_body(preferencelist=("plain",))
+    try:
+        body = body_part.get_content() if body_part is not None else ""
+    except Exception:
+        body = ""
+
+    m = TICKET_REF.search(subject)
+    clean_subject = TICKET_REF.sub("", _REPLY_PREFIX.sub("", subject)).strip()
+    return {
+        "ticket_ref": int(m.group(1)) if m else None,
+        "subject": clean_subject or "(no subject)",
+        "from_name": from_name or (email.split("@")[0] if email else "Guest"),
+        "email": email or None,
+        "body": _strip_quoted(body)[:MAX_BODY_CHARS],
+    }
+
+
+# -----------------------------------------------------------------------------
+# Spool readers
+# -----------------------------------------------------------------------------
+class MaildirSpool:
+    """Reads new/ of a Maildir; processed messages are moved to cur/ (flag S)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        for sub in ("new", "cur", "tmp"):
+            os.makedirs(os.path.join(path, sub), exist_ok=True)
+
+    def batches(self, size: int) -> Iterator[List[Tuple[str, bytes]]]:
+        new_dir = os.path.join(self.path, "new")
+        batch = []
+        with os.scandir(new_dir) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                try:
+                    with open(entry.path, "rb") as fh:
+                        batch.append((entry.name, fh.read()))
+                except FileNotFoundError:
+                    continue            # picked up by a concurrent reader
+                if len(batch) >= size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def done(self, keys: List[str]) -> None:
+        for key in keys:
+            src = os.path.join(self.path, "new", key)
+            if os.path.exists(src):
+                os.replace(src, os.path.join(self.path, "cur", key + ":2,S"))
+
+    def pending(self, keys: List[str]) -> List[str]:
+        """The keys still waiting in new/ (another reader may have taken some)."""
+        return [k for k in keys if os.path.exists(os.path.join(self.path, "new", k))]
+
+
+class MboxSpool:
+    """
+    Streams an mbox file from the last processed byte offset (kept in a
+    '<mbox>.offset' side file), so it never loads the whole mailbox.
+
+    A message counts as complete once the next 'From ' line follows it. The
+    last message in the file is only taken when it ends with mbox's blank
+    separator line and the file has not been written for `settle` seconds,
+    so a delivery still in progress is left for the next poll.
+    """
+
+    def __init__(self, path: str, settle: float = 2.0):
+        self.path = path
+        self.offset_path = path + ".offset"
+        self.settle = settle
+
+    def _load_offset(self) -> int:
+        try:
+            with open(self.offset_path) as fh:
+                return int(fh.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def batches(self, size: int) -> Iterator[List[Tuple[str, bytes]]]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as fh:
+            fh.seek(self._load_offset())
+            batch = []
+            current = []
+            while True:
+                pos = fh.tell()
+                line = fh.readline()
+                at_boundary = not line or (line.startswith(b"From ") and current)
+                if not line and current and not self._tail_complete(fh, current):
+                    break                   # last message may still be being written
+                if at_boundary and current:
+                    # key = end offset of this message; drop its From_ line
+                    batch.append((str(pos), b"".join(current[1:])))
+                    current = []
+                    if len(batch) >= size:
+                        yield batch
+                        batch = []
+                if not line:
+                    break
+                current.append(line)
+            if batch:
+                yield batch
+
+    def _tail_complete(self, fh, lines: List[bytes]) -> bool:
+        if len(lines) < 2 or lines[-1].strip():
+            return False
+        return time.time() - os.fstat(fh.fileno()).st_mtime >= self.settle
+
+    def done(self, keys: List[str]) -> None:
+        # keys are end offsets of each message, in file order
+        if keys:
+            with open(self.offset_path, "w") as fh:
+                fh.write(keys[-1])
+
+    def pending(self, keys: List[str]) -> List[str]:
+        """The keys past the processed offset (another reader may have taken some)."""
+        offset = self._load_offset()
+        return [k for k in keys if int(k) > offset]
+
+
+# -----------------------------------------------------------------------------
+# Gateway
+# -----------------------------------------------------------------------------
+class MailGateway:
+    """
+    Email-to-ticket ingestion. Messages are read from the spool in bounded
+    chunks, parsed in a worker pool, then applied to the TicketManager on the
+    calling thread (managers are not thread-safe):
+      - subject carries [#<id>] of an open ticket and the sender is that
+        ticket's requester (or an agent)          -> public reply on that ticket
+      - anything else                             -> new ticket
+    Ticket ids are sequential, so a reference alone doesn't let a stranger
+    write on someone's ticket; their mail becomes a ticket of its own. New
+    tickets go through the tenant's Intake when one is wired in (the same
+    per-email/domain rate limits as the public form; replies are charged
+    against them too) and over-limit messages are dropped and counted as
+    "limited". When the open-ticket quota or the intake queue is full, the
+    rest of the spool is left in place ("deferred") for a later poll.
+
+    poll() runs on demand (menu 6). watch() adds a recurring scheduler job
+    that parses new mail off the main thread and hands small batches to the
+    tab loop, which creates the tickets between agent actions.
+    """
+
+    def __init__(self, ticket_manager, spool_path: str, workers: int = 4,
+                 chunk_size: int = 500, use_processes: bool = False):
+        self.ticket_manager = ticket_manager
+        if os.path.isfile(spool_path):
+            self.spool = MboxSpool(spool_path)
+        else:
+            self.spool = MaildirSpool(spool_path)
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.use_processes = use_processes
+        self.stats = dict.fromkeys(RUN_KEYS, 0)
+        self._inflight = False          # a watched batch is waiting for the tab loop
+
+    def poll(self, limit: Optional[int] = None) -> dict:
+        """Process waiting messages (at most `limit`). Returns counts for this run."""
+        run = dict.fromkeys(RUN_KEYS, 0)
+        pool_cls = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        seen = 0
+        with pool_cls(max_workers=self.workers) as pool:
+            for batch in self.spool.batches(self.chunk_size):
+                if limit is not None:
+                    batch = batch[:max(0, limit - seen)]
+                    if not batch:
+                        break
+                parsed = pool.map(parse_message, [raw for _, raw in batch],
+                                  chunksize=max(1, len(batch) // (self.workers * 4)))
+                seen += self._apply_batch([key for key, _ in batch], parsed, run)
+                if run["deferred"]:
+                    break
+        for k, v in run.items():
+            self.stats[k] += v
+        return run
+
+    def _apply_batch(self, keys: List[str], parsed, run: dict) -> int:
+        """Apply parsed messages in order, then mark them done. Returns how many were applied."""
+        applied = 0
+        try:
+            for fields in parsed:
+                run[self._apply(fields)] += 1
+                applied += 1
+        except QuotaExceeded:
+            run["deferred"] = len(keys) - applied
+        # a crash before this point re-reads the chunk on the next poll
+        self.spool.done(keys[:applied])
+        return applied
+
+    # ---------- background import ----------
+    def watch(self, scheduler, every: float = 30.0, batch: int = 50, group: Optional[str] = None):
+        """Poll the spool every `every` seconds on `scheduler` (models/jobs.py)."""
+        return scheduler.schedule("mail-import", self._fetch, scheduler, batch, every=every,
+                                  group=group, run_now=True)
+
+    def _fetch(self, scheduler, size: int) -> str:
+        if self._inflight:
+            return "waiting for the tab loop"
+        for batch in self.spool.batches(size):
+            parsed = [parse_message(raw) for _, raw in batch]
+            self._inflight = True
+            scheduler.call_in_main(self._apply_fetched, [key for key, _ in batch], parsed)
+            return "{} message(s) parsed".format(len(batch))
+        return "no new mail"
+
+    def _apply_fetched(self, keys: List[str], parsed: List[Optional[dict]]):
+        """Tab loop side of watch(): skip anything a manual poll took meanwhile."""
+        self._inflight = False
+        still = set(self.spool.pending(keys))
+        keep = [(k, f) for k, f in zip(keys, parsed) if k in still]
+        run = dict.fromkeys(RUN_KEYS, 0)
+        self._apply_batch([k for k, _ in keep], [f for _, f in keep], run)
+        for k, v in run.items():
+            self.stats[k] += v
+
+    def _may_reply(self, t, email: Optional[str]) -> bool:
+        """Only the ticket's requester or one of the agents may reply by email."""
+        sender = normalize_email(email)
+        if not sender:
+            return False
+        if sender == normalize_email(t.email):
+            return True
+        users = self.ticket_manager.user_store
+        return users is not None and any(
+            normalize_email(u.email) == sender for u in users.list_users())
+
+    def _apply(self, fields: Optional[dict]) -> str:
+        if fields is None:
+            return "skipped"
+        tm = self.ticket_manager
+        intake = tm.intake
+        t = tm.get_ticket(fields["ticket_ref"]) if fields["ticket_ref"] is not None else None
+        if t is not None and self._may_reply(t, fields["email"]):
+            if intake is not None and intake.charge(fields["email"], source="email") > 0:
+                return "limited"
+            tm.add_reply(t, fields["from_name"], fields["email"], fields["body"] or "(empty reply)")
+            return "replies"
+
+        new = dict(subject=fields["subject"], from_name=fields["from_name"],
+                   email=fields["email"], help_topic="Email", message=fields["body"] or None)
+        if intake is None:
+            tm.create_ticket(**new)
+            return "created"
+        result = intake.submit(new, source="email")
+        if result.status == "rate_limited":
+            return "limited"
+        if result.status == "busy":
+            raise QuotaExceeded(result.reason)  # leave this and the rest for a later poll
+        return "created"
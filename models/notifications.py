@@ -0,0 +1,330 @@
+import itertools
+import json
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+from datetime import datetime
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+# -----------------------------------------------------------------------------
+# Transports
+# -----------------------------------------------------------------------------
+class Transport:
+    """Delivers a batch of rendered messages. Raise on failure to trigger a retry."""
+
+    def send(self, messages: List[EmailMessage]) -> None:
+        raise NotImplementedError
+
+
+class FileTransport(Transport):
+    """Local default: appends each message to a plain-text mail sink file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, messages: List[EmailMessage]) -> None:
+        with open(self.path, "a", encoding="utf-8") as fh:
+            for msg in messages:
+                fh.write(msg.as_string())
+                fh.write("\n" + "=" * 72 + "\n")
+
+
+class SMTPTransport(Transport):
+    """Sends through an SMTP server (one connection per batch)."""
+
+    def __init__(self, host: str = "localhost", port: int = 25, username: Optional[str] = None,
+                 password: Optional[str] = None, use_tls: bool = False, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def send(self, messages: List[EmailMessage]) -> None:
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            for msg in messages:
+                smtp.send_message(msg)
+
+
+# -----------------------------------------------------------------------------
+# Notifier
+# -----------------------------------------------------------------------------
+# Which events each audience hears about
+SUBMITTER_EVENTS = {"created", "claimed", "assigned", "resolved"}
+ASSIGNEE_EVENTS = {"assigned", "noted", "replied", "resolved"}
+
+_EVENT_TEXT = {
+    "created":  "Your ticket was received.",
+    "claimed":  "{actor} is now working on this ticket.",
+    "assigned": "Ticket assigned to {assignee}.",
+    "noted":    "{actor} added a note: {note}",
+    "replied":  "The requester replied: {note}",
+    "resolved": "Ticket marked as resolved.",
+}
+
+
+class Notifier:
+    """
+    Asynchronous outbound notifications for ticket events.
+
+    handle() is registered as a TicketManager listener. It appends the event
+    to the outbox journal (one buffered write, no fsync) and queues it in
+    memory, so the agent's action never waits on the network. A worker thread
+    fsyncs the journal, works out recipients, coalesces rapid updates per
+    (ticket, recipient) for `coalesce_window` seconds, sends them in batches
+    through the transport, and retries failed batches with exponential
+    backoff. Undelivered messages, including events the worker never got to,
+    are replayed from the outbox on the next start. An event survives a
+    process crash as soon as handle() returns, and a power loss once the
+    worker's next fsync has run (within about 0.2s).
+    """
+
+    def __init__(self, outbox_path: str, transport: Transport, user_store=None,
+                 sender: str = "helpdesk@localhost", coalesce_window: float = 2.0,
+                 max_batch: int = 50, max_attempts: int = 6, base_backoff: float = 1.0):
+        self.outbox_path = outbox_path
+        self.transport = transport
+        self.user_store = user_store
+        self.sender = sender
+        self.coalesce_window = coalesce_window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+
+        self._inbox = queue.SimpleQueue()
+        self._fh = None                         # outbox journal, append mode
+        self._journal_lock = threading.Lock()   # handle() and the worker both append
+        self._sync_lock = threading.Lock()      # fsync vs. closing the file; never taken by handle()
+        self._eids = itertools.count(1)
+        self._epoch = "{:x}".format(time.time_ns())   # keeps event ids unique across runs
+        self._pending: Dict[str, dict] = {}    # {key: message state}
+        self._thread = None
+        self._stop = threading.Event()
+        self._flush_all = False
+        self.stats = {"queued": 0, "sent": 0, "retries": 0, "dead": 0}
+
+    # ---------- listener (agent path) ----------
+    def handle(self, event, ticket, actor, changes) -> None:
+        """TicketManager listener: cheap, non-blocking hand-off to the worker."""
+        item = {
+            "event": event,
+            "ticket_id": ticket.id,
+            "subject": ticket.subject,
+            "submitter": ticket.email,
+            "assignee": ticket.assigned_to,
+            "actor": actor.name if actor is not None else "System",
+            "note": (changes.get("note") or (None, None))[1],
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "eid": "{}-{}".format(self._epoch, next(self._eids)),
+        }
+        self._journal([{"op": "event", "item": item}], sync=False)
+        self._inbox.put(item)
+
+    # ---------- lifecycle ----------
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._replay_outbox()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self._thread.start()
+
+    def stop(self, flush: bool = True, timeout: float = 5.0) -> None:
+        """Stop the worker; with flush, send whatever is pending first."""
+        if self._thread is None:
+            return
+        self._flush_all = flush
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._close_journal()
+
+    # ---------- worker ----------
+    def _run(self) -> None:
+        while True:
+            stopping = self._stop.is_set()
+            self._drain_inbox(timeout=0.0 if stopping else 0.2)
+            now = time.monotonic()
+            force = stopping and self._flush_all
+            due = [k for k, m in self._pending.items()
+                   if force or (m["next_try"] <= now and now - m["first_seen"] >= self.coalesce_window)]
+            for i in range(0, len(due), self.max_batch):
+                self._send_batch(due[i:i + self.max_batch])
+            if stopping:
+                return
+
+    def _drain_inbox(self, timeout: float) -> None:
+        try:
+            item = self._inbox.get(timeout=timeout) if timeout else self._inbox.get_nowait()
+        except queue.Empty:
+            return
+        items = [item]
+        while True:
+            try:
+                items.append(self._inbox.get_nowait())
+            except queue.Empty:
+                break
+        records = []
+        for item in items:
+            for recipient in self._recipients(item):
+                self._enqueue(item, recipient)
+                records.append({"op": "enqueue", "to": recipient, "item": item})
+            records.append({"op": "routed", "eid": item["eid"]})
+        self._journal(records)
+
+    def _recipients(self, item: dict) -> List[str]:
+        out = []
+        if item["event"] in SUBMITTER_EVENTS and item["submitter"]:
+            out.append(item["submitter"])
+        if item["event"] in ASSIGNEE_EVENTS and self.user_store is not None:
+            u = self.user_store.get_by_name(item["assignee"])
+            # don't tell people about their own actions
+            if u is not None and u.email and u.name != item["actor"]:
+                out.append(u.email)
+        return out
+
+    def _enqueue(self, item: dict, recipient: str) -> None:
+        key = "{}|{}".format(item["ticket_id"], recipient)
+        msg = self._pending.get(key)
+        if msg is None:
+            msg = {"key": key, "ticket_id": item["ticket_id"], "to": recipient,
+                   "subject": item["subject"], "events": [], "attempts": 0,
+                   "first_seen": time.monotonic(), "next_try": 0.0}
+            self._pending[key] = msg
+        msg["events"].append(item)
+        self.stats["queued"] += 1
+
+    def _send_batch(self, keys: List[str]) -> None:
+        msgs = [self._pending[k] for k in keys]
+        try:
+            self.transport.send([self._render(m) for m in msgs])
+        except Exception as e:
+            records = []
+            for m in msgs:
+                m["attempts"] += 1
+                if m["attempts"] >= self.max_attempts:
+                    del self._pending[m["key"]]
+                    self.stats["dead"] += 1
+                    records.append({"op": "dead", "key": m["key"], "error": str(e)})
+                else:
+                    delay = self.base_backoff * (2 ** (m["attempts"] - 1))
+                    m["next_try"] = time.monotonic() + delay * (0.5 + random.random())
+                    self.stats["retries"] += 1
+            self._journal(records)
+            return
+        for m in msgs:
+            del self._pending[m["key"]]
+            self.stats["sent"] += 1
+        self._journal([{"op": "sent", "key": m["key"], "count": len(m["events"])} for m in msgs])
+
+    def _render(self, m: dict) -> EmailMessage:
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = m["to"]
+        msg["Subject"] = "[#{}] {}".format(m["ticket_id"], m["subject"])
+        lines = []
+        for ev in m["events"]:
+            template = _EVENT_TEXT.get(ev["event"], ev["event"])
+            lines.append("{}  {}".format(ev["at"], template.format(
+                actor=ev["actor"], assignee=ev["assignee"] or "Unassigned", note=ev["note"] or "")))
+        lines.append("")
+        lines.append("Reply to this email and keep [#{}] in the subject.".format(m["ticket_id"]))
+        msg.set_content("\n".join(lines))
+        return msg
+
+    # ---------- outbox journal ----------
+    def _journal(self, records: List[dict], sync: bool = True) -> None:
+        """
+        Append records; with sync, fsync them (and anything handle() wrote
+        before). The fsync runs after _journal_lock is released, so handle()
+        never waits on the disk; _sync_lock keeps the file open meanwhile.
+        """
+        if not records:
+            return
+        with self._journal_lock:
+            if self._fh is None:
+                self._fh = open(self.outbox_path, "a", encoding="utf-8")
+            fh = self._fh
+            fh.write("".join(json.dumps(r) + "\n" for r in records))
+            fh.flush()
+        if sync:
+            with self._sync_lock:
+                if self._fh is fh:          # not closed by stop() in the meantime
+                    os.fsync(fh.fileno())
+
+    def _close_journal(self) -> None:
+        with self._sync_lock, self._journal_lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def _replay_outbox(self) -> None:
+        """Re-queue messages enqueued but never sent/dead-lettered, then compact the file."""
+        if not os.path.exists(self.outbox_path):
+            return
+        open_items: Dict[str, List[tuple]] = {}
+        unrouted: Dict[str, dict] = {}          # events journaled by handle(), never routed
+        with self._journal_lock:
+            if self._fh is not None:
+                self._fh.flush()
+            with open(self.outbox_path, "rb") as fh:
+                data = fh.read()
+        for line in data.decode("utf-8", "replace").splitlines():
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue            # torn last line after a crash
+            if rec["op"] == "event":
+                unrouted[rec["item"]["eid"]] = rec["item"]
+            elif rec["op"] == "routed":
+                unrouted.pop(rec["eid"], None)
+            elif rec["op"] == "enqueue":
+                key = "{}|{}".format(rec["item"]["ticket_id"], rec["to"])
+                open_items.setdefault(key, []).append((rec["item"], rec["to"]))
+            else:
+                open_items.pop(rec["key"], None)
+
+        # write and fsync the compacted copy without holding any lock handle() takes
+        tmp = self.outbox_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            for entries in open_items.values():
+                for item, to in entries:
+                    fh.write(json.dumps({"op": "enqueue", "to": to, "item": item}) + "\n")
+            for item in unrouted.values():
+                fh.write(json.dumps({"op": "event", "item": item}) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        with self._sync_lock, self._journal_lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            # carry over whatever handle() appended since the read
+            with open(self.outbox_path, "rb") as fh:
+                fh.seek(len(data))
+                appended = fh.read()
+            if appended:
+                with open(tmp, "ab") as fh:
+                    fh.write(appended)
+            os.replace(tmp, self.outbox_path)
+
+        for entries in open_items.values():
+            for item, to in entries:
+                self._enqueue(item, to)
+        # events handle() queued in this process before start() are journaled too
+        while True:
+            try:
+                item = self._inbox.get_nowait()
+            except queue.Empty:
+                break
+            unrouted[item["eid"]] = item
+        for item in unrouted.values():
+            self._inbox.put(item)
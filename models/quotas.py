@@ -0,0 +1,16 @@
+from typing import Optional
+
+# -----------------------------------------------------------------------------
+# Per-tenant limits
+# -----------------------------------------------------------------------------
+# Keys understood in a tenant's quota dict; None (or missing) = unlimited
+QUOTA_KEYS = ("users", "open_tickets", "open_tasks", "articles")
+
+
+class QuotaExceeded(ValueError):
+    """Raised when creating something would exceed a configured limit."""
+
+
+def check_quota(what: str, used: int, limit: Optional[int]) -> None:
+    if limit is not None and used >= limit:
+        raise QuotaExceeded("{} quota reached ({} of {})".format(what, used, limit))
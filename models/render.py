@@ -0,0 +1,153 @@
+import shutil
+import sys
+from typing import Callable, Iterable, List, Optional, Sequence
+
+# -----------------------------------------------------------------------------
+# Terminal rendering
+# -----------------------------------------------------------------------------
+# The tabs redraw their list plus menu on every loop of run_ui. With long
+# queues that is thousands of print() calls per keypress, so instead:
+#   - a frame is built as a list of lines and written with a single write()
+#   - ListView only formats the rows inside its viewport (one page), so the
+#     cost of a frame does not grow with the size of the queue
+#   - when the previous frame is known to still be on screen (only our own
+#     prompt was printed since, e.g. after paging) and the output is a
+#     terminal, Screen moves the cursor back up and rewrites just the lines
+#     that changed, then clears what is left below.
+CLEAR_LINE = "\x1b[2K"
+CLEAR_BELOW = "\x1b[J"
+NEXT_LINE = "\x1b[E"
+
+PAGE_KEYS = {"n": 1, "p": -1}
+
+
+def terminal_size():
+    return shutil.get_terminal_size((100, 40))
+
+
+def write_lines(lines: Iterable[str], out=None):
+    """Write a block of lines with one call instead of one print() per line."""
+    (out or sys.stdout).write("".join(line + "\n" for line in lines))
+
+
+class Screen:
+    """Writes whole frames, or only their changed lines when the last frame is intact."""
+
+    def __init__(self, out=None):
+        self._out = out               # None = whatever sys.stdout is at draw time
+        self._last = None             # lines of the last frame
+        self._below = 0               # terminal rows used by prompts since that frame
+        self._held = False            # nothing but our prompts printed since the last frame
+
+    @property
+    def out(self):
+        return self._out or sys.stdout
+
+    def _is_tty(self) -> bool:
+        isatty = getattr(self.out, "isatty", None)
+        return bool(isatty and isatty())
+
+    def hold(self):
+        """Mark the last frame as still on screen (call when an action printed nothing)."""
+        self._held = True
+
+    def input(self, prompt: str) -> str:
+        """input() that remembers how many rows the prompt line took."""
+        text = input(prompt)
+        cols = terminal_size().columns
+        self._below += max(1, -(-(len(prompt) + len(text)) // cols))
+        return text
+
+    def _can_patch(self, lines: List[str]) -> bool:
+        if not (self._held and self._last is not None and self._is_tty()):
+            return False
+        cols, rows = terminal_size()
+        # cursor maths assumes one terminal row per line and the whole frame on screen
+        return (len(self._last) + self._below < rows
+                and all(len(line) <= cols for line in self._last)
+                and all(len(line) <= cols for line in lines))
+
+    def draw(self, lines: List[str]):
+        if self._can_patch(lines):
+            prev = self._last
+            buf = ["\x1b[{}F".format(len(prev) + self._below)]
+            for i, line in enumerate(lines):
+                if i < len(prev) and prev[i] == line:
+                    buf.append(NEXT_LINE)
+                else:
+                    buf.append("\r" + CLEAR_LINE + line + "\n")
+            buf.append(CLEAR_BELOW)
+            self.out.write("".join(buf))
+        else:
+            write_lines(lines, self.out)
+        self.out.flush()
+        self._last = list(lines)
+        self._below = 0
+        self._held = False
+
+
+class Viewport:
+    """Which slice of a long list is visible; scrolls a page at a time."""
+
+    def __init__(self, page_size: Optional[int] = None):
+        self.page_size = page_size    # None = fit the terminal (see ListView)
+        self.offset = 0
+
+    def window(self, total: int, size: int):
+        last = max(0, total - 1) // size * size
+        self.offset = min(max(0, self.offset), last)
+        return self.offset, min(total, self.offset + size)
+
+    def scroll(self, pages: int, size: int):
+        self.offset += pages * size
+
+
+class ListView:
+    """
+    A table tab's list: header, the visible page of rows, a position footer,
+    then the menu, drawn as one frame through a Screen.
+    """
+
+    def __init__(self, header: str, rule: int = 100, empty: str = "(no items)",
+                 page_size: Optional[int] = None, out=None):
+        self.header = header
+        self.rule = rule
+        self.empty = empty
+        self.viewport = Viewport(page_size)
+        self.screen = Screen(out)
+        self._size = page_size or 20
+
+    def _page_size(self, reserved: int) -> int:
+        if self.viewport.page_size:
+            return self.viewport.page_size
+        return max(5, terminal_size().lines - reserved)
+
+    def draw(self, items: Sequence, fmt: Callable[[object], str],
+             notes: Sequence[str] = (), menu: Sequence[str] = ()):
+        """Render rows [offset, offset + page) of `items`; fmt is only called for those."""
+        if not items:
+            self.screen.draw([self.empty] + list(notes) + list(menu))
+            return
+        # header + rule + footer + prompt + one spare row
+        self._size = size = self._page_size(len(notes) + len(menu) + 5)
+        start, stop = self.viewport.window(len(items), size)
+        lines = [self.header, "-" * self.rule]
+        lines.extend(fmt(items[i]) for i in range(start, stop))
+        if len(items) > size:
+            lines.append("Rows {:,}-{:,} of {:,}  (n = next page, p = previous page)".format(
+                start + 1, stop, len(items)))
+        lines.extend(notes)
+        lines.extend(menu)
+        self.screen.draw(lines)
+
+    def prompt(self, text: str = "Enter a number: ") -> str:
+        return self.screen.input(text)
+
+    def page(self, choice: str) -> bool:
+        """Handle a paging key; True if `choice` was one (the frame is then redrawn in place)."""
+        pages = PAGE_KEYS.get(choice.lower())
+        if pages is None:
+            return False
+        self.viewport.scroll(pages, self._size)
+        self.screen.hold()
+        return True
@@ -0,0 +1,630 @@
+import argparse
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+from models.audit import TASK_FIELDS, TICKET_FIELDS, AuditLog
+from models.search import ARCHIVED
+from models.tabs.tasks import Task
+from models.tabs.tickets import Ticket
+from models.timetravel import apply_record, build_managers, capture_state, copy_state
+
+# -----------------------------------------------------------------------------
+# Leader/follower replication
+# -----------------------------------------------------------------------------
+# The audit log already is the mutation log: every ticket/task/user change
+# becomes one numbered record. The leader ships those records to read-only
+# followers over a local socket (TCP "host:port" or a Unix socket path):
+#
+#   follower -> leader   {"hello": {"term": ..., "seq": ...}}
+#   leader -> follower   {"type": "snapshot", "term", "seq", "state", "totals", "next_ticket",
+#                         "next_task"}
+#                        {"type": "rec", "rec": {...}}          one audit record
+#                        {"type": "beat", "seq": n}             when idle
+#
+# A new follower (or one from another term — a restarted or promoted leader)
+# gets a snapshot of the queue state, then the live stream. A follower that
+# merely lost its connection reconnects with the last seq it applied and is
+# caught up from the audit log. Each leader process is one "term", so a
+# follower never replays one leader's records onto another's state.
+#
+# Scope: the queue state of models/timetravel.py (open tickets and tasks,
+# users and their claims) plus the dashboard totals. KB, passwords and
+# tickets resolved before a follower joined are not replicated.
+DEFAULT_HEARTBEAT = 0.5
+MAX_QUEUE = 10000               # records buffered per follower before it is dropped
+CATCHUP_CHUNK = 1000
+
+
+class StaleReplica(RuntimeError):
+    """A follower read was refused: the replica is further behind than allowed."""
+
+
+def parse_address(address: str):
+    """("tcp", (host, port)) for "host:port", ("unix", path) for a socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return "tcp", (host or "127.0.0.1", int(port))
+    return "unix", address
+
+
+def _listen(address: str) -> socket.socket:
+    family, addr = parse_address(address)
+    if family == "unix":
+        if os.path.exists(addr):
+            os.unlink(addr)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(addr)
+    sock.listen(16)
+    return sock
+
+
+def _connect(address: str, timeout: float) -> socket.socket:
+    family, addr = parse_address(address)
+    sock = socket.socket(socket.AF_UNIX if family == "unix" else socket.AF_INET, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    sock.connect(addr)
+    if family == "tcp":
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+def _dumps(msg: dict) -> bytes:
+    return json.dumps(msg, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+
+
+# -----------------------------------------------------------------------------
+# Applying records to live managers (follower side)
+# -----------------------------------------------------------------------------
+def apply_to_managers(user_store, tm, ta, rec: dict) -> None:
+    """
+    Roll live managers forward by one audit record, keeping their indexes
+    and claim lists in step (the object counterpart of timetravel.apply_record).
+    No listeners fire: followers only mirror what the leader already did.
+    """
+    kind, item_id, event, changes = rec["kind"], rec["id"], rec["event"], rec["changes"]
+    if kind == "user":
+        u = user_store.get_by_id(item_id)
+        if u is not None and "status" in changes:
+            user_store.set_status(u, changes["status"][1])
+        return
+    if kind == "ticket":
+        items, fields = tm.tickets, TICKET_FIELDS
+    elif kind == "task":
+        items, fields = ta.tasks, TASK_FIELDS
+    else:
+        return
+
+    if event == "created":
+        values = {f: changes.get(f, (None, None))[1] for f in fields}
+        if kind == "ticket":
+            item = Ticket(ticket_id=item_id, created_at=rec["at"], **values)
+            items[item_id] = item
+            if tm._dedup is not None:
+                tm._dedup.add(item)
+            if tm._search is not None:
+                tm._search.add_ticket(item)
+            if tm._requesters is not None:
+                tm._requesters.add_ticket(item)
+            if item.parent_id is not None:
+                tm._children.setdefault(item.parent_id, set()).add(item_id)
+            tm._next_id = max(tm._next_id, item_id + 1)
+            tm.totals_created += 1
+        else:
+            item = Task(task_id=item_id, created_at=rec["at"], **values)
+            items[item_id] = item
+            ta._index_task(item)
+            ta._next_id = max(ta._next_id, item_id + 1)
+            ta.totals_created += 1
+        _claim(user_store, kind, item, item.assigned_to)
+        return
+
+    item = items.get(item_id)
+    if item is None:
+        return
+    if event == "resolved":
+        items.pop(item_id)
+        item.status = "Resolved"
+        item.resolved_at = rec["at"]
+        if kind == "ticket":
+            tm.archived[item_id] = item
+            if tm._dedup is not None:
+                tm._dedup.remove(item_id)
+            if tm._search is not None:
+                tm._search.set_state(item_id, ARCHIVED)
+            _unlink(tm, item, None)
+            tm._children.pop(item_id, None)
+            tm.totals_resolved += 1
+        else:
+            ta._unindex_task(item)
+            ta.totals_resolved += 1
+        _unclaim(user_store, kind, item, item.assigned_to)
+        return
+
+    for field, (before, after) in changes.items():
+        if field == "note":
+            note = {"by": rec["actor"] or ("Requester" if event == "replied" else "System"),
+                    "text": after}
+            if event == "replied":
+                note["public"] = True
+            item.internal_notes.append(note)
+        elif field == "assigned_to":
+            _unclaim(user_store, kind, item, before)
+            item.assigned_to = after
+            _claim(user_store, kind, item, after)
+        elif field == "parent_id" and kind == "ticket":
+            _unlink(tm, item, after)
+            item.parent_id = after
+            if after is not None:
+                tm._children.setdefault(after, set()).add(item_id)
+        elif field == "ticket_id" and kind == "task":
+            ta._unindex_task(item)
+            item.ticket_id = after
+            ta._index_task(item)
+        elif hasattr(item, field):
+            setattr(item, field, after)
+
+
+def _claim(user_store, kind, item, name):
+    u = user_store.get_by_name(name)
+    if u is not None:
+        (u.claim_ticket if kind == "ticket" else u.claim_task)(item)
+
+
+def _unclaim(user_store, kind, item, name):
+    u = user_store.get_by_name(name)
+    if u is not None:
+        (u.unclaim_ticket if kind == "ticket" else u.unclaim_task)(item)
+
+
+def _unlink(tm, ticket, new_parent):
+    """Drop a ticket from its current parent's child set (if the parent changes)."""
+    if ticket.parent_id is None or ticket.parent_id == new_parent:
+        return
+    siblings = tm._children.get(ticket.parent_id)
+    if siblings is not None:
+        siblings.discard(ticket.id)
+        if not siblings:
+            del tm._children[ticket.parent_id]
+
+
+# -----------------------------------------------------------------------------
+# Leader
+# -----------------------------------------------------------------------------
+class _Peer:
+    def __init__(self, conn: socket.socket, name: str):
+        self.conn = conn
+        self.name = name
+        self.queue = queue.Queue(MAX_QUEUE)
+        self.overflow = False           # fell MAX_QUEUE records behind: drop, it will catch up
+
+
+class ReplicationLeader:
+    """
+    Ships the audit log to followers. Keeps its own copy of the queue state,
+    updated under a lock by the audit listener, so a snapshot and its seq
+    always describe the same point in the log.
+    """
+
+    def __init__(self, audit: AuditLog, user_store, ticket_manager, task_manager,
+                 address: str, heartbeat: float = DEFAULT_HEARTBEAT):
+        self.audit = audit
+        self.user_store = user_store
+        self.ticket_manager = ticket_manager
+        self.task_manager = task_manager
+        self.address = address
+        self.heartbeat = heartbeat
+        self.term = uuid.uuid4().hex[:16]
+
+        self._lock = threading.Lock()
+        self._state = capture_state(user_store, ticket_manager, task_manager)
+        self._seq = len(audit)
+        self._totals = {"tickets": [ticket_manager.totals_created, ticket_manager.totals_resolved],
+                        "tasks": [task_manager.totals_created, task_manager.totals_resolved]}
+        self._next_ticket = ticket_manager._next_id
+        self._next_task = task_manager._next_id
+        self._peers = {}
+        self._sock = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.stats = {"connections": 0, "snapshots": 0, "catchups": 0, "shipped": 0, "dropped": 0}
+        audit.add_listener(self._on_record)
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._thread is not None:
+            return
+        self._sock = _listen(self.address)
+        if parse_address(self.address)[0] == "tcp":
+            host, port = self._sock.getsockname()[:2]
+            self.address = "{}:{}".format(host, port)     # real port when 0 was asked for
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._accept, name="replication", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        _close(self._sock)          # shutdown wakes the accept(); a bare close doesn't
+        with self._lock:
+            peers = list(self._peers.values())
+        for p in peers:
+            _close(p.conn)
+        self._thread.join(2.0)
+        self._thread = None
+        if parse_address(self.address)[0] == "unix" and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def followers(self):
+        with self._lock:
+            return sorted(self._peers)
+
+    # ---------- log tap ----------
+    def _on_record(self, rec: dict):
+        msg = {"type": "rec", "rec": rec}
+        with self._lock:
+            apply_record(self._state, rec)
+            if rec["event"] in ("created", "resolved") and rec["kind"] + "s" in self._totals:
+                self._totals[rec["kind"] + "s"][0 if rec["event"] == "created" else 1] += 1
+            if rec["kind"] == "ticket" and rec["event"] == "created":
+                self._next_ticket = max(self._next_ticket, rec["id"] + 1)
+            if rec["kind"] == "task" and rec["event"] == "created":
+                self._next_task = max(self._next_task, rec["id"] + 1)
+            self._seq = rec["seq"] + 1
+            for p in self._peers.values():
+                if not p.overflow:
+                    try:
+                        p.queue.put_nowait(msg)
+                    except queue.Full:
+                        p.overflow = True
+
+    # ---------- serving ----------
+    def _accept(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), name="replication-peer",
+                             daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        peer = None
+        try:
+            conn.settimeout(5.0)
+            hello = json.loads(conn.makefile("rb").readline() or b"{}").get("hello") or {}
+            conn.settimeout(None)
+            peer = _Peer(conn, str(hello.get("name") or id(conn)))
+            first, lo, hi = self._register(peer, hello)
+            if first is not None:
+                conn.sendall(_dumps(first))
+            for start in range(lo, hi, CATCHUP_CHUNK):
+                recs = self.audit.records(start, min(hi, start + CATCHUP_CHUNK))
+                conn.sendall(b"".join(_dumps({"type": "rec", "rec": r}) for r in recs))
+            self._stream(peer)
+        except (OSError, ValueError):
+            pass
+        finally:
+            if peer is not None:
+                with self._lock:
+                    self._peers.pop(peer.name, None)
+            _close(conn)
+
+    def _register(self, peer: _Peer, hello: dict):
+        """Pick snapshot or log catch-up and start queueing live records, atomically."""
+        with self._lock:
+            self._peers[peer.name] = peer
+            self.stats["connections"] += 1
+            seq = hello.get("seq")
+            if hello.get("term") == self.term and isinstance(seq, int) and seq <= self._seq:
+                self.stats["catchups"] += 1
+                return None, seq, self._seq
+            self.stats["snapshots"] += 1
+            return {"type": "snapshot", "term": self.term, "seq": self._seq,
+                    "state": copy_state(self._state), "totals": self._totals,
+                    "next_ticket": self._next_ticket, "next_task": self._next_task}, 0, 0
+
+    def _beat(self) -> dict:
+        with self._lock:
+            return {"type": "beat", "seq": self._seq}
+
+    def _stream(self, peer: _Peer):
+        last_beat = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                batch = [peer.queue.get(timeout=self.heartbeat)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < 500:
+                try:
+                    batch.append(peer.queue.get_nowait())
+                except queue.Empty:
+                    break
+            # beat when idle, and at least every heartbeat while busy, so a
+            # follower with a backlog in the pipe knows it is behind
+            if not batch or time.monotonic() - last_beat >= self.heartbeat:
+                batch.append(self._beat())
+                last_beat = time.monotonic()
+            peer.conn.sendall(b"".join(_dumps(m) for m in batch))
+            self.stats["shipped"] += len(batch)
+            if peer.overflow:
+                self.stats["dropped"] += 1
+                return                  # follower reconnects and is caught up from the log
+
+
+def _close(conn):
+    try:
+        conn.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    conn.close()
+
+
+# -----------------------------------------------------------------------------
+# Follower
+# -----------------------------------------------------------------------------
+class ReplicationFollower:
+    """
+    Read-only replica. A background thread keeps (re)connecting to the
+    leader and applies what it ships; reads go through read(), which holds
+    the apply lock and refuses to serve when the replica's view is older
+    than `max_staleness` seconds.
+
+    Staleness is measured from the last moment the follower knew it had
+    applied everything the leader had (a heartbeat or record whose seq it
+    had reached), so an idle but connected follower stays fresh and a
+    disconnected or lagging one goes stale.
+    """
+
+    def __init__(self, address: str, max_staleness: float = 2.0, name: Optional[str] = None,
+                 reconnect: float = 0.5):
+        self.address = address
+        self.max_staleness = max_staleness
+        self.name = name or "follower-{}-{}".format(os.getpid(), uuid.uuid4().hex[:6])
+        self.reconnect = reconnect
+        self.lock = threading.RLock()
+        self._synced = threading.Condition(self.lock)
+        self.user_store = self.ticket_manager = self.task_manager = None
+        self.term = None
+        self.applied = 0                # records applied (= next expected seq)
+        self.leader_seq = 0             # newest seq the leader has told us about
+        self._fresh_at = None           # monotonic time we were last fully caught up
+        self._sock = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()       # cut the reconnect pause short
+        self.stats = {"connects": 0, "snapshots": 0, "applied": 0}
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        if self._sock is not None:
+            _close(self._sock)
+        self._thread.join(2.0)
+        self._thread = None
+
+    def follow(self, address: str):
+        """Switch to another leader (e.g. a newly promoted follower)."""
+        self.address = address
+        self._wake.set()
+        if self._sock is not None:
+            _close(self._sock)      # the loop reconnects to the new address at once
+
+    # ---------- reads ----------
+    def staleness(self) -> float:
+        """Seconds since the replica last knew it had everything the leader had."""
+        with self.lock:
+            if self._fresh_at is None:
+                return float("inf")
+            return time.monotonic() - self._fresh_at
+
+    @contextmanager
+    def read(self, max_staleness: Optional[float] = None):
+        """Hold the replica steady for a read; raises StaleReplica if it is too far behind."""
+        bound = self.max_staleness if max_staleness is None else max_staleness
+        with self.lock:
+            lag = self.staleness()
+            if lag > bound:
+                raise StaleReplica("Replica is {} behind the leader (limit {:.1f}s).".format(
+                    "not yet synced" if lag == float("inf") else "{:.1f}s".format(lag), bound))
+            yield self
+
+    def wait_for(self, seq: int, timeout: float = 5.0) -> bool:
+        """Block until records [0, seq) are applied (read-your-writes after a leader write)."""
+        deadline = time.monotonic() + timeout
+        with self._synced:
+            while self.applied < seq or self.ticket_manager is None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._synced.wait(left)
+        return True
+
+    # ---------- replication loop ----------
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self._sock = _connect(self.address, timeout=5.0)
+                self.stats["connects"] += 1
+                self._sock.sendall(_dumps({"hello": {"term": self.term, "seq": self.applied,
+                                                     "name": self.name}}))
+                self._sock.settimeout(max(5.0, 4 * DEFAULT_HEARTBEAT))
+                self._receive(self._sock)
+            except (OSError, ValueError):
+                pass
+            finally:
+                if self._sock is not None:
+                    _close(self._sock)
+                    self._sock = None
+            self._wake.wait(self.reconnect)
+
+    def _receive(self, sock: socket.socket):
+        """Apply whatever arrived in one go, so readers wait for one lock hand-off per batch."""
+        tail = b""
+        while True:
+            data = sock.recv(1 << 16)
+            if not data:
+                return
+            lines = (tail + data).split(b"\n")
+            tail = lines.pop()
+            if not lines:
+                continue
+            with self._synced:
+                for line in lines:
+                    self._handle(json.loads(line))
+                if self.applied >= self.leader_seq:
+                    self._fresh_at = time.monotonic()
+                self._synced.notify_all()
+
+    def _handle(self, msg: dict):
+        kind = msg.get("type")
+        if kind == "snapshot":
+            self._install(msg)
+        elif kind == "rec":
+            rec = msg["rec"]
+            if rec["seq"] < self.applied:
+                return                          # already have it
+            if rec["seq"] > self.applied:
+                raise ValueError("gap in replication stream")   # reconnect and catch up
+            apply_to_managers(self.user_store, self.ticket_manager, self.task_manager, rec)
+            self.applied = rec["seq"] + 1
+            self.leader_seq = max(self.leader_seq, self.applied)
+            self.stats["applied"] += 1
+        elif kind == "beat":
+            self.leader_seq = max(self.leader_seq, msg["seq"])
+
+    def _install(self, msg: dict):
+        state = msg["state"]
+        # JSON object keys are strings; ids are ints everywhere else
+        state["tickets"] = {int(k): v for k, v in state["tickets"].items()}
+        state["tasks"] = {int(k): v for k, v in state["tasks"].items()}
+        users, tm, ta = build_managers(state)
+        tm.totals_created, tm.totals_resolved = msg["totals"]["tickets"]
+        ta.totals_created, ta.totals_resolved = msg["totals"]["tasks"]
+        tm._next_id = max(tm._next_id, msg["next_ticket"])
+        ta._next_id = max(ta._next_id, msg.get("next_task", 1))
+        self.user_store, self.ticket_manager, self.task_manager = users, tm, ta
+        self.term = msg["term"]
+        self.applied = self.leader_seq = msg["seq"]
+        self.stats["snapshots"] += 1
+
+    # ---------- failover ----------
+    def promote(self, address: Optional[str] = None,
+                audit_path: Optional[str] = None) -> ReplicationLeader:
+        """
+        Stop following and become a writable leader: the replica's managers get
+        a fresh audit log (a new term) and, with an address, start shipping it
+        to followers of their own. Point the other followers at it with follow().
+        """
+        self.stop()
+        with self.lock:
+            if self.ticket_manager is None:
+                raise StaleReplica("Cannot promote a replica that never synced.")
+            audit = AuditLog(audit_path)
+            tm, ta = self.ticket_manager, self.task_manager
+            tm.add_listener(audit.ticket_listener)
+            ta.add_listener(audit.task_listener)
+            tm.audit = ta.audit = audit
+            leader = ReplicationLeader(audit, self.user_store, tm, ta, address or "127.0.0.1:0")
+        if address:
+            leader.start()
+        return leader
+
+
+# -----------------------------------------------------------------------------
+# Follower console (python -m models.replication HOST:PORT)
+# -----------------------------------------------------------------------------
+def _status_line(f: ReplicationFollower) -> str:
+    lag = f.staleness()
+    return "Leader {}  term {}  applied {:,} / {:,}  staleness {}".format(
+        f.address, f.term or "-", f.applied, f.leader_seq,
+        "not synced" if lag == float("inf") else "{:.1f}s".format(lag))
+
+
+def run_console(f: ReplicationFollower):
+    from models.tabs.dashboard import Dashboard
+    from models.render import ListView
+
+    view = ListView("{:<6} {:<40} {:<14} {:<10} {:<15}".format(
+        "ID", "Subject", "From", "Priority", "Assigned To"), rule=89, empty="(no tickets)")
+    while True:
+        print("\n=== Read replica ===")
+        print(_status_line(f))
+        print("1) Open tickets\n2) Search tickets\n3) Dashboard overview\n"
+              "4) Promote to leader\n0) Exit\n")
+        choice = input("Enter a number: ").strip()
+        try:
+            if choice == "1":
+                while True:
+                    with f.read():
+                        items = list(f.ticket_manager.tickets.values())
+                        view.draw(items, lambda t: "{:<6} {:<40} {:<14} {:<10} {:<15}".format(
+                            t.id, t.subject[:40], t.from_name[:14], t.priority,
+                            t.assigned_to or "-"), menu=["0) Back"])
+                    if not view.page(view.prompt("Choice: ").strip()):
+                        break
+            elif choice == "2":
+                query = input("Search: ").strip()
+                with f.read():
+                    hits = f.ticket_manager.search_tickets(query, limit=10)
+                    for t, score in hits:
+                        print("  #{:<6} {:>4.0%}  {} ({})".format(t.id, score, t.subject, t.from_name))
+                    if not hits:
+                        print("No matching open tickets.")
+            elif choice == "3":
+                with f.read():
+                    Dashboard(f.ticket_manager, f.task_manager,
+                              user_store=f.user_store)._print_overview()
+            elif choice == "4":
+                address = input("Listen on (host:port or socket path): ").strip()
+                leader = f.promote(address or None)
+                print("✅ Promoted: term {}, serving followers on {}.".format(
+                    leader.term, leader.address))
+                print("Point the other followers here; press Enter to stop.")
+                input()
+                leader.stop()
+                return
+            elif choice == "0":
+                return
+        except StaleReplica as e:
+            print("❌ {}".format(e))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read-only replica of a helpdesk leader")
+    parser.add_argument("leader", help="leader address (host:port or Unix socket path)")
+    parser.add_argument("--max-staleness", type=float, default=2.0, metavar="SECONDS",
+                        help="refuse reads when the replica is further behind than this")
+    args = parser.parse_args(argv)
+    f = ReplicationFollower(args.leader, max_staleness=args.max_staleness)
+    f.start()
+    f.wait_for(0, timeout=5.0)
+    try:
+        run_console(f)
+    finally:
+        f.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import bisect
+from typing import Dict, List, Optional
+
+from models.dedup import email_domain
+
+# -----------------------------------------------------------------------------
+# Requester index
+# -----------------------------------------------------------------------------
+# "All tickets from chris@example.com" (or from anyone @example.com) without
+# scanning the store: ticket ids are kept per normalized email and per
+# domain, open and archived alike. Ids are appended as tickets are created,
+# so each list stays in ascending id order; a lookup is one dict access plus
+# the requester's own tickets.
+
+
+def normalize_email(email: Optional[str]) -> str:
+    """Lowercased address without surrounding whitespace/angle brackets ("" if unusable)."""
+    email = (email or "").strip().strip("<>").strip().lower()
+    if email.startswith("mailto:"):
+        email = email[len("mailto:"):]
+    return email if "@" in email else ""
+
+
+class RequesterIndex:
+    """{email: [ticket ids]} and {domain: [ticket ids]} over open and archived tickets."""
+
+    def __init__(self):
+        self._by_email: Dict[str, List[int]] = {}
+        self._by_domain: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        """Number of distinct requesters (by email)."""
+        return len(self._by_email)
+
+    def add(self, ticket_id: int, email: Optional[str]):
+        email = normalize_email(email)
+        if not email:
+            return
+        for ids in (self._by_email.setdefault(email, []),
+                    self._by_domain.setdefault(email_domain(email), [])):
+            if not ids or ids[-1] < ticket_id:
+                ids.append(ticket_id)
+            else:                       # out of order (e.g. an archive filled late)
+                i = bisect.bisect_left(ids, ticket_id)
+                if i == len(ids) or ids[i] != ticket_id:
+                    ids.insert(i, ticket_id)
+
+    def add_ticket(self, t):
+        self.add(t.id, t.email)
+
+    def for_email(self, email: Optional[str]) -> List[int]:
+        """Ticket ids from this requester, oldest first."""
+        return list(self._by_email.get(normalize_email(email), ()))
+
+    def for_domain(self, domain: str) -> List[int]:
+        """Ticket ids from anyone at `domain` ("example.com" or "@example.com"), oldest first."""
+        return list(self._by_domain.get(domain.strip().lstrip("@").lower(), ()))
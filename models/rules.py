@@ -0,0 +1,429 @@
+import json
+import os
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from models.users import User
+from models.selection import parse_selection, item_matches
+from models.macros import compile_template, TICKET_PLACEHOLDERS, AGENT_PLACEHOLDER
+from models.auth import Perm
+from models.tabs.tickets import TicketManager
+from models.tabs.tasks import TaskManager
+
+# -----------------------------------------------------------------------------
+# Rules
+# -----------------------------------------------------------------------------
+# A rule fires on ticket or task events whose item matches its conditions:
+#   kind     "ticket" | "task"
+#   on       ["created"] and/or ["updated"] (any later change: claim, assign,
+#            note, reply, link, field update; never resolve)
+#   when     a bulk-selection expression, e.g. 'help_topic=Billing priority=High'
+#   actions  run in order:
+#     {"type": "set",    "field": "department", "value": "Finance"}
+#     {"type": "assign", "to": "suggest" | "<user name>"}
+#     {"type": "note",   "text": "<template>"}               (see models/macros.py)
+#     {"type": "task",   "title": "<template>"}              (tickets only)
+TRIGGERS = ("created", "updated")
+KINDS = ("ticket", "task")
+TASK_PLACEHOLDERS = ("id", "title", "department", "status", "assigned_to", "ticket_id",
+                     "description")
+
+# Actions are performed (and audited) as this pseudo-user; it never logs in
+RULES_ACTOR = User(-1, "Automation", role="System")
+
+
+def _trigger(event: str) -> Optional[str]:
+    if event == "created":
+        return "created"
+    if event == "resolved":
+        return None
+    return "updated"
+
+
+class Rule:
+    """One compiled rule plus its counters."""
+
+    def __init__(self, name: str, kind: str, when: str, actions: List[dict],
+                 on=("created",), enabled: bool = True, dry_run: bool = False,
+                 hits: int = 0, last_hit: Optional[str] = None):
+        if kind not in KINDS:
+            raise ValueError("Rule kind must be 'ticket' or 'task'.")
+        on = tuple(on)
+        if not on or set(on) - set(TRIGGERS):
+            raise ValueError("Rule 'on' must be 'created' and/or 'updated'.")
+        self.name = name
+        self.kind = kind
+        self.on = on
+        self.when = when
+        self.enabled = enabled
+        self.dry_run = dry_run
+        self.hits = hits
+        self.last_hit = last_hit
+        self.errors = 0
+
+        manager = TicketManager if kind == "ticket" else TaskManager
+        self.terms = parse_selection(when, manager.SELECT_FIELDS)
+        # (field, value) of the equality test the network indexes this rule under
+        eq = [(key, value) for k, key, value in self.terms if k == "eq"]
+        self.key = eq[0] if eq else None
+
+        placeholders = TICKET_PLACEHOLDERS if kind == "ticket" else TASK_PLACEHOLDERS
+        self.actions = [dict(a) for a in actions]
+        if not self.actions:
+            raise ValueError("A rule needs at least one action.")
+        for a in self.actions:
+            t = a.get("type")
+            if t == "set":
+                if a.get("field") not in manager.EDITABLE_FIELDS:
+                    raise ValueError("'set' can change: {}.".format(", ".join(manager.EDITABLE_FIELDS)))
+                if not a.get("value"):
+                    raise ValueError("'set' needs a value.")
+            elif t == "assign":
+                if not a.get("to"):
+                    raise ValueError("'assign' needs 'to'.")
+            elif t == "note" or (t == "task" and kind == "ticket"):
+                text = a.get("text" if t == "note" else "title") or ""
+                unknown = compile_template(text).names - set(placeholders) - {AGENT_PLACEHOLDER}
+                if not text or unknown:
+                    raise ValueError("Bad {} template{}.".format(
+                        t, ": unknown " + ", ".join(sorted(unknown)) if unknown else ""))
+            else:
+                raise ValueError("Unknown rule action '{}'.".format(t))
+
+    def matches(self, item) -> bool:
+        return item_matches(item, self.terms)
+
+    def summary(self) -> str:
+        out = []
+        for a in self.actions:
+            if a["type"] == "set":
+                out.append("{}={}".format(a["field"], a["value"]))
+            elif a["type"] == "assign":
+                out.append("assign → {}".format(a["to"]))
+            elif a["type"] == "note":
+                out.append("note \"{}\"".format(a["text"][:24]))
+            else:
+                out.append("task \"{}\"".format(a["title"][:24]))
+        return "; ".join(out)
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "kind": self.kind, "on": list(self.on), "when": self.when,
+                "actions": self.actions, "enabled": self.enabled, "dry_run": self.dry_run,
+                "hits": self.hits, "last_hit": self.last_hit}
+
+
+# -----------------------------------------------------------------------------
+# Engine
+# -----------------------------------------------------------------------------
+class RuleEngine:
+    """
+    Runs rules on TicketManager/TaskManager events.
+
+    Rules are compiled into a discrimination network: for each (kind,
+    trigger) there is a hash index {field: {value: [rules]}} holding every rule
+    under one of its equality tests, plus a short list of rules with no
+    equality test. An event looks up the item's value for each indexed field
+    and only the rules found there (and the unindexed ones) have their
+    remaining conditions checked, so cost follows the rules that could match,
+    not the size of the rule set. Rules fire in the order they were added.
+
+    Dry-run rules (or the whole engine with `dry_run=True`) count hits and log
+    what they would have done without doing it. Actions never trigger further
+    rules, so rules cannot loop.
+    """
+
+    def __init__(self, ticket_manager, task_manager, path: Optional[str] = None,
+                 dry_run: bool = False, log_size: int = 200):
+        self.ticket_manager = ticket_manager
+        self.task_manager = task_manager
+        self.path = path
+        self.dry_run = dry_run
+        self.rules: List[Rule] = []
+        self.log = deque(maxlen=log_size)       # recent firings, newest last
+        self._net: Dict[tuple, tuple] = {}
+        self._firing = False
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                for spec in json.load(fh):
+                    self.rules.append(Rule(**spec))
+        self._compile()
+
+    # ---------- network ----------
+    def _compile(self):
+        net = {}
+        for order, rule in enumerate(self.rules):
+            if not rule.enabled:
+                continue
+            for trigger in rule.on:
+                index, rest = net.setdefault((rule.kind, trigger), ({}, []))
+                if rule.key is None:
+                    rest.append((order, rule))
+                else:
+                    field, value = rule.key
+                    index.setdefault(field, {}).setdefault(value, []).append((order, rule))
+        self._net = net
+
+    def candidates(self, kind: str, trigger: str, item) -> List[Rule]:
+        """Rules whose indexed test `item` passes (remaining conditions not yet checked)."""
+        node = self._net.get((kind, trigger))
+        if node is None:
+            return []
+        index, rest = node
+        found = list(rest)
+        for field, by_value in index.items():
+            raw = getattr(item, field, None)
+            hit = by_value.get("" if raw is None else str(raw).lower())
+            if hit:
+                found.extend(hit)
+        if len(found) > 1:
+            found.sort(key=lambda p: p[0])
+        return [rule for _, rule in found]
+
+    def matching(self, kind: str, item, trigger: str = "created") -> List[Rule]:
+        return [r for r in self.candidates(kind, trigger, item) if r.matches(item)]
+
+    # ---------- listeners ----------
+    def ticket_listener(self, event, t, actor, changes):
+        self._on_event("ticket", event, t)
+
+    def task_listener(self, event, t, actor, changes):
+        self._on_event("task", event, t)
+
+    def _on_event(self, kind, event, item):
+        trigger = _trigger(event)
+        if trigger is None or self._firing or (kind, trigger) not in self._net:
+            return
+        rules = self.matching(kind, item, trigger)
+        if not rules:
+            return
+        self._firing = True
+        try:
+            for rule in rules:
+                self._fire(rule, kind, item, event)
+        finally:
+            self._firing = False
+
+    def _fire(self, rule: Rule, kind: str, item, event: str):
+        rule.hits += 1
+        rule.last_hit = datetime.now().isoformat(timespec="seconds")
+        dry = self.dry_run or rule.dry_run
+        entry = {"at": rule.last_hit, "rule": rule.name, "kind": kind, "id": item.id,
+                 "event": event, "dry_run": dry, "error": None}
+        if not dry:
+            try:
+                for a in rule.actions:
+                    self._perform(a, kind, item)
+            except ValueError as e:         # unknown assignee, quota, ...
+                rule.errors += 1
+                entry["error"] = str(e)
+            except Exception as e:          # a bug in one rule must not break the agent's action
+                rule.errors += 1
+                entry["error"] = "{}: {}".format(type(e).__name__, e)
+        self.log.append(entry)
+
+    def _perform(self, a: dict, kind: str, item):
+        tm, ta = self.ticket_manager, self.task_manager
+        manager = tm if kind == "ticket" else ta
+        t = a["type"]
+        if t == "set":
+            if kind == "ticket":
+                tm.update_ticket(item, RULES_ACTOR, **{a["field"]: a["value"]})
+            else:
+                ta.update_task(item, RULES_ACTOR, **{a["field"]: a["value"]})
+        elif t == "assign":
+            target = self._assignee(a["to"], kind, item)
+            if kind == "ticket":
+                tm.assign_tickets([item.id], target, RULES_ACTOR)
+            else:
+                ta.assign_tasks([item.id], target, RULES_ACTOR)
+        elif t == "note":
+            manager.add_note(item, RULES_ACTOR, self._render(a["text"], kind, item))
+        elif t == "task":
+            ta.create_task(self._render(a["title"], kind, item), department=item.department,
+                           ticket_id=item.id, actor=RULES_ACTOR)
+
+    def _assignee(self, to: str, kind: str, item) -> User:
+        assigner = self.ticket_manager.assigner
+        if to == "suggest":
+            target = None
+            if assigner is not None:
+                target = (assigner.pick_for_ticket(item) if kind == "ticket"
+                          else assigner.pick_for_task(item))
+            if target is None:
+                raise ValueError("No available agent to assign to.")
+            return target
+        store = self.ticket_manager.user_store
+        target = store.get_by_name(to) if store is not None else None
+        if target is None or not target.is_active:
+            raise ValueError("'{}' is unknown or inactive.".format(to))
+        return target
+
+    @staticmethod
+    def _render(text: str, kind: str, item) -> str:
+        template = compile_template(text)
+        params = {}
+        if kind == "task":
+            # task fields that aren't also ticket attribute names are bound as values
+            params = {n: getattr(item, n) for n in template.names
+                      if n not in TICKET_PLACEHOLDERS and n != AGENT_PLACEHOLDER}
+        return template.bind(RULES_ACTOR.name, params)(item)
+
+    # ---------- rule management ----------
+    def get(self, name: str) -> Optional[Rule]:
+        for r in self.rules:
+            if r.name == name:
+                return r
+        return None
+
+    def add(self, rule: Rule):
+        if self.get(rule.name) is not None:
+            raise ValueError("A rule named '{}' already exists.".format(rule.name))
+        self.rules.append(rule)
+        self._changed()
+
+    def remove(self, name: str) -> bool:
+        rule = self.get(name)
+        if rule is None:
+            return False
+        self.rules.remove(rule)
+        self._changed()
+        return True
+
+    def set_flags(self, name: str, enabled: Optional[bool] = None,
+                  dry_run: Optional[bool] = None) -> bool:
+        rule = self.get(name)
+        if rule is None:
+            return False
+        if enabled is not None:
+            rule.enabled = enabled
+        if dry_run is not None:
+            rule.dry_run = dry_run
+        self._changed()
+        return True
+
+    def _changed(self):
+        self._compile()
+        self.save()
+
+    def save(self):
+        """Write rules (with hit counters) to the rules file, if any."""
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump([r.to_dict() for r in self.rules], fh, indent=2)
+        os.replace(tmp, self.path)
+
+    # -------------------------------------------------------------------------
+    # UI (admins)
+    # -------------------------------------------------------------------------
+    def run_ui(self, session=None):
+        if session is not None and not session.can(Perm.MANAGE_RULES):
+            print("\n❌ Only admins can manage automation rules.\n")
+            return
+        while True:
+            print("\n--- Automation Rules ---")
+            self._print_rules()
+            print("\n1) Add a rule")
+            print("2) Enable/disable a rule")
+            print("3) Toggle dry-run for a rule")
+            print("4) Delete a rule")
+            print("5) Test rules against a ticket (dry run)")
+            print("6) Recent firings")
+            print("0) Back\n")
+            choice = input("Enter a number: ").strip()
+            if choice == "0":
+                return
+            elif choice == "1":
+                self._add_rule_ui()
+            elif choice in ("2", "3", "4"):
+                name = input("Rule name: ").strip()
+                rule = self.get(name)
+                if rule is None:
+                    print("❌ No rule named '{}'.\n".format(name))
+                elif choice == "2":
+                    self.set_flags(name, enabled=not rule.enabled)
+                    print("✅ Rule '{}' {}.\n".format(name, "enabled" if rule.enabled else "disabled"))
+                elif choice == "3":
+                    self.set_flags(name, dry_run=not rule.dry_run)
+                    print("✅ Dry-run {} for '{}'.\n".format("on" if rule.dry_run else "off", name))
+                else:
+                    self.remove(name)
+                    print("✅ Rule '{}' deleted.\n".format(name))
+            elif choice == "5":
+                self._test_ui()
+            elif choice == "6":
+                self._log_ui()
+            else:
+                print("\n❌ Invalid option. Try again.\n")
+
+    def _print_rules(self):
+        if not self.rules:
+            print("(no rules)")
+            return
+        print("{:<16} {:<7} {:<16} {:<6} {:<34} {}".format(
+            "Name", "Kind", "On", "Hits", "When", "Then"))
+        print("-" * 100)
+        for r in self.rules:
+            flags = "" if r.enabled else " (off)"
+            if r.dry_run:
+                flags += " (dry)"
+            print("{:<16} {:<7} {:<16} {:<6} {:<34} {}{}".format(
+                r.name[:16], r.kind, ",".join(r.on), r.hits, r.when[:34], r.summary(), flags))
+
+    def _add_rule_ui(self):
+        name = input("Rule name (blank to cancel): ").strip()
+        if not name:
+            print("Cancelled.\n")
+            return
+        kind = "task" if input("Applies to (1) tickets or (2) tasks [1]: ").strip() == "2" else "ticket"
+        on = {"1": ["created"], "2": ["updated"], "3": ["created", "updated"]}.get(
+            input("Fire on (1) create (2) update (3) both [1]: ").strip(), ["created"])
+        print("Conditions use the bulk-selection syntax, e.g.  help_topic=Billing priority=High")
+        when = input("When: ").strip()
+        actions = []
+        while True:
+            print("Add action: 1) Set field  2) Assign  3) Note  4) Create task  0) Done")
+            a = input("> ").strip()
+            if a == "0":
+                break
+            elif a == "1":
+                field = input("Field: ").strip().lower()
+                actions.append({"type": "set", "field": field, "value": input("Value: ").strip()})
+            elif a == "2":
+                to = input("Assign to ('suggest' or a user name): ").strip()
+                actions.append({"type": "assign", "to": to})
+            elif a == "3":
+                actions.append({"type": "note", "text": input("Note template: ").strip()})
+            elif a == "4" and kind == "ticket":
+                actions.append({"type": "task", "title": input("Task title template: ").strip()})
+        dry = input("Start in dry-run mode? (y/n): ").strip().lower() == "y"
+        try:
+            self.add(Rule(name, kind, when, actions, on=on, dry_run=dry))
+        except ValueError as e:
+            print("❌ {}\n".format(e))
+            return
+        print("✅ Rule '{}' added.\n".format(name))
+
+    def _test_ui(self):
+        s = input("Ticket ID: ").strip()
+        t = self.ticket_manager.get_ticket(int(s)) if s.isdigit() else None
+        if t is None:
+            print("❌ Ticket not found.\n")
+            return
+        for trigger in TRIGGERS:
+            rules = self.matching("ticket", t, trigger)
+            names = ", ".join("{} ({})".format(r.name, r.summary()) for r in rules) or "(none)"
+            print("On {}: {}".format(trigger, names))
+        print("")
+
+    def _log_ui(self):
+        if not self.log:
+            print("(nothing has fired yet)\n")
+            return
+        for e in self.log:
+            status = "would fire" if e["dry_run"] else ("failed: " + e["error"] if e["error"] else "fired")
+            print("{} {} on {} {} ({}): {}".format(
+                e["at"], e["rule"], e["kind"], e["id"], e["event"], status))
+        print("")
@@ -0,0 +1,190 @@
+import bisect
+import heapq
+import math
+import re
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from models.analytics import np
+from models.backends import SearchBackend
+
+# -----------------------------------------------------------------------------
+# Trigrams
+# -----------------------------------------------------------------------------
+# Every word of a ticket's subject, requester name and email is padded with
+# spaces and cut into character trigrams (" ta", "tay", "ayl", ...). A typo
+# only breaks the two or three trigrams around it, so "taylr" still shares
+# " ta", "tay", "ayl" with "taylor" and the ticket keeps most of its score.
+_WORD = re.compile(r"[a-z0-9]+")
+
+OPEN = 1
+ARCHIVED = 2
+
+# Below this many postings in a query's rarest lists, candidates are checked
+# one by one; above it every list is counted in bulk (NumPy when installed).
+SMALL_CANDIDATES = 20000
+
+
+def padded(text: str) -> str:
+    """Lower-cased words of `text`, each padded with a space, joined by two spaces."""
+    return " " + "  ".join(_WORD.findall((text or "").lower())) + " "
+
+
+def trigrams(text: str) -> List[str]:
+    """Distinct trigrams of `text`, in first-seen order."""
+    # words joined by two spaces: slices spanning a gap contain "  " and are dropped
+    s = padded(text)
+    return [g for g in dict.fromkeys([s[i:i + 3] for i in range(len(s) - 2)]) if "  " not in g]
+
+
+def ticket_text(subject: str, from_name: str, email: Optional[str]) -> str:
+    return " ".join(x for x in (subject, from_name, email) if x)
+
+
+# -----------------------------------------------------------------------------
+# Index
+# -----------------------------------------------------------------------------
+class TicketSearch(SearchBackend):
+    """
+    Typo-tolerant search over ticket subject, requester name and email.
+
+    Postings are compact sorted arrays of ticket ids per trigram; ticket ids
+    only grow, so indexing a new ticket is an append per trigram. A query
+    first counts hits in its rarest trigrams — a ticket sharing at least
+    `need` of the query's Q trigrams must appear in one of the Q - need + 1
+    rarest lists — then checks only those candidates against the common
+    trigrams by binary search. Results are ranked by IDF-weighted overlap,
+    so rare words (names, error codes) count for more than "com" or "the".
+    """
+
+    def __init__(self, min_share: float = 0.5):
+        self.min_share = min_share              # fraction of query trigrams a hit must share
+        self._postings: Dict[str, array] = {}   # {trigram: sorted ticket ids}
+        self._state = bytearray()               # [ticket id] -> 0 absent, OPEN, ARCHIVED
+        self._size = array("H")                 # [ticket id] -> number of trigrams
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    # ---------- maintenance ----------
+    def _grow(self, tid: int):
+        if tid >= len(self._state):
+            extra = max(tid + 1, 2 * len(self._state)) - len(self._state)
+            self._state.extend(bytes(extra))
+            self._size.extend(array("H", bytes(2 * extra)))
+
+    def add(self, tid: int, text: str, state: int = OPEN):
+        """Index one ticket's searchable text (a ticket is only indexed once)."""
+        self._grow(tid)
+        if self._state[tid]:
+            self._state[tid] = state
+            return
+        grams = trigrams(text)
+        postings = self._postings
+        for g in grams:
+            post = postings.get(g)
+            if post is None:
+                post = postings[g] = array("I")
+            if not post or post[-1] < tid:
+                post.append(tid)
+            else:                               # out-of-order id (e.g. archive loaded after queue)
+                i = bisect.bisect_left(post, tid)
+                if i == len(post) or post[i] != tid:
+                    post.insert(i, tid)
+        self._state[tid] = state
+        self._size[tid] = min(len(grams), 0xFFFF)
+        self.count += 1
+
+    def set_state(self, tid: int, state: int):
+        """Mark an indexed ticket open or archived (resolve moves it to the archive)."""
+        if tid < len(self._state) and self._state[tid]:
+            self._state[tid] = state
+
+    # ---------- queries ----------
+    def search(self, query: str, limit: int = 10,
+               include_archived: bool = False) -> List[Tuple[int, float]]:
+        """Up to `limit` (ticket id, score 0..1) pairs, best first; open tickets win ties."""
+        grams = trigrams(query)
+        if not grams:
+            return []
+        q = len(grams)
+        need = q if q <= 2 else max(1, math.ceil(self.min_share * q))
+        total = float(max(self.count, 1))
+        postings = [self._postings.get(g) or array("I") for g in grams]
+        weights = [math.log(1.0 + total / (1 + len(p))) for p in postings]
+        wanted = (OPEN, ARCHIVED) if include_archived else (OPEN,)
+
+        order = sorted(range(q), key=lambda i: len(postings[i]))
+        rare = order[:q - need + 1]
+        if sum(len(postings[i]) for i in rare) <= SMALL_CANDIDATES:
+            top = self._few(postings, order, rare, need, wanted, limit)
+        elif np is not None:
+            top = self._bulk_numpy(postings, weights, need, wanted, limit)
+        else:
+            top = self._bulk(postings, need, wanted, limit)
+
+        # rank by IDF-weighted overlap; then tighter matches (fewer unrelated
+        # trigrams), then open, then newest
+        qweight = sum(weights)
+        ranked = []
+        for tid in top:
+            got = sum(w for p, w in zip(postings, weights) if _contains(p, tid))
+            ranked.append((-got / qweight, -got / max(self._size[tid], 1), self._state[tid], -tid))
+        ranked.sort()
+        return [(-r[3], -r[0]) for r in ranked[:limit]]
+
+    def _few(self, postings, order, rare, need, wanted, limit):
+        """
+        A ticket sharing `need` of the Q trigrams must appear in one of the
+        Q - need + 1 rarest lists: count those, then binary-search the rest
+        only for the (few) candidates they produced.
+        """
+        counts = Counter()
+        for i in rare:
+            counts.update(postings[i])
+        state = self._state
+        cands = {tid: c for tid, c in counts.items() if state[tid] in wanted}
+        rest = order[len(rare):]
+        for k, i in enumerate(rest):
+            left = len(rest) - k - 1
+            post = postings[i]
+            for tid in list(cands):
+                if _contains(post, tid):
+                    cands[tid] += 1
+                elif cands[tid] + left < need:
+                    del cands[tid]
+        return [tid for _, tid in heapq.nlargest(limit * 10, ((c, tid) for tid, c in cands.items()))]
+
+    def _bulk_numpy(self, postings, weights, need, wanted, limit):
+        """Weighted hit counts for every ticket at once (postings are viewed, not copied)."""
+        ids = np.concatenate([np.frombuffer(p, dtype=np.uint32) for p in postings])
+        w = np.repeat(np.asarray(weights), [len(p) for p in postings])
+        n = len(self._state)
+        hits = np.bincount(ids, minlength=n)
+        score = np.bincount(ids, weights=w, minlength=n)
+        state = np.frombuffer(self._state, dtype=np.uint8)
+        ok = (hits >= need) & np.isin(state, wanted)
+        cand = np.flatnonzero(ok)
+        if len(cand) == 0:
+            return []
+        # newest first among equal scores: nudge by id, far below one trigram's weight
+        key = score[cand] + cand * (1e-6 / n)
+        k = min(limit * 10, len(cand))
+        return cand[np.argpartition(-key, k - 1)[:k]].tolist()
+
+    def _bulk(self, postings, need, wanted, limit):
+        """Pure-Python fallback: C-level counting of every list, best by hit count."""
+        counts = Counter()
+        for p in postings:
+            counts.update(p)
+        state = self._state
+        return [tid for _, tid in heapq.nlargest(
+            limit * 10, ((c, tid) for tid, c in counts.items()
+                         if c >= need and state[tid] in wanted))]
+
+
+def _contains(post: array, tid: int) -> bool:
+    i = bisect.bisect_left(post, tid)
+    return i < len(post) and post[i] == tid
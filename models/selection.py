@@ -0,0 +1,130 @@
+import bisect
+import re
+import shlex
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# -----------------------------------------------------------------------------
+# Bulk selection expressions
+# -----------------------------------------------------------------------------
+# A selection is a whitespace-separated list of terms, all of which must match:
+#   1-5,8            ids and id ranges (a term of ids/ranges is a union)
+#   priority=Low     field equals value (case-insensitive)
+#   subject~vpn      field contains value (case-insensitive)
+#   unassigned       no assignee        (also: assigned)
+#   all              everything in the list
+# Values containing spaces can be quoted: assigned_to="Sam Patel"
+_RANGE = re.compile(r"^\d+(-\d+)?(,\d+(-\d+)?)*$")
+_FILTER = re.compile(r"^([A-Za-z_]+)([=~])(.*)$")
+_FLAGS = {"unassigned", "assigned", "all"}
+
+
+class IdRanges:
+    """
+    Ids from a term like '1-5,8' as sorted, merged (lo, hi) ranges. Membership
+    is a binary search, so '1-99999999999' costs no more than '1-5'.
+    """
+
+    def __init__(self, ranges: Iterable[Tuple[int, int]]):
+        merged = []
+        for lo, hi in sorted(ranges):
+            if merged and lo <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], hi)
+            else:
+                merged.append([lo, hi])
+        self._lo = [lo for lo, _ in merged]
+        self._hi = [hi for _, hi in merged]
+
+    def __contains__(self, item_id) -> bool:
+        i = bisect.bisect_right(self._lo, item_id) - 1
+        return i >= 0 and item_id <= self._hi[i]
+
+    def size(self) -> int:
+        """Number of ids covered (may exceed what len() can return)."""
+        return sum(hi - lo + 1 for lo, hi in zip(self._lo, self._hi))
+
+    def __iter__(self):
+        for lo, hi in zip(self._lo, self._hi):
+            yield from range(lo, hi + 1)
+
+
+def _parse_ids(term: str) -> IdRanges:
+    ranges = []
+    for part in term.split(","):
+        if "-" in part:
+            lo, hi = (int(x) for x in part.split("-", 1))
+            ranges.append((min(lo, hi), max(lo, hi)))
+        else:
+            ranges.append((int(part), int(part)))
+    return IdRanges(ranges)
+
+
+def parse_selection(expr: str, fields: Sequence[str]) -> List[tuple]:
+    """
+    Compile a selection expression into a list of (kind, key, value) terms.
+    `fields` lists the attribute names that may be filtered on.
+    Raises ValueError with a user-facing message on bad input.
+    """
+    try:
+        tokens = shlex.split(expr or "")
+    except ValueError as e:
+        raise ValueError("Could not parse selection: {}".format(e))
+    if not tokens:
+        raise ValueError("Empty selection.")
+
+    terms = []
+    for tok in tokens:
+        low = tok.lower()
+        if _RANGE.match(tok):
+            terms.append(("ids", None, _parse_ids(tok)))
+        elif low in _FLAGS:
+            terms.append(("flag", low, None))
+        elif _FILTER.match(tok):
+            key, op, value = _FILTER.match(tok).groups()
+            key = key.lower()
+            if key not in fields:
+                raise ValueError("Unknown field '{}'. Try one of: {}".format(key, ", ".join(fields)))
+            terms.append(("eq" if op == "=" else "contains", key, value.strip().lower()))
+        else:
+            raise ValueError("Don't understand '{}'.".format(tok))
+    return terms
+
+
+def item_matches(item, terms: List[tuple]) -> bool:
+    """True when `item` satisfies every term from parse_selection()."""
+    for kind, key, value in terms:
+        if kind == "ids":
+            if item.id not in value:
+                return False
+        elif kind == "flag":
+            if key == "unassigned" and item.assigned_to:
+                return False
+            if key == "assigned" and not item.assigned_to:
+                return False
+        else:
+            raw = getattr(item, key, None)
+            text = "" if raw is None else str(raw).lower()
+            if kind == "eq" and text != value:
+                return False
+            if kind == "contains" and value not in text:
+                return False
+    return True
+
+
+def select_items(items: Dict[int, object], expr: str, fields: Sequence[str]) -> list:
+    """
+    Resolve a selection expression against an {id: item} store in one pass.
+    Pure id selections are served by direct lookups instead of a scan.
+    Returns the matching items sorted by id.
+    """
+    terms = parse_selection(expr, fields)
+
+    # Walk whichever side is smaller: the narrowest id term, or the store itself
+    id_terms = sorted((v for kind, _, v in terms if kind == "ids"), key=IdRanges.size)
+    if id_terms and id_terms[0].size() < len(items):
+        candidates: Iterable = (items[i] for i in id_terms[0] if i in items)
+    else:
+        candidates = items.values()
+
+    found = [it for it in candidates if item_matches(it, terms)]
+    found.sort(key=lambda it: it.id)
+    return found
@@ -0,0 +1,412 @@
+import json
+import mmap
+import os
+import struct
+from collections.abc import MutableMapping
+from datetime import datetime
+
+from models.users import User, UserStore
+from models.tabs.tickets import Ticket, TicketManager
+from models.tabs.tasks import Task, TaskManager
+from models.tabs.knowledge_base import (Article, ArticleStats, ArticleVersion, ChunkStore,
+                                        KnowledgeBase, Popularity)
+
+# -----------------------------------------------------------------------------
+# File layout
+# -----------------------------------------------------------------------------
+#   MAGIC | cold blobs ... | header JSON | header offset (8 bytes, little endian)
+#
+# The header holds everything needed to reach the first prompt: users, open
+# tickets/tasks (without notes), KB titles, counters, and (offset, length)
+# pointers into the blob region. Cold data — notes, archived tickets and KB
+# article paragraphs (one blob per content-addressed chunk, shared by every
+# version that uses it) — is only decoded from the memory map on first access.
+# Archived tickets' pointers are not in the header at all: they sit in a
+# fixed-width binary table (PointerTable) that is binary-searched in the map,
+# so the header grows with the open queue, not with the archive's history.
+MAGIC = b"TKSNAP01"
+_FOOTER = struct.Struct("<Q")
+
+TICKET_FIELDS = ("subject", "from_name", "priority", "status", "assigned_to",
+                 "department", "sla_plan", "help_topic", "printing", "email", "parent_id",
+                 "created_at", "resolved_at")
+TASK_FIELDS = ("title", "department", "status", "assigned_to", "ticket_id", "description",
+               "created_at", "resolved_at")
+
+
+# -----------------------------------------------------------------------------
+# Lazy blob plumbing
+# -----------------------------------------------------------------------------
+class BlobRef:
+    """Pointer to a JSON value inside a mapped snapshot; decoded on demand."""
+
+    __slots__ = ("buf", "offset", "length")
+
+    def __init__(self, buf, offset: int, length: int):
+        self.buf = buf
+        self.offset = offset
+        self.length = length
+
+    def raw(self) -> bytes:
+        return self.buf[self.offset:self.offset + self.length]
+
+    def load(self):
+        return json.loads(self.raw())
+
+
+class PointerTable:
+    """
+    Read-only {ticket_id: BlobRef} over a fixed-width binary table inside the
+    mapping: `count` (id, offset, length) entries sorted by id. Lookups are a
+    binary search over the map, so opening a snapshot never parses the
+    archive's pointers however long its history is.
+    """
+
+    ENTRY = struct.Struct("<QQQ")
+
+    def __init__(self, buf, offset: int, count: int):
+        self.buf = buf
+        self.offset = offset
+        self.count = count
+
+    def _entry(self, i: int):
+        return self.ENTRY.unpack_from(self.buf, self.offset + i * self.ENTRY.size)
+
+    def _index(self, key) -> int:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.count and self._entry(lo)[0] == key else -1
+
+    def get(self, key, default=None):
+        i = self._index(key) if isinstance(key, int) and key >= 0 else -1
+        if i < 0:
+            return default
+        _, off, length = self._entry(i)
+        return BlobRef(self.buf, off, length)
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, int) and key >= 0 and self._index(key) >= 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def items(self):
+        end = self.offset + self.count * self.ENTRY.size
+        for tid, off, length in self.ENTRY.iter_unpack(self.buf[self.offset:end]):
+            yield tid, BlobRef(self.buf, off, length)
+
+    def __iter__(self):
+        for tid, _ in self.items():
+            yield tid
+
+    @classmethod
+    def pack(cls, entries) -> bytes:
+        """Table bytes for [(id, [offset, length])]."""
+        return b"".join(cls.ENTRY.pack(tid, ptr[0], ptr[1]) for tid, ptr in sorted(entries))
+
+
+class LazyArchive(MutableMapping):
+    """
+    {ticket_id: Ticket} for resolved tickets. Entries that came from a
+    snapshot stay as BlobRefs (a dict, or a PointerTable in the map) until
+    they are looked up.
+    """
+
+    def __init__(self, refs=None):
+        self._refs = refs if isinstance(refs, PointerTable) else dict(refs or {})
+        self._gone = set()              # ids no longer served from _refs
+        self._loaded = {}               # {id: Ticket}
+
+    def _ref(self, key):
+        return None if key in self._gone else self._refs.get(key)
+
+    def __getitem__(self, key):
+        if key in self._loaded:
+            return self._loaded[key]
+        ref = self._ref(key)
+        if ref is None:
+            raise KeyError(key)
+        t = _ticket_from_record(ref.load())
+        self._loaded[key] = t
+        self._gone.add(key)
+        return t
+
+    def __setitem__(self, key, value):
+        if key in self._refs:
+            self._gone.add(key)
+        self._loaded[key] = value
+
+    def __delitem__(self, key):
+        if key in self._loaded:
+            del self._loaded[key]
+        elif self._ref(key) is not None:
+            self._gone.add(key)
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._loaded or self._ref(key) is not None
+
+    def __iter__(self):
+        yield from list(self._loaded)
+        for tid in self._refs:
+            if tid not in self._gone:
+                yield tid
+
+    def __len__(self):
+        # _gone only ever holds ids present in _refs
+        return len(self._loaded) + len(self._refs) - len(self._gone)
+
+    def peek(self, key):
+        """Decode an entry without caching it (safe from a background thread)."""
+        t = self._loaded.get(key)
+        if t is not None:
+            return t
+        ref = self._ref(key)
+        if ref is None:                 # decoded by the main thread meanwhile
+            return self._loaded[key]
+        return _ticket_from_record(ref.load())
+
+    def raw_refs(self):
+        """Undecoded (id, BlobRef) pairs — copied byte-for-byte when re-saving."""
+        return ((tid, ref) for tid, ref in self._refs.items() if tid not in self._gone)
+
+    def loaded_items(self):
+        return self._loaded.items()
+
+
+# -----------------------------------------------------------------------------
+# Record <-> object helpers
+# -----------------------------------------------------------------------------
+def _ticket_record(t: Ticket) -> dict:
+    rec = {"id": t.id}
+    for f in TICKET_FIELDS:
+        rec[f] = getattr(t, f)
+    return rec
+
+
+def _ticket_from_record(rec: dict) -> Ticket:
+    t = Ticket(ticket_id=rec["id"], **{f: rec.get(f) for f in TICKET_FIELDS if f in rec})
+    if "notes" in rec:
+        t.internal_notes = rec["notes"]
+    return t
+
+
+def _task_record(t: Task) -> dict:
+    rec = {"id": t.id}
+    for f in TASK_FIELDS:
+        rec[f] = getattr(t, f)
+    return rec
+
+
+class _BlobWriter:
+    """Appends JSON (or raw) blobs to the output file and hands back pointers."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.pos = fh.tell()
+
+    def put(self, value) -> list:
+        return self.put_raw(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+    def put_raw(self, data: bytes) -> list:
+        off = self.pos
+        self.fh.write(data)
+        self.pos += len(data)
+        return [off, len(data)]
+
+
+def _notes_pointer(obj, blobs: _BlobWriter):
+    """Pointer for an item's notes, copying still-unread snapshot bytes as-is."""
+    if obj._notes_ref is not None:
+        return blobs.put_raw(obj._notes_ref.raw())
+    if not obj._notes:
+        return None
+    return blobs.put(obj._notes)
+
+
+# -----------------------------------------------------------------------------
+# Save / Load
+# -----------------------------------------------------------------------------
+def save_snapshot(path: str, user_store: UserStore, ticket_manager: TicketManager,
+                  task_manager: TaskManager, kb: KnowledgeBase) -> None:
+    """Write all manager state to `path` atomically (temp file + rename)."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(MAGIC)
+        blobs = _BlobWriter(fh)
+
+        tickets = []
+        for t in ticket_manager.tickets.values():
+            rec = _ticket_record(t)
+            rec["notes"] = _notes_pointer(t, blobs)
+            tickets.append(rec)
+
+        archived = []
+        archive = ticket_manager.archived
+        if isinstance(archive, LazyArchive):
+            for tid, ref in archive.raw_refs():
+                archived.append((tid, blobs.put_raw(ref.raw())))
+            loaded = archive.loaded_items()
+        else:
+            loaded = archive.items()
+        for tid, t in loaded:
+            rec = _ticket_record(t)
+            rec["notes"] = t.internal_notes
+            archived.append((tid, blobs.put(rec)))
+        # fixed-width (id, offset, length) table, searched in place on load
+        archive_table = [blobs.put_raw(PointerTable.pack(archived))[0], len(archived)]
+
+        tasks = []
+        for t in task_manager.tasks.values():
+            rec = _task_record(t)
+            rec["notes"] = _notes_pointer(t, blobs)
+            tasks.append(rec)
+
+        articles = []
+        chunks = {}
+        for a in kb.articles.values():
+            versions = []
+            for v in a.versions:
+                for key in v.chunks:
+                    if key not in chunks:
+                        ref = kb.chunks.raw_ref(key)
+                        chunks[key] = (blobs.put_raw(ref.raw()) if ref is not None
+                                       else blobs.put(kb.chunks.get(key)))
+                versions.append({"n": v.number, "title": v.title, "chunks": list(v.chunks),
+                                 "author": v.author, "at": v.created_at.isoformat()})
+            articles.append({"id": a.id, "title": a.title,
+                             "created_at": a.created_at.isoformat(), "versions": versions,
+                             "stats": kb.popularity.stats[a.id].to_list()})
+
+        header = {
+            "users": [{"id": u.id, "name": u.name, "role": u.role, "status": u.status,
+                       "skills": u.skills, "email": u.email, "tickets_claimed": u.tickets_claimed,
+                       "tasks_claimed": u.tasks_claimed, "password_hash": u.password_hash,
+                       "api_tokens": u.api_tokens, "departments": u.departments}
+                      for u in user_store.list_users()],
+            "tickets": tickets,
+            "archive_table": archive_table,
+            "tasks": tasks,
+            "articles": articles,
+            "kb_chunks": chunks,
+            "counters": {
+                "ticket_next_id": ticket_manager._next_id,
+                "tickets_created": ticket_manager.totals_created,
+                "tickets_resolved": ticket_manager.totals_resolved,
+                "tickets_deleted": ticket_manager.totals_deleted,
+                "task_next_id": task_manager._next_id,
+                "tasks_created": task_manager.totals_created,
+                "tasks_resolved": task_manager.totals_resolved,
+                "tasks_deleted": task_manager.totals_deleted,
+                "kb_next_id": kb._next_id,
+                "kb_score_epoch": kb.popularity.epoch,
+            },
+        }
+        header_off = blobs.pos
+        fh.write(json.dumps(header, separators=(",", ":")).encode("utf-8"))
+        fh.write(_FOOTER.pack(header_off))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+class Snapshot:
+    """
+    A mapped snapshot file. load() returns fully wired managers whose cold
+    fields point back into this mapping, so keep the Snapshot alive for as
+    long as those managers are in use.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, "rb")
+        self.buf = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.buf[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError("{} is not a ticketing snapshot".format(path))
+
+    def close(self):
+        self.buf.close()
+        self._fh.close()
+
+    def _ref(self, ptr):
+        return BlobRef(self.buf, ptr[0], ptr[1]) if ptr else None
+
+    def load(self):
+        """Return (user_store, ticket_manager, task_manager, kb) backed by this snapshot."""
+        (header_off,) = _FOOTER.unpack(self.buf[-_FOOTER.size:])
+        header = json.loads(self.buf[header_off:len(self.buf) - _FOOTER.size])
+        counters = header["counters"]
+
+        users = []
+        for rec in header["users"]:
+            u = User(rec["id"], rec["name"], rec["role"], rec["status"],
+                     rec.get("skills"), rec.get("email"))
+            u.tickets_claimed = list(rec["tickets_claimed"])
+            u.tasks_claimed = list(rec["tasks_claimed"])
+            u.password_hash = rec.get("password_hash")
+            u.api_tokens = list(rec.get("api_tokens", ()))
+            u.departments = list(rec.get("departments", ()))
+            users.append(u)
+        user_store = UserStore(users)
+
+        tm = TicketManager(user_store, seed=False)
+        for rec in header["tickets"]:
+            notes = rec.pop("notes", None)
+            t = _ticket_from_record(rec)
+            t._notes_ref = self._ref(notes)
+            tm.tickets[t.id] = t
+        if "archive_table" in header:
+            tm.archived = LazyArchive(PointerTable(self.buf, *header["archive_table"]))
+        else:                           # older snapshots: pointers in the header
+            tm.archived = LazyArchive({int(k): self._ref(v) for k, v in header["archived"].items()})
+        tm._next_id = counters["ticket_next_id"]
+        tm.totals_created = counters["tickets_created"]
+        tm.totals_resolved = counters["tickets_resolved"]
+        tm.totals_deleted = counters["tickets_deleted"]
+        tm._reindex()
+
+        ta = TaskManager(user_store, ticket_manager=tm, seed=False)
+        for rec in header["tasks"]:
+            notes = rec.pop("notes", None)
+            t = Task(task_id=rec.pop("id"), **rec)
+            t._notes_ref = self._ref(notes)
+            ta.tasks[t.id] = t
+        # older snapshots have no task counter; fall back to the highest open id
+        ta._next_id = counters.get("task_next_id", max(ta.tasks, default=0) + 1)
+        ta.totals_created = counters["tasks_created"]
+        ta.totals_resolved = counters["tasks_resolved"]
+        ta.totals_deleted = counters["tasks_deleted"]
+        ta._reindex()
+        tm.task_manager = ta
+
+        kb = KnowledgeBase(seed=False)
+        refs = {k: self._ref(ptr) for k, ptr in header.get("kb_chunks", {}).items()}
+        loaded = []
+        for rec in header["articles"]:
+            created = datetime.fromisoformat(rec["created_at"])
+            if "versions" in rec:
+                versions = [ArticleVersion(v["n"], v["title"], v["chunks"], v.get("author"),
+                                           datetime.fromisoformat(v["at"]))
+                            for v in rec["versions"]]
+            else:
+                # older snapshots: one whole-body blob, kept as a single chunk
+                key = "body-{}".format(rec["id"])
+                refs[key] = self._ref(rec["content"])
+                versions = [ArticleVersion(1, rec["title"], (key,), None, created)]
+            loaded.append((rec, created, versions))
+        kb.chunks = ChunkStore(refs)
+        kb.popularity = Popularity(counters.get("kb_score_epoch"))
+        for rec, created, versions in loaded:
+            kb.articles[rec["id"]] = Article(rec["id"], rec["title"], None, created_at=created,
+                                             store=kb.chunks, versions=versions)
+            kb.popularity.add(rec["id"], ArticleStats(*rec.get("stats", ())))
+        kb._next_id = counters["kb_next_id"]
+
+        return user_store, tm, ta, kb
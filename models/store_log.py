@@ -0,0 +1,163 @@
+import json
+import os
+from collections.abc import ItemsView, ValuesView
+from typing import Dict, Optional, Tuple
+
+from models.backends import Codec, ItemStore
+
+# -----------------------------------------------------------------------------
+# Append-only log store
+# -----------------------------------------------------------------------------
+# One JSON line per write, `[id, record]`, or `[id, null]` for a delete. On
+# open the file is scanned once (only the id and length of each line are
+# parsed) to build {id: (offset, length)} of the newest line per id; reads are
+# a single pread. Nothing is rewritten in place: flush() appends the items
+# that changed, and once stale lines make up more than half the file it is
+# compacted into a fresh log that replaces the old one atomically.
+COMPACT_MIN_BYTES = 1 << 20
+TOMBSTONE = b",null]\n"
+
+
+def _line(key, rec) -> bytes:
+    return (json.dumps([key, rec], separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class _Values(ValuesView):
+    def __iter__(self):
+        for key in self._mapping:
+            yield self._mapping[key]
+
+
+class _Items(ItemsView):
+    def __iter__(self):
+        for key in self._mapping:
+            yield key, self._mapping[key]
+
+
+class AppendLogStore(ItemStore):
+    """
+    {id: item} over an append-only file. Items read or written since opening
+    stay live in `_live` with the line last written for them; flush()
+    re-encodes those and appends only the ones that changed.
+    """
+
+    def __init__(self, path: Optional[str], codec: Codec):
+        if not path:
+            raise ValueError("AppendLogStore needs a file path.")
+        self.path = path
+        self.codec = codec
+        self._index: Dict[int, Tuple[int, int]] = {}   # {id: (offset, length)} of the newest line
+        self._live = {}                                 # {id: [item, line bytes]}
+        self._live_bytes = 0                            # bytes of the lines in _index
+        self._order = None                              # sorted ids (None = stale)
+        self._open()
+
+    def _open(self):
+        self._fh = open(self.path, "a+b")
+        self._fh.seek(0)
+        index, pos, size = {}, 0, 0
+        for raw in self._fh:
+            if not raw.endswith(b"\n"):                 # torn final write: drop it
+                self._fh.truncate(pos)
+                break
+            key = int(raw[1:raw.index(b",")])
+            old = index.pop(key, None)
+            if old is not None:
+                size -= old[1]
+            if not raw.endswith(TOMBSTONE):
+                index[key] = (pos, len(raw))
+                size += len(raw)
+            pos += len(raw)
+        self._index, self._live_bytes, self._end = index, size, pos
+        self._order = None
+
+    # ---------- writes ----------
+    def _append(self, key, line: bytes):
+        self._fh.write(line)
+        old = self._index.pop(key, None)
+        if old is not None:
+            self._live_bytes -= old[1]
+        elif self._order is not None and not (self._order and key < self._order[-1]):
+            self._order.append(key)
+        else:
+            self._order = None
+        if not line.endswith(TOMBSTONE):
+            self._index[key] = (self._end, len(line))
+            self._live_bytes += len(line)
+        self._end += len(line)
+
+    def __setitem__(self, key, item):
+        line = _line(key, self.codec.encode(item))
+        self._append(key, line)
+        self._live[key] = [item, line]
+
+    def __delitem__(self, key):
+        if key not in self._index:
+            raise KeyError(key)
+        self._append(key, _line(key, None))
+        self._live.pop(key, None)
+        self._order = None
+
+    # ---------- reads ----------
+    def _read(self, key) -> bytes:
+        off, length = self._index[key]
+        self._fh.flush()
+        return os.pread(self._fh.fileno(), length, off)
+
+    def __getitem__(self, key):
+        entry = self._live.get(key)
+        if entry is not None:
+            return entry[0]
+        line = self._read(key)
+        item = self.codec.decode(json.loads(line)[1])
+        self._live[key] = [item, line]
+        return item
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        if self._order is None:
+            self._order = sorted(self._index)
+        return iter(list(self._order))
+
+    def __len__(self):
+        return len(self._index)
+
+    def values(self):
+        return _Values(self)
+
+    def items(self):
+        return _Items(self)
+
+    # ---------- durability ----------
+    def flush(self):
+        encode = self.codec.encode
+        for key, entry in self._live.items():
+            line = _line(key, encode(entry[0]))
+            if line != entry[1]:
+                entry[1] = line
+                self._append(key, line)
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        if self._end > COMPACT_MIN_BYTES and self._end > 2 * self._live_bytes:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log with only the newest line per id (atomic replace)."""
+        self._fh.flush()
+        tmp = self.path + ".compact"
+        fd = self._fh.fileno()
+        with open(tmp, "wb") as out:
+            for key in sorted(self._index):
+                off, length = self._index[key]
+                out.write(os.pread(fd, length, off))
+            out.flush()
+            os.fsync(out.fileno())
+        self._fh.close()
+        os.replace(tmp, self.path)
+        self._open()
+
+    def close(self):
+        self.flush()
+        self._fh.close()
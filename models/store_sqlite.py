@@ -0,0 +1,177 @@
+import json
+import math
+import sqlite3
+from collections.abc import ItemsView, ValuesView
+from typing import List, Optional, Tuple
+
+from models.backends import Codec, ItemStore, SearchBackend
+from models.search import ARCHIVED, OPEN, padded, trigrams
+
+# -----------------------------------------------------------------------------
+# SQLite backends (standard library sqlite3)
+# -----------------------------------------------------------------------------
+# SQLiteStore keeps one row per item (the codec's record as JSON) and
+# SQLiteSearch uses an FTS5 table with the trigram tokenizer. Writes go into
+# an open transaction; flush() commits. path=None keeps everything in memory.
+
+
+def _connect(path: Optional[str]) -> sqlite3.Connection:
+    conn = sqlite3.connect(path or ":memory:")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _dumps(rec: dict) -> str:
+    return json.dumps(rec, separators=(",", ":"))
+
+
+class _Values(ValuesView):
+    def __iter__(self):
+        for _, v in self._mapping._scan():
+            yield v
+
+
+class _Items(ItemsView):
+    def __iter__(self):
+        return self._mapping._scan()
+
+
+class SQLiteStore(ItemStore):
+    """
+    {id: item} in an `items(id, data)` table. Items read or written since
+    opening stay live in `_live` together with the JSON last written for
+    them; flush() re-encodes those and upserts only the ones that changed.
+    """
+
+    def __init__(self, path: Optional[str], codec: Codec):
+        self.path = path
+        self.codec = codec
+        self._conn = _connect(path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+        self._live = {}                 # {id: [item, JSON stored for it]}
+
+    def _load(self, key, data: str):
+        item = self.codec.decode(json.loads(data))
+        self._live[key] = [item, data]
+        return item
+
+    def __getitem__(self, key):
+        entry = self._live.get(key)
+        if entry is not None:
+            return entry[0]
+        row = self._conn.execute("SELECT data FROM items WHERE id = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return self._load(key, row[0])
+
+    def __setitem__(self, key, item):
+        data = _dumps(self.codec.encode(item))
+        self._conn.execute("INSERT OR REPLACE INTO items (id, data) VALUES (?, ?)", (key, data))
+        self._live[key] = [item, data]
+
+    def __delitem__(self, key):
+        cur = self._conn.execute("DELETE FROM items WHERE id = ?", (key,))
+        self._live.pop(key, None)
+        if cur.rowcount == 0:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self._live:
+            return True
+        return self._conn.execute("SELECT 1 FROM items WHERE id = ?", (key,)).fetchone() is not None
+
+    def __iter__(self):
+        for (key,) in self._conn.execute("SELECT id FROM items ORDER BY id"):
+            yield key
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def _scan(self):
+        """(id, item) in id order from one query instead of one per key."""
+        live = self._live
+        for key, data in self._conn.execute("SELECT id, data FROM items ORDER BY id"):
+            entry = live.get(key)
+            yield key, (entry[0] if entry is not None else self._load(key, data))
+
+    def values(self):
+        return _Values(self)
+
+    def items(self):
+        return _Items(self)
+
+    def flush(self):
+        changed = []
+        encode = self.codec.encode
+        for key, entry in self._live.items():
+            data = _dumps(encode(entry[0]))
+            if data != entry[1]:
+                entry[1] = data
+                changed.append((key, data))
+        if changed:
+            self._conn.executemany("UPDATE items SET data = ? WHERE id = ?",
+                                   [(d, k) for k, d in changed])
+        self._conn.commit()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+class SQLiteSearch(SearchBackend):
+    """
+    Ticket search on FTS5's trigram tokenizer. Text is indexed in the same
+    padded form as models/search.py, a query ORs its trigrams and FTS5 ranks
+    candidates by bm25; the reported score is the share of query trigrams
+    the ticket contains, and hits below `min_share` are dropped.
+    """
+
+    def __init__(self, path: Optional[str] = None, min_share: float = 0.5):
+        self.min_share = min_share
+        self._conn = _connect(path)
+        self._conn.executescript(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(text, tokenize='trigram');"
+            "CREATE TABLE IF NOT EXISTS state (id INTEGER PRIMARY KEY, state INTEGER NOT NULL);")
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM state").fetchone()[0]
+
+    def add(self, tid: int, text: str, state: int = OPEN):
+        cur = self._conn.execute("INSERT OR IGNORE INTO state (id, state) VALUES (?, ?)", (tid, state))
+        if cur.rowcount == 0:           # already indexed: only the state changes
+            self.set_state(tid, state)
+            return
+        self._conn.execute("INSERT INTO docs (rowid, text) VALUES (?, ?)",
+                           (tid, padded(text)))
+
+    def set_state(self, tid: int, state: int):
+        self._conn.execute("UPDATE state SET state = ? WHERE id = ?", (state, tid))
+
+    def search(self, query: str, limit: int = 10,
+               include_archived: bool = False) -> List[Tuple[int, float]]:
+        grams = trigrams(query)
+        if not grams:
+            return []
+        q = len(grams)
+        need = q if q <= 2 else max(1, math.ceil(self.min_share * q))
+        wanted = (OPEN, ARCHIVED) if include_archived else (OPEN,)
+        match = " OR ".join('"{}"'.format(g) for g in grams)
+        rows = self._conn.execute(
+            "SELECT docs.rowid, docs.text, state.state, bm25(docs) AS rank FROM docs "
+            "JOIN state ON state.id = docs.rowid WHERE docs MATCH ? AND state.state IN ({}) "
+            "ORDER BY rank, docs.rowid DESC LIMIT ?".format(
+                ",".join("?" * len(wanted))),
+            (match, *wanted, limit * 10)).fetchall()
+        ranked = []
+        # share of the query first, then open, then bm25, then newest
+        for tid, text, state, rank in rows:
+            got = sum(1 for g in grams if g in text)
+            if got >= need:
+                ranked.append((-got / q, state, round(rank, 9), -tid))
+        ranked.sort()
+        return [(-r[3], -r[0]) for r in ranked[:limit]]
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
@@ -1,15 +1,48 @@
+from datetime import datetime
+
+from models.audit import format_audit_record
+from models.render import write_lines
+
+
 class Dashboard:
     """
     Simple overview tab.
-    Pulls stats from TicketManager and TaskManager.
-    No actions — just a summary + return to tabs.
+    Pulls stats from TicketManager and TaskManager, plus per-user activity
+    from the audit log when one is wired in.
     """
 
-    def __init__(self, ticket_manager, task_manager):
+    def __init__(self, ticket_manager, task_manager, audit=None, user_store=None,
+                 history=None, analytics=None, forecaster=None):
         self.ticket_manager = ticket_manager
         self.task_manager = task_manager
+        self.audit = audit
+        self.user_store = user_store
+        self.history = history          # optional TimeMachine for "as of" views
+        self.analytics = analytics      # optional Analytics (needs NumPy) for reports
+        self.forecaster = forecaster    # optional Forecaster for staffing recommendations
 
     def run_ui(self):
+        while True:
+            self._print_overview()
+            print("Actions:")
+            print("1) User activity (today)")
+            print("2) Queue as of a past time")
+            print("3) Reports (by department, resolution times, throughput, backlog age)")
+            print("4) Forecast & staffing (next 7 days)")
+            print("0) Back to tabs\n")
+            choice = input("Enter a number: ").strip()
+            if choice == "1":
+                self._activity_ui()
+            elif choice == "2":
+                self._as_of_ui()
+            elif choice == "3":
+                self._reports_ui()
+            elif choice == "4":
+                self._forecast_ui()
+            else:
+                return
+
+    def _print_overview(self):
         print("\n=== Dashboard Overview ===\n")
 
         # --- Tickets ---
@@ -30,4 +63,109 @@ class Dashboard:
         print("  Open:     {}".format(len(ta.tasks)))
         print("")
 
+    def _as_of_ui(self):
+        """Open queue and each agent's claims at a past moment."""
+        if self.history is None:
+            print("\n(history not enabled)\n")
+            return
+        s = input("As of (YYYY-MM-DD HH:MM, blank to cancel): ").strip()
+        if not s:
+            print("Cancelled.\n")
+            return
+        try:
+            when = datetime.strptime(s, "%Y-%m-%d %H:%M")
+        except ValueError:
+            print("❌ Invalid date/time.\n")
+            return
+        try:
+            users, tickets, tasks = self.history.as_of(when.timestamp())
+        except ValueError as e:
+            print("❌ {}\n".format(e))
+            return
+
+        lines = ["", "--- Queue as of {} ---".format(when.strftime("%Y-%m-%d %H:%M")),
+                 "Open tickets: {}   Open tasks: {}".format(len(tickets.tickets), len(tasks.tasks))]
+        lines.extend("  {:<4} {:<30} {:<8} {}".format(
+            t.id, t.subject[:30], t.priority, t.assigned_to or "Unassigned")
+            for t in tickets.tickets.values())
+        lines.append("Claims:")
+        lines.extend("  {:<20} tickets={} tasks={}".format(u.name, u.tickets_claimed, u.tasks_claimed)
+                     for u in users.list_agents_first())
+        lines.append("")
+        write_lines(lines)
+        input("Press Enter to return...")
+
+    def _reports_ui(self):
+        """Vectorized reports over all ticket history (see models/analytics.py)."""
+        if self.analytics is None:
+            print("\n(reports need NumPy: pip install numpy)\n")
+            return
+        an = self.analytics
+
+        print("\n--- Open tickets by department / priority ---")
+        for dept, row in sorted(an.counts("ticket", "department", "priority", open_only=True).items()):
+            print("  {:<14} {}".format(dept, "  ".join(
+                "{}={}".format(p, n) for p, n in sorted(row.items()))))
+
+        print("\n--- Resolution time by priority (hours: p50 / p90 / p99) ---")
+        for prio, ps in sorted(an.resolution_percentiles("ticket", by="priority").items()):
+            print("  {:<14} {:.1f} / {:.1f} / {:.1f}".format(prio, ps[50], ps[90], ps[99]))
+
+        print("\n--- Tickets resolved per agent, last 7 days (oldest day first) ---")
+        for agent, days in sorted(an.throughput("ticket", bucket=86400).items()):
+            print("  {:<20} {:>4}  {}".format(agent, sum(days), " ".join(str(d) for d in days)))
+
+        names, rows = an.backlog_age("ticket", by="priority")
+        print("\n--- Open ticket age ---")
+        print("  {:<14} {}".format("", " ".join("{:>8}".format(n) for n in names)))
+        for prio, counts in sorted(rows.items()):
+            print("  {:<14} {}".format(prio, " ".join("{:>8}".format(c) for c in counts)))
+        print("")
+        input("Press Enter to return...")
+
+    def _forecast_ui(self):
+        """Simulated week ahead per department for the current roster, with staffing advice."""
+        if self.forecaster is None:
+            print("\n(forecasting needs NumPy: pip install numpy)\n")
+            return
+        f = self.forecaster
+        print("\nSimulating {} scenarios per department...".format(f.scenarios))
+        rows = f.forecast()
+        if not rows:
+            print("(not enough ticket history to forecast)\n")
+            return
+        print("\n--- Next {} hours (SLA: {}) ---".format(f.horizon_hours, ", ".join(
+            "{} {}h".format(p, h) for p, h in f.sla_hours.items())))
+        print("{:<14} {:>8} {:>7} {:>14} {:>16} {:>12}".format(
+            "Department", "Arrivals", "Agents", "Backlog avg/90", "SLA breach avg/90", "Recommend"))
+        print("-" * 78)
+        for r in rows:
+            rec = "{} agents".format(r["recommended"]) if r["recommended"] else "more than tried"
+            print("{:<14} {:>8.0f} {:>7.1f} {:>14} {:>16} {:>12}".format(
+                r["department"][:14], r["expected_arrivals"], r["agents"],
+                "{:.0f}/{:.0f}".format(r["backlog_mean"], r["backlog_p90"]),
+                "{:.1%}/{:.1%}".format(r["breach_mean"], r["breach_p90"]), rec))
+        print("\nRecommended = fewest agents keeping the 90th-percentile breach rate under "
+              "{:.0%} ({:.2f} tickets per agent-hour measured).\n".format(
+                  f.target_breach, rows[0]["service_rate"]))
+        input("Press Enter to return...")
+
+    def _activity_ui(self):
+        """Everything one user did since midnight, from the audit log."""
+        if self.audit is None or self.user_store is None:
+            print("\n(audit log not enabled)\n")
+            return
+        write_lines("{:<4} {:<20}".format(u.id, u.name) for u in self.user_store.list_users())
+        s = input("USER ID (or 0 to cancel): ").strip()
+        user = self.user_store.get_by_id(int(s)) if s.isdigit() else None
+        if user is None:
+            print("Cancelled.\n")
+            return
+
+        midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        records = self.audit.by_actor(user.name, since=midnight.timestamp())
+        print("\n--- {}: activity today ({} change(s)) ---".format(user.name, len(records)))
+        for r in records:
+            print(format_audit_record(r))
+        print("")
         input("Press Enter to return...")
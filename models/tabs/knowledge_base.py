@@ -1,4 +1,16 @@
+import bisect
+import difflib
+import hashlib
+import math
+import re
+import time
+from collections.abc import Sequence
 from datetime import datetime
+from typing import List, Optional
+
+from models.quotas import QuotaExceeded, check_quota
+from models.auth import Perm
+from models.render import ListView, write_lines
 
 # Seed articles
 DEFAULT_ARTICLES = [
@@ -23,20 +35,261 @@ DEFAULT_ARTICLES = [
 ]
 
 
+# -----------------------------------------------------------------------------
+# Content-addressed body storage
+# -----------------------------------------------------------------------------
+# Article bodies are split into paragraphs (on blank lines) and each paragraph
+# is stored once under the hash of its text. A version is just the list of its
+# paragraph keys, so editing one paragraph of a long article adds one chunk and
+# every other paragraph is shared with the previous versions.
+PARAGRAPH_SEP = "\n\n"
+
+
+def chunk_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+class ChunkStore:
+    """
+    {key: paragraph text}. Chunks that came from a snapshot stay as refs
+    (anything with .load(), see models/snapshot.py) until first read.
+    """
+
+    def __init__(self, refs=None):
+        self._refs = dict(refs or {})   # {key: ref} not yet decoded
+        self._chunks = {}               # {key: text}
+
+    def __contains__(self, key):
+        return key in self._chunks or key in self._refs
+
+    def __len__(self):
+        return len(self._chunks) + len(self._refs)
+
+    def put(self, body: str) -> tuple:
+        """Store a body; returns its paragraph keys (existing chunks are reused)."""
+        keys = []
+        for para in body.split(PARAGRAPH_SEP):
+            key = chunk_key(para)
+            if key not in self:
+                self._chunks[key] = para
+            keys.append(key)
+        return tuple(keys)
+
+    def get(self, key: str) -> str:
+        text = self._chunks.get(key)
+        if text is None:
+            text = self._chunks[key] = self._refs.pop(key).load()
+        return text
+
+    def join(self, keys) -> str:
+        return PARAGRAPH_SEP.join(self.get(k) for k in keys)
+
+    def raw_ref(self, key: str):
+        """Undecoded snapshot ref for `key` (copied byte-for-byte when re-saving), or None."""
+        return self._refs.get(key)
+
+    def retain(self, live):
+        """Drop chunks no longer referenced by any version."""
+        for d in (self._chunks, self._refs):
+            for key in [k for k in d if k not in live]:
+                del d[key]
+
+
 # -----------------------------------------------------------------------------
 # Model
 # -----------------------------------------------------------------------------
+class ArticleVersion:
+    """One saved revision: title plus the paragraph keys of its body."""
+
+    __slots__ = ("number", "title", "chunks", "author", "created_at")
+
+    def __init__(self, number: int, title: str, chunks, author: Optional[str] = None,
+                 created_at: Optional[datetime] = None):
+        self.number = number
+        self.title = title
+        self.chunks = tuple(chunks)
+        self.author = author
+        self.created_at = created_at or datetime.now()
+
+
 class Article:
-    """A single FAQ entry."""
+    """A single FAQ entry with its full version history."""
 
-    def __init__(self, article_id, title, content, created_at=None):
+    def __init__(self, article_id, title, content, created_at=None, store=None,
+                 versions=None, author=None):
         self.id = article_id
         self.title = title
-        self.content = content
         self.created_at = created_at or datetime.now()
 
+        # the body is never held here; it is assembled from `store` on demand,
+        # so listing titles never touches (or, from a snapshot, decodes) content
+        self.store = store if store is not None else ChunkStore()
+        self.versions = list(versions or [])
+        if content is not None:
+            self.versions.append(ArticleVersion(1, title, self.store.put(content),
+                                                author, self.created_at))
+
+    @property
+    def version(self) -> int:
+        return self.versions[-1].number
+
+    @property
+    def content(self):
+        return self.store.join(self.versions[-1].chunks)
+
+    def body(self, number: int) -> str:
+        return self.store.join(self.get_version(number).chunks)
+
+    def get_version(self, number: int) -> ArticleVersion:
+        for v in self.versions:
+            if v.number == number:
+                return v
+        raise ValueError("Article {} has no version {}".format(self.id, number))
+
+    def edit(self, title: str, content: str, author: Optional[str] = None) -> Optional[ArticleVersion]:
+        """Save a new version; returns None (and saves nothing) if nothing changed."""
+        chunks = self.store.put(content)
+        if title == self.title and chunks == self.versions[-1].chunks:
+            return None
+        v = ArticleVersion(self.version + 1, title, chunks, author)
+        self.versions.append(v)
+        self.title = title
+        return v
+
+    def diff(self, a: int, b: int) -> List[str]:
+        """
+        Line diff from version a to version b. Paragraphs are compared by key
+        first, so unchanged ones are skipped without being loaded.
+        """
+        va, vb = self.get_version(a), self.get_version(b)
+        out = ["--- v{} ({:%Y-%m-%d %H:%M}, {})".format(
+                   va.number, va.created_at, va.author or "unknown"),
+               "+++ v{} ({:%Y-%m-%d %H:%M}, {})".format(
+                   vb.number, vb.created_at, vb.author or "unknown")]
+        if va.title != vb.title:
+            out.append("title: {!r} -> {!r}".format(va.title, vb.title))
+        sm = difflib.SequenceMatcher(None, va.chunks, vb.chunks, autojunk=False)
+        for op, i1, i2, j1, j2 in sm.get_opcodes():
+            if op == "equal":
+                out.append("  ({} unchanged paragraph(s))".format(i2 - i1))
+                continue
+            out.append("@@ paragraph {} @@".format(j1 + 1))
+            old = self.store.join(va.chunks[i1:i2]).splitlines() if i2 > i1 else []
+            new = self.store.join(vb.chunks[j1:j2]).splitlines() if j2 > j1 else []
+            for line in difflib.ndiff(old, new):
+                if not line.startswith("?"):
+                    out.append(line)
+        return out
+
     def __repr__(self):
-        return f"<Article {self.id}: {self.title[:24]!r}>"
+        return f"<Article {self.id}: {self.title[:24]!r} v{self.version}>"
+
+
+# -----------------------------------------------------------------------------
+# Usage tracking
+# -----------------------------------------------------------------------------
+# Views, suggestion clicks and "did this solve it?" answers feed a popularity
+# score that halves every HALF_LIFE_DAYS. Scores are kept scaled to a fixed
+# epoch (weight * e^(rate * (t - epoch))): decay then multiplies every score
+# by the same factor, so the ranking only changes for the article that was
+# just used and one bisect move keeps the whole order current. Counters are
+# plain ints: they are only written from the UI thread, so no lock is needed.
+HALF_LIFE_DAYS = 14
+SIGNAL_WEIGHTS = {"view": 1.0, "click": 2.0, "helpful": 5.0, "unhelpful": -3.0}
+_COUNTERS = {"view": "views", "click": "clicks", "helpful": "helpful", "unhelpful": "unhelpful"}
+_RESCALE_AT = 1e200                     # re-base the epoch before floats overflow
+_STOPWORDS = frozenset("the and for with not how can cannot my your our you this that from "
+                       "are was have has why what when does".split())
+
+
+def search_terms(text: str) -> List[str]:
+    return [w for w in re.findall(r"[a-z0-9]{3,}", text.lower()) if w not in _STOPWORDS]
+
+
+class ArticleStats:
+    """Usage counters for one article plus its epoch-scaled score."""
+
+    __slots__ = ("views", "clicks", "helpful", "unhelpful", "score")
+
+    def __init__(self, views=0, clicks=0, helpful=0, unhelpful=0, score=0.0):
+        self.views = views
+        self.clicks = clicks
+        self.helpful = helpful
+        self.unhelpful = unhelpful
+        self.score = score
+
+    def to_list(self) -> list:
+        return [self.views, self.clicks, self.helpful, self.unhelpful, self.score]
+
+
+class Popularity(Sequence):
+    """
+    Article ids ordered by score (best first; ties by id). Indexing and
+    slicing the top k is O(k); a recorded signal moves one entry.
+    """
+
+    def __init__(self, epoch: Optional[float] = None, half_life_days: float = HALF_LIFE_DAYS):
+        self.epoch = time.time() if epoch is None else epoch
+        self.rate = math.log(2) / (half_life_days * 86400)
+        self.stats = {}                 # {article id: ArticleStats}
+        self._order = []                # sorted [(-score, id)]
+
+    def __len__(self):
+        return len(self._order)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [aid for _, aid in self._order[i]]
+        return self._order[i][1]
+
+    def add(self, aid: int, stats: Optional[ArticleStats] = None):
+        st = self.stats[aid] = stats or ArticleStats()
+        bisect.insort(self._order, (-st.score, aid))
+
+    def remove(self, aid: int):
+        st = self.stats.pop(aid)
+        del self._order[bisect.bisect_left(self._order, (-st.score, aid))]
+
+    def record(self, aid: int, signal: str, now: Optional[float] = None):
+        """Count one view / click / helpful / unhelpful for an article."""
+        st = self.stats[aid]
+        counter = _COUNTERS[signal]
+        setattr(st, counter, getattr(st, counter) + 1)
+        growth = math.exp(self.rate * ((time.time() if now is None else now) - self.epoch))
+        if growth > _RESCALE_AT:
+            self._rebase(now)
+            growth = 1.0
+        i = bisect.bisect_left(self._order, (-st.score, aid))
+        del self._order[i]
+        st.score += SIGNAL_WEIGHTS[signal] * growth
+        bisect.insort(self._order, (-st.score, aid))
+
+    def _rebase(self, now: Optional[float]):
+        now = time.time() if now is None else now
+        factor = math.exp(-self.rate * (now - self.epoch))
+        for st in self.stats.values():
+            st.score *= factor
+        self.epoch = now
+        self._order = sorted((-st.score, aid) for aid, st in self.stats.items())
+
+    def score(self, aid: int, now: Optional[float] = None) -> float:
+        """Current (decayed) score of an article."""
+        now = time.time() if now is None else now
+        return self.stats[aid].score * math.exp(-self.rate * (now - self.epoch))
+
+
+class _RankedArticles(Sequence):
+    """Articles in popularity order, resolved lazily for the rows on screen."""
+
+    def __init__(self, articles, ranking):
+        self.articles = articles
+        self.ranking = ranking
+
+    def __len__(self):
+        return len(self.ranking)
+
+    def __getitem__(self, i):
+        return self.articles[self.ranking[i]]
 
 
 # -----------------------------------------------------------------------------
@@ -45,11 +298,17 @@ class Article:
 class KnowledgeBase:
     """Stores and manages FAQ-style articles."""
 
-    def __init__(self):
+    def __init__(self, seed=True):
         self.articles = {}
-        for i, a in enumerate(DEFAULT_ARTICLES, start=1):
-            self.articles[i] = Article(i, a["title"], a["content"])
+        self.chunks = ChunkStore()      # paragraph store shared by every article version
+        self.popularity = Popularity()  # usage counters + ranking
+        for i, a in enumerate(DEFAULT_ARTICLES if seed else [], start=1):
+            self.articles[i] = Article(i, a["title"], a["content"], store=self.chunks)
+            self.popularity.add(i)
         self._next_id = (max(self.articles.keys()) + 1) if self.articles else 1
+        self.max_articles = None        # optional tenant limit (see models/quotas.py)
+        self.list_view = ListView("{:<4} {:<40} {:<12} {:<5} {:>6}".format(
+            "ID", "Title", "Created", "Ver", "Score"), rule=72, empty="(no articles yet)")
 
     # --- helpers ---
     def _next(self):
@@ -60,43 +319,140 @@ class KnowledgeBase:
     def get_article(self, article_id):
         return self.articles.get(article_id)
 
-    def _print_titles(self):
-        print("{:<4} {:<40} {:<12}".format("ID", "Title", "Created"))
-        print("-" * 64)
-        if not self.articles:
-            print("(no articles yet)")
-            return
-        for a in self.articles.values():
-            created = a.created_at.strftime("%Y-%m-%d")
-            print("{:<4} {:<40} {:<12}".format(a.id, a.title[:40], created))
+    def create_article(self, title, content, author=None):
+        check_quota("Article", len(self.articles), self.max_articles)
+        nid = self._next()
+        self.articles[nid] = Article(nid, title, content, store=self.chunks, author=author)
+        self.popularity.add(nid)
+        return self.articles[nid]
+
+    def delete_article(self, article_id):
+        """Remove an article with its history; chunks only it used are dropped."""
+        del self.articles[article_id]
+        self.popularity.remove(article_id)
+        self.chunks.retain({k for a in self.articles.values() for v in a.versions for k in v.chunks})
+
+    def record(self, article_id, signal):
+        """Count a "view", "click" (opened from a suggestion), "helpful" or "unhelpful"."""
+        if article_id in self.articles:
+            self.popularity.record(article_id, signal)
+
+    def ranked(self) -> Sequence:
+        """All articles, most popular first (O(k) to read the first k)."""
+        return _RankedArticles(self.articles, self.popularity)
+
+    def search(self, query, limit=None):
+        """Articles whose title or body contain every term, most popular first."""
+        terms = search_terms(query)
+        found = []
+        for a in self.ranked():
+            title = a.title.lower()
+            rest = [t for t in terms if t not in title]
+            if rest:
+                body = a.content.lower()
+                if any(t not in body for t in rest):
+                    continue
+            found.append(a)
+            if limit is not None and len(found) >= limit:
+                break
+        return found
+
+    def suggest(self, text, limit=3):
+        """Popular articles whose title shares a word with `text` (bodies are not read)."""
+        terms = set(search_terms(text))
+        if not terms:
+            return []
+        found = []
+        for a in self.ranked():
+            if terms.intersection(search_terms(a.title)):
+                found.append(a)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def _print_titles(self, menu=()):
+        self.list_view.draw(self.ranked(), self._title_row, menu=menu)
+
+    def _title_row(self, a):
+        return "{:<4} {:<40} {:<12} v{:<4} {:>6.1f}".format(
+            a.id, a.title[:40], a.created_at.strftime("%Y-%m-%d"), a.version,
+            self.popularity.score(a.id))
 
     # --- UI entrypoint ---
-    def run_ui(self):
+    def run_ui(self, session=None):
+        can_edit = session is None or session.can(Perm.EDIT_KB)
+        author = session.user.name if session is not None else None
         print("\n=== Knowledge Base (Titles / FAQ) ===\n")
         running = True
         while running:
-            self._print_titles()
-            print("\nActions:")
-            print("1) Create article")
-            print("2) Read article by ID")
-            print("3) Delete article by ID")
-            print("0) Back to tabs\n")
-
-            choice = input("Enter a number: ").strip()
+            self._print_titles(menu=[
+                "",
+                "Actions:",
+                "1) Create article",
+                "2) Read article by ID",
+                "3) Delete article by ID",
+                "4) Edit article",
+                "5) History / compare versions",
+                "6) Search articles",
+                "0) Back to tabs",
+                "",
+            ])
+
+            choice = self.list_view.prompt().strip()
+            if self.list_view.page(choice):
+                continue
             if choice == "0":
                 print("\nReturning to tabs...\n")
                 running = False
+            elif choice in ("1", "3", "4") and not can_edit:
+                print("\n❌ You don't have permission to edit the knowledge base.\n")
             elif choice == "1":
-                self._create_article_ui()
+                self._create_article_ui(author)
             elif choice == "2":
                 self._read_article_ui()
             elif choice == "3":
                 self._delete_article_ui()
+            elif choice == "4":
+                self._edit_article_ui(author)
+            elif choice == "5":
+                self._history_ui()
+            elif choice == "6":
+                self._search_ui()
             else:
                 print("\n❌ Invalid option. Try again.\n")
 
-    # --- create/read/delete ---
-    def _create_article_ui(self):
+    # --- create/read/edit/delete ---
+    @staticmethod
+    def _read_body():
+        """Multi-line input ending with '.'; None if the user entered 0 to cancel."""
+        lines = []
+        while True:
+            line = input()
+            if line == "0":
+                return None
+            if line.strip() == ".":
+                return "\n".join(lines).strip()
+            lines.append(line)
+
+    def _pick_article(self, action):
+        s = input("\nEnter Article ID to {} (or 0 to cancel): ".format(action)).strip()
+        if s == "0":
+            print("Cancelled.\n")
+            return None
+        if not s.isdigit():
+            print("❌ Invalid input. Please enter a number.\n")
+            return None
+        a = self.get_article(int(s))
+        if not a:
+            print("❌ Article not found.\n")
+        return a
+
+    def _create_article_ui(self, author=None):
+        try:
+            check_quota("Article", len(self.articles), self.max_articles)
+        except QuotaExceeded as e:
+            print("\n❌ {}.\n".format(e))
+            return
         print("\n=== Create Article (enter 0 at any prompt to cancel) ===")
         title = input("Title: ").strip()
         if title == "0":
@@ -107,62 +463,101 @@ class KnowledgeBase:
             return
 
         print("Enter content. Finish with a single '.' on a line.")
-        lines = []
-        while True:
-            line = input()
-            if line == "0":
-                print("Cancelled.\n")
-                return
-            if line.strip() == ".":
-                break
-            lines.append(line)
-        content = "\n".join(lines).strip()
+        content = self._read_body()
+        if content is None:
+            print("Cancelled.\n")
+            return
         if not content:
             print("❌ Content is required.\n")
             return
 
-        nid = self._next()
-        self.articles[nid] = Article(nid, title, content)
-        print(f"✅ Article {nid} ('{title}') created.\n")
+        a = self.create_article(title, content, author)
+        print(f"✅ Article {a.id} ('{title}') created.\n")
 
-    def _read_article_ui(self):
-        s = input("\nEnter Article ID to read (or 0 to cancel): ").strip()
-        if s == "0":
+    def _edit_article_ui(self, author=None):
+        a = self._pick_article("edit")
+        if a is None:
+            return
+        print("\n=== Edit Article {} (v{}) — enter 0 at any prompt to cancel ===".format(a.id, a.version))
+        title = input("Title [{}]: ".format(a.title)).strip()
+        if title == "0":
             print("Cancelled.\n")
             return
-        if not s.isdigit():
-            print("❌ Invalid input. Please enter a number.\n")
+        print("Current content:")
+        print(a.content)
+        print("Enter the new content. Finish with a single '.' on a line "
+              "(just '.' keeps the current content).")
+        content = self._read_body()
+        if content is None:
+            print("Cancelled.\n")
             return
+        v = a.edit(title or a.title, content or a.content, author)
+        if v is None:
+            print("Nothing changed.\n")
+        else:
+            print("✅ Article {} saved as v{}.\n".format(a.id, v.number))
 
-        aid = int(s)
-        a = self.get_article(aid)
-        if not a:
-            print("❌ Article not found.\n")
+    def _history_ui(self):
+        a = self._pick_article("show history for")
+        if a is None:
             return
+        print("\n=== History: Article {} ===".format(a.id))
+        for v in a.versions:
+            print("v{:<4} {:%Y-%m-%d %H:%M}  {:<20} {}".format(
+                v.number, v.created_at, v.author or "-", v.title))
+        if len(a.versions) > 1:
+            s = input("Compare versions (e.g. '1 3'; blank = previous vs latest): ").strip().split()
+            try:
+                old, new = (int(s[0]), int(s[1])) if len(s) == 2 else (a.version - 1, a.version)
+                print("")
+                print("\n".join(a.diff(old, new)))
+            except ValueError as e:
+                print("❌ {}".format(e))
+        print("")
+        input("Press Enter to return...")
 
-        print("\n=== Article {} — {} ===".format(a.id, a.title))
+    def _read_article_ui(self):
+        a = self._pick_article("read")
+        if a is None:
+            return
+
+        self.show_article(a)
+
+    def show_article(self, a, signal="view"):
+        """Print an article, count the read, and ask whether it solved the problem."""
+        self.record(a.id, signal)
+        print("\n=== Article {} — {} (v{}) ===".format(a.id, a.title, a.version))
         print(a.content)
         print("")
-        input("Press Enter to return...")
+        answer = input("Did this solve it? (y/n, Enter to skip): ").strip().lower()
+        if answer in ("y", "n"):
+            self.record(a.id, "helpful" if answer == "y" else "unhelpful")
+            print("Thanks for the feedback.\n")
+        return answer == "y"
 
-    def _delete_article_ui(self):
-        s = input("\nEnter Article ID to delete (or 0 to cancel): ").strip()
-        if s == "0":
+    def _search_ui(self):
+        query = input("\nSearch for (blank to cancel): ").strip()
+        if not query:
             print("Cancelled.\n")
             return
-        if not s.isdigit():
-            print("❌ Invalid input. Please enter a number.\n")
+        found = self.search(query, limit=20)
+        if not found:
+            print("(no matching articles)\n")
             return
+        write_lines(self._title_row(a) for a in found)
+        s = input("Open article ID (Enter to return): ").strip()
+        a = self.get_article(int(s)) if s.isdigit() else None
+        if a is not None:
+            self.show_article(a)
 
-        aid = int(s)
-        a = self.get_article(aid)
-        if not a:
-            print("❌ Article not found.\n")
+    def _delete_article_ui(self):
+        a = self._pick_article("delete")
+        if a is None:
             return
 
-        confirm = input(f"Type DELETE to confirm removal of '{a.title}': ").strip()
+        confirm = input(f"Type DELETE to confirm removal of '{a.title}' and its history: ").strip()
         if confirm == "DELETE":
-            del self.articles[aid]
-            print(f"✅ Article {aid} deleted.\n")
+            self.delete_article(a.id)
+            print(f"✅ Article {a.id} deleted.\n")
         else:
             print("Cancelled.\n")
@@ -1,3 +1,11 @@
+import time
+from models.selection import select_items
+from models.audit import format_audit_record
+from models.quotas import check_quota
+from models.auth import Perm
+from models.render import ListView, write_lines
+from models.users import claimed_items, format_user_table
+
 # -----------------------------------------------------------------------------
 # Seed data (private to this module)
 # -----------------------------------------------------------------------------
@@ -15,7 +23,8 @@ class Task:
     """Simple internal task with optional link to a ticket."""
 
     def __init__(self, task_id, title, department="Support",
-                 status="Open", assigned_to=None, ticket_id=None, description=""):
+                 status="Open", assigned_to=None, ticket_id=None, description="",
+                 created_at=None, resolved_at=None):
         self.id = task_id
         self.title = title
         self.department = department
@@ -25,9 +34,26 @@ class Task:
         # optional link back to a ticket
         self.ticket_id = ticket_id
         self.description = description
+        # epoch seconds (None when unknown)
+        self.created_at = created_at
+        self.resolved_at = resolved_at
 
         # list of {"by": name, "text": str}
-        self.internal_notes = []    
+        # (_notes_ref is set when the notes still live in a snapshot; see models/snapshot.py)
+        self._notes = []
+        self._notes_ref = None
+
+    @property
+    def internal_notes(self):
+        if self._notes_ref is not None:
+            self._notes = self._notes_ref.load()
+            self._notes_ref = None
+        return self._notes
+
+    @internal_notes.setter
+    def internal_notes(self, notes):
+        self._notes = notes
+        self._notes_ref = None
 
     def __repr__(self):
         return "<Task {}: {} [{}]>".format(self.id, self.title, self.status)
@@ -46,12 +72,21 @@ class TaskManager:
     # -------------------------------------------------------------------------
     # Construction & Core Helpers
     # -------------------------------------------------------------------------
-    def __init__(self, user_store=None):
+    def __init__(self, user_store=None, ticket_manager=None, seed=True, store=None):
         self.user_store = user_store
-        self.tasks = {}
-
-        # Seed defaults
-        for i, d in enumerate(DEFAULT_TASKS, start=1):
+        self.ticket_manager = ticket_manager     # used to validate linked ticket ids
+        self.assigner = None                     # optional AssignmentEngine (wired by App)
+        self._listeners = []                     # fn(event, task, actor, changes)
+        self.audit = None                        # optional AuditLog (wired by App)
+        self.max_open = None                     # optional tenant limit on open tasks
+        self._session = None                     # session driving run_ui (None = unrestricted)
+        self.list_view = ListView("{:<4} {:<8} {:<30} {:<14} {:<12} {:<15}".format(
+            "ID", "Ticket", "Title", "Department", "Status", "Assigned To"), empty="(no tasks)")
+        self.tasks = store if store is not None else {}   # {id: Task}; any ItemStore
+        self._by_ticket = {}                     # {ticket id: {task ids}}
+
+        # Seed defaults (not into a store that already holds some)
+        for i, d in enumerate(DEFAULT_TASKS if seed and not self.tasks else [], start=1):
             self.tasks[i] = Task(
                 task_id=i,
                 title=d.get("title", "Untitled Task"),
@@ -60,57 +95,310 @@ class TaskManager:
                 assigned_to=d.get("assigned_to"),
                 ticket_id=d.get("ticket_id"),
                 description=d.get("description", ""),
+                created_at=time.time(),
             )
+            self._index_task(self.tasks[i])
+        if store is not None:
+            self._reindex()
+        # Monotonic: ids of resolved/deleted tasks are never handed out again
+        self._next_id = max(self.tasks, default=0) + 1
 
         # Stats (for dashboard)
         self.totals_created = len(self.tasks)
         self.totals_resolved = 0
         self.totals_deleted = 0
 
+    def add_listener(self, fn):
+        """
+        Subscribe to task mutations. `fn(event, task, actor, changes)` is called
+        after each change; event is one of created, claimed, assigned, noted,
+        updated, resolved. `changes` maps field -> (before, after).
+        """
+        self._listeners.append(fn)
+
+    def _emit(self, event, t, actor=None, changes=None):
+        for fn in self._listeners:
+            fn(event, t, actor, changes or {})
+
     def get_task(self, task_id):
         """Lookup a task by id or return None."""
         return self.tasks.get(task_id)
 
-    def _next_id(self):
-        """Return the next incremental task id (computed from current keys)."""
-        return (max(self.tasks.keys()) + 1) if self.tasks else 1
+    def get_user_tasks(self, user):
+        """The user's claimed open tasks (stale claims are pruned)."""
+        return claimed_items(user, user.tasks_claimed, self.tasks)
 
     # -------------------------------------------------------------------------
-    # List Rendering
+    # Ticket Links & Resolution
     # -------------------------------------------------------------------------
-    def _print_task_list(self):
-        """Render the current (open) tasks table."""
-        if not self.tasks:
-            print("(no tasks)")
-            return
+    def _index_task(self, t):
+        if t.ticket_id is not None:
+            self._by_ticket.setdefault(t.ticket_id, set()).add(t.id)
+
+    def _unindex_task(self, t):
+        if t.ticket_id is not None:
+            ids = self._by_ticket.get(t.ticket_id)
+            if ids is not None:
+                ids.discard(t.id)
+                if not ids:
+                    del self._by_ticket[t.ticket_id]
+
+    def _reindex(self):
+        """Rebuild derived indexes after self.tasks was replaced wholesale."""
+        self._by_ticket = {}
+        for t in self.tasks.values():
+            self._index_task(t)
+
+    def task_ids_for_ticket(self, ticket_id):
+        """Ids of open tasks linked to the given ticket (sorted)."""
+        return sorted(i for i in self._by_ticket.get(ticket_id, ()) if i in self.tasks)
+
+    def resolve_tasks(self, task_ids, user=None, release=True):
+        """
+        Resolve several tasks in one batch: store, ticket index and totals are
+        updated together, then claim lists are cleaned in a single pass.
+        Returns the ids that were actually resolved.
+        """
+        done = []
+        holders = {}
+        now = time.time()
+        for tid in task_ids:
+            t = self.tasks.pop(tid, None)
+            if t is None:
+                continue
+            before = t.status
+            t.status = "Resolved"
+            t.resolved_at = now
+            self._unindex_task(t)
+            done.append(tid)
+            self._emit("resolved", t, user, {"status": (before, "Resolved")})
+            u = self.user_store.get_by_name(t.assigned_to) if self.user_store else None
+            if u is not None:
+                holders[u.id] = u
+        self.totals_resolved += len(done)
+
+        if release and done:
+            if self.user_store is not None:
+                self._touch(self.user_store.release_claims(
+                    task_ids=done, holders=list(holders.values())))
+            elif user is not None:
+                for tid in done:
+                    user.unclaim_task(tid)
+        return done
+
+    def resolve_task(self, t, user=None):
+        """Resolve a single task (removes it from the open set)."""
+        return self.resolve_tasks([t.id], user)
+
+    def create_task(self, title, department="Support", ticket_id=None,
+                    description="", assignee=None, actor=None):
+        """
+        Programmatic creation. `ticket_id` must reference an open ticket when a
+        TicketManager is wired in; raises ValueError otherwise (QuotaExceeded,
+        a ValueError, when the tenant's open-task limit is reached).
+        """
+        check_quota("Open task", len(self.tasks), self.max_open)
+        if ticket_id is not None and self.ticket_manager is not None:
+            if self.ticket_manager.get_ticket(ticket_id) is None:
+                raise ValueError("Ticket {} not found or already resolved".format(ticket_id))
+
+        new_id = self._next_task_id()
+        t = Task(
+            task_id=new_id,
+            title=title,
+            department=department,
+            status="Open",
+            assigned_to=assignee.name if assignee else None,
+            ticket_id=ticket_id,
+            description=description,
+            created_at=time.time(),
+        )
+        self.tasks[new_id] = t
+        self._index_task(t)
+        self.totals_created += 1
+        self._emit("created", t, actor)
 
-        print("{:<4} {:<8} {:<30} {:<14} {:<12} {:<15}".format(
-            "ID", "Ticket", "Title", "Department", "Status", "Assigned To"))
-        print("-" * 100)
+        # If assigned to someone, add to their claimed list
+        if assignee is not None:
+            assignee.claim_task(t)
+            self._touch([assignee])
+            self._emit("assigned", t, actor, {"assigned_to": (None, assignee.name)})
+        return t
+
+    # -------------------------------------------------------------------------
+    # Assignment, Notes & Bulk Operations
+    # -------------------------------------------------------------------------
+    # Fields agents may filter on in bulk selections (see models/selection.py)
+    SELECT_FIELDS = ("id", "title", "department", "status", "assigned_to",
+                     "ticket_id", "description")
+
+    def select_tasks(self, expr):
+        """Open tasks matching a selection like '1-5,8' or 'department=Support unassigned'."""
+        return select_items(self.tasks, expr, self.SELECT_FIELDS)
+
+    def assign_tasks(self, task_ids, target, actor=None):
+        """
+        Assign several open tasks to `target` in one batch. Previous owners
+        lose the claims in a single pass over the user store.
+        """
+        tasks = [self.tasks[i] for i in dict.fromkeys(task_ids) if i in self.tasks]
+        if not tasks:
+            return []
+        ids = [t.id for t in tasks]
+
+        released = []
+        if self.user_store is not None:
+            holders = {}
+            for t in tasks:
+                u = self.user_store.get_by_name(t.assigned_to)
+                if u is not None:
+                    holders[u.id] = u
+            released = self.user_store.release_claims(task_ids=ids, holders=list(holders.values()))
+        before = [t.assigned_to for t in tasks]
+        for t in tasks:
+            t.assigned_to = target.name
+        target.claim_tasks(ids)
+        self._touch(released + [target])
+
+        event = "claimed" if actor is not None and actor.id == target.id else "assigned"
+        for t, old in zip(tasks, before):
+            self._emit(event, t, actor, {"assigned_to": (old, target.name)})
+        return tasks
+
+    def _touch(self, users):
+        """Tell the assignment engine (if any) that these users' loads changed."""
+        if self.assigner is not None and users:
+            self.assigner.touch(users)
+
+    def suggest_assignee(self, department, exclude=None):
+        """Least-loaded active agent for a department, or None without an engine."""
+        if self.assigner is None:
+            return None
+        return self.assigner.pick((department,), exclude)
+
+    def rebalance_user(self, user):
+        """Re-route every open task held by `user` to the best remaining agent."""
+        if self.assigner is None:
+            return []
+        moved = []
+        for t in self.get_user_tasks(user):
+            target = self.assigner.pick_for_task(t, exclude=user)
+            if target is None:
+                break
+            self.assign_task(t, target)
+            moved.append(t)
+        return moved
+
+    def assign_task(self, t, target, actor=None):
+        """Assign (or claim, when target is the acting user) one task."""
+        self.assign_tasks([t.id], target, actor)
+        return t
+
+    # Fields update_task may change
+    EDITABLE_FIELDS = ("department", "description")
+
+    def update_task(self, t, actor=None, **fields):
+        """Set editable fields on an open task; emits 'updated' with what changed."""
+        unknown = set(fields) - set(self.EDITABLE_FIELDS)
+        if unknown:
+            raise ValueError("Can't set {} on a task.".format(", ".join(sorted(unknown))))
+        changes = {f: (getattr(t, f), v) for f, v in fields.items() if getattr(t, f) != v}
+        for f, (_, v) in changes.items():
+            setattr(t, f, v)
+        if changes:
+            self._emit("updated", t, actor, changes)
+        return changes
+
+    def set_status(self, t, status, actor=None):
+        """
+        Set an open task's status (resolving has its own call); emits 'updated'
+        so the audit log and history see the change.
+        """
+        if status == "Resolved":
+            raise ValueError("Use resolve_task() to resolve a task.")
+        if t.status == status:
+            return {}
+        changes = {"status": (t.status, status)}
+        t.status = status
+        self._emit("updated", t, actor, changes)
+        return changes
+
+    def add_notes(self, task_ids, user, text):
+        """Append the same internal note to several open tasks."""
+        tasks = [self.tasks[i] for i in dict.fromkeys(task_ids) if i in self.tasks]
+        for t in tasks:
+            t.internal_notes.append({"by": user.name, "text": text})
+            self._emit("noted", t, user, {"note": (None, text)})
+        return tasks
+
+    def add_note(self, t, user, text):
+        """Append an internal note to one task."""
+        t.internal_notes.append({"by": user.name, "text": text})
+        self._emit("noted", t, user, {"note": (None, text)})
+        return t
+
+    def _next_task_id(self):
+        """Return the next task id and advance the counter."""
+        nid = self._next_id
+        self._next_id += 1
+        return nid
+
+    # -------------------------------------------------------------------------
+    # List Rendering
+    # -------------------------------------------------------------------------
+    def _print_task_list(self, menu=()):
+        """Render the current (open) tasks table, one page at a time, followed by `menu`."""
+        allowed = {}        # department -> may view (one permission check per department)
+        rows = []
         for t in self.tasks.values():
-            ticket_str = str(t.ticket_id) if t.ticket_id is not None else "-"
-            assigned = t.assigned_to if t.assigned_to else "Unassigned"
-            print("{:<4} {:<8} {:<30} {:<14} {:<12} {:<15}".format(
-                t.id, ticket_str, t.title[:28], t.department, t.status, assigned))
+            ok = allowed.get(t.department)
+            if ok is None:
+                ok = allowed[t.department] = self._can(Perm.VIEW_QUEUE, t.department)
+            if ok:
+                rows.append(t)
+        self.list_view.draw(rows, self._task_row, menu=menu)
+
+    @staticmethod
+    def _task_row(t):
+        ticket_str = str(t.ticket_id) if t.ticket_id is not None else "-"
+        assigned = t.assigned_to if t.assigned_to else "Unassigned"
+        return "{:<4} {:<8} {:<30} {:<14} {:<12} {:<15}".format(
+            t.id, ticket_str, t.title[:28], t.department, t.status, assigned)
 
     # -------------------------------------------------------------------------
     # Tasks Tab UI (agent workflow)
     # -------------------------------------------------------------------------
-    def run_ui(self, current_user):
+    def _can(self, perm, department=None):
+        """Authorization for the session driving the UI (O(1) bitmask test)."""
+        return self._session is None or self._session.can(perm, department)
+
+    def _can_work(self, t):
+        if self._can(Perm.WORK_TASKS, t.department):
+            return True
+        print("❌ You don't have permission to work on Task {} ({}).\n".format(t.id, t.department))
+        return False
+
+    def run_ui(self, current_user, session=None):
         """Entry point for the Tasks tab loop."""
+        self._session = session
         print(f"\n=== {getattr(current_user, 'name', 'You')} is now in the Tasks Tab ===\n")
         running = True
         while running:
-            self._print_task_list()
-
-            print("\nActions:")
-            print("1) Claim a task")
-            print("2) See my tasks")
-            print("3) Access / work on a task")
-            print("4) Create a task")
-            print("0) Back to tabs\n")
-
-            choice = input("Enter a number: ").strip()
+            self._print_task_list(menu=[
+                "",
+                "Actions:",
+                "1) Claim a task",
+                "2) See my tasks",
+                "3) Access / work on a task",
+                "4) Create a task",
+                "5) Bulk actions (claim/assign/note/resolve many)",
+                "0) Back to tabs",
+                "",
+            ])
+
+            choice = self.list_view.prompt().strip()
+            if self.list_view.page(choice):
+                continue
             if choice == "0":
                 print("\nReturning to tabs...\n")
                 running = False
@@ -122,8 +410,14 @@ class TaskManager:
                 self._access_task_ui(current_user)
             elif choice == "4":
                 self._create_task_ui(current_user)
+            elif choice == "5":
+                if self._can(Perm.BULK_ACTIONS):
+                    self._bulk_actions_ui(current_user)
+                else:
+                    print("❌ You don't have permission to do that.\n")
             else:
                 print("\n❌ Invalid option. Try again.\n")
+        self._session = None
 
     # -------------------------------------------------------------------------
     # Actions: Claim / My Tasks / Access
@@ -146,29 +440,27 @@ class TaskManager:
         if task is None:
             print("❌ Task not found.\n")
             return
+        if not self._can_work(task):
+            return
 
-        # Update both sides
-        task.assigned_to = user.name
-        user.claim_task(task)
+        # Update both sides (previous owner loses the claim)
+        self.assign_task(task, user, user)
 
         print("✅ Task {} ('{}') is now assigned to {}.\n".format(tid, task.title, user.name))
 
     def _show_my_tasks(self, user):
         """Submenu that lists tasks claimed by the given user, with a quick access flow."""
         while True:
-            claimed_ids = user.tasks_claimed
+            my_tasks = self.get_user_tasks(user)
             print("\n=== My Tasks (for {}) ===".format(user.name))
-            if not claimed_ids:
+            if not my_tasks:
                 print("(You have not claimed any tasks yet.)\n")
                 return
 
             print("{:<4} {:<8} {:<30} {:<14} {:<12} {:<15}".format(
                 "ID", "Ticket", "Title", "Department", "Status", "Assigned To"))
             print("-" * 100)
-            for tid in claimed_ids:
-                t = self.get_task(tid)
-                if not t:
-                    continue
+            for t in my_tasks:
                 ticket_str = str(t.ticket_id) if t.ticket_id is not None else "-"
                 assigned = t.assigned_to if t.assigned_to else "Unassigned"
                 print("{:<4} {:<8} {:<30} {:<14} {:<12} {:<15}".format(
@@ -202,12 +494,15 @@ class TaskManager:
         if not t:
             print("❌ Task not found.\n")
             return
+        if not self._can_work(t):
+            return
 
         while True:
             self._print_task_details(t)
             print("Actions:")
             print("1) Internal notes (view/add)")
             print("2) Update status (Open/Resolved)")
+            print("3) History")
             print("0) Back\n")
 
             choice = input("Enter a number: ").strip()
@@ -215,6 +510,11 @@ class TaskManager:
                 return
             elif choice == "1":
                 self._internal_notes_ui(t, user)
+            elif choice == "3":
+                if self._can(Perm.VIEW_AUDIT):
+                    self._history_ui(t)
+                else:
+                    print("❌ You don't have permission to do that.\n")
             elif choice == "2":
                 self._update_status_ui(t, user)
                 # If resolved, the task is removed from the dict; bounce back.
@@ -236,6 +536,20 @@ class TaskManager:
         print("Description:   {}".format(t.description if t.description else "(none)"))
         print("")
 
+    def _history_ui(self, t):
+        """Show every recorded change to this task, oldest first."""
+        print("\n--- History: Task {} ---".format(t.id))
+        if self.audit is None:
+            print("(audit log not enabled)\n")
+            return
+        records = self.audit.history("task", t.id)
+        if not records:
+            print("(no recorded changes)\n")
+            return
+        for r in records:
+            print(format_audit_record(r))
+        print("")
+
     def _internal_notes_ui(self, t, user):
         """View and append internal notes for the given task."""
         print("\n--- Internal Notes ---")
@@ -249,7 +563,7 @@ class TaskManager:
         if add == "y":
             text = input("Note text (blank to cancel): ").strip()
             if text:
-                t.internal_notes.append({"by": user.name, "text": text})
+                self.add_note(t, user, text)
                 print("✅ Note added.\n")
             else:
                 print("Cancelled.\n")
@@ -270,23 +584,97 @@ class TaskManager:
             print("Cancelled.\n")
             return
         elif choice == "1":
-            t.status = "Open"
+            self.set_status(t, "Open", user)
             print("✅ Status set to Open.\n")
         elif choice == "2":
-            t.status = "Resolved"
-            # remove from store so it disappears from lists
-            if t.id in self.tasks:
-                del self.tasks[t.id]
-            self.totals_resolved += 1
-            # best-effort: remove from current user's claimed list if present
-            try:
-                user.unclaim_task(t.id)
-            except Exception:
-                pass
+            # removes from store so it disappears from lists
+            self.resolve_task(t, user)
             print("✅ Task {} resolved and removed.\n".format(t.id))
         else:
             print("❌ Invalid option.\n")
 
+    # -------------------------------------------------------------------------
+    # Bulk Actions
+    # -------------------------------------------------------------------------
+    def _bulk_actions_ui(self, user):
+        """Select many tasks by ids/ranges/filters and apply one action to all of them."""
+        print("\n--- Bulk Actions ---")
+        print("Select tasks by ids and/or filters, e.g.:")
+        print("  1-5,8    department=Support unassigned    title~mouse")
+        expr = input("Selection (or 0 to cancel): ").strip()
+        if expr == "0" or not expr:
+            print("Cancelled.\n")
+            return
+        try:
+            selected = self.select_tasks(expr)
+        except ValueError as e:
+            print("❌ {}\n".format(e))
+            return
+        # only tasks in the agent's department scope
+        selected = [t for t in selected if self._can(Perm.WORK_TASKS, t.department)]
+        if not selected:
+            print("No open tasks match that selection.\n")
+            return
+
+        ids = [t.id for t in selected]
+        preview = ", ".join(str(i) for i in ids[:20]) + (" …" if len(ids) > 20 else "")
+        print("\nMatched {} task(s): {}".format(len(ids), preview))
+        print("1) Claim all")
+        print("2) Assign all to another user")
+        print("3) Add the same internal note")
+        print("4) Resolve all")
+        choice = input("Choose an action (or 0 to cancel): ").strip()
+
+        if choice == "1":
+            self.assign_tasks(ids, user, user)
+            print("✅ Claimed {} task(s).\n".format(len(ids)))
+        elif choice == "2" and not self._can(Perm.ASSIGN_OTHERS):
+            print("❌ You don't have permission to do that.\n")
+        elif choice == "2":
+            target = self._pick_assignee_ui(user)
+            if target is not None:
+                self.assign_tasks(ids, target, user)
+                print("✅ Assigned {} task(s) to {}.\n".format(len(ids), target.name))
+        elif choice == "3":
+            text = input("Note text (blank to cancel): ").strip()
+            if text:
+                self.add_notes(ids, user, text)
+                print("✅ Note added to {} task(s).\n".format(len(ids)))
+            else:
+                print("Cancelled.\n")
+        elif choice == "4":
+            confirm = input("Type RESOLVE to resolve {} task(s): ".format(len(ids))).strip()
+            if confirm == "RESOLVE":
+                done = self.resolve_tasks(ids, user)
+                print("✅ Resolved {} task(s).\n".format(len(done)))
+            else:
+                print("Cancelled.\n")
+        else:
+            print("Cancelled.\n")
+
+    def _pick_assignee_ui(self, current_user):
+        """Show active users and prompt for a USER ID; returns the User or None."""
+        if not self.user_store:
+            print("❌ Cannot assign: user store not available.\n")
+            return None
+        users = [u for u in self.user_store.list_users()
+                 if u.is_active
+                 and (current_user is None or u.id != current_user.id)]
+        if not users:
+            print("❌ No eligible users found.\n")
+            return None
+
+        write_lines(["", "Active users:"] + format_user_table(users))
+        s = input("Assign to USER ID (or 0 to cancel): ").strip()
+        if s.isdigit():
+            for u in users:
+                if u.id == int(s):
+                    return u
+        if s != "0":
+            print("❌ That USER ID was not in the list above.")
+        print("Cancelled.\n")
+        return None
+
     # -------------------------------------------------------------------------
     # Creation
     # -------------------------------------------------------------------------
@@ -318,6 +706,9 @@ class TaskManager:
             return
         if not department:
             department = "Support"
+        if not self._can(Perm.WORK_TASKS, department):
+            print("❌ {} is outside your department scope.\n".format(department))
+            return
 
         # Linked Ticket ID (optional)
         print("")
@@ -329,59 +720,55 @@ class TaskManager:
         if ticket_input:
             if ticket_input.isdigit():
                 ticket_id = int(ticket_input)
+                if self.ticket_manager is not None and self.ticket_manager.get_ticket(ticket_id) is None:
+                    print("❌ Ticket not found or already resolved; leaving blank.")
+                    ticket_id = None
             else:
                 print("❌ Invalid ticket id; leaving blank.")
                 ticket_id = None
 
-        # Optional Assignee (by USER ID) — show active users if we can
-        assignee_name = None
-        if self.user_store:
+        # Optional Assignee (by USER ID) — show active users if we can; without
+        # ASSIGN_OTHERS the creator may only take the task themselves
+        assignee = None
+        if not self._can(Perm.ASSIGN_OTHERS):
+            s = input("Assign to yourself? (y/N): ").strip().lower()
+            if s == "0":
+                print("Cancelled.\n")
+                return
+            if s == "y":
+                assignee = user
+        elif self.user_store:
             users = [u for u in self.user_store.list_users()
-                     if isinstance(u.status, str) and u.status.lower() == "active"]
+                     if u.is_active]
             if users:
-                print("\nActive users:")
-                print("{:<4} {:<20} {:<8} {:<8}".format("ID", "Name", "Role", "Status"))
-                print("-" * 48)
-                for u in users:
-                    print("{:<4} {:<20} {:<8} {:<8}".format(u.id, u.name, u.role, u.status))
-                print("-" * 48)
+                write_lines(["", "Active users:"] + format_user_table(users))
+                suggested = self.suggest_assignee(department)
+                if suggested:
+                    print("Suggested (least loaded for {}): {} — enter 'a' to use".format(
+                        department, suggested.name))
                 s = input("Assign to USER ID (blank for none): ").strip()
                 if s == "0":
                     print("Cancelled.\n")
                     return
-                if s:
+                if s.lower() == "a" and suggested:
+                    assignee = suggested
+                elif s:
                     if s.isdigit():
                         target = self.user_store.get_by_id(int(s))
-                        if target and isinstance(target.status, str) and target.status.lower() == "active":
-                            assignee_name = target.name
+                        if target and target.is_active:
+                            assignee = target
                         else:
                             print("❌ Invalid or inactive user id; leaving unassigned.")
                     else:
                         print("❌ Invalid input; leaving unassigned.")
 
         # Create the task
-        new_id = self._next_id()
-        t = Task(
-            task_id=new_id,
-            title=title,
-            department=department,
-            status="Open",
-            assigned_to=assignee_name,
-            ticket_id=ticket_id,
-            description=description,
-        )
-        self.tasks[new_id] = t
-        self.totals_created += 1
-
-        # If assigned to someone, add to their claimed list
-        if assignee_name and self.user_store:
-            for u in self.user_store.list_users():
-                if u.name == assignee_name:
-                    try:
-                        u.claim_task(t)
-                    except Exception:
-                        pass
-                    break
+        try:
+            t = self.create_task(title, department=department, ticket_id=ticket_id,
+                                 description=description, assignee=assignee, actor=user)
+        except ValueError as e:
+            print("❌ {}.\n".format(e))
+            return
 
         print("✅ Task {} ('{}') created{}.\n".format(
-            new_id, title, " and assigned to {}".format(assignee_name) if assignee_name else ""))
+            t.id, title, " and assigned to {}".format(assignee.name) if assignee else ""))
@@ -1,5 +1,17 @@
-from typing import Optional
-from models.users import User
+import time
+from typing import List, Optional
+from models.users import User, claimed_items, format_user_table
+from models.dedup import DuplicateDetector
+from models.backends import SearchBackend
+from models.jobs import check_cancelled
+from models.search import ARCHIVED, TicketSearch
+from models.requesters import RequesterIndex, normalize_email
+from models.selection import select_items
+from models.audit import format_audit_record
+from models.quotas import QuotaExceeded, check_quota
+from models.auth import Perm
+from models.macros import Macro
+from models.render import ListView, write_lines
 
 # -----------------------------------------------------------------------------
 # Seed data (private to this module)
@@ -32,6 +44,9 @@ class Ticket:
         help_topic: str = "General Inquiry",
         printing: bool = False,
         email: Optional[str] = None,
+        parent_id: Optional[int] = None,
+        created_at: Optional[float] = None,
+        resolved_at: Optional[float] = None,
     ):
         # core
         self.id = ticket_id
@@ -48,8 +63,29 @@ class Ticket:
         self.printing = printing
         self.email = email
 
+        # optional parent incident this ticket is attached to
+        self.parent_id = parent_id
+
+        # epoch seconds (None when unknown, e.g. tickets from older snapshots)
+        self.created_at = created_at
+        self.resolved_at = resolved_at
+
         # notes: [{"by": <str>, "text": <str>}]
-        self.internal_notes = []
+        # (_notes_ref is set when the notes still live in a snapshot; see models/snapshot.py)
+        self._notes = []
+        self._notes_ref = None
+
+    @property
+    def internal_notes(self):
+        if self._notes_ref is not None:
+            self._notes = self._notes_ref.load()
+            self._notes_ref = None
+        return self._notes
+
+    @internal_notes.setter
+    def internal_notes(self, notes):
+        self._notes = notes
+        self._notes_ref = None
 
     def __repr__(self):
         return "<Ticket {}: {} [{}]>".format(self.id, self.subject, self.status)
@@ -63,27 +99,232 @@ class TicketManager:
     Owns the collection of tickets and exposes:
       - Core helpers (create, lookup, stats)
       - Tickets tab UI (agent workflow)
-      - Client submission UI (public form)
+      - Client submission UI (public form) and ticket status lookup
     """
 
     # -------------------------------------------------------------------------
     # Construction & Core Helpers
     # -------------------------------------------------------------------------
-    def __init__(self, user_store=None):
+    def __init__(self, user_store=None, seed: bool = True, store=None, archive=None):
         self.user_store = user_store              # reference so we can assign/escalate
-        self.tickets = {}                         # {id: Ticket}
+        self.task_manager = None                  # wired by App for ticket→task cascades
+        # {id: Ticket} open and resolved tickets; any ItemStore (models/backends.py)
+        self.tickets = store if store is not None else {}
+        self.archived = archive if archive is not None else {}
+        self._children = {}                       # {parent id: {child ticket ids}}
+
+        # Seed initial tickets (not into a store that already holds some)
+        if seed and not self.tickets and not self.archived:
+            for i, d in enumerate(DEFAULT_TICKETS, start=1):
+                self.tickets[i] = Ticket(ticket_id=i, status="Open", created_at=time.time(), **d)
+        elif store is not None:
+            self._reindex()
+
+        # Near-duplicate index over the open set (built on first use)
+        self._dedup = None
+
+        # Trigram search over open + archived tickets (built on first search);
+        # search_factory returns any SearchBackend (models/backends.py)
+        self._search = None
+        self.search_factory = TicketSearch
+
+        # Ticket ids per requester email / domain, open and archived (built on first lookup)
+        self._requesters = None
+
+        # Optional AssignmentEngine (wired by App); routes new tickets when auto_assign is on
+        self.assigner = None
+        self.auto_assign = True
+
+        # Mutation listeners: fn(event, ticket, actor, changes)
+        self._listeners = []
+
+        # Optional AuditLog (wired by App) used for the per-ticket history view
+        self.audit = None
+
+        # Optional tenant limit on the open queue (see models/quotas.py)
+        self.max_open = None
+
+        # Session of the agent driving run_ui (None = unrestricted, e.g. scripts)
+        self._session = None
+
+        # Optional Intake (wired by App): rate limits + bounded queue for public submissions
+        self.intake = None
+
+        # Optional MacroLibrary (wired by App): canned responses / multi-step actions
+        self.macros = None
 
-        # Seed initial tickets
-        for i, d in enumerate(DEFAULT_TICKETS, start=1):
-            self.tickets[i] = Ticket(ticket_id=i, status="Open", **d)
+        # Optional KnowledgeBase (wired by App): article suggestions on the public form
+        self.kb = None
+
+        # Paged queue table for the Tickets tab (see models/render.py)
+        self.list_view = ListView(
+            f"{'ID':<4} {'Subject':<38} {'From':<12} {'Priority':<8} {'Status':<12} {'Assigned To':<15}",
+            empty="(no tickets)")
 
         # Stats for dashboard
         self.totals_created = len(self.tickets)
         self.totals_resolved = 0
         self.totals_deleted = 0  # maintained if you add deletion later
 
-        # Next ID after seeding
-        self._next_id = (max(self.tickets.keys()) + 1) if self.tickets else 1
+        # Next ID after seeding (a persistent archive may hold the highest id)
+        self._next_id = max(max(self.tickets, default=0), max(self.archived, default=0)) + 1
+
+    @property
+    def dedup(self) -> DuplicateDetector:
+        """Near-duplicate index over the open set, built lazily on first use."""
+        if self._dedup is None:
+            self._dedup = DuplicateDetector()
+            for t in self.tickets.values():
+                self._dedup.add(t)
+        return self._dedup
+
+    @property
+    def search_index(self) -> SearchBackend:
+        """Typo-tolerant subject/requester/email index, built lazily on first search."""
+        if self._search is None:
+            archive = self.archived
+            # LazyArchive: decode without caching, so the archive isn't kept in memory
+            peek = getattr(archive, "peek", archive.__getitem__)
+            self._search = self._build_search(self.tickets, list(archive), peek)
+        return self._search
+
+    @property
+    def requesters(self) -> RequesterIndex:
+        """Requester email/domain index over open and archived tickets, built lazily."""
+        if self._requesters is None:
+            archive = self.archived
+            peek = getattr(archive, "peek", archive.__getitem__)
+            self._requesters = self._build_requesters(self.tickets, list(archive), peek)
+        return self._requesters
+
+    def _build_requesters(self, tickets, archived_ids, load) -> RequesterIndex:
+        """Index `tickets` {id: Ticket} and the archived ids (load(id) -> Ticket) in id order."""
+        index = RequesterIndex()
+        for n, tid in enumerate(sorted(list(tickets) + list(archived_ids))):
+            if n % 1000 == 999:
+                check_cancelled()       # no-op unless running as a background job
+            t = tickets.get(tid)
+            index.add_ticket(t if t is not None else load(tid))
+        return index
+
+    def warm_requesters(self, scheduler, group=None):
+        """
+        Build the requester index on a low-priority background job (as
+        warm_search_index does), so the first status lookup doesn't decode
+        the archive. Only over in-memory stores, like the search index.
+        """
+        if (self._requesters is not None or getattr(self.tickets, "persistent", False)
+                or getattr(self.archived, "persistent", False)):
+            return None
+        live, tickets, upto = self.tickets, dict(self.tickets), self._next_id
+        archive = self.archived
+        archived_ids = list(archive)
+        peek = getattr(archive, "peek", archive.__getitem__)
+
+        def install(index):
+            if self._requesters is not None or self.tickets is not live:
+                return
+            for tid in range(upto, self._next_id):
+                t = self.tickets.get(tid) or self.archived.get(tid)
+                if t is not None:
+                    index.add_ticket(t)
+            self._requesters = index
+
+        return scheduler.submit(
+            lambda: scheduler.call_in_main(install, self._build_requesters(tickets, archived_ids, peek)),
+            name="requester-index", priority="low", group=group)
+
+    def requester_tickets(self, email: Optional[str] = None,
+                          domain: Optional[str] = None) -> List[Ticket]:
+        """Open and resolved tickets from one requester (or one email domain), newest first."""
+        ids = self.requesters.for_email(email) if email else self.requesters.for_domain(domain or "")
+        out = []
+        for tid in reversed(ids):
+            t = self.tickets.get(tid) or self.archived.get(tid)
+            if t is not None:
+                out.append(t)
+        return out
+
+    def _build_search(self, tickets, archived_ids, load) -> SearchBackend:
+        """Index `tickets` {id: Ticket} and the archived ids (load(id) -> Ticket) in id order."""
+        index = self.search_factory()
+        # in id order, so every posting list is built by appends only
+        for n, tid in enumerate(sorted(list(tickets) + list(archived_ids))):
+            if n % 1000 == 999:
+                check_cancelled()       # no-op unless running as a background job
+            t = tickets.get(tid)
+            if t is not None:
+                index.add_ticket(t)
+            else:
+                index.add_ticket(load(tid), ARCHIVED)
+        return index
+
+    def warm_search_index(self, scheduler, group=None):
+        """
+        Build the search index on a low-priority background job instead of on
+        the first search. The queue is captured here, the index is built off
+        the main thread, then caught up with tickets created or resolved in
+        the meantime and installed from the tab loop (scheduler.run_main).
+        Only for the in-memory index over in-memory tickets: SQLite
+        connections belong to the thread that opened them.
+        """
+        if (self._search is not None or self.search_factory is not TicketSearch
+                or getattr(self.tickets, "persistent", False)
+                or getattr(self.archived, "persistent", False)):
+            return None
+        live, tickets, upto = self.tickets, dict(self.tickets), self._next_id
+        archive = self.archived
+        archived_ids = list(archive)
+        peek = getattr(archive, "peek", archive.__getitem__)   # LazyArchive: decode without caching
+
+        def install(index):
+            if self._search is not None or self.tickets is not live:
+                return              # built by a search meanwhile, or the queue was replaced
+            for tid in range(upto, self._next_id):
+                if tid in self.tickets:
+                    index.add_ticket(self.tickets[tid])
+                elif tid in self.archived:
+                    index.add_ticket(self.archived[tid], ARCHIVED)
+            for tid in tickets:
+                if tid not in self.tickets:
+                    index.set_state(tid, ARCHIVED)
+            self._search = index
+
+        return scheduler.submit(
+            lambda: scheduler.call_in_main(install, self._build_search(tickets, archived_ids, peek)),
+            name="search-index", priority="low", group=group)
+
+    def search_tickets(self, query: str, limit: int = 10, include_archived: bool = False):
+        """Return [(Ticket, score)] ranked by fuzzy match on subject, requester and email."""
+        out = []
+        for tid, score in self.search_index.search(query, limit, include_archived):
+            t = self.tickets.get(tid) or self.archived.get(tid)
+            if t is not None:
+                out.append((t, score))
+        return out
+
+    def _reindex(self):
+        """Rebuild derived indexes after self.tickets was replaced wholesale."""
+        self._children = {}
+        for t in self.tickets.values():
+            if t.parent_id is not None:
+                self._children.setdefault(t.parent_id, set()).add(t.id)
+        self._dedup = None
+        self._search = None
+        self._requesters = None
+
+    def add_listener(self, fn):
+        """
+        Subscribe to ticket mutations. `fn(event, ticket, actor, changes)` is
+        called after each change; event is one of created, claimed, assigned,
+        noted, replied, linked, updated, resolved. `changes` maps field -> (before,
+        after).
+        """
+        self._listeners.append(fn)
+
+    def _emit(self, event: str, t: Ticket, actor: Optional[User] = None, changes=None):
+        for fn in self._listeners:
+            fn(event, t, actor, changes or {})
 
     def _next_ticket_id(self) -> int:
         """Return the next incremental ticket id and advance the counter."""
@@ -101,11 +342,15 @@ class TicketManager:
         sla_plan: str = "Standard",
         help_topic: str = "General Inquiry",
         printing: bool = False,
+        parent_id: Optional[int] = None,
+        message: Optional[str] = None,
     ) -> Ticket:
         """
-        Programmatic creation (used by client form and tests).
-        Returns the created Ticket.
+        Programmatic creation (used by client form and tests). `message` is the
+        requester's first message (e.g. an email body), kept as a public reply.
+        Returns the created Ticket; raises QuotaExceeded when the open queue is full.
         """
+        check_quota("Open ticket", len(self.tickets), self.max_open)
         tid = self._next_ticket_id()
         t = Ticket(
             ticket_id=tid,
@@ -119,15 +364,329 @@ class TicketManager:
             help_topic=help_topic,
             printing=printing,
             email=email,
+            parent_id=parent_id,
+            created_at=time.time(),
         )
         self.tickets[tid] = t
+        if self._dedup is not None:
+            self._dedup.add(t)
+        if self._search is not None:
+            self._search.add_ticket(t)
+        if self._requesters is not None:
+            self._requesters.add_ticket(t)
+        if parent_id is not None:
+            self._children.setdefault(parent_id, set()).add(tid)
         self.totals_created += 1
+        self._emit("created", t)
+        if message:
+            self.add_reply(t, from_name, email, message)
+
+        # Route to the least-loaded agent with a matching skill (unless a
+        # listener, e.g. an automation rule, already assigned it)
+        if self.assigner is not None and self.auto_assign and t.assigned_to is None:
+            target = self.assigner.pick_for_ticket(t)
+            if target is not None:
+                self.assign_ticket(t, target)
+        return t
+
+    def find_duplicates(self, subject: str, email: Optional[str] = None, limit: int = 5,
+                        same_requester: bool = False):
+        """
+        Return [(Ticket, similarity)] for open tickets resembling a new submission.
+        With same_requester, only tickets from `email` itself (the public form
+        must not show other requesters' tickets; the detector matches by domain).
+        """
+        out = []
+        if same_requester:
+            email = normalize_email(email)
+            if not email:
+                return out
+            limit, wanted = limit * 4, limit    # some matches will be other requesters'
+        for tid, score in self.dedup.find_similar(subject, email, limit=limit):
+            t = self.tickets.get(tid)
+            if t is None or (same_requester and normalize_email(t.email) != email):
+                continue
+            out.append((t, score))
+        return out[:wanted] if same_requester else out
+
+    def merge_ticket(self, dup: Ticket, into: Ticket, actor: Optional[User] = None) -> Ticket:
+        """
+        Agent action: fold duplicate `dup` into `into`. A note on each records
+        the merge, child incidents move to `into`, and `dup` is resolved
+        (without cascading to them).
+        """
+        if dup.id == into.id:
+            raise ValueError("A ticket can't be merged into itself.")
+        by = actor.name if actor is not None else "System"
+        text = "Merged duplicate Ticket {} from {} ({}): {}".format(
+            dup.id, dup.from_name, dup.email or "no email", dup.subject)
+        into.internal_notes.append({"by": by, "text": text})
+        self._emit("noted", into, actor, {"note": (None, text)})
+        note = "Merged into Ticket {}.".format(into.id)
+        dup.internal_notes.append({"by": by, "text": note})
+        self._emit("noted", dup, actor, {"note": (None, note)})
+        if into.id in self._descendant_ids(dup.id):
+            self.link_ticket(into, None, actor)
+        for cid in sorted(self._children.get(dup.id, ())):
+            self.link_ticket(self.tickets[cid], into, actor)
+        self.resolve_tickets([dup.id], actor, cascade=False)
+        return into
+
+    def add_reply(self, t: Ticket, from_name: str, email: Optional[str], text: str) -> Ticket:
+        """Record a public reply from the requester (e.g. via the email gateway)."""
+        by = "{} <{}>".format(from_name, email) if email else from_name
+        t.internal_notes.append({"by": by, "text": text, "public": True})
+        self._emit("replied", t, None, {"note": (None, text)})
         return t
 
     def get_ticket(self, ticket_id: int) -> Optional[Ticket]:
         """Lookup a ticket by id or return None."""
         return self.tickets.get(ticket_id)
 
+    def get_archived(self, ticket_id: int) -> Optional[Ticket]:
+        """Lookup a resolved (archived) ticket by id or return None."""
+        return self.archived.get(ticket_id)
+
+    def get_user_tickets(self, user: User) -> List[Ticket]:
+        """The user's claimed open tickets (stale claims are pruned)."""
+        return claimed_items(user, user.tickets_claimed, self.tickets)
+
+    # -------------------------------------------------------------------------
+    # Incident Links & Resolution
+    # -------------------------------------------------------------------------
+    def get_children(self, ticket_id: int) -> List[Ticket]:
+        """Open child tickets attached to the given parent incident."""
+        return [self.tickets[c] for c in sorted(self._children.get(ticket_id, ()))
+                if c in self.tickets]
+
+    def _descendant_ids(self, ticket_id: int) -> List[int]:
+        """All open tickets below `ticket_id` in the incident tree (breadth-first)."""
+        out = []
+        queue = [ticket_id]
+        seen = {ticket_id}
+        while queue:
+            current = queue.pop(0)
+            for c in sorted(self._children.get(current, ())):
+                if c in self.tickets and c not in seen:
+                    seen.add(c)
+                    out.append(c)
+                    queue.append(c)
+        return out
+
+    def link_ticket(self, child: Ticket, parent: Optional[Ticket],
+                    actor: Optional[User] = None) -> bool:
+        """
+        Attach `child` to the `parent` incident (or detach it when parent is None).
+        Returns False if the link would create a cycle.
+        """
+        if parent is not None:
+            if parent.id == child.id or parent.id in self._descendant_ids(child.id):
+                return False
+
+        if child.parent_id is not None:
+            siblings = self._children.get(child.parent_id)
+            if siblings is not None:
+                siblings.discard(child.id)
+                if not siblings:
+                    del self._children[child.parent_id]
+
+        before = child.parent_id
+        child.parent_id = parent.id if parent is not None else None
+        if parent is not None:
+            self._children.setdefault(parent.id, set()).add(child.id)
+        self._emit("linked", child, actor, {"parent_id": (before, child.parent_id)})
+        return True
+
+    def resolution_plan(self, ticket_ids, cascade: bool = True):
+        """
+        Work out everything resolving `ticket_ids` touches: ([ticket ids], [task ids]).
+        With cascade, that is the tickets, every open descendant incident, and
+        all open tasks linked to any of them.
+        """
+        planned = []
+        seen = set()
+        for tid in ticket_ids:
+            if tid in seen or tid not in self.tickets:
+                continue
+            seen.add(tid)
+            planned.append(tid)
+            if cascade:
+                for c in self._descendant_ids(tid):
+                    if c not in seen:
+                        seen.add(c)
+                        planned.append(c)
+
+        task_ids = []
+        if cascade and self.task_manager is not None:
+            for tid in planned:
+                task_ids.extend(self.task_manager.task_ids_for_ticket(tid))
+        return planned, task_ids
+
+    def resolve_tickets(self, ticket_ids, user: Optional[User] = None, cascade: bool = True):
+        """
+        Resolve several tickets (and, by default, their child tickets and linked
+        tasks) in one batch: the plan is computed up front, then the store,
+        indexes, totals and every user's claim lists are updated together.
+        Returns (resolved ticket ids, resolved task ids).
+        """
+        ticket_ids, task_ids = self.resolution_plan(ticket_ids, cascade)
+        resolved = set(ticket_ids)
+        resolved_items = [self.tickets[i] for i in ticket_ids]
+        if task_ids:
+            resolved_items += [self.task_manager.tasks[i] for i in task_ids]
+
+        now = time.time()
+        for tid in ticket_ids:
+            ticket = self.tickets.pop(tid)
+            before = ticket.status
+            ticket.status = "Resolved"
+            ticket.resolved_at = now
+            self.archived[tid] = ticket
+            if self._dedup is not None:
+                self._dedup.remove(tid)
+            if self._search is not None:
+                self._search.set_state(tid, ARCHIVED)
+            # unlink from a parent that is staying open
+            if ticket.parent_id is not None and ticket.parent_id not in resolved:
+                siblings = self._children.get(ticket.parent_id)
+                if siblings is not None:
+                    siblings.discard(tid)
+                    if not siblings:
+                        del self._children[ticket.parent_id]
+            self._children.pop(tid, None)
+            self._emit("resolved", ticket, user, {"status": (before, "Resolved")})
+        self.totals_resolved += len(ticket_ids)
+
+        if task_ids:
+            task_ids = self.task_manager.resolve_tasks(task_ids, user, release=False)
+
+        if self.user_store is not None:
+            self._touch(self.user_store.release_claims(
+                ticket_ids=ticket_ids, task_ids=task_ids, holders=self._holders(resolved_items)))
+        elif user is not None:
+            for tid in ticket_ids:
+                user.unclaim_ticket(tid)
+        return ticket_ids, task_ids
+
+    def resolve_ticket(self, t: Ticket, user: Optional[User] = None, cascade: bool = True):
+        """Resolve one ticket; see resolve_tickets for the cascade rules."""
+        return self.resolve_tickets([t.id], user, cascade)
+
+    # -------------------------------------------------------------------------
+    # Assignment, Notes & Bulk Operations
+    # -------------------------------------------------------------------------
+    # Fields agents may filter on in bulk selections (see models/selection.py)
+    SELECT_FIELDS = ("id", "subject", "from_name", "email", "priority", "status",
+                     "department", "help_topic", "sla_plan", "assigned_to", "parent_id")
+
+    def select_tickets(self, expr: str) -> List[Ticket]:
+        """Open tickets matching a selection like '1-5,8' or 'priority=Low unassigned'."""
+        return select_items(self.tickets, expr, self.SELECT_FIELDS)
+
+    def assign_tickets(self, ticket_ids, target: User,
+                       actor: Optional[User] = None) -> List[Ticket]:
+        """
+        Assign several open tickets to `target` in one batch. Previous owners
+        lose the claims in a single pass over the user store. When `actor` is
+        the target this is a claim.
+        """
+        tickets = [self.tickets[i] for i in dict.fromkeys(ticket_ids) if i in self.tickets]
+        if not tickets:
+            return []
+        ids = [t.id for t in tickets]
+
+        released = []
+        if self.user_store is not None:
+            released = self.user_store.release_claims(ticket_ids=ids, holders=self._holders(tickets))
+        before = [t.assigned_to for t in tickets]
+        for t in tickets:
+            t.assigned_to = target.name
+        target.claim_tickets(ids)
+        self._touch(released + [target])
+
+        event = "claimed" if actor is not None and actor.id == target.id else "assigned"
+        for t, old in zip(tickets, before):
+            self._emit(event, t, actor, {"assigned_to": (old, target.name)})
+        return tickets
+
+    def _holders(self, items):
+        """Users currently assigned to any of `items` (the only claim lists to clean)."""
+        holders = {}
+        for it in items:
+            u = self.user_store.get_by_name(it.assigned_to)
+            if u is not None:
+                holders[u.id] = u
+        return list(holders.values())
+
+    def _touch(self, users):
+        """Tell the assignment engine (if any) that these users' loads changed."""
+        if self.assigner is not None and users:
+            self.assigner.touch(users)
+
+    def rebalance_user(self, user: User) -> List[Ticket]:
+        """
+        Re-route every open ticket held by `user` (e.g. after they went
+        Inactive) to the best remaining agent. Returns the moved tickets.
+        """
+        if self.assigner is None:
+            return []
+        moved = []
+        for t in self.get_user_tickets(user):
+            target = self.assigner.pick_for_ticket(t, exclude=user)
+            if target is None:
+                break
+            self.assign_ticket(t, target)
+            moved.append(t)
+        return moved
+
+    def assign_ticket(self, t: Ticket, target: User, actor: Optional[User] = None) -> Ticket:
+        """Assign (or claim, when target is the acting user) one ticket."""
+        self.assign_tickets([t.id], target, actor)
+        return t
+
+    # Fields update_ticket may change (status, assignment and links have their own calls)
+    EDITABLE_FIELDS = ("priority", "department", "help_topic", "sla_plan")
+
+    def update_ticket(self, t: Ticket, actor: Optional[User] = None, **fields) -> dict:
+        """Set editable fields on an open ticket; emits 'updated' with what changed."""
+        unknown = set(fields) - set(self.EDITABLE_FIELDS)
+        if unknown:
+            raise ValueError("Can't set {} on a ticket.".format(", ".join(sorted(unknown))))
+        changes = {f: (getattr(t, f), v) for f, v in fields.items() if getattr(t, f) != v}
+        for f, (_, v) in changes.items():
+            setattr(t, f, v)
+        if changes:
+            self._emit("updated", t, actor, changes)
+        return changes
+
+    def set_status(self, t: Ticket, status: str, actor: Optional[User] = None) -> dict:
+        """
+        Set an open ticket's status (resolving has its own call); emits 'updated'
+        so the audit log and history see the change.
+        """
+        if status == "Resolved":
+            raise ValueError("Use resolve_ticket() to resolve a ticket.")
+        if t.status == status:
+            return {}
+        changes = {"status": (t.status, status)}
+        t.status = status
+        self._emit("updated", t, actor, changes)
+        return changes
+
+    def add_notes(self, ticket_ids, user: User, text: str) -> List[Ticket]:
+        """Append the same internal note to several open tickets."""
+        tickets = [self.tickets[i] for i in dict.fromkeys(ticket_ids) if i in self.tickets]
+        for t in tickets:
+            t.internal_notes.append({"by": user.name, "text": text})
+            self._emit("noted", t, user, {"note": (None, text)})
+        return tickets
+
+    def add_note(self, t: Ticket, user: User, text: str) -> Ticket:
+        """Append an internal note to one ticket."""
+        t.internal_notes.append({"by": user.name, "text": text})
+        self._emit("noted", t, user, {"note": (None, text)})
+        return t
+
     def print_stats(self):
         """Small stats dump used by the Dashboard."""
         print("==== Ticket Stats (Totals) ====")
@@ -139,20 +698,57 @@ class TicketManager:
     # -------------------------------------------------------------------------
     # Tickets Tab UI (agent workflow)
     # -------------------------------------------------------------------------
-    def run_ui(self, current_user: User):
+    def _can(self, perm: int, department: Optional[str] = None) -> bool:
+        """Authorization for the session driving the UI (O(1) bitmask test)."""
+        return self._session is None or self._session.can(perm, department)
+
+    def _can_work(self, t: Ticket) -> bool:
+        if self._can(Perm.WORK_TICKETS, t.department):
+            return True
+        print("❌ You don't have permission to work on Ticket {} ({}).\n".format(t.id, t.department))
+        return False
+
+    def _can_resolve(self, ticket_ids) -> bool:
+        """
+        Resolving cascades to child tickets and linked tasks; refuse when any of
+        them is outside the session's departments.
+        """
+        ticket_ids, task_ids = self.resolution_plan(ticket_ids)
+        blocked = ["Ticket {} ({})".format(i, self.tickets[i].department) for i in ticket_ids
+                   if not self._can(Perm.WORK_TICKETS, self.tickets[i].department)]
+        for i in task_ids:
+            task = self.task_manager.tasks[i]
+            if not self._can(Perm.WORK_TASKS, task.department):
+                blocked.append("Task {} ({})".format(i, task.department))
+        if not blocked:
+            return True
+        print("❌ Resolving would also close work outside your departments: {}{}\n".format(
+            ", ".join(blocked[:10]), " …" if len(blocked) > 10 else ""))
+        return False
+
+    def run_ui(self, current_user: User, session=None):
         """Entry point for the Tickets tab loop."""
+        self._session = session
         print(f"\n=== {current_user.name} is now in the Tickets Tab ===\n")
         running = True
         while running:
-            self._print_ticket_list()
-
-            print("\nActions:")
-            print("1) Claim a ticket")
-            print("2) See my tickets")
-            print("3) Access / work on a ticket")
-            print("0) Back to tabs\n")
-
-            choice = input("Enter a number: ").strip()
+            self._print_ticket_list(menu=[
+                "",
+                "Actions:",
+                "1) Claim a ticket",
+                "2) See my tickets",
+                "3) Access / work on a ticket",
+                "4) Bulk actions (claim/assign/note/resolve many)",
+                "5) Macros (list/create/delete)",
+                "6) Search tickets (subject, requester, email)",
+                "7) Requester history (email or @domain)",
+                "0) Back to tabs",
+                "",
+            ])
+
+            choice = self.list_view.prompt().strip()
+            if self.list_view.page(choice):
+                continue
             if choice == "0":
                 print("\nReturning to tabs...\n")
                 running = False
@@ -162,52 +758,160 @@ class TicketManager:
                 self._show_my_tickets(current_user)
             elif choice == "3":
                 self._access_ticket_ui(current_user)
+            elif choice == "4":
+                if self._can(Perm.BULK_ACTIONS):
+                    self._bulk_actions_ui(current_user)
+                else:
+                    print("❌ You don't have permission to do that.\n")
+            elif choice == "5":
+                self._macros_ui()
+            elif choice == "6":
+                self._search_ui()
+            elif choice == "7":
+                self._requester_ui()
             else:
                 print("\n❌ Invalid option. Try again.\n")
+        self._session = None
 
-    def _print_ticket_list(self):
-        """Render the current (open) tickets table."""
-        if not self.tickets:
-            print("(no tickets)")
+    def _print_ticket_list(self, menu=()):
+        """Render the current (open) tickets table, one page at a time, followed by `menu`."""
+        allowed = {}        # department -> may view (one permission check per department)
+        rows = []
+        hidden = 0
+        for t in self.tickets.values():
+            ok = allowed.get(t.department)
+            if ok is None:
+                ok = allowed[t.department] = self._can(Perm.VIEW_QUEUE, t.department)
+            if not ok:
+                continue
+            # child tickets are shown under their parent incident, not in the queue
+            if t.parent_id is not None and t.parent_id in self.tickets:
+                hidden += 1
+                continue
+            rows.append(t)
+        notes = [f"({hidden} linked ticket(s) grouped under their parent incident)"] if hidden else []
+        self.list_view.draw(rows, self._ticket_row, notes=notes, menu=menu)
+
+    def _ticket_row(self, t: Ticket) -> str:
+        assigned = t.assigned_to if t.assigned_to else "Unassigned"
+        subject = t.subject[:28]
+        linked = len(self._children.get(t.id, ()))
+        if linked:
+            subject = "{} (+{})".format(subject, linked)
+        return f"{t.id:<4} {subject:<38} {t.from_name:<12} {t.priority:<8} {t.status:<12} {assigned:<15}"
+
+    def _print_search_results(self, results):
+        lines = ["{:<6} {:<34} {:<14} {:<24} {:<9} {:>5}".format(
+                     "ID", "Subject", "From", "Email", "Status", "Match"), "-" * 97]
+        lines.extend("{:<6} {:<34} {:<14} {:<24} {:<9} {:>5}".format(
+            t.id, t.subject[:34], t.from_name[:14], (t.email or "-")[:24], t.status,
+            "{:.0%}".format(score)) for t, score in results)
+        write_lines(lines)
+
+    def _ticket_id_ui(self, prompt: str) -> Optional[int]:
+        """
+        Ask for a ticket id; anything that is not a number is treated as a
+        fuzzy search over open tickets and the agent picks from the results.
+        Returns None when cancelled.
+        """
+        s = input(prompt).strip()
+        if s.isdigit() and s != "0":
+            return int(s)
+        if s in ("", "0"):
+            return None
+        results = [(t, score) for t, score in self.search_tickets(s, limit=10)
+                   if self._can(Perm.VIEW_QUEUE, t.department)]
+        if not results:
+            print("❌ No open tickets match '{}'.".format(s))
+            return None
+        self._print_search_results(results)
+        s = input("Enter the ID from the list (or 0 to cancel): ").strip()
+        return int(s) if s.isdigit() and s != "0" else None
+
+    def _search_ui(self):
+        """Fuzzy search over open and resolved tickets (subject, requester, email)."""
+        query = input("\nSearch tickets (e.g. 'taylr portal login', blank to cancel): ").strip()
+        if not query:
+            print("Cancelled.\n")
             return
+        results = [(t, score) for t, score in
+                   self.search_tickets(query, limit=20, include_archived=True)
+                   if self._can(Perm.VIEW_QUEUE, t.department)]
+        if not results:
+            print("(no matching tickets)\n")
+            return
+        self._print_search_results(results)
+        s = input("Enter an ID to view (or Enter to return): ").strip()
+        t = (self.get_ticket(int(s)) or self.get_archived(int(s))) if s.isdigit() else None
+        if t is not None and any(t is r for r, _ in results):
+            self._print_ticket_details(t)
+            input("Press Enter to return...")
 
-        print(f"{'ID':<4} {'Subject':<38} {'From':<12} {'Priority':<8} {'Status':<12} {'Assigned To':<15}")
-        print("-" * 100)
-        for t in self.tickets.values():
-            assigned = t.assigned_to if t.assigned_to else "Unassigned"
-            print(f"{t.id:<4} {t.subject[:28]:<38} {t.from_name:<12} {t.priority:<8} {t.status:<12} {assigned:<15}")
+    @staticmethod
+    def _day(ts: Optional[float]) -> str:
+        return time.strftime("%Y-%m-%d", time.localtime(ts)) if ts else "-"
+
+    def _requester_ui(self):
+        """Every ticket, open and resolved, from one requester email or a whole @domain."""
+        s = input("\nRequester email, or @domain for a whole organisation (blank to cancel): ").strip()
+        if not s:
+            print("Cancelled.\n")
+            return
+        if s.startswith("@"):
+            tickets = self.requester_tickets(domain=s)
+        elif normalize_email(s):
+            tickets = self.requester_tickets(email=s)
+        else:
+            print("❌ '{}' is not an email address or @domain.\n".format(s))
+            return
+        tickets = [t for t in tickets if self._can(Perm.VIEW_QUEUE, t.department)]
+        if not tickets:
+            print("(no tickets from {})\n".format(s))
+            return
+        open_count = sum(1 for t in tickets if t.id in self.tickets)
+        lines = ["", "--- Tickets from {} ({} open, {} resolved) ---".format(
+                     s, open_count, len(tickets) - open_count),
+                 "{:<6} {:<34} {:<24} {:<9} {:<15} {:<10} {:<10}".format(
+                     "ID", "Subject", "Email", "Status", "Assigned To", "Opened", "Resolved"),
+                 "-" * 112]
+        lines.extend("{:<6} {:<34} {:<24} {:<9} {:<15} {:<10} {:<10}".format(
+            t.id, t.subject[:34], (t.email or "-")[:24], t.status, (t.assigned_to or "Unassigned")[:15],
+            self._day(t.created_at), self._day(t.resolved_at)) for t in tickets)
+        write_lines(lines)
+        s = input("Enter an ID to view (or Enter to return): ").strip()
+        t = next((t for t in tickets if s.isdigit() and t.id == int(s)), None)
+        if t is not None:
+            self._print_ticket_details(t)
+            input("Press Enter to return...")
 
     def _claim_ticket_ui(self, user: User):
         """Claim a ticket: assigns it to the current agent and records on the User."""
         print(f"\nClaim Ticket (as {user.name})")
-        ticket_id = input("Enter the ID of the ticket you want to claim (or 0 to cancel): ").strip()
-
-        if ticket_id == "0":
+        tid = self._ticket_id_ui("Enter the ID of the ticket you want to claim, "
+                                 "or search text (0 to cancel): ")
+        if tid is None:
             print("Cancelled claiming.\n")
             return
-        if not ticket_id.isdigit():
-            print("❌ Invalid input. Please enter a number.\n")
-            return
 
-        tid = int(ticket_id)
         ticket = self.get_ticket(tid)
         if ticket is None:
             print("❌ Ticket not found.\n")
             return
+        if not self._can_work(ticket):
+            return
 
-        # Update both sides: ticket + user
-        ticket.assigned_to = user.name
-        user.claim_ticket(ticket)
+        # Update both sides: ticket + user (previous owner loses the claim)
+        self.assign_ticket(ticket, user, user)
 
         print(f"✅ Ticket {tid} ('{ticket.subject}') is now assigned to {user.name}.\n")
 
     def _show_my_tickets(self, user: User):
         """Submenu that lists tickets claimed by the given user, with a quick access flow."""
-        claimed_ids = user.tickets_claimed
-
         while True:
+            my_tickets = self.get_user_tickets(user)
+
             print("\n=== My Tickets (for {}) ===".format(user.name))
-            if not claimed_ids:
+            if not my_tickets:
                 print("(You have not claimed any tickets yet.)\n")
                 return
 
@@ -216,10 +920,7 @@ class TicketManager:
                 "ID", "Subject", "From", "Priority", "Status", "Assigned To"))
             print("-" * 90)
 
-            for tid in claimed_ids:
-                t = self.get_ticket(tid)
-                if not t:
-                    continue
+            for t in my_tickets:
                 assigned = t.assigned_to if t.assigned_to else "Unassigned"
                 print("{:<4} {:<30} {:<12} {:<8} {:<12} {:<15}".format(
                     t.id, t.subject[:28], t.from_name, t.priority, t.status, assigned))
@@ -240,19 +941,18 @@ class TicketManager:
 
     def _access_ticket_ui(self, user: User):
         """Open a specific ticket by id and provide per-ticket actions."""
-        ticket_id = input("Enter the ID of the ticket to access (or 0 to cancel): ").strip()
-        if ticket_id == "0":
+        tid = self._ticket_id_ui("Enter the ID of the ticket to access, "
+                                 "or search text (0 to cancel): ")
+        if tid is None:
             print("Cancelled.\n")
             return
-        if not ticket_id.isdigit():
-            print("❌ Invalid input. Please enter a number.\n")
-            return
 
-        tid = int(ticket_id)
         t = self.get_ticket(tid)
         if not t:
             print("❌ Ticket not found.\n")
             return
+        if not self._can_work(t):
+            return
 
         while True:
             self._print_ticket_details(t)
@@ -260,6 +960,10 @@ class TicketManager:
             print("1) Internal notes (view/add)")
             print("2) Update status (Open/Resolved)")
             print("3) Assign/Escalate to another agent")
+            print("4) Link to a parent incident")
+            print("5) History")
+            print("6) Apply a macro")
+            print("7) Merge into a duplicate ticket")
             print("0) Back\n")
 
             choice = input("Enter a number: ").strip()
@@ -273,7 +977,24 @@ class TicketManager:
                 if self.get_ticket(t.id) is None:
                     return
             elif choice == "3":
-                self._assign_ticket_ui(t, user)
+                if self._can(Perm.ASSIGN_OTHERS, t.department):
+                    self._assign_ticket_ui(t, user)
+                else:
+                    print("❌ You don't have permission to do that.\n")
+            elif choice == "4":
+                self._link_ticket_ui(t, user)
+            elif choice == "5":
+                if self._can(Perm.VIEW_AUDIT):
+                    self._history_ui(t)
+                else:
+                    print("❌ You don't have permission to do that.\n")
+            elif choice == "6":
+                self._apply_macro_ui([t.id], user)
+                if self.get_ticket(t.id) is None:
+                    return
+            elif choice == "7":
+                if self._merge_ticket_ui(t, user):
+                    return
             else:
                 print("\n❌ Invalid option. Try again.\n")
 
@@ -288,6 +1009,15 @@ class TicketManager:
         print("Help Topic:  {}".format(t.help_topic))
         print("Printing:    {}".format("Enabled" if t.printing else "Disabled"))
         print("Email:       {}".format(t.email if t.email else "(unknown)"))
+        if t.parent_id is not None:
+            print("Parent:      Ticket {}".format(t.parent_id))
+        children = self.get_children(t.id)
+        if children:
+            print("Children:    {}".format(", ".join(str(c.id) for c in children)))
+        if self.task_manager is not None:
+            task_ids = self.task_manager.task_ids_for_ticket(t.id)
+            if task_ids:
+                print("Tasks:       {}".format(", ".join(str(i) for i in task_ids)))
         print("")
 
     def _internal_notes_ui(self, t: Ticket, user: User):
@@ -297,14 +1027,15 @@ class TicketManager:
             print("(no internal notes yet)")
         else:
             for i, n in enumerate(t.internal_notes, start=1):
-                print("{}: [{}] {}".format(i, n.get("by", "Unknown"), n.get("text", "")))
+                kind = " (reply)" if n.get("public") else ""
+                print("{}: [{}]{} {}".format(i, n.get("by", "Unknown"), kind, n.get("text", "")))
         print("")
 
         add = input("Add a new note? (y/n): ").strip().lower()
         if add == "y":
             text = input("Note text (blank to cancel): ").strip()
             if text:
-                t.internal_notes.append({"by": user.name, "text": text})
+                self.add_note(t, user, text)
                 print("✅ Note added.\n")
             else:
                 print("Cancelled.\n")
@@ -321,20 +1052,27 @@ class TicketManager:
             print("Cancelled.\n")
             return
         elif choice == "1":
-            t.status = "Open"
+            self.set_status(t, "Open", user)
             print("✅ Status set to Open.\n")
         elif choice == "2":
-            t.status = "Resolved"
-            # remove from store so it disappears from lists
-            if t.id in self.tickets:
-                del self.tickets[t.id]
-            self.totals_resolved += 1
-            # best-effort: remove from current user's claimed list if present
-            try:
-                user.unclaim_ticket(t.id)
-            except Exception:
-                pass
-            print("✅ Ticket {} resolved and removed.\n".format(t.id))
+            if not self._can_resolve([t.id]):
+                return
+            ticket_ids, task_ids = self.resolution_plan([t.id])
+            extra_tickets = len(ticket_ids) - 1
+            if extra_tickets or task_ids:
+                print("This will also resolve {} child ticket(s) and {} linked task(s).".format(
+                    extra_tickets, len(task_ids)))
+                if input("Continue? (y/n): ").strip().lower() != "y":
+                    print("Cancelled.\n")
+                    return
+            # removes from store so it disappears from lists
+            ticket_ids, task_ids = self.resolve_ticket(t, user)
+            print("✅ Ticket {} resolved and removed.".format(t.id))
+            if len(ticket_ids) > 1 or task_ids:
+                print("   Also resolved: tickets {} | tasks {}".format(
+                    ", ".join(str(i) for i in ticket_ids[1:]) or "-",
+                    ", ".join(str(i) for i in task_ids) or "-"))
+            print("")
         else:
             print("❌ Invalid option.\n")
 
@@ -343,16 +1081,28 @@ class TicketManager:
         Assign/Escalate a ticket to another active user (Agent or Admin).
         Excludes the current user from the candidate list.
         """
+        target = self._pick_assignee_ui(current_user, "Assign/Escalate Ticket {}".format(t.id), t)
+        if target is None:
+            return
+
+        # Do the reassignment: unclaim from all, then assign to target
+        self.assign_ticket(t, target, current_user)
+
+        print("✅ Ticket {} assigned to {}.\n".format(t.id, target.name))
+
+    def _pick_assignee_ui(self, current_user: User, heading: str,
+                          ticket: Optional[Ticket] = None) -> Optional[User]:
+        """Show active users (except the current one) and prompt for a USER ID."""
         # Must have a user store to list candidates
         if not hasattr(self, "user_store") or self.user_store is None:
             print("❌ Cannot assign: user store not available.\n")
-            return
+            return None
 
         # 1) Build candidate list: ALL ACTIVE USERS (Agents + Admins)
         all_users = self.user_store.list_users()
         candidates = []
         for u in all_users:
-            if isinstance(u.status, str) and u.status.lower() == "active":
+            if u.is_active:
                 candidates.append(u)
 
         # Exclude the current user (so you can't assign to yourself)
@@ -367,52 +1117,279 @@ class TicketManager:
 
         if not display:
             print("❌ No eligible users found.\n")
-            return
+            return None
 
         # 2) Show the table (note the header says USER ID)
-        print("\n--- Assign/Escalate Ticket {} ---".format(t.id))
-        print("{:<4} {:<20} {:<8} {:<8}".format("ID", "Name", "Role", "Status"))
-        print("-" * 48)
-        for u in display:
-            print("{:<4} {:<20} {:<8} {:<8}".format(u.id, u.name, u.role, u.status))
-        print("-" * 48)
+        write_lines(["", "--- {} ---".format(heading)] + format_user_table(display))
+
+        suggested = None
+        if self.assigner is not None and ticket is not None:
+            suggested = self.assigner.pick_for_ticket(ticket, exclude=current_user)
+        if suggested is not None:
+            print("Suggested (least loaded with matching skills): {} — enter 'a' to use".format(
+                suggested.name))
 
         # 3) Prompt for USER ID (NOT menu index)
         s = input("Enter USER ID to assign to (or 0 to cancel): ").strip()
         if s == "0":
             print("Cancelled.\n")
-            return
+            return None
+        if s.lower() == "a" and suggested is not None:
+            return suggested
         if not s.isdigit():
             print("❌ Invalid input. Please enter a number.\n")
-            return
+            return None
 
         target_id = int(s)
 
         # Ensure the chosen ID is actually in our displayed list
-        target = None
         for u in display:
             if u.id == target_id:
-                target = u
-                break
+                return u
+
+        print("❌ That USER ID was not in the list above.\n")
+        return None
+
+    def _bulk_actions_ui(self, user: User):
+        """Select many tickets by ids/ranges/filters and apply one action to all of them."""
+        print("\n--- Bulk Actions ---")
+        print("Select tickets by ids and/or filters, e.g.:")
+        print("  1-5,8    priority=Low department=Support unassigned    subject~vpn")
+        expr = input("Selection (or 0 to cancel): ").strip()
+        if expr == "0" or not expr:
+            print("Cancelled.\n")
+            return
+        try:
+            selected = self.select_tickets(expr)
+        except ValueError as e:
+            print("❌ {}\n".format(e))
+            return
+        # only tickets in the agent's department scope
+        selected = [t for t in selected if self._can(Perm.WORK_TICKETS, t.department)]
+        if not selected:
+            print("No open tickets match that selection.\n")
+            return
 
-        if target is None:
-            print("❌ That USER ID was not in the list above.\n")
+        ids = [t.id for t in selected]
+        preview = ", ".join(str(i) for i in ids[:20]) + (" …" if len(ids) > 20 else "")
+        print("\nMatched {} ticket(s): {}".format(len(ids), preview))
+        print("1) Claim all")
+        print("2) Assign all to another agent")
+        print("3) Add the same internal note")
+        print("4) Resolve all (cascades to linked tickets/tasks)")
+        print("5) Apply a macro")
+        choice = input("Choose an action (or 0 to cancel): ").strip()
+
+        if choice == "1":
+            self.assign_tickets(ids, user, user)
+            print("✅ Claimed {} ticket(s).\n".format(len(ids)))
+        elif choice == "2" and not self._can(Perm.ASSIGN_OTHERS):
+            print("❌ You don't have permission to do that.\n")
+        elif choice == "2":
+            target = self._pick_assignee_ui(user, "Assign {} Tickets".format(len(ids)))
+            if target is not None:
+                self.assign_tickets(ids, target, user)
+                print("✅ Assigned {} ticket(s) to {}.\n".format(len(ids), target.name))
+        elif choice == "3":
+            text = input("Note text (blank to cancel): ").strip()
+            if text:
+                self.add_notes(ids, user, text)
+                print("✅ Note added to {} ticket(s).\n".format(len(ids)))
+            else:
+                print("Cancelled.\n")
+        elif choice == "4" and not self._can_resolve(ids):
             return
+        elif choice == "4":
+            confirm = input("Type RESOLVE to resolve {} ticket(s): ".format(len(ids))).strip()
+            if confirm == "RESOLVE":
+                ticket_ids, task_ids = self.resolve_tickets(ids, user)
+                print("✅ Resolved {} ticket(s) and {} linked task(s).\n".format(
+                    len(ticket_ids), len(task_ids)))
+            else:
+                print("Cancelled.\n")
+        elif choice == "5":
+            self._apply_macro_ui(ids, user)
+        else:
+            print("Cancelled.\n")
 
-        # 4) Do the reassignment: unclaim from all, then assign to target
-        for u in self.user_store.list_users():
-            try:
-                u.unclaim_ticket(t.id)
-            except Exception:
-                pass
+    # ---------- macros ----------
+    def _choose_macro_ui(self):
+        if self.macros is None or not self.macros.names():
+            print("(no macros defined)\n")
+            return None
+        names = self.macros.names()
+        for i, name in enumerate(names, start=1):
+            m = self.macros.get(name)
+            print("{}) {:<18} {}".format(i, name, m.description or m.summary()))
+        s = input("Macro number (or 0 to cancel): ").strip()
+        if not s.isdigit() or not 1 <= int(s) <= len(names):
+            print("Cancelled.\n")
+            return None
+        return self.macros.get(names[int(s) - 1])
+
+    def _apply_macro_ui(self, ids, user: User):
+        """Run a macro over the given tickets (one batch per action)."""
+        print("\n--- Apply Macro to {} ticket(s) ---".format(len(ids)))
+        macro = self._choose_macro_ui()
+        if macro is None:
+            return
+        if macro.assigns_to_others() and not self._can(Perm.ASSIGN_OTHERS):
+            print("❌ You don't have permission to do that.\n")
+            return
+        if macro.resolves() and not self._can_resolve(ids):
+            return
+        params = {}
+        for p in macro.params:
+            value = input("{}: ".format(p)).strip()
+            if not value:
+                print("Cancelled.\n")
+                return
+            params[p] = value
+        if macro.resolves() and len(ids) > 1:
+            confirm = input("This resolves {} ticket(s). Type RESOLVE to continue: ".format(
+                len(ids))).strip()
+            if confirm != "RESOLVE":
+                print("Cancelled.\n")
+                return
+        try:
+            result = macro.apply(self, ids, user, params)
+        except ValueError as e:
+            print("❌ {}\n".format(e))
+            return
+        print("✅ '{}' applied to {} ticket(s): {} note(s), {} assigned, {} reopened, "
+              "{} resolved.\n".format(macro.name, result["tickets"], result["notes"],
+                                      result["assigned"], result["reopened"],
+                                      len(result["resolved"])))
+
+    def _macros_ui(self):
+        """List, create or delete macros."""
+        if self.macros is None:
+            print("(macros not enabled)\n")
+            return
+        print("\n--- Macros ---")
+        for name in self.macros.names():
+            m = self.macros.get(name)
+            params = " ({})".format(", ".join(m.params)) if m.params else ""
+            print("{}{}: {}".format(name, params, m.summary()))
+        print("\n1) Create a macro")
+        print("2) Delete a macro")
+        choice = input("Choose (or 0 to go back): ").strip()
+        if choice == "1":
+            if self._can(Perm.BULK_ACTIONS):
+                self._create_macro_ui()
+            else:
+                print("❌ You don't have permission to do that.\n")
+        elif choice == "2":
+            if not self._can(Perm.BULK_ACTIONS):
+                print("❌ You don't have permission to do that.\n")
+                return
+            name = input("Macro name to delete: ").strip()
+            if self.macros.remove(name):
+                print("✅ Macro '{}' deleted.\n".format(name))
+            else:
+                print("❌ No macro named '{}'.\n".format(name))
 
-        t.assigned_to = target.name
-        target.claim_ticket(t)
+    def _create_macro_ui(self):
+        print("\nNotes may use {from_name}, {subject}, {department}, {email}, {id}, {agent}")
+        print("and any parameters you declare (asked for when the macro runs).")
+        name = input("Name (blank to cancel): ").strip()
+        if not name:
+            print("Cancelled.\n")
+            return
+        description = input("Description: ").strip()
+        params = [p.strip() for p in input("Parameters (comma separated, optional): ").split(",")
+                  if p.strip()]
+        actions = []
+        while True:
+            print("Add action: 1) Note  2) Assign  3) Resolve  0) Done")
+            a = input("> ").strip()
+            if a == "0":
+                break
+            elif a == "1":
+                text = input("Note template: ").strip()
+                if text:
+                    actions.append({"type": "note", "text": text})
+            elif a == "2":
+                to = input("Assign to ('me', 'suggest' or a user name): ").strip()
+                if to:
+                    actions.append({"type": "assign", "to": to})
+            elif a == "3":
+                actions.append({"type": "status", "value": "Resolved"})
+        if not actions:
+            print("Cancelled.\n")
+            return
+        try:
+            macro = Macro(name, actions, description, params)
+        except (ValueError, KeyError) as e:
+            print("❌ {}\n".format(e))
+            return
+        self.macros.add(macro)
+        print("✅ Macro '{}' saved.\n".format(name))
+
+    def _history_ui(self, t: Ticket):
+        """Show every recorded change to this ticket, oldest first."""
+        print("\n--- History: Ticket {} ---".format(t.id))
+        if self.audit is None:
+            print("(audit log not enabled)\n")
+            return
+        records = self.audit.history("ticket", t.id)
+        if not records:
+            print("(no recorded changes)\n")
+            return
+        for r in records:
+            print(format_audit_record(r))
+        print("")
 
-        print("✅ Ticket {} assigned to {}.\n".format(t.id, target.name))
+    def _merge_ticket_ui(self, t: Ticket, user: User) -> bool:
+        """Merge this ticket into a similar open one. True if it was merged (and resolved)."""
+        print("\n--- Merge Ticket {} ---".format(t.id))
+        matches = [(d, score) for d, score in self.find_duplicates(t.subject, t.email, limit=6)
+                   if d.id != t.id and self._can(Perm.VIEW_QUEUE, d.department)]
+        if matches:
+            print("Similar open tickets:")
+            for d, score in matches[:5]:
+                print("  {:<4} {:<38} {:<16} {:.0%}".format(
+                    d.id, d.subject[:36], (d.email or "-")[:16], score))
+        s = input("Merge into ticket ID (0 to cancel): ").strip()
+        target = self.get_ticket(int(s)) if s.isdigit() and s != "0" else None
+        if target is None or target.id == t.id:
+            print("Cancelled.\n")
+            return False
+        if not self._can_work(target):
+            return False
+        self.merge_ticket(t, target, user)
+        print("✅ Ticket {} merged into Ticket {} and resolved.\n".format(t.id, target.id))
+        return True
+
+    def _link_ticket_ui(self, t: Ticket, user: User):
+        """Attach this ticket to a parent incident, or detach it (enter 'none')."""
+        print("\n--- Link Ticket {} ---".format(t.id))
+        print("Current parent: {}".format(t.parent_id if t.parent_id is not None else "(none)"))
+        s = input("Parent ticket ID ('none' to detach, 0 to cancel): ").strip().lower()
+        if s == "0":
+            print("Cancelled.\n")
+            return
+        if s == "none":
+            self.link_ticket(t, None, user)
+            print("✅ Ticket {} detached from its parent.\n".format(t.id))
+            return
+        if not s.isdigit():
+            print("❌ Invalid input. Please enter a number.\n")
+            return
+
+        parent = self.get_ticket(int(s))
+        if parent is None:
+            print("❌ Parent ticket not found (it may already be resolved).\n")
+            return
+        if not self._can_work(parent):
+            return
+        if not self.link_ticket(t, parent, user):
+            print("❌ Cannot link: that would create a cycle.\n")
+            return
+        print("✅ Ticket {} is now linked under incident {}.\n".format(t.id, parent.id))
 
     # -------------------------------------------------------------------------
-    # Client Submission UI (public form)
+    # Client Submission UI (public form + status lookup)
     # -------------------------------------------------------------------------
     def submit_ticket_ui(self):
         """
@@ -432,6 +1409,10 @@ class TicketManager:
             print("\n❌ Subject is required.\n")
             return
 
+        # Self-service first: popular KB articles matching the subject
+        if self.kb is not None and self._suggest_articles(subject):
+            return
+
         # Requester name
         from_name = input("\nYour Name: ").strip()
         if from_name == "0":
@@ -489,17 +1470,44 @@ class TicketManager:
 
         printing = False  # kept hidden for now
 
-        # Create
-        t = self.create_ticket(
-            subject=subject,
-            from_name=from_name,
-            priority=priority,
-            email=email,
-            department=department,
-            sla_plan=sla_plan,
-            help_topic=help_topic,
-            printing=printing,
-        )
+        # Create (through the rate-limited intake when one is wired in)
+        fields = dict(subject=subject, from_name=from_name, priority=priority, email=email,
+                      department=department, sla_plan=sla_plan, help_topic=help_topic,
+                      printing=printing)
+        if self.intake is not None:
+            refused = self.intake.check(fields, source="console")
+            if refused is not None:
+                self._intake_refused(refused)
+                return
+
+        # Duplicate check against this requester's own open tickets; agents
+        # merge or link duplicates from the queue
+        matches = self.find_duplicates(subject, email, same_requester=True)
+        if matches and not self._duplicate_prompt(matches):
+            print("\nCancelled — we'll keep working on your existing ticket.\n")
+            return
+
+        if self.intake is not None:
+            result = self.intake.submit(fields, source="console")
+            if result.status in ("rate_limited", "busy"):
+                self._intake_refused(result)
+                return
+            if result.status in ("queued", "spooled"):
+                print("\n" + "-" * 60)
+                print("✅ Thanks {}, your request was received and is number {} in line.".format(
+                    from_name, result.position))
+                print("   It will appear in the queue shortly.")
+                print("-" * 60 + "\n")
+                input("Press Enter to return...")
+                return
+            t = result.ticket
+        else:
+            try:
+                t = self.create_ticket(**fields)
+            except QuotaExceeded as e:
+                print("\n❌ We can't accept new tickets right now: {}.\n".format(e))
+                input("Press Enter to return...")
+                return
 
         # Receipt
         print("\n" + "-" * 60)
@@ -512,3 +1520,79 @@ class TicketManager:
         print("-" * 60 + "\n")
 
         input("Press Enter to return...")
+
+    def ticket_status_ui(self):
+        """
+        Public status check: the requester gives their email and one of their
+        ticket numbers, then sees every ticket they have submitted. Attempts
+        are rate-limited per email, domain and source by the intake.
+        """
+        print("\n" + "=" * 60)
+        print("   Check Ticket Status (enter 0 at any prompt to cancel)")
+        print("=" * 60 + "\n")
+        email = input("Your Email: ").strip()
+        if email == "0":
+            print("\nCancelled.\n")
+            return
+        s = input("One of your ticket numbers: ").strip()
+        if s == "0":
+            print("\nCancelled.\n")
+            return
+        # every attempt is charged, so ticket numbers can't be guessed quickly
+        wait = self.intake.allow_lookup(email, source="console") if self.intake is not None else 0
+        if wait > 0:
+            print("\n❌ Too many status checks. Please try again in {:.0f} second(s).\n".format(
+                max(1, wait)))
+            input("Press Enter to return...")
+            return
+        t = (self.get_ticket(int(s)) or self.get_archived(int(s))) if s.isdigit() else None
+        # the same message either way, so the form can't be used to probe ticket numbers
+        if t is None or not normalize_email(email) or normalize_email(t.email) != normalize_email(email):
+            print("\n❌ We couldn't find that ticket number for that email address.\n")
+            input("Press Enter to return...")
+            return
+
+        tickets = self.requester_tickets(email=email)
+        lines = ["", "Your tickets ({}):".format(normalize_email(email)),
+                 "{:<6} {:<38} {:<12} {:<10} {:<10}".format("ID", "Subject", "Status", "Opened", "Resolved"),
+                 "-" * 80]
+        lines.extend("{:<6} {:<38} {:<12} {:<10} {:<10}".format(
+            x.id, x.subject[:38], x.status, self._day(x.created_at), self._day(x.resolved_at))
+            for x in tickets)
+        write_lines(lines + [""])
+        input("Press Enter to return...")
+
+    def _suggest_articles(self, subject: str) -> bool:
+        """Offer KB articles for the subject; True if one solved the problem."""
+        articles = self.kb.suggest(subject)
+        if not articles:
+            return False
+        print("\nThese articles might already answer your question:")
+        for a in articles:
+            print("  {:<4} {}".format(a.id, a.title))
+        s = input("Open an article ID (Enter to continue with your ticket): ").strip()
+        a = self.kb.get_article(int(s)) if s.isdigit() else None
+        if a is None:
+            return False
+        if self.kb.show_article(a, signal="click"):
+            print("✅ Glad that helped — no ticket was needed.\n")
+            return True
+        print("Sorry that didn't help; let's continue with your ticket.")
+        return False
+
+    @staticmethod
+    def _intake_refused(result):
+        print("\n❌ We can't accept your ticket right now ({}). "
+              "Please try again in {:.0f} second(s).\n".format(
+                  result.reason, max(1, result.retry_after)))
+        input("Press Enter to return...")
+
+    def _duplicate_prompt(self, matches) -> bool:
+        """
+        Tell the requester they already have similar open tickets (their own,
+        by count only: the email on the form isn't verified). True to submit anyway.
+        """
+        print("\nYou already have {} open ticket(s) that look similar.".format(len(matches)))
+        print("  1) Submit as a new ticket anyway")
+        print("  2) Cancel (an agent is already on it)")
+        return input("Choose (1/2, default 1): ").strip() not in ("0", "2")
@@ -0,0 +1,347 @@
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from models.users import UserStore
+from models.tabs.tickets import TicketManager
+from models.tabs.tasks import TaskManager
+from models.tabs.knowledge_base import KnowledgeBase
+from models.tabs.dashboard import Dashboard
+from models.snapshot import Snapshot, save_snapshot
+from models.assignment import AssignmentEngine
+from models.notifications import Notifier, FileTransport
+from models.mail_gateway import MailGateway
+from models.audit import AuditLog, verify_segment
+from models.timetravel import TimeMachine
+from models.quotas import QUOTA_KEYS
+from models.auth import Authenticator
+from models.intake import Intake
+from models.macros import MacroLibrary
+from models.rules import RuleEngine
+from models.analytics import Analytics, HAVE_NUMPY
+from models.forecast import Forecaster
+from models.replication import ReplicationLeader
+from models.jobs import Scheduler
+
+# -----------------------------------------------------------------------------
+# Tenant (one organisation's helpdesk)
+# -----------------------------------------------------------------------------
+TENANT_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+
+class Tenant:
+    """
+    Everything one helpdesk needs, wired together: users, ticket/task/KB
+    managers (each with its own id counters and indexes), audit log, history,
+    routing, notifications and the optional mail gateway.
+    """
+
+    def __init__(self, name: str, snapshot_path: Optional[str] = None,
+                 data_dir: Optional[str] = None, mail_spool: Optional[str] = None,
+                 seed_users: Optional[Callable[[], UserStore]] = None, seed_data: bool = True,
+                 quotas: Optional[Dict[str, Optional[int]]] = None,
+                 replicate: Optional[str] = None, scheduler: Optional[Scheduler] = None):
+        self.name = name
+        # Shared background job scheduler (owned by the app); jobs are grouped by tenant name
+        self.scheduler = scheduler
+        self.snapshot_path = snapshot_path
+        self.snapshot = None
+        self.data_dir = data_dir
+        self.last_used = time.monotonic()
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+
+        if snapshot_path and os.path.exists(snapshot_path):
+            # Map the snapshot; notes, archive and KB bodies load on first access
+            self.snapshot = Snapshot(snapshot_path)
+            (self.user_store, self.ticket_manager,
+             self.task_manager, self.kb) = self.snapshot.load()
+        else:
+            self.user_store = seed_users() if seed_users else UserStore()
+
+            # Managers (pass user_store where needed)
+            self.ticket_manager = TicketManager(self.user_store, seed=seed_data)
+            self.task_manager = TaskManager(self.user_store, ticket_manager=self.ticket_manager,
+                                            seed=seed_data)
+            self.ticket_manager.task_manager = self.task_manager
+            self.kb = KnowledgeBase(seed=seed_data)
+        self.ticket_manager.kb = self.kb
+        self.set_quotas(quotas or {})
+
+        # Password/token login and server-side sessions for this tenant's users
+        self.auth = Authenticator(self.user_store)
+
+        # Append-only audit trail of every change (on disk when a data dir is set)
+        self.audit = AuditLog(os.path.join(data_dir, "audit.jsonl") if data_dir else None)
+        self.ticket_manager.add_listener(self.audit.ticket_listener)
+        self.task_manager.add_listener(self.audit.task_listener)
+        self.ticket_manager.audit = self.audit
+        self.task_manager.audit = self.audit
+        # Never reuse an id the log already knows (e.g. a data dir without a snapshot)
+        tm, ta = self.ticket_manager, self.task_manager
+        tm._next_id = max(tm._next_id, self.audit.max_id("ticket") + 1)
+        ta._next_id = max(ta._next_id, self.audit.max_id("task") + 1)
+
+        # Point-in-time queue reconstruction (checkpoints + audit deltas)
+        self.history = TimeMachine(
+            self.audit, self.user_store, self.ticket_manager, self.task_manager,
+            path=os.path.join(data_dir, "checkpoints.jsonl") if data_dir else None,
+        )
+
+        # Ship the audit log to read-only followers (python -m models.replication ADDR)
+        self.replication = None
+        if replicate:
+            self.replication = ReplicationLeader(self.audit, self.user_store, self.ticket_manager,
+                                                 self.task_manager, replicate)
+
+        # Column-array history for vectorized reports (only when NumPy is installed)
+        self.analytics = None
+        if HAVE_NUMPY:
+            self.analytics = Analytics(
+                self.ticket_manager, self.task_manager,
+                path=os.path.join(data_dir, "analytics.npz") if data_dir else None,
+            )
+            self.ticket_manager.add_listener(self.analytics.ticket_listener)
+            self.task_manager.add_listener(self.analytics.task_listener)
+        self.forecaster = None
+
+        # Workload-aware routing of new tickets (and suggestions for tasks)
+        self.assigner = AssignmentEngine(self.user_store)
+        self.ticket_manager.assigner = self.assigner
+        self.task_manager.assigner = self.assigner
+
+        # Outbound email notifications (outbox + mail sink live in the data dir)
+        self.notifier = None
+        if data_dir:
+            self.notifier = Notifier(
+                os.path.join(data_dir, "outbox.jsonl"),
+                FileTransport(os.path.join(data_dir, "sent_mail.txt")),
+                user_store=self.user_store,
+            )
+            self.ticket_manager.add_listener(self.notifier.handle)
+
+        # Automation rules on ticket/task events (registered last so audit and
+        # notifications see each event before any changes a rule makes)
+        self.rules = RuleEngine(self.ticket_manager, self.task_manager,
+                                path=os.path.join(data_dir, "rules.json") if data_dir else None)
+        self.ticket_manager.add_listener(self.rules.ticket_listener)
+        self.task_manager.add_listener(self.rules.task_listener)
+
+        # Rate-limited, bounded intake for public submissions (overflow spools to disk)
+        self.intake = Intake(
+            self.ticket_manager,
+            spool_path=os.path.join(data_dir, "intake_spool.jsonl") if data_dir else None,
+        )
+        self.ticket_manager.intake = self.intake
+
+        # Canned responses / macros (kept in the data dir when there is one)
+        self.macros = MacroLibrary(os.path.join(data_dir, "macros.json") if data_dir else None)
+        self.ticket_manager.macros = self.macros
+
+        # Inbound email (Maildir directory or mbox file)
+        self.mail_gateway = MailGateway(self.ticket_manager, mail_spool) if mail_spool else None
+        if self.analytics is not None:
+            self.forecaster = Forecaster(self.analytics, self.user_store, self.ticket_manager)
+        self.dashboard = Dashboard(self.ticket_manager, self.task_manager,
+                                   audit=self.audit, user_store=self.user_store,
+                                   history=self.history, analytics=self.analytics,
+                                   forecaster=self.forecaster)
+
+    def set_quotas(self, quotas: Dict[str, Optional[int]]):
+        """Apply limits; keys are QUOTA_KEYS, missing/None = unlimited."""
+        unknown = set(quotas) - set(QUOTA_KEYS)
+        if unknown:
+            raise ValueError("Unknown quota(s): {}".format(", ".join(sorted(unknown))))
+        self.quotas = dict(quotas)
+        self.user_store.max_users = quotas.get("users")
+        self.ticket_manager.max_open = quotas.get("open_tickets")
+        self.task_manager.max_open = quotas.get("open_tasks")
+        self.kb.max_articles = quotas.get("articles")
+
+    def usage(self) -> Dict[str, int]:
+        return {"users": len(self.user_store.list_users()),
+                "open_tickets": len(self.ticket_manager.tickets),
+                "open_tasks": len(self.task_manager.tasks),
+                "articles": len(self.kb.articles)}
+
+    # ---------- lifecycle ----------
+    def start(self):
+        self.history.start()
+        if self.notifier:
+            self.notifier.start()
+        if self.replication:
+            self.replication.start()
+        if self.scheduler is not None:
+            self.scheduler.schedule("audit-verify", self.verify_audit, cron="17 * * * *",
+                                    group=self.name)
+            self.ticket_manager.warm_search_index(self.scheduler, group=self.name)
+            self.ticket_manager.warm_requesters(self.scheduler, group=self.name)
+            if self.analytics is not None:
+                self.analytics.warm(self.scheduler, group=self.name)
+            if self.mail_gateway is not None:
+                self.mail_gateway.watch(self.scheduler, group=self.name)
+
+    def verify_audit(self) -> str:
+        """
+        Background job: check the audit hash chain. A file-backed log is split
+        into segments checked by process jobs (hashing is CPU-bound).
+        """
+        try:
+            segments = self.audit.segments() if self.audit.path and self.scheduler else None
+        except ValueError:
+            segments = None             # a record no longer parses; the serial walk finds it
+        if segments:
+            parts = [self.scheduler.spawn(verify_segment, *seg, kind="process") for seg in segments]
+            self.scheduler.join(parts)
+            bad = [p.result for p in parts if p.result is not None]
+            failed = [p.last_error for p in parts if p.last_error]
+            if failed:
+                raise RuntimeError("segment check failed: {}".format(failed[0]))
+            seq = min(bad) if bad else None
+        else:
+            seq = self.audit.verify()
+        if seq is not None:
+            raise RuntimeError("audit chain broken at record {}".format(seq))
+        return "{:,} records intact".format(len(self.audit))
+
+    def save(self):
+        """Persist all manager state to the snapshot file."""
+        if self.snapshot_path:
+            save_snapshot(self.snapshot_path, self.user_store, self.ticket_manager,
+                          self.task_manager, self.kb)
+        if self.analytics is not None:
+            self.analytics.save()
+
+    def close(self, save: bool = True):
+        """Stop background work, optionally save, and release files/mappings."""
+        if self.scheduler is not None:
+            self.scheduler.cancel_group(self.name)
+        if self.notifier:
+            self.notifier.stop(flush=True)
+        if self.replication:
+            self.replication.stop()
+        self.history.stop()
+        self.intake.close()
+        if self.forecaster is not None:
+            self.forecaster.close()
+        self.rules.save()           # hit counters
+        if save:
+            self.save()
+        self.audit.close()
+        if self.snapshot is not None:
+            # lazy fields point into the old mapping; nothing may use them after this
+            self.snapshot.close()
+            self.snapshot = None
+
+
+# -----------------------------------------------------------------------------
+# Registry
+# -----------------------------------------------------------------------------
+class TenantRegistry:
+    """
+    Tenants under `root/<name>/` (snapshot, audit log, outbox, ...), loaded on
+    first use and kept in an LRU of at most `max_loaded`. Tenants idle for
+    `idle_seconds` are saved and dropped by evict_idle(), so memory follows
+    the set of tenants in use rather than the number of tenants on disk.
+
+    Quotas come from `default_quotas`, overridden per tenant by an optional
+    `root/<name>/quotas.json`.
+    """
+
+    SNAPSHOT_FILE = "helpdesk.snap"
+    QUOTA_FILE = "quotas.json"
+
+    def __init__(self, root: str, seed_users: Optional[Callable[[], UserStore]] = None,
+                 max_loaded: int = 8, idle_seconds: float = 600.0,
+                 default_quotas: Optional[Dict[str, Optional[int]]] = None,
+                 scheduler: Optional[Scheduler] = None):
+        self.root = root
+        self.scheduler = scheduler
+        self.seed_users = seed_users
+        self.max_loaded = max_loaded
+        self.idle_seconds = idle_seconds
+        self.default_quotas = dict(default_quotas or {})
+        self._loaded: "OrderedDict[str, Tenant]" = OrderedDict()   # LRU order
+        os.makedirs(root, exist_ok=True)
+
+    # ---------- lookup ----------
+    def _home(self, name: str) -> str:
+        if not TENANT_NAME.match(name or ""):
+            raise ValueError("Invalid tenant name '{}' (letters, digits, '-' and '_').".format(name))
+        return os.path.join(self.root, name)
+
+    def names(self) -> List[str]:
+        """Every tenant on disk (loaded or not), sorted."""
+        return sorted(e.name for e in os.scandir(self.root)
+                      if e.is_dir() and TENANT_NAME.match(e.name))
+
+    def exists(self, name: str) -> bool:
+        return os.path.isdir(self._home(name))
+
+    def loaded(self) -> List[str]:
+        """Names of tenants currently in memory, least recently used first."""
+        return list(self._loaded)
+
+    def quotas_for(self, name: str) -> Dict[str, Optional[int]]:
+        quotas = dict(self.default_quotas)
+        path = os.path.join(self._home(name), self.QUOTA_FILE)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                quotas.update(json.load(fh))
+        return quotas
+
+    def get(self, name: str) -> Tenant:
+        """The tenant's live instance, loading it (and evicting the LRU) if needed."""
+        tenant = self._loaded.get(name)
+        if tenant is None:
+            home = self._home(name)
+            if not os.path.isdir(home):
+                raise KeyError("Unknown tenant '{}'".format(name))
+            tenant = Tenant(name, os.path.join(home, self.SNAPSHOT_FILE), data_dir=home,
+                            seed_users=self.seed_users, seed_data=False,
+                            quotas=self.quotas_for(name), scheduler=self.scheduler)
+            tenant.start()
+            self._loaded[name] = tenant
+        self._loaded.move_to_end(name)
+        tenant.last_used = time.monotonic()
+        self._evict_over_capacity(keep=name)
+        return tenant
+
+    def create(self, name: str) -> Tenant:
+        """Create an empty helpdesk (seed users only) and return it loaded."""
+        home = self._home(name)
+        if os.path.isdir(home):
+            raise ValueError("Tenant '{}' already exists.".format(name))
+        os.makedirs(home)
+        tenant = self.get(name)
+        tenant.save()
+        return tenant
+
+    # ---------- eviction ----------
+    def evict(self, name: str, save: bool = True):
+        tenant = self._loaded.pop(name, None)
+        if tenant is not None:
+            tenant.close(save=save)
+
+    def _evict_over_capacity(self, keep: Optional[str] = None):
+        for name in list(self._loaded):
+            if len(self._loaded) <= self.max_loaded:
+                break
+            if name != keep:
+                self.evict(name)
+
+    def evict_idle(self, keep=(), now: Optional[float] = None) -> List[str]:
+        """Save and drop tenants unused for idle_seconds. Returns their names."""
+        now = time.monotonic() if now is None else now
+        idle = [name for name, t in self._loaded.items()
+                if name not in keep and now - t.last_used >= self.idle_seconds]
+        for name in idle:
+            self.evict(name)
+        return idle
+
+    def close_all(self):
+        for name in list(self._loaded):
+            self.evict(name)
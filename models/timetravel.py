@@ -0,0 +1,272 @@
+import bisect
+import json
+import os
+import queue
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from models.users import User, UserStore
+from models.tabs.tickets import Ticket, TicketManager
+from models.tabs.tasks import Task, TaskManager
+from models.audit import TICKET_FIELDS, TASK_FIELDS
+
+# -----------------------------------------------------------------------------
+# State (plain dicts so checkpoints are cheap to copy and serialise)
+# -----------------------------------------------------------------------------
+#   {"tickets": {id: {field: value}},   open tickets only, like TicketManager.tickets
+#    "tasks":   {id: {field: value}},   open tasks only
+#    "users":   {name: {"id", "role", "status", "skills", "email",
+#                       "tickets_claimed", "tasks_claimed"}}}
+_KINDS = {"ticket": ("tickets", "tickets_claimed", TICKET_FIELDS),
+          "task": ("tasks", "tasks_claimed", TASK_FIELDS)}
+
+
+def capture_state(user_store: UserStore, ticket_manager: TicketManager,
+                  task_manager: TaskManager) -> dict:
+    """Queue state of the live managers (notes are not part of it)."""
+    return {
+        "tickets": {t.id: {f: getattr(t, f) for f in TICKET_FIELDS}
+                    for t in ticket_manager.tickets.values()},
+        "tasks": {t.id: {f: getattr(t, f) for f in TASK_FIELDS}
+                  for t in task_manager.tasks.values()},
+        "users": {u.name: {"id": u.id, "role": u.role, "status": u.status,
+                           "skills": list(u.skills), "email": u.email,
+                           "tickets_claimed": list(u.tickets_claimed),
+                           "tasks_claimed": list(u.tasks_claimed)}
+                  for u in user_store.list_users()},
+    }
+
+
+def copy_state(state: dict) -> dict:
+    return {
+        "tickets": {k: dict(v) for k, v in state["tickets"].items()},
+        "tasks": {k: dict(v) for k, v in state["tasks"].items()},
+        "users": {k: dict(v, tickets_claimed=list(v["tickets_claimed"]),
+                          tasks_claimed=list(v["tasks_claimed"]))
+                  for k, v in state["users"].items()},
+    }
+
+
+def _user(state: dict, name: Optional[str]) -> Optional[dict]:
+    return state["users"].get(name) if name else None
+
+
+def apply_record(state: dict, rec: dict) -> None:
+    """Roll `state` forward by one audit record (mirrors the managers' mutations)."""
+    kind, item_id, event, changes = rec["kind"], rec["id"], rec["event"], rec["changes"]
+
+    if kind == "user":
+        if "status" in changes:
+            for u in state["users"].values():
+                if u["id"] == item_id:
+                    u["status"] = changes["status"][1]
+        return
+    if kind not in _KINDS:
+        return
+    store, claims, fields = _KINDS[kind]
+    items = state[store]
+
+    if event == "created":
+        items[item_id] = {f: changes.get(f, (None, None))[1] for f in fields}
+        return
+    if event == "resolved":
+        item = items.pop(item_id, None)
+        holder = _user(state, item["assigned_to"]) if item else None
+        if holder is not None and item_id in holder[claims]:
+            holder[claims].remove(item_id)
+        return
+
+    item = items.get(item_id)
+    if item is None:
+        return
+    for field, (before, after) in changes.items():
+        if field == "assigned_to":
+            old, new = _user(state, before), _user(state, after)
+            if old is not None and item_id in old[claims]:
+                old[claims].remove(item_id)
+            if new is not None and item_id not in new[claims]:
+                new[claims].append(item_id)
+        if field in item:
+            item[field] = after
+
+
+def build_managers(state: dict) -> Tuple[UserStore, TicketManager, TaskManager]:
+    """Detached (user_store, ticket_manager, task_manager) holding `state`."""
+    users = []
+    for name, rec in state["users"].items():
+        u = User(rec["id"], name, rec["role"], rec["status"], rec["skills"], rec["email"])
+        u.tickets_claimed = list(rec["tickets_claimed"])
+        u.tasks_claimed = list(rec["tasks_claimed"])
+        users.append(u)
+    user_store = UserStore(sorted(users, key=lambda u: u.id))
+
+    tm = TicketManager(user_store, seed=False)
+    for tid, rec in sorted(state["tickets"].items()):
+        tm.tickets[tid] = Ticket(ticket_id=tid, **rec)
+    tm._next_id = max(tm.tickets, default=0) + 1
+    tm._reindex()
+
+    ta = TaskManager(user_store, ticket_manager=tm, seed=False)
+    for tid, rec in sorted(state["tasks"].items()):
+        ta.tasks[tid] = Task(task_id=tid, **rec)
+    ta._next_id = max(ta.tasks, default=0) + 1
+    ta._reindex()
+    tm.task_manager = ta
+    return user_store, tm, ta
+
+
+# -----------------------------------------------------------------------------
+# Time machine
+# -----------------------------------------------------------------------------
+class TimeMachine:
+    """
+    Rebuilds queue state as of any past moment from checkpoints + audit deltas.
+
+    A full state checkpoint is taken when attached (the live managers are the
+    source of truth at that point) and again every `every` audit records. To
+    answer "as of T" we find the last checkpoint at or before T and replay only
+    the audit records between it and T, so the cost is bounded by `every`
+    records plus one state copy, however long the history is.
+
+    With a path, checkpoints are appended to a JSON-lines file and only their
+    (seq, timestamp, byte offset) stay in memory.
+
+    After start(), the audit listener only queues each record; a worker thread
+    rolls the live state forward and writes the checkpoints, so an agent's
+    action never waits on serialising the whole queue. Without start() (a
+    detached TimeMachine) the listener does that work inline.
+    """
+
+    def __init__(self, audit, user_store, ticket_manager, task_manager,
+                 path: Optional[str] = None, every: int = 500):
+        self.audit = audit
+        self.path = path
+        self.every = every
+        self._seqs: List[int] = []          # checkpoint -> audit seq it covers up to
+        self._times: List[float] = []       # checkpoint -> wall time
+        self._offsets: List[int] = []       # checkpoint -> byte offset (on disk)
+        self._mem: List[dict] = []          # checkpoint states (in memory)
+        self._inbox = queue.SimpleQueue()   # audit records waiting for the worker
+        self._thread = None
+        if path:
+            self._load_index()
+
+        self._live = capture_state(user_store, ticket_manager, task_manager)
+        self._checkpoint()
+        audit.add_listener(self._on_record)
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="timetravel", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the worker after it has applied every queued record."""
+        if self._thread is None:
+            return
+        self._inbox.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    # ---------- writing ----------
+    def _on_record(self, rec: dict):
+        if self._thread is not None:
+            self._inbox.put(rec)
+        else:
+            self._advance(rec)
+
+    def _run(self):
+        while True:
+            rec = self._inbox.get()
+            if rec is None:
+                return
+            self._advance(rec)
+
+    def _advance(self, rec: dict):
+        apply_record(self._live, rec)
+        seq = rec["seq"] + 1
+        if seq - self._seqs[-1] >= self.every:
+            self._checkpoint(seq)
+
+    def _checkpoint(self, seq: Optional[int] = None):
+        seq = len(self.audit) if seq is None else seq
+        at = time.time()
+        if self._times and at < self._times[-1]:
+            at = self._times[-1]        # keep checkpoint times sorted across clock steps
+        if self.path:
+            with open(self.path, "ab") as fh:
+                offset = fh.tell()
+                fh.write(json.dumps({"seq": seq, "at": at, "state": self._live},
+                                    separators=(",", ":"), default=str).encode("utf-8") + b"\n")
+            self._offsets.append(offset)
+        else:
+            self._mem.append(copy_state(self._live))
+        # readers bisect _times, so it is extended last
+        self._seqs.append(seq)
+        self._times.append(at)
+
+    def _load_index(self):
+        if not os.path.exists(self.path):
+            return
+        good = 0
+        with open(self.path, "rb") as fh:
+            offset = 0
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break               # torn tail after a crash; truncated below
+                if rec["seq"] > len(self.audit):
+                    break               # audit log was truncated behind us
+                self._offsets.append(offset)
+                self._seqs.append(rec["seq"])
+                self._times.append(rec["at"])
+                offset += len(line)
+                good = offset
+        if good != os.path.getsize(self.path):
+            with open(self.path, "r+b") as fh:
+                fh.truncate(good)
+
+    def _load_checkpoint(self, idx: int) -> dict:
+        if not self.path:
+            return copy_state(self._mem[idx])
+        with open(self.path, "rb") as fh:
+            fh.seek(self._offsets[idx])
+            state = json.loads(fh.readline())["state"]
+        # JSON object keys are strings; ids are ints everywhere else
+        state["tickets"] = {int(k): v for k, v in state["tickets"].items()}
+        state["tasks"] = {int(k): v for k, v in state["tasks"].items()}
+        return state
+
+    # ---------- reading ----------
+    def _replay(self, idx: int, seq: int) -> dict:
+        state = self._load_checkpoint(idx)
+        for rec in self.audit.records(self._seqs[idx], seq):
+            apply_record(state, rec)
+        return state
+
+    def state_at_seq(self, seq: int) -> dict:
+        """State after the first `seq` audit records."""
+        idx = bisect.bisect_right(self._seqs, seq) - 1
+        if idx < 0:
+            raise ValueError("no checkpoint at or before record {}".format(seq))
+        return self._replay(idx, seq)
+
+    def state_at(self, ts: float) -> dict:
+        """State as of wall time `ts` (epoch seconds)."""
+        # pick by time, not seq: a checkpoint taken on restart may share its seq
+        # with the one before it but describe different (reloaded) state
+        idx = bisect.bisect_right(self._times, ts) - 1
+        if idx < 0:
+            raise ValueError("no history recorded before the first checkpoint")
+        return self._replay(idx, max(self.audit.seq_until(ts), self._seqs[idx]))
+
+    def as_of(self, ts: float) -> Tuple[UserStore, TicketManager, TaskManager]:
+        """Detached managers holding the queue as it was at `ts`."""
+        return build_managers(self.state_at(ts))
+
+    def earliest(self) -> Optional[float]:
+        return self._times[0] if self._times else None
@@ -1,5 +1,7 @@
 from typing import List, Optional
 
+from models.quotas import check_quota
+
 
 # -----------------------------------------------------------------------------
 # Model
@@ -7,16 +9,34 @@ from typing import List, Optional
 class User:
     """Represents an agent/admin account that can claim tickets and tasks."""
 
-    def __init__(self, user_id: int, name: str, role: str = "Agent", status: str = "Active"):
+    def __init__(self, user_id: int, name: str, role: str = "Agent", status: str = "Active",
+                 skills: Optional[List[str]] = None, email: Optional[str] = None):
         self.id = user_id
         self.name = name
         self.role = role      # "Agent" or "Admin"
         self.status = status  # "Active" or "Inactive"
 
+        # Departments / help topics this user is routed work for (empty = generalist)
+        self.skills: List[str] = list(skills) if skills else []
+        self.email = email    # where assignment/note notifications are sent
+
+        # Authentication / authorisation (see models/auth.py)
+        self.password_hash: Optional[str] = None
+        self.api_tokens: List[str] = []        # SHA-256 digests of issued API tokens
+        self.departments: List[str] = []       # department scope (empty = all)
+
         # Basic tracking (store ids for simplicity)
         self.tickets_claimed: List[int] = []
         self.tasks_claimed: List[int] = []
 
+    @property
+    def is_active(self) -> bool:
+        return isinstance(self.status, str) and self.status.lower() == "active"
+
+    @property
+    def is_admin(self) -> bool:
+        return isinstance(self.role, str) and self.role.lower() == "admin"
+
     # ---------- ticket helpers ----------
     def claim_ticket(self, ticket) -> bool:
         """
@@ -42,6 +62,14 @@ class User:
             return True
         return False
 
+    def claim_tickets(self, ticket_ids) -> None:
+        """Add several ticket ids to the claimed list in one pass (skips duplicates)."""
+        have = set(self.tickets_claimed)
+        for tid in ticket_ids:
+            if tid not in have:
+                have.add(tid)
+                self.tickets_claimed.append(tid)
+
     # ---------- task helpers ----------
     def claim_task(self, task) -> bool:
         """
@@ -67,10 +95,47 @@ class User:
             return True
         return False
 
+    def claim_tasks(self, task_ids) -> None:
+        """Add several task ids to the claimed list in one pass (skips duplicates)."""
+        have = set(self.tasks_claimed)
+        for task_id in task_ids:
+            if task_id not in have:
+                have.add(task_id)
+                self.tasks_claimed.append(task_id)
+
     def __repr__(self) -> str:
         return "<User {}: {} ({})>".format(self.id, self.name, self.role)
 
 
+def format_user_table(users: List[User]) -> List[str]:
+    """ID / name / role / status table lines for the pick-a-user prompts."""
+    lines = ["{:<4} {:<20} {:<8} {:<8}".format("ID", "Name", "Role", "Status"), "-" * 48]
+    lines.extend("{:<4} {:<20} {:<8} {:<8}".format(u.id, u.name, u.role, u.status) for u in users)
+    lines.append("-" * 48)
+    return lines
+
+
+def claimed_items(user: User, claims: List[int], store: dict) -> list:
+    """
+    Batched "My Tickets"/"My Tasks" view: hydrate every item in `claims`
+    (one of the user's claim lists, the per-user assignee index) from the
+    `store` of open items in one pass. Stale ids (resolved, deleted, or
+    since claimed by someone else) are pruned from `claims` in the same pass.
+    """
+    live_ids = []
+    found = []
+    for item_id in claims:
+        item = store.get(item_id)
+        if item is None or item.assigned_to != user.name:
+            continue
+        live_ids.append(item_id)
+        found.append(item)
+
+    if len(live_ids) != len(claims):
+        claims[:] = live_ids
+    return found
+
+
 # -----------------------------------------------------------------------------
 # Store
 # -----------------------------------------------------------------------------
@@ -87,11 +152,22 @@ class UserStore:
         # Next id is computed from existing users
         self._next_id = (max([u.id for u in self.users]) + 1) if self.users else 1
 
+        # Lookup indexes
+        self._by_id = {u.id: u for u in self.users}
+        self._by_name = {u.name: u for u in self.users}
+
+        # Optional tenant limit on the number of accounts
+        self.max_users = None
+
     # ---------- creation ----------
-    def add_user(self, name: str, role: str = "Agent", status: str = "Active") -> User:
-        """Create and append a new User, returning the instance."""
-        user = User(self._next_id, name, role, status)
+    def add_user(self, name: str, role: str = "Agent", status: str = "Active",
+                 skills: Optional[List[str]] = None, email: Optional[str] = None) -> User:
+        """Create and append a new User, returning the instance. Raises QuotaExceeded."""
+        check_quota("User", len(self.users), self.max_users)
+        user = User(self._next_id, name, role, status, skills, email)
         self.users.append(user)
+        self._by_id[user.id] = user
+        self._by_name[user.name] = user
         self._next_id += 1
         return user
 
@@ -123,7 +199,36 @@ class UserStore:
 
     def get_by_id(self, user_id: int) -> Optional[User]:
         """Find a user by their numeric id, or return None."""
-        for u in self.users:
-            if u.id == user_id:
-                return u
-        return None
+        return self._by_id.get(user_id)
+
+    def get_by_name(self, name: Optional[str]) -> Optional[User]:
+        """Find a user by display name (as stored in assigned_to), or return None."""
+        if not name:
+            return None
+        return self._by_name.get(name)
+
+    # ---------- bulk claim maintenance ----------
+    def release_claims(self, ticket_ids=(), task_ids=(), holders=None) -> List[User]:
+        """
+        Remove the given ticket/task ids from users' claimed lists in a single
+        pass (used when items are resolved or reassigned in bulk). Pass
+        `holders` to limit the pass to the users known to hold the items;
+        otherwise every user is checked. Returns the users whose lists changed.
+        """
+        ticket_ids = set(ticket_ids)
+        task_ids = set(task_ids)
+        changed = []
+        for u in (self.users if holders is None else holders):
+            before = len(u.tickets_claimed) + len(u.tasks_claimed)
+            if ticket_ids and u.tickets_claimed:
+                u.tickets_claimed[:] = [i for i in u.tickets_claimed if i not in ticket_ids]
+            if task_ids and u.tasks_claimed:
+                u.tasks_claimed[:] = [i for i in u.tasks_claimed if i not in task_ids]
+            if len(u.tickets_claimed) + len(u.tasks_claimed) != before:
+                changed.append(u)
+        return changed
+
+    # ---------- status ----------
+    def set_status(self, user: User, status: str) -> None:
+        """Set a user's status ("Active" or "Inactive")."""
+        user.status = status
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from models.audit import AuditCorrupt, AuditLog
+
+
+def _log(path, n=5):
+    log = AuditLog(str(path))
+    for i in range(n):
+        log.record("ticket", i + 1, "created", "Sam", {"subject": (None, "s{}".format(i))})
+    log.close()
+    return path
+
+
+def _lines(path):
+    with open(path, "rb") as fh:
+        return fh.readlines()
+
+
+def test_reload_keeps_every_record(tmp_path):
+    path = _log(tmp_path / "audit.jsonl")
+    log = AuditLog(str(path))
+    assert len(log) == 5
+    assert log.verify() is None
+    assert log.max_id("ticket") == 5
+
+
+def test_torn_last_line_is_cut_off(tmp_path):
+    path = _log(tmp_path / "audit.jsonl")
+    lines = _lines(path)
+    with open(path, "ab") as fh:
+        fh.write(b'{"seq": 5, "at": 1')         # crash mid-write, no newline
+    log = AuditLog(str(path))
+    assert len(log) == 5
+    assert _lines(path) == lines
+    log.record("ticket", 6, "created")
+    log.close()
+    assert AuditLog(str(path)).verify() is None
+
+
+def test_garbage_record_in_the_middle_raises_and_keeps_the_file(tmp_path):
+    path = _log(tmp_path / "audit.jsonl")
+    lines = _lines(path)
+    lines[1] = b"not json\n"
+    with open(path, "wb") as fh:
+        fh.writelines(lines)
+    size = path.stat().st_size
+    with pytest.raises(AuditCorrupt) as e:
+        AuditLog(str(path))
+    assert e.value.seq == 1
+    assert path.stat().st_size == size
+
+
+def test_deleted_record_breaks_the_chain_on_load(tmp_path):
+    path = _log(tmp_path / "audit.jsonl")
+    lines = _lines(path)
+    del lines[2]
+    with open(path, "wb") as fh:
+        fh.writelines(lines)
+    with pytest.raises(AuditCorrupt) as e:
+        AuditLog(str(path))
+    assert e.value.seq == 2
+
+
+def test_edited_last_record_fails_the_head_check(tmp_path):
+    path = _log(tmp_path / "audit.jsonl")
+    lines = _lines(path)
+    rec = json.loads(lines[-1])
+    rec["actor"] = "Mallory"
+    lines[-1] = (json.dumps(rec) + "\n").encode("utf-8")
+    with open(path, "wb") as fh:
+        fh.writelines(lines)
+    with pytest.raises(AuditCorrupt):
+        AuditLog(str(path))
+
+
+def test_edited_middle_record_is_found_by_verify(tmp_path):
+    path = _log(tmp_path / "audit.jsonl")
+    lines = _lines(path)
+    rec = json.loads(lines[1])
+    rec["actor"] = "Mallory"
+    lines[1] = (json.dumps(rec) + "\n").encode("utf-8")
+    with open(path, "wb") as fh:
+        fh.writelines(lines)
+    assert AuditLog(str(path)).verify() == 1
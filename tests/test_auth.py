@@ -0,0 +1,88 @@
+import builtins
+
+import pytest
+
+from models.auth import AuthError, Authenticator, Perm
+from models.tenants import Tenant
+from models.users import UserStore
+
+
+def _store():
+    store = UserStore()
+    admin = store.add_user("root", role="Admin")
+    agent = store.add_user("sam")
+    return store, admin, agent
+
+
+def test_password_less_account_cannot_log_in():
+    store, admin, agent = _store()
+    auth = Authenticator(store)
+    for name in ("root", "sam"):
+        with pytest.raises(AuthError):
+            auth.login(name, "")
+
+
+def test_setup_code_works_once_for_an_admin():
+    store, admin, agent = _store()
+    auth = Authenticator(store)
+    code = auth.issue_setup_code()
+    assert code and auth.issue_setup_code() is None      # one outstanding code
+    with pytest.raises(AuthError):
+        auth.redeem_setup_code(agent, code, "longpassword")
+    with pytest.raises(AuthError):
+        auth.redeem_setup_code(admin, "wrong", "longpassword")
+    auth.redeem_setup_code(admin, code, "longpassword")
+    assert auth.login("root", "longpassword").user is admin
+    with pytest.raises(AuthError):
+        auth.redeem_setup_code(admin, code, "otherpassword")
+    assert not auth.needs_setup() and auth.issue_setup_code() is None
+
+
+def test_department_scope():
+    store, admin, agent = _store()
+    auth = Authenticator(store)
+    auth.set_departments(agent, ["Support", " IT "])
+    auth.set_password(agent, "agentpassword")
+    auth.set_password(admin, "adminpassword")
+    s = auth.login("sam", "agentpassword")
+    assert s.can(Perm.WORK_TICKETS, "support") and s.can(Perm.WORK_TICKETS, "IT")
+    assert not s.can(Perm.WORK_TICKETS, "HR")
+    assert not s.can(Perm.MANAGE_USERS)
+    a = auth.login("root", "adminpassword")
+    assert a.can(Perm.MANAGE_USERS, "Anything typed on the form")
+
+
+def test_unknown_departments_get_no_bits():
+    store, admin, agent = _store()
+    auth = Authenticator(store)
+    auth.set_departments(agent, ["Support"])
+    auth.set_password(agent, "agentpassword")
+    s = auth.login("sam", "agentpassword")
+    for i in range(200):
+        assert not s.can(Perm.VIEW_QUEUE, "dept-{}".format(i))
+    assert auth.departments.bit("dept-7") == 0
+    assert len(auth.departments._bits) == 1
+    # each user store numbers its own departments
+    assert Authenticator(UserStore()).departments.bit("Support") == 0
+
+
+def test_create_task_without_assign_others_only_self_assigns(monkeypatch):
+    tenant = Tenant("t")
+    store, auth = tenant.user_store, tenant.auth
+    agent = store.add_user("Sam")
+    other = store.add_user("Kim")
+    auth.set_password(agent, "agentpassword")
+    session = auth.login("Sam", "agentpassword")
+    session.perms &= ~Perm.ASSIGN_OTHERS
+    tasks = tenant.task_manager
+    tasks._session = session
+    # title, description, department, ticket, then the assignee prompt
+    answers = iter(["Rack servers", "", "", "", str(other.id)])
+    monkeypatch.setattr(builtins, "input", lambda prompt="": next(answers))
+    tasks._create_task_ui(agent)
+    t = tasks.tasks[max(tasks.tasks)]
+    assert t.title == "Rack servers" and t.assigned_to != other.name
+
+    answers = iter(["Cable servers", "", "", "", "y"])
+    tasks._create_task_ui(agent)
+    assert tasks.tasks[max(tasks.tasks)].assigned_to == agent.name
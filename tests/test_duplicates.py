@@ -0,0 +1,69 @@
+import builtins
+
+from models.auth import Session
+from models.tenants import Tenant
+
+
+def _inputs(monkeypatch, *answers):
+    it = iter(answers)
+    monkeypatch.setattr(builtins, "input", lambda prompt="": next(it))
+
+
+def test_public_matches_only_the_submitters_own_tickets():
+    tm = Tenant("t").ticket_manager
+    theirs = tm.create_ticket("Cannot log in to portal", "Ann", email="ann@corp.example")
+    bobs = tm.create_ticket("Cannot log in to portal", "Bob", email="bob@corp.example")
+    found = tm.find_duplicates("Cannot log in to the portal", "Ann@Corp.example",
+                               same_requester=True)
+    assert [t.id for t, _ in found] == [theirs.id]
+    assert tm.find_duplicates("Cannot log in to portal", None, same_requester=True) == []
+    agent_view = tm.find_duplicates("Cannot log in to portal", "ann@corp.example")
+    assert bobs.id in [t.id for t, _ in agent_view]
+
+
+def test_public_form_does_not_show_other_requesters(monkeypatch, capsys):
+    tm = Tenant("t").ticket_manager
+    other = tm.create_ticket("Cannot log in to portal", "Bob", email="bob@corp.example")
+    before = set(tm.tickets)
+    # subject, name, email, priority, department, topic, SLA, receipt
+    _inputs(monkeypatch, "Cannot log in to portal", "Eve", "eve@corp.example",
+            "", "", "", "", "")
+    tm.submit_ticket_ui()
+    out = capsys.readouterr().out
+    assert "look similar" not in out
+    (new_id,) = set(tm.tickets) - before
+    assert tm.get_ticket(new_id).parent_id is None
+    assert other.internal_notes == []
+
+
+def test_merge_ticket_moves_children_and_resolves_duplicate():
+    tm = Tenant("t").ticket_manager
+    into = tm.create_ticket("Mail server down", "Ann", email="ann@corp.example")
+    dup = tm.create_ticket("Mail server is down", "Bob", email="bob@corp.example")
+    child = tm.create_ticket("No mail", "Cy", email="cy@corp.example", parent_id=dup.id)
+    tm.merge_ticket(dup, into)
+    assert tm.get_ticket(dup.id) is None and dup.status == "Resolved"
+    assert child.parent_id == into.id and child.status != "Resolved"
+    assert "Merged duplicate Ticket {}".format(dup.id) in into.internal_notes[-1]["text"]
+
+
+def test_merge_into_own_child_detaches_it_first():
+    tm = Tenant("t").ticket_manager
+    dup = tm.create_ticket("Mail server down", "Ann")
+    child = tm.create_ticket("Mail server is down", "Bob", parent_id=dup.id)
+    tm.merge_ticket(dup, child)
+    assert child.parent_id is None and tm.get_ticket(child.id) is child
+
+
+def test_agent_merge_needs_access_to_the_target(monkeypatch, capsys):
+    tenant = Tenant("t")
+    tm = tenant.ticket_manager
+    agent = tenant.user_store.add_user("Sam")
+    agent.departments = ["Support"]
+    tm._session = Session("tok", agent)
+    dup = tm.create_ticket("Printer jam", "Ann", department="Support")
+    target = tm.create_ticket("Printer jammed", "Bob", department="HR")
+    _inputs(monkeypatch, str(target.id))
+    assert tm._merge_ticket_ui(dup, agent) is False
+    assert "don't have permission" in capsys.readouterr().out
+    assert tm.get_ticket(dup.id) is dup
@@ -0,0 +1,47 @@
+from models.snapshot import save_snapshot
+from models.tenants import Tenant
+
+
+def test_task_ids_are_not_reused_after_resolve():
+    ta = Tenant("t").task_manager
+    last = max(ta.tasks)
+    ta.resolve_tasks([last])
+    assert ta.create_task("next").id == last + 1
+
+
+def test_counters_continue_past_the_audit_log(tmp_path):
+    t = Tenant("t", data_dir=str(tmp_path))
+    for _ in range(3):
+        ticket = t.ticket_manager.create_ticket("s", "n")
+    task = t.task_manager.create_task("x")
+    t.close(save=False)
+    again = Tenant("t", data_dir=str(tmp_path))
+    assert again.ticket_manager.create_ticket("s", "n").id == ticket.id + 1
+    assert again.task_manager.create_task("y").id == task.id + 1
+    again.close(save=False)
+
+
+def test_task_counter_survives_a_snapshot(tmp_path):
+    t = Tenant("t")
+    ta = t.task_manager
+    ta.resolve_tasks([ta.create_task("x").id])
+    path = str(tmp_path / "s.snap")
+    save_snapshot(path, t.user_store, t.ticket_manager, ta, t.kb)
+    loaded = Tenant("t", snapshot_path=path)
+    assert loaded.task_manager._next_id == ta._next_id
+    loaded.close(save=False)
+
+
+def test_claim_lists_are_pruned_of_stale_ids():
+    tenant = Tenant("claims")
+    sam = tenant.user_store.add_user("Sam")
+    kim = tenant.user_store.add_user("Kim")
+    tm, ta = tenant.ticket_manager, tenant.task_manager
+    a, b = tm.create_ticket("A", "x"), tm.create_ticket("B", "y")
+    tm.assign_tickets([a.id, b.id], sam, sam)
+    tm.assign_tickets([b.id], kim, kim)
+    assert tm.get_user_tickets(sam) == [a]
+    assert sam.tickets_claimed == [a.id]
+    task = ta.create_task("T", assignee=sam, actor=sam)
+    ta.resolve_tasks([task.id], sam)
+    assert ta.get_user_tasks(sam) == [] and sam.tasks_claimed == []
@@ -0,0 +1,82 @@
+import builtins
+
+from models.intake import Intake
+from models.tenants import Tenant
+
+
+def _fields(i, email="a@corp.example"):
+    return dict(subject="Issue {}".format(i), from_name="A", email=email)
+
+
+def test_email_burst_then_rate_limited():
+    tm = Tenant("t").ticket_manager
+    intake = Intake(tm)
+    statuses = [intake.submit(_fields(i), now=0.0).status for i in range(4)]
+    assert statuses == ["created"] * 3 + ["rate_limited"]
+    # one token back after 10 s at 6 per minute
+    assert intake.submit(_fields(9), now=10.0).status == "created"
+
+
+def test_refused_submission_charges_nothing():
+    intake = Intake(Tenant("t").ticket_manager, limits={"domain": (60, 1)})
+    assert intake.submit(_fields(0), now=0.0).status == "created"
+    for i in range(5):      # domain bucket is empty; the email bucket must not drain
+        assert intake.submit(_fields(i), now=0.0).status == "rate_limited"
+    assert intake.submit(_fields(1), now=1.0).status == "created"
+
+
+def test_check_does_not_spend():
+    intake = Intake(Tenant("t").ticket_manager)
+    for _ in range(10):
+        assert intake.check(_fields(0), now=0.0) is None
+    assert [intake.submit(_fields(i), now=0.0).status for i in range(3)] == ["created"] * 3
+    assert intake.check(_fields(3), now=0.0).status == "rate_limited"
+
+
+def test_admission_queues_then_drains():
+    intake = Intake(Tenant("t").ticket_manager, admit_per_minute=60, admit_burst=1)
+    assert intake.submit(_fields(0, "a@x.test"), now=0.0).status == "created"
+    r = intake.submit(_fields(1, "b@y.test"), now=0.0)
+    assert (r.status, r.position) == ("queued", 1)
+    assert intake.drain(now=0.5) == 0
+    assert intake.drain(now=1.0) == 1 and intake.pending() == 0
+
+
+def test_queue_full_without_spool_is_busy():
+    intake = Intake(Tenant("t").ticket_manager, admit_burst=0, max_queue=2)
+    got = [intake.submit(_fields(i, "u{}@d{}.test".format(i, i)), now=0.0).status
+           for i in range(3)]
+    assert got == ["queued", "queued", "busy"]
+
+
+def test_close_without_spool_reports_what_the_quota_stopped():
+    tm = Tenant("t").ticket_manager
+    tm.max_open = len(tm.tickets) + 1
+    intake = Intake(tm, admit_burst=0)
+    for i in range(3):
+        intake.submit(_fields(i, "u{}@d{}.test".format(i, i)), now=0.0)
+    assert intake.close() == 2
+    assert intake.stats["dropped"] == 2 and intake.pending() == 0
+
+
+def test_close_with_spool_keeps_the_queue(tmp_path):
+    spool = str(tmp_path / "spool.jsonl")
+    intake = Intake(Tenant("t").ticket_manager, admit_burst=0, spool_path=spool)
+    for i in range(3):
+        intake.submit(_fields(i, "u{}@d{}.test".format(i, i)), now=0.0)
+    assert intake.close() == 0
+    again = Intake(Tenant("t2").ticket_manager, spool_path=spool)
+    assert again.pending() == 3 and again.drain(paced=False) == 3
+
+
+def test_public_form_checks_limits_before_the_duplicate_prompt(monkeypatch, capsys):
+    tm = Tenant("t").ticket_manager
+    tm.intake = Intake(tm)
+    tm.create_ticket("Printer on fire", "Ann", email="ann@corp.example")
+    for i in range(3):
+        tm.intake.submit(_fields(i, "ann@corp.example"))
+    answers = iter(["Printer on fire", "Ann", "ann@corp.example", "", "", "", "", ""])
+    monkeypatch.setattr(builtins, "input", lambda prompt="": next(answers))
+    tm.submit_ticket_ui()
+    out = capsys.readouterr().out
+    assert "Too many submissions" in out and "look similar" not in out
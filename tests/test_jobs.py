@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from models.jobs import CANCELLED, DONE, Cron, Scheduler, check_cancelled
+from models.tenants import TenantRegistry
+
+
+@pytest.fixture
+def scheduler():
+    s = Scheduler(threads=2, processes=1)
+    s.start()
+    yield s
+    s.stop()
+
+
+def test_cancel_group_drops_posted_main_callbacks(scheduler):
+    ran = []
+    a = scheduler.submit(lambda: scheduler.call_in_main(ran.append, "a"), group="a")
+    b = scheduler.submit(lambda: scheduler.call_in_main(ran.append, "b"), group="b")
+    assert scheduler.join([a, b], timeout=5)
+    scheduler.cancel_group("a")
+    scheduler.run_main()
+    assert ran == ["b"]
+    assert scheduler.stats["main_dropped"] == 1
+
+
+def test_cancelled_job_cannot_post_to_main(scheduler):
+    ran = []
+    started, go = threading.Event(), threading.Event()
+
+    def job():
+        started.set()
+        go.wait(5)
+        scheduler.call_in_main(ran.append, "late")
+
+    j = scheduler.submit(job, group="t")
+    assert started.wait(5)
+    assert scheduler.cancel_group("t") == 1
+    go.set()
+    assert j.wait(5)
+    scheduler.run_main()
+    assert ran == []
+
+
+def test_group_name_can_be_reused_after_cancel(scheduler):
+    scheduler.cancel_group("t")
+    ran = []
+    j = scheduler.submit(lambda: scheduler.call_in_main(ran.append, 1), group="t")
+    assert scheduler.join([j], timeout=5)
+    scheduler.run_main()
+    assert ran == [1]
+
+
+def test_running_job_stops_at_check_cancelled(scheduler):
+    started = threading.Event()
+
+    def loop():
+        started.set()
+        while True:
+            check_cancelled()
+
+    j = scheduler.submit(loop)
+    assert started.wait(5)
+    scheduler.cancel(j.id)
+    assert j.wait(5) and j.state == CANCELLED
+
+
+def test_spawned_sub_jobs_join_on_a_worker(scheduler):
+    def parent():
+        parts = [scheduler.spawn(lambda i=i: i * i) for i in range(5)]
+        scheduler.join(parts)
+        return sum(p.result for p in parts)
+
+    j = scheduler.submit(parent)
+    assert j.wait(5) and j.state == DONE and j.result == 30
+
+
+def test_recurring_job_skips_while_still_running(scheduler):
+    release = threading.Event()
+    j = scheduler.schedule("slow", lambda: release.wait(5), every=0.05, run_now=True)
+    time.sleep(0.4)
+    release.set()
+    scheduler.cancel(j.id)
+    assert j.skipped >= 1
+
+
+def test_cron_next_after():
+    base = time.mktime((2026, 1, 5, 10, 7, 30, 0, 0, -1))        # a Monday
+    nxt = time.localtime(Cron("*/15 9-17 * * 1-5").next_after(base))
+    assert (nxt.tm_hour, nxt.tm_min) == (10, 15)
+    with pytest.raises(ValueError):
+        Cron("61 * * * *")
+
+
+def test_evicted_tenant_warm_builds_never_install(scheduler, tmp_path):
+    registry = TenantRegistry(str(tmp_path), scheduler=scheduler)
+    registry.create("acme")
+    warm = [j for j in scheduler.rows("acme") if not j.recurring]
+    assert warm and scheduler.join(warm, timeout=10)
+    registry.evict("acme")
+    assert scheduler.stats["main_dropped"] >= 1
+    assert scheduler.run_main() == 0
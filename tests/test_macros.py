@@ -0,0 +1,38 @@
+import pytest
+
+from models.macros import Macro
+from models.tenants import Tenant
+
+
+def _setup():
+    tenant = Tenant("t")
+    agent = tenant.user_store.add_user("Sam")
+    return tenant.ticket_manager, agent
+
+
+def test_status_open_sets_open():
+    tm, agent = _setup()
+    t = tm.create_ticket("Printer jam", "Ann")
+    t.status = "Pending"
+    events = []
+    tm.add_listener(lambda event, item, actor, changes: events.append((event, changes)))
+    result = Macro("reopen", [{"type": "status", "value": "Open"}]).apply(tm, [t.id], agent)
+    assert t.status == "Open" and result["reopened"] == 1
+    assert events == [("updated", {"status": ("Pending", "Open")})]
+    # already open: nothing to do
+    assert Macro("reopen", [{"type": "status", "value": "Open"}]).apply(
+        tm, [t.id], agent)["reopened"] == 0
+
+
+def test_status_resolved_resolves_and_later_steps_skip_it():
+    tm, agent = _setup()
+    t = tm.create_ticket("Printer jam", "Ann")
+    m = Macro("close", [{"type": "status", "value": "Resolved"},
+                        {"type": "note", "text": "done"}])
+    result = m.apply(tm, [t.id], agent)
+    assert result["resolved"] == [t.id] and result["notes"] == 0
+
+
+def test_invalid_status_rejected():
+    with pytest.raises(ValueError):
+        Macro("x", [{"type": "status", "value": "Closed"}])
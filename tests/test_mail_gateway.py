@@ -0,0 +1,81 @@
+import os
+
+from models.mail_gateway import MailGateway, MboxSpool
+from models.tenants import Tenant
+
+
+def _deliver(maildir, name, sender, subject, body="hello"):
+    os.makedirs(os.path.join(maildir, "new"), exist_ok=True)
+    msg = "From: {}\nSubject: {}\n\n{}\n".format(sender, subject, body)
+    with open(os.path.join(maildir, "new", name), "w") as fh:
+        fh.write(msg)
+
+
+def _gateway(tmp_path):
+    tenant = Tenant("t")
+    maildir = str(tmp_path / "mail")
+    os.makedirs(maildir)
+    gw = MailGateway(tenant.ticket_manager, maildir, workers=1)
+    return tenant, gw, maildir
+
+
+def test_requester_reply_is_threaded(tmp_path):
+    tenant, gw, maildir = _gateway(tmp_path)
+    t = tenant.ticket_manager.create_ticket("VPN down", "Chris", email="chris@example.com")
+    _deliver(maildir, "1", "Chris <Chris@Example.com>", "Re: [#{}] VPN down".format(t.id))
+    run = gw.poll()
+    assert run["replies"] == 1 and run["created"] == 0
+    assert t.internal_notes[-1]["text"] == "hello"
+
+
+def test_stranger_cannot_reply_to_someone_elses_ticket(tmp_path):
+    tenant, gw, maildir = _gateway(tmp_path)
+    tm = tenant.ticket_manager
+    t = tm.create_ticket("VPN down", "Chris", email="chris@example.com")
+    notes = list(t.internal_notes)
+    _deliver(maildir, "1", "mallory@evil.test", "[#{}] please reset my password".format(t.id))
+    run = gw.poll()
+    assert run == dict(run, replies=0, created=1)
+    assert t.internal_notes == notes
+    new = tm.get_ticket(max(tm.tickets))
+    assert new.email == "mallory@evil.test"
+    assert new.internal_notes[-1]["text"] == "hello"
+
+
+def test_agent_may_reply_by_email(tmp_path):
+    tenant, gw, maildir = _gateway(tmp_path)
+    tenant.user_store.add_user("Sam", email="sam@helpdesk.local")
+    t = tenant.ticket_manager.create_ticket("VPN down", "Chris", email="chris@example.com")
+    _deliver(maildir, "1", "sam@helpdesk.local", "[#{}] on it".format(t.id))
+    assert gw.poll()["replies"] == 1
+
+
+def test_flood_from_one_sender_is_rate_limited(tmp_path):
+    tenant, gw, maildir = _gateway(tmp_path)
+    before = len(tenant.ticket_manager.tickets)
+    for i in range(10):
+        _deliver(maildir, str(i), "spam@flood.test", "buy now {}".format(i))
+    run = gw.poll()
+    assert run["created"] == 3                      # the email bucket's burst
+    assert run["limited"] == 7
+    assert len(tenant.ticket_manager.tickets) == before + 3
+    assert not os.listdir(os.path.join(maildir, "new"))
+
+
+def test_quota_defers_the_rest_of_the_spool(tmp_path):
+    tenant, gw, maildir = _gateway(tmp_path)
+    tenant.set_quotas({"open_tickets": len(tenant.ticket_manager.tickets) + 1})
+    for i in range(3):
+        _deliver(maildir, str(i), "u{}@example.com".format(i), "issue {}".format(i))
+    run = gw.poll()
+    assert run["created"] == 1 and run["deferred"] == 2
+    assert len(os.listdir(os.path.join(maildir, "new"))) == 2
+
+
+def test_mbox_leaves_a_half_written_message(tmp_path):
+    path = tmp_path / "mbox"
+    path.write_bytes(b"From a@x Mon\nSubject: one\n\nbody\n\n"
+                     b"From b@x Mon\nSubject: two\n\npartial")
+    spool = MboxSpool(str(path), settle=0)
+    batches = list(spool.batches(10))
+    assert [len(b) for b in batches] == [1]
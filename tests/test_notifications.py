@@ -0,0 +1,80 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import models.notifications as notifications
+from models.notifications import Notifier, Transport
+
+
+class ListTransport(Transport):
+    def __init__(self):
+        self.sent = []
+
+    def send(self, messages):
+        self.sent.extend(messages)
+
+
+def _ticket(tid=1):
+    return SimpleNamespace(id=tid, subject="VPN down", email="chris@example.com",
+                           assigned_to=None)
+
+
+def _ops(path):
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line)["op"] for line in fh]
+
+
+def test_handle_does_not_wait_for_the_workers_fsync(tmp_path, monkeypatch):
+    n = Notifier(str(tmp_path / "outbox"), ListTransport())
+    in_fsync, release = threading.Event(), threading.Event()
+    real_fsync = notifications.os.fsync
+
+    def slow_fsync(fd):
+        in_fsync.set()
+        release.wait(5)
+        real_fsync(fd)
+
+    monkeypatch.setattr(notifications.os, "fsync", slow_fsync)
+    worker = threading.Thread(target=n._journal, args=([{"op": "routed", "eid": "x"}],))
+    worker.start()
+    assert in_fsync.wait(5)
+    t0 = time.monotonic()
+    n.handle("created", _ticket(), None, {})
+    elapsed = time.monotonic() - t0
+    release.set()
+    worker.join()
+    assert elapsed < 1.0
+    assert _ops(str(tmp_path / "outbox")) == ["routed", "event"]
+
+
+def test_unrouted_events_are_replayed_on_start(tmp_path):
+    path = str(tmp_path / "outbox")
+    first = Notifier(path, ListTransport())
+    first.handle("created", _ticket(), None, {})       # never started: "crash"
+    first._fh.close()
+
+    transport = ListTransport()
+    second = Notifier(path, transport, coalesce_window=0.0)
+    second.start()
+    second.stop(flush=True)
+    assert [m["To"] for m in transport.sent] == ["chris@example.com"]
+    assert "sent" in _ops(path)
+
+
+def test_replay_keeps_events_handled_during_compaction(tmp_path, monkeypatch):
+    path = str(tmp_path / "outbox")
+    n = Notifier(path, ListTransport())
+    n.handle("created", _ticket(1), None, {})
+    real_fsync = notifications.os.fsync
+
+    def fsync_and_handle(fd):
+        real_fsync(fd)
+        monkeypatch.setattr(notifications.os, "fsync", real_fsync)
+        n.handle("created", _ticket(2), None, {})       # lands after the read
+
+    monkeypatch.setattr(notifications.os, "fsync", fsync_and_handle)
+    n._replay_outbox()
+    with open(path, encoding="utf-8") as fh:
+        ids = [json.loads(line)["item"]["ticket_id"] for line in fh]
+    assert sorted(ids) == [1, 2]
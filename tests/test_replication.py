@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from models.audit import AuditLog
+from models.replication import ReplicationFollower, ReplicationLeader, StaleReplica
+from models.tabs.tasks import TaskManager
+from models.tabs.tickets import TicketManager
+from models.users import UserStore
+
+
+@pytest.fixture
+def leader():
+    users = UserStore()
+    users.add_user("Sam")
+    audit = AuditLog()
+    tm = TicketManager(users, seed=False)
+    ta = TaskManager(users, ticket_manager=tm, seed=False)
+    tm.task_manager = ta
+    tm.add_listener(audit.ticket_listener)
+    ta.add_listener(audit.task_listener)
+    tm.create_ticket("Before the follower joined", "Ann")
+    leader = ReplicationLeader(audit, users, tm, ta, "127.0.0.1:0", heartbeat=0.05)
+    leader.start()
+    yield leader
+    leader.stop()
+
+
+@pytest.fixture
+def follower(leader):
+    f = ReplicationFollower(leader.address, max_staleness=5.0, reconnect=0.05)
+    f.start()
+    assert f.wait_for(len(leader.audit), timeout=10)
+    yield f
+    f.stop()
+
+
+def test_snapshot_then_live_records(leader, follower):
+    assert follower.stats["snapshots"] == 1
+    sam = leader.user_store.get_by_name("Sam")
+    t = leader.ticket_manager.create_ticket("After", "Bob")
+    leader.ticket_manager.assign_tickets([t.id], sam, sam)
+    assert follower.wait_for(len(leader.audit), timeout=10)
+    with follower.read():
+        copy = follower.ticket_manager.get_ticket(t.id)
+        assert copy.subject == "After" and copy.assigned_to == "Sam"
+        assert sorted(follower.ticket_manager.tickets) == sorted(leader.ticket_manager.tickets)
+
+
+def test_reconnect_catches_up_from_the_log(leader, follower):
+    follower.stop()
+    for i in range(5):
+        leader.ticket_manager.create_ticket("offline {}".format(i), "Cy")
+    follower.start()
+    assert follower.wait_for(len(leader.audit), timeout=10)
+    assert follower.stats["snapshots"] == 1           # same term: log catch-up, no snapshot
+    assert len(follower.ticket_manager.tickets) == len(leader.ticket_manager.tickets)
+
+
+def test_unsynced_replica_refuses_reads():
+    f = ReplicationFollower("127.0.0.1:1", max_staleness=1.0)
+    with pytest.raises(StaleReplica):
+        with f.read():
+            pass
+
+
+def test_disconnected_replica_goes_stale(leader, follower):
+    leader.stop()
+    time.sleep(0.3)
+    with pytest.raises(StaleReplica):
+        with follower.read(max_staleness=0.2):
+            pass
+
+
+def test_promoted_follower_keeps_ids_and_leads(leader, follower):
+    newest = max(leader.ticket_manager.tickets)
+    promoted = follower.promote("127.0.0.1:0")
+    try:
+        t = promoted.ticket_manager.create_ticket("After failover", "Dee")
+        assert t.id == newest + 1
+        other = ReplicationFollower(promoted.address, reconnect=0.05)
+        other.start()
+        try:
+            assert other.wait_for(len(promoted.audit), timeout=10)
+            assert other.ticket_manager.get_ticket(t.id).subject == "After failover"
+        finally:
+            other.stop()
+    finally:
+        promoted.stop()